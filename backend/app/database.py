@@ -1,15 +1,28 @@
 """
 数据库配置文件
 配置SQLAlchemy引擎、会话和基础模型类
+
+接口与后台任务使用异步引擎（SQLite 走 aiosqlite，PostgreSQL 走 asyncpg），
+查询不会阻塞事件循环；同步引擎只供建表与离线脚本使用。
+
+文件型 SQLite 使用 WAL 等连接参数（见 app.utils.sqlite_profile），并拆分为两个连接池：
+写连接池默认只有一个连接（SQLITE_WRITE_POOL_SIZE），写事务在连接池排队而不是在 SQLite 锁上冲突；
+只读连接池有多个连接，读请求通过 get_read_db 获取，在 WAL 下与写入并行。
+其他数据库两者共用同一个引擎。
 """
 
 import os
 from pathlib import Path
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+from app.utils.db_profiler import instrument_engine
+from app.utils.sqlite_profile import apply_sqlite_profile, is_sqlite_file
+
 # 加载环境变量
 load_dotenv()
 
@@ -20,40 +33,129 @@ DEFAULT_DB_PATH = BACKEND_DIR / "travel_planner.db"
 # 获取数据库URL（优先环境变量），否则使用绝对路径的 SQLite 文件
 DATABASE_URL = os.getenv("DATABASE_URL") or f"sqlite:///{DEFAULT_DB_PATH.as_posix()}"
 
-# 创建数据库引擎
+# 各数据库对应的异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "postgres": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+
+def to_async_url(url: str) -> str:
+    """把同步数据库URL转换为对应异步驱动的URL（如 sqlite:/// -> sqlite+aiosqlite:///）"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"不支持的数据库类型: {backend}")
+    if backend == "postgres":
+        backend = "postgresql"
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+# SQL_ECHO=true 时逐条打印SQL，仅用于本地调试；日常通过 app.utils.db_profiler 统计查询次数、耗时与慢查询
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+
+SQLITE_FILE = is_sqlite_file(DATABASE_URL)
+# 写连接池与只读连接池大小（仅文件型 SQLite）
+SQLITE_WRITE_POOL_SIZE = int(os.getenv("SQLITE_WRITE_POOL_SIZE", "1"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
+# 创建同步数据库引擎（建表与离线脚本）
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=True  # 开发阶段显示SQL语句
+    echo=SQL_ECHO
 )
+instrument_engine(engine)
+
+# 创建异步数据库引擎（接口与后台任务）；文件型 SQLite 的写连接池默认只保留一个连接
+if SQLITE_FILE:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=SQL_ECHO,
+        pool_size=SQLITE_WRITE_POOL_SIZE,
+        max_overflow=0,
+    )
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=SQL_ECHO,
+        pool_size=SQLITE_READ_POOL_SIZE,
+        max_overflow=SQLITE_READ_POOL_SIZE,
+    )
+    apply_sqlite_profile(engine)
+    apply_sqlite_profile(async_engine.sync_engine)
+    apply_sqlite_profile(async_read_engine.sync_engine, read_only=True)
+else:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=SQL_ECHO)
+    async_read_engine = async_engine
+instrument_engine(async_engine.sync_engine)
+instrument_engine(async_read_engine.sync_engine)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 提交后不过期对象属性：异步会话中访问过期属性会触发隐式IO
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # 创建基础模型类
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     """
-    获取数据库会话
+    获取异步数据库会话（写连接池）
     用于依赖注入
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    """
+    获取只读异步数据库会话（只读连接池）
+    用于只查询不写入的接口；文件型 SQLite 上写入会被 query_only 拒绝
+    """
+    async with AsyncReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def dispose_engines():
+    """
+    关闭异步引擎的连接池（应用关闭时调用）
+    """
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+
+async def run_migrations_async():
+    """
+    执行尚未应用的数据库迁移（应用启动时调用）
+    """
+    from app.migrations import upgrade
+
+    async with async_engine.begin() as conn:
+        return await conn.run_sync(upgrade)
 
 def create_tables():
     """
-    创建所有数据表
+    创建所有数据表（执行尚未应用的数据库迁移）
     """
-    Base.metadata.create_all(bind=engine)
+    from app.migrations import upgrade
+
+    with engine.begin() as conn:
+        upgrade(conn)
     print("数据库表创建完成")
 
 def drop_tables():
     """
     删除所有数据表（开发阶段使用）
     """
+    from app.migrations import drop_version_table
+
     Base.metadata.drop_all(bind=engine)
-    print("数据库表删除完成")
\ No newline at end of file
+    with engine.begin() as conn:
+        drop_version_table(conn)
+    print("数据库表删除完成")
@@ -0,0 +1,77 @@
+"""
+数据库版本化迁移
+按版本号顺序执行 versions.MIGRATIONS 中尚未应用的迁移，并在 schema_version 表记录已应用的版本。
+
+应用启动时由 app.database.run_migrations_async 调用；命令行可用 scripts/migrate.py 查看状态或手动升级。
+迁移与版本记录在调用方的同一个事务中提交（SQLite 的 DDL 不一定参与事务，因此迁移本身都写成可重复执行）。
+"""
+
+import logging
+from typing import List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, insert, select
+from sqlalchemy.engine import Connection
+
+from app.migrations.versions import MIGRATIONS, Migration
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 版本表不属于业务模型，使用独立的 MetaData，避免被 create_all / drop_all 处理
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+if [m.version for m in MIGRATIONS] != sorted({m.version for m in MIGRATIONS}):
+    raise RuntimeError("迁移版本号必须唯一且递增")
+
+LATEST_VERSION = MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def current_version(conn: Connection) -> int:
+    """数据库当前的迁移版本（未做过迁移时为 0）"""
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.scalar(select(func.max(schema_version.c.version))) or 0
+
+
+def pending_migrations(conn: Connection) -> List[Migration]:
+    """尚未应用的迁移"""
+    version = current_version(conn)
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+
+def upgrade(conn: Connection, target: Optional[int] = None) -> List[int]:
+    """
+    执行尚未应用的迁移
+
+    Args:
+        conn: 同步连接（需处于事务中，如 engine.begin()）
+        target: 升级到的版本，默认最新
+
+    Returns:
+        本次应用的版本号列表
+    """
+    schema_version.create(conn, checkfirst=True)
+    applied = []
+    for migration in pending_migrations(conn):
+        if target is not None and migration.version > target:
+            break
+        logger.info(f"应用数据库迁移 {migration.version}: {migration.description}")
+        migration.upgrade(conn)
+        conn.execute(insert(schema_version).values(version=migration.version, description=migration.description))
+        applied.append(migration.version)
+    return applied
+
+
+def drop_version_table(conn: Connection):
+    """删除版本表（与 drop_tables 一起使用，使下次启动重新执行全部迁移）"""
+    schema_version.drop(conn, checkfirst=True)
+
+
+__all__ = ["MIGRATIONS", "LATEST_VERSION", "Migration", "current_version", "pending_migrations", "upgrade", "drop_version_table", "schema_version"]
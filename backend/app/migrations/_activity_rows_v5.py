@@ -0,0 +1,262 @@
+"""
+迁移 5 回填 itinerary_activities 用的行程活动解析（冻结副本）
+
+复制自迁移发布时的 app/utils/activity_parser.py 及其用到的 app/utils/cn_numbers.py，
+之后对解析规则的修改不影响已发布迁移的回填结果；不要修改本文件，也不要在迁移以外使用。
+"""
+
+import re
+from datetime import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_DIGITS = {
+    "零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "俩": 2, "三": 3, "四": 4,
+    "五": 5, "六": 6, "七": 7, "八": 8, "九": 9,
+}
+_UNITS = {"十": 10, "拾": 10, "百": 100, "佰": 100, "千": 1000, "仟": 1000, "k": 1000, "K": 1000}
+_BIG_UNITS = {"万": 10_000, "w": 10_000, "W": 10_000, "亿": 100_000_000}
+
+# 全角数字和小数点转半角
+_FULLWIDTH = str.maketrans("０１２３４５６７８９．", "0123456789.")
+
+# 数字表达式：阿拉伯数字与中文数字、单位的任意组合
+_NUMBER_PATTERN = r"(?:\d+(?:\.\d+)?|[零〇一二两俩三四五六七八九十拾百佰千仟])(?:\d+(?:\.\d+)?|[零〇一二两俩三四五六七八九十拾百佰千仟万亿]|(?<=\d)[kKwW])*"
+# 单独的单位字（如“万”）不是数字，需要前面有数字
+_NUMBER_RE = re.compile(_NUMBER_PATTERN)
+_ARABIC_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _normalize_digits(text: str) -> str:
+    """全角数字转半角"""
+    return text.translate(_FULLWIDTH)
+
+
+def _tokens(text: str) -> List[Tuple[str, float]]:
+    """拆分为 ("num", 值) / ("unit", 倍数) / ("big", 倍数) / ("zero", 0) 序列"""
+    tokens = []
+    i = 0
+    while i < len(text):
+        match = _ARABIC_RE.match(text, i)
+        if match:
+            tokens.append(("num", float(match.group())))
+            i = match.end()
+            continue
+        ch = text[i]
+        if ch in ("零", "〇"):
+            tokens.append(("zero", 0))
+        elif ch in _DIGITS:
+            tokens.append(("num", _DIGITS[ch]))
+        elif ch in _UNITS:
+            tokens.append(("unit", _UNITS[ch]))
+        elif ch in _BIG_UNITS:
+            tokens.append(("big", _BIG_UNITS[ch]))
+        else:
+            return []
+        i += 1
+    return tokens
+
+
+def _cn_to_number(text: str) -> Optional[float]:
+    """
+    把中文/混合数字转换为数值，无法识别时返回 None
+
+    支持“二十五”“一百零五”“两万三”（口语，= 23000）“一千二”（= 1200）
+    “3.5万”“1万5”“5k”“1.2w”等写法。
+    """
+    tokens = _tokens(_normalize_digits(text.strip()))
+    if not tokens:
+        return None
+
+    total = 0.0
+    section = 0.0
+    number: Optional[float] = None
+    last_unit = 0
+    largest_big = 0
+    zero_seen = False
+    for kind, value in tokens:
+        if kind == "num":
+            if number is not None:
+                # 连续两个数字（如“一二”）不是合法写法
+                return None
+            number = value
+        elif kind == "zero":
+            zero_seen = True
+        elif kind == "unit":
+            section += (number if number is not None else 1) * value
+            number = None
+            last_unit = value
+            zero_seen = False
+        else:
+            head = section + (number or 0)
+            if value > largest_big:
+                # “一亿两千万”：更大的单位作用于此前的全部数值
+                total = (total + head) * value
+                largest_big = value
+            else:
+                total += head * value
+            section = 0.0
+            number = None
+            last_unit = value
+            zero_seen = False
+
+    if number is not None:
+        # 口语省略末尾单位：“两万三”= 23000，“一千二”= 1200；“一千零二”不省略
+        if last_unit >= 100 and not zero_seen and number < 10:
+            number *= last_unit / 10
+        section += number
+    return total + section
+
+
+def _find_numbers(text: str) -> List[Tuple[float, int, int]]:
+    """找出文本中所有数字表达式，返回 (数值, 起始位置, 结束位置)"""
+    text = _normalize_digits(text)
+    results = []
+    for match in _NUMBER_RE.finditer(text):
+        value = _cn_to_number(match.group())
+        if value is not None:
+            results.append((value, match.start(), match.end()))
+    return results
+
+
+_DAY_KEY_RE = re.compile(r"day(\d+)")
+
+_CLOCK_RE = re.compile(r"(\d{1,2})\s*[:：]\s*(\d{2})")
+_HOUR_POINT_RE = re.compile(rf"(上午|早上|中午|下午|傍晚|晚上)?\s*({_NUMBER_PATTERN})\s*[点時时](半)?")
+_AFTERNOON = ("下午", "傍晚", "晚上")
+
+_HOURS_RE = re.compile(
+    rf"({_NUMBER_PATTERN})(?:\s*[-~～至到]\s*({_NUMBER_PATTERN}))?\s*个?\s*(半)?\s*(?:小时|钟头|hours?|hrs?|h)",
+    re.IGNORECASE,
+)
+_MINUTES_RE = re.compile(
+    rf"({_NUMBER_PATTERN})(?:\s*[-~～至到]\s*({_NUMBER_PATTERN}))?\s*(?:分钟|分|minutes?|mins?)",
+    re.IGNORECASE,
+)
+# 没有具体数字的常见说法
+_DURATION_WORDS = {"半小时": 30, "半个小时": 30, "半天": 240, "全天": 480, "一整天": 480, "一天": 480}
+_FREE_WORDS = ("免费", "免门票", "无需门票", "不要钱")
+
+
+def _day_index(key: str) -> Optional[int]:
+    """行程JSON的键（如 "day3"）对应的天序号，不是天的键返回 None"""
+    match = _DAY_KEY_RE.fullmatch(key)
+    return int(match.group(1)) if match else None
+
+
+def _parse_start_time(value: Any) -> Optional[time]:
+    """解析开始时间：“09:00”“14:00-16:00”取开始，“下午3点半”等口语写法"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = _normalize_digits(value)
+    match = _CLOCK_RE.search(text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+    else:
+        match = _HOUR_POINT_RE.search(text)
+        hour_value = _cn_to_number(match.group(2)) if match else None
+        if hour_value is None:
+            return None
+        hour, minute = int(hour_value), 30 if match.group(3) else 0
+        if match.group(1) in _AFTERNOON and hour < 12:
+            hour += 12
+    if 0 <= hour < 24 and 0 <= minute < 60:
+        return time(hour, minute)
+    return None
+
+
+def _range_value(low: str, high: Optional[str]) -> Optional[float]:
+    """“2-3”取中间值"""
+    low_value = _cn_to_number(low)
+    high_value = _cn_to_number(high) if high else None
+    if low_value is None:
+        return None
+    return (low_value + high_value) / 2 if high_value is not None else low_value
+
+
+def _parse_duration_minutes(value: Any) -> Optional[int]:
+    """解析持续时间为分钟：“2小时”“1.5小时”“一个半小时”“1小时30分钟”“90min”“半天”"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # 纯数字按小时理解（与提示词中的“2小时”一致）
+        return int(round(value * 60)) if value >= 0 else None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = _normalize_digits(value.strip())
+    for word, minutes in _DURATION_WORDS.items():
+        if text == word:
+            return minutes
+
+    total = 0.0
+    matched = False
+    hours = _HOURS_RE.search(text)
+    if hours:
+        amount = _range_value(hours.group(1), hours.group(2))
+        if amount is not None:
+            total += amount * 60 + (30 if hours.group(3) else 0)
+            matched = True
+        text = text[hours.end():]
+    minutes = _MINUTES_RE.search(text)
+    if minutes:
+        amount = _range_value(minutes.group(1), minutes.group(2))
+        if amount is not None:
+            total += amount
+            matched = True
+    if not matched and "半小时" in text:
+        return 30
+    return int(round(total)) if matched else None
+
+
+def _parse_cost(value: Any) -> Optional[float]:
+    """解析费用：数字直接使用，文本取第一个金额（“约80元”“人均50”），“免费”为0"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return round(float(value), 2) if value >= 0 else None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    if any(word in value for word in _FREE_WORDS):
+        return 0.0
+    numbers = _find_numbers(value)
+    return round(numbers[0][0], 2) if numbers else None
+
+
+def _text(value: Any, max_length: int) -> Optional[str]:
+    """非空文本截断到列长度"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text[:max_length] if text else None
+
+
+def activity_rows(itinerary: Any) -> List[Dict[str, Any]]:
+    """
+    把行程JSON展开为活动行（不含 trip_id）
+
+    Args:
+        itinerary: Trip.itinerary，{"day1": {"date", "activities": [...]}, ...}
+
+    Returns:
+        [{"day_index", "position", "start_time", "duration_minutes", "cost",
+          "activity_type", "name", "location"}, ...]，按天、活动顺序排列
+    """
+    if not isinstance(itinerary, dict):
+        return []
+    rows = []
+    days = sorted((index, day) for index, day in ((_day_index(key), day) for key, day in itinerary.items()) if index is not None)
+    for index, day in days:
+        activities = day.get("activities") if isinstance(day, dict) else None
+        if not isinstance(activities, list):
+            continue
+        for position, activity in enumerate(activities):
+            if not isinstance(activity, dict):
+                continue
+            rows.append({
+                "day_index": index,
+                "position": position,
+                "start_time": _parse_start_time(activity.get("time")),
+                "duration_minutes": _parse_duration_minutes(activity.get("duration")),
+                "cost": _parse_cost(activity.get("cost")),
+                "activity_type": _text(activity.get("type"), 50),
+                "name": _text(activity.get("activity") or activity.get("name"), 200),
+                "location": _text(activity.get("location"), 200),
+            })
+    return rows
@@ -0,0 +1,174 @@
+"""
+数据库迁移列表
+每个迁移有递增的版本号，已应用的版本记录在 schema_version 表中，只会执行一次。
+
+新增迁移时在 MIGRATIONS 末尾追加，不要修改已发布的迁移。迁移函数接收同步连接，
+需要兼容“表结构已由旧版本的 create_all 建好”的数据库，因此建表、加列、建索引都先检查是否已存在。
+迁移中的表结构是定义时的快照，不引用 ORM 模型上的列和索引，回填数据也只使用这些快照和
+迁移包内冻结的解析代码，模型或解析规则之后的修改不会改变已发布迁移的含义。
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List
+
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Index, Integer, JSON, MetaData, Numeric, String, Table, Text, Time,
+    delete, func, insert, inspect, select, text,
+)
+from sqlalchemy.engine import Connection
+
+from app.migrations._activity_rows_v5 import activity_rows
+
+
+@dataclass(frozen=True)
+class Migration:
+    """一个版本化迁移"""
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _add_column_if_missing(conn: Connection, table: str, column: str, ddl: str):
+    """表中缺少该列时执行 ALTER TABLE ADD COLUMN"""
+    columns = {item["name"] for item in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_index(conn: Connection, name: str, table: str, *columns: str):
+    """在现有表上创建索引（已存在则跳过）"""
+    reflected = Table(table, MetaData(), autoload_with=conn)
+    Index(name, *[reflected.c[column] for column in columns]).create(conn, checkfirst=True)
+
+
+# 各迁移新建的表在创建时的结构快照；迁移 1 的基础表即引入版本化迁移之前 create_all 建出的表，
+# 不含之后迁移新增的列和索引
+_schema = MetaData()
+
+Table(
+    "users", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, index=True, nullable=False),
+    Column("email", String(100), unique=True, index=True, nullable=False),
+    Column("password_hash", String(255), nullable=False),
+    Column("preferences", JSON, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "trips", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("title", String(200), nullable=False),
+    Column("destination", String(100), nullable=False),
+    Column("start_date", DateTime, nullable=False),
+    Column("end_date", DateTime, nullable=False),
+    Column("budget", Numeric(10, 2), nullable=True),
+    Column("status", String(20)),
+    Column("itinerary", JSON, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "expenses", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("trip_id", Integer, ForeignKey("trips.id"), nullable=False),
+    Column("amount", Numeric(10, 2), nullable=False),
+    Column("category", String(50), nullable=False),
+    Column("description", Text, nullable=True),
+    Column("expense_date", DateTime, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "generation_jobs", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("status", String(20), nullable=False, index=True),
+    Column("request", JSON, nullable=False),
+    Column("trip_id", Integer, ForeignKey("trips.id", ondelete="SET NULL"), nullable=True),
+    Column("error", Text, nullable=True),
+    Column("attempts", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("started_at", DateTime(timezone=True), nullable=True),
+    Column("finished_at", DateTime(timezone=True), nullable=True),
+)
+
+
+_trip_budget_totals = Table(
+    "trip_budget_totals", _schema,
+    Column("trip_id", Integer, ForeignKey("trips.id"), primary_key=True),
+    Column("category", String(50), primary_key=True),
+    Column("amount", Numeric(12, 2), nullable=False),
+    Column("expense_count", Integer, nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+_itinerary_activities = Table(
+    "itinerary_activities", _schema,
+    Column("id", Integer, primary_key=True),
+    Column("trip_id", Integer, ForeignKey("trips.id"), nullable=False),
+    Column("day_index", Integer, nullable=False),
+    Column("position", Integer, nullable=False),
+    Column("start_time", Time, nullable=True),
+    Column("duration_minutes", Integer, nullable=True),
+    Column("cost", Numeric(10, 2), nullable=True),
+    Column("activity_type", String(50), nullable=True),
+    Column("name", String(200), nullable=True),
+    Column("location", String(200), nullable=True),
+)
+
+
+def initial_schema(conn: Connection):
+    """基础表：用户、行程、费用与生成任务"""
+    _schema.create_all(
+        conn,
+        tables=[_schema.tables[name] for name in ("users", "trips", "expenses", "generation_jobs")],
+    )
+
+
+def add_trip_travelers(conn: Connection):
+    """trips.travelers（原 scripts/add_travelers_column.py）"""
+    _add_column_if_missing(conn, "trips", "travelers", "INTEGER")
+
+
+def add_hot_path_indexes(conn: Connection):
+    """行程列表、费用列表/汇总与归属校验使用的复合索引"""
+    _create_index(conn, "ix_trips_user_id_created_at", "trips", "user_id", "created_at")
+    _create_index(conn, "ix_expenses_trip_id_expense_date", "expenses", "trip_id", "expense_date")
+
+
+def add_trip_budget_totals(conn: Connection):
+    """按 (行程, 类别) 维护的开销汇总表，并从现有费用回填"""
+    _trip_budget_totals.create(conn, checkfirst=True)
+    expenses = _schema.tables["expenses"]
+    conn.execute(delete(_trip_budget_totals))
+    conn.execute(insert(_trip_budget_totals).from_select(
+        ["trip_id", "category", "amount", "expense_count"],
+        select(expenses.c.trip_id, expenses.c.category, func.sum(expenses.c.amount), func.count(expenses.c.id))
+        .group_by(expenses.c.trip_id, expenses.c.category),
+    ))
+
+
+def add_itinerary_activities(conn: Connection):
+    """行程活动表（从 itinerary JSON 展开）及其索引，并从现有行程回填"""
+    _itinerary_activities.create(conn, checkfirst=True)
+    _create_index(conn, "ix_itinerary_activities_trip_id_day_index", "itinerary_activities", "trip_id", "day_index", "position")
+    _create_index(conn, "ix_itinerary_activities_type_cost", "itinerary_activities", "activity_type", "cost")
+    trips = _schema.tables["trips"]
+    conn.execute(delete(_itinerary_activities))
+    for trip_id, itinerary in conn.execute(select(trips.c.id, trips.c.itinerary)).all():
+        rows = activity_rows(itinerary)
+        if rows:
+            conn.execute(insert(_itinerary_activities), [{"trip_id": trip_id, **row} for row in rows])
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial schema", initial_schema),
+    Migration(2, "add trips.travelers", add_trip_travelers),
+    Migration(3, "add trips(user_id, created_at) and expenses(trip_id, expense_date) indexes", add_hot_path_indexes),
+    Migration(4, "add trip_budget_totals", add_trip_budget_totals),
+    Migration(5, "add itinerary_activities", add_itinerary_activities),
+]
@@ -6,6 +6,9 @@
 from .user import User
 from .trip import Trip
 from .expense import Expense
+from .job import GenerationJob
+from .budget_total import TripBudgetTotal
+from .activity import ItineraryActivity
 
 # 导出所有模型
-__all__ = ["User", "Trip", "Expense"]
\ No newline at end of file
+__all__ = ["User", "Trip", "Expense", "GenerationJob", "TripBudgetTotal", "ItineraryActivity"]
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+行程活动模型
+把 Trip.itinerary 中的 dayN.activities[] 展开为带类型的行，按类型/费用/地点筛选活动、
+按天汇总计划费用时直接查询本表，无需逐个解码行程JSON
+
+活动行由 Trip 的 ORM 事件在同一事务中维护：创建行程、修改 itinerary（整体更新、
+局部重新生成）时整体重写该行程的活动，删除行程时一并删除。绕过 ORM 直接写 trips 表后
+需调用 rebuild_itinerary_activities 重新展开。
+"""
+
+from typing import Optional
+
+from sqlalchemy import Column, Integer, String, Time, ForeignKey, Numeric, Index, delete, event, insert, inspect, select
+from sqlalchemy.engine import Connection
+from app.database import Base
+from app.models.trip import Trip
+from app.utils.activity_parser import activity_rows
+
+class ItineraryActivity(Base):
+    """
+    行程活动表模型
+    每个行程每天的每个活动一行，与行程JSON中的顺序一致
+    """
+    __tablename__ = "itinerary_activities"
+    __table_args__ = (
+        # 某行程的活动按天、顺序读取，以及按天汇总
+        Index("ix_itinerary_activities_trip_id_day_index", "trip_id", "day_index", "position"),
+        # 按类型筛选并按费用过滤/排序（如费用超过200元的景点）
+        Index("ix_itinerary_activities_type_cost", "activity_type", "cost"),
+    )
+
+    id = Column(Integer, primary_key=True, comment="活动ID")
+    trip_id = Column(Integer, ForeignKey("trips.id"), nullable=False, comment="行程ID")
+    day_index = Column(Integer, nullable=False, comment="第几天（从1开始）")
+    position = Column(Integer, nullable=False, comment="当天的第几个活动（从0开始）")
+    start_time = Column(Time, nullable=True, comment="开始时间")
+    duration_minutes = Column(Integer, nullable=True, comment="持续时间（分钟）")
+    cost = Column(Numeric(10, 2), nullable=True, comment="计划费用")
+    activity_type = Column(String(50), nullable=True, comment="活动类型: 景点、餐饮、住宿、交通等")
+    name = Column(String(200), nullable=True, comment="活动名称")
+    location = Column(String(200), nullable=True, comment="地点")
+
+    def __repr__(self):
+        return f"<ItineraryActivity(trip_id={self.trip_id}, day={self.day_index}, position={self.position}, name='{self.name}')>"
+
+
+def sync_trip_activities(connection: Connection, trip_id: int, itinerary):
+    """用行程JSON整体重写该行程的活动行"""
+    table = ItineraryActivity.__table__
+    connection.execute(delete(table).where(table.c.trip_id == trip_id))
+    rows = activity_rows(itinerary)
+    if rows:
+        connection.execute(insert(table), [{"trip_id": trip_id, **row} for row in rows])
+
+
+@event.listens_for(Trip, "after_insert")
+def _trip_inserted(mapper, connection, target):
+    rows = activity_rows(target.itinerary)
+    if rows:
+        connection.execute(insert(ItineraryActivity.__table__), [{"trip_id": target.id, **row} for row in rows])
+
+
+@event.listens_for(Trip, "after_update")
+def _trip_updated(mapper, connection, target):
+    if inspect(target).attrs["itinerary"].history.has_changes():
+        sync_trip_activities(connection, target.id, target.itinerary)
+
+
+@event.listens_for(Trip, "before_delete")
+def _trip_deleted(mapper, connection, target):
+    # 在删除行程之前执行，启用外键约束的数据库上不会因活动行引用行程而失败
+    table = ItineraryActivity.__table__
+    connection.execute(delete(table).where(table.c.trip_id == target.id))
+
+
+def rebuild_itinerary_activities(connection: Connection, trip_id: Optional[int] = None):
+    """
+    从行程JSON重新展开活动（迁移回填、绕过 ORM 写入后修复）
+
+    Args:
+        connection: 同步连接（需处于事务中）
+        trip_id: 只重建某个行程，默认全部
+    """
+    statement = select(Trip.id, Trip.itinerary)
+    if trip_id is not None:
+        statement = statement.where(Trip.id == trip_id)
+    else:
+        connection.execute(delete(ItineraryActivity.__table__))
+    for row in connection.execute(statement).all():
+        sync_trip_activities(connection, row.id, row.itinerary)
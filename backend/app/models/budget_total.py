@@ -0,0 +1,122 @@
+"""
+行程开销汇总模型
+按 (行程, 类别) 维护费用金额合计与条数，预算汇总接口直接读取，无需扫描费用明细
+
+汇总由 Expense 的 ORM 事件在同一事务中维护：插入、删除（含删除行程时的级联删除）
+以及修改金额/类别/所属行程都会同步更新。绕过 ORM 直接写 expenses 表后需调用
+rebuild_budget_totals 重新统计。
+"""
+
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, delete, event, insert, inspect, select, update, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from app.database import Base
+from app.models.expense import Expense
+
+class TripBudgetTotal(Base):
+    """
+    行程开销汇总表模型
+    每个行程的每个费用类别一行
+    """
+    __tablename__ = "trip_budget_totals"
+
+    trip_id = Column(Integer, ForeignKey("trips.id"), primary_key=True, comment="行程ID")
+    category = Column(String(50), primary_key=True, comment="费用类别")
+    amount = Column(Numeric(12, 2), nullable=False, default=0, comment="金额合计")
+    expense_count = Column(Integer, nullable=False, default=0, comment="费用条数")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<TripBudgetTotal(trip_id={self.trip_id}, category='{self.category}', amount={self.amount}, count={self.expense_count})>"
+
+
+def _apply_delta(connection: Connection, trip_id: int, category: str, amount, count: int):
+    """把一笔费用的增减累加到汇总行（不存在则插入），条数归零的行删除"""
+    table = TripBudgetTotal.__table__
+    amount = Decimal(str(amount or 0))
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        upsert = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table).values(
+            trip_id=trip_id, category=category, amount=amount, expense_count=count
+        )
+        connection.execute(upsert.on_conflict_do_update(
+            index_elements=[table.c.trip_id, table.c.category],
+            set_={
+                "amount": table.c.amount + upsert.excluded.amount,
+                "expense_count": table.c.expense_count + upsert.excluded.expense_count,
+                "updated_at": func.now(),
+            },
+        ))
+    else:
+        result = connection.execute(
+            update(table)
+            .where(table.c.trip_id == trip_id, table.c.category == category)
+            .values(amount=table.c.amount + amount, expense_count=table.c.expense_count + count)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(trip_id=trip_id, category=category, amount=amount, expense_count=count))
+    if count < 0:
+        connection.execute(
+            delete(table).where(table.c.trip_id == trip_id, table.c.category == category, table.c.expense_count <= 0)
+        )
+
+
+def _old_value(target, name: str):
+    """属性修改前的值（未修改时为当前值）"""
+    history = inspect(target).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(target, name)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    """仅用于启用 active_history，不修改赋值"""
+
+
+# 对象提交后属性已过期，直接赋值不会记录旧值；启用 active_history 让赋值前先加载旧值，
+# 否则 _old_value 取到的是新值，原类别/行程的汇总不会扣减
+for _name in ("trip_id", "category", "amount"):
+    event.listen(getattr(Expense, _name), "set", _load_old_value, active_history=True)
+
+
+@event.listens_for(Expense, "after_insert")
+def _expense_inserted(mapper, connection, target):
+    _apply_delta(connection, target.trip_id, target.category, target.amount, 1)
+
+
+@event.listens_for(Expense, "after_delete")
+def _expense_deleted(mapper, connection, target):
+    _apply_delta(connection, _old_value(target, "trip_id"), _old_value(target, "category"), -Decimal(str(_old_value(target, "amount") or 0)), -1)
+
+
+@event.listens_for(Expense, "after_update")
+def _expense_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in ("trip_id", "category", "amount")):
+        return
+    old_amount = Decimal(str(_old_value(target, "amount") or 0))
+    _apply_delta(connection, _old_value(target, "trip_id"), _old_value(target, "category"), -old_amount, -1)
+    _apply_delta(connection, target.trip_id, target.category, target.amount, 1)
+
+
+def rebuild_budget_totals(connection: Connection, trip_id: Optional[int] = None):
+    """
+    从费用明细重新统计汇总（迁移回填、绕过 ORM 写入后修复）
+
+    Args:
+        connection: 同步连接（需处于事务中）
+        trip_id: 只重建某个行程，默认全部
+    """
+    table = TripBudgetTotal.__table__
+    aggregate = select(
+        Expense.trip_id, Expense.category, func.sum(Expense.amount), func.count(Expense.id)
+    ).group_by(Expense.trip_id, Expense.category)
+    clear = delete(table)
+    if trip_id is not None:
+        aggregate = aggregate.where(Expense.trip_id == trip_id)
+        clear = clear.where(table.c.trip_id == trip_id)
+    connection.execute(clear)
+    connection.execute(
+        insert(table).from_select(["trip_id", "category", "amount", "expense_count"], aggregate)
+    )
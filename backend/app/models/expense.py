@@ -3,7 +3,7 @@
 记录旅行中的各项支出
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Numeric, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -14,6 +14,10 @@ class Expense(Base):
     记录旅行中的各项支出
     """
     __tablename__ = "expenses"
+    __table_args__ = (
+        # 费用列表与各类汇总：按行程过滤并按发生日期排序
+        Index("ix_expenses_trip_id_expense_date", "trip_id", "expense_date"),
+    )
     
     # 基本字段
     id = Column(Integer, primary_key=True, index=True, comment="费用记录ID")
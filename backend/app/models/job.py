@@ -0,0 +1,60 @@
+"""
+行程生成任务模型
+记录后台生成任务的状态、耗时与结果
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class GenerationJob(Base):
+    """
+    行程生成任务表模型
+    状态流转: queued -> running -> done / failed
+    """
+    __tablename__ = "generation_jobs"
+    
+    # 基本字段
+    id = Column(Integer, primary_key=True, index=True, comment="任务ID")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True, comment="用户ID")
+    status = Column(String(20), nullable=False, default="queued", index=True, comment="任务状态: queued, running, done, failed")
+    request = Column(JSON, nullable=False, comment="生成请求参数")
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="SET NULL"), nullable=True, comment="生成的行程ID")
+    error = Column(Text, nullable=True, comment="失败原因")
+    attempts = Column(Integer, nullable=False, default=0, comment="已执行次数")
+    
+    # 时间戳
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+    started_at = Column(DateTime(timezone=True), nullable=True, comment="开始执行时间")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="结束时间")
+    
+    # 关系映射
+    user = relationship("User")
+    trip = relationship("Trip")
+    
+    def __repr__(self):
+        return f"<GenerationJob(id={self.id}, user_id={self.user_id}, status='{self.status}')>"
+    
+    def to_dict(self):
+        """
+        转换为字典格式
+        """
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "trip_id": self.trip_id,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    @property
+    def is_finished(self):
+        """
+        任务是否已结束
+        """
+        return self.status in ("done", "failed")
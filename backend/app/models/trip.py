@@ -3,7 +3,7 @@
 包含旅行计划基本信息和详细行程安排
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Numeric, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -14,6 +14,10 @@ class Trip(Base):
     存储旅行计划主表和详细行程
     """
     __tablename__ = "trips"
+    __table_args__ = (
+        # 行程列表：按用户过滤并按创建时间倒序
+        Index("ix_trips_user_id_created_at", "user_id", "created_at"),
+    )
     
     # 基本字段
     id = Column(Integer, primary_key=True, index=True, comment="行程ID")
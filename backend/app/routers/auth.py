@@ -3,23 +3,24 @@
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import SessionLocal
 from ..models.user import User
 from ..schemas.auth import UserRegister, UserLogin, UserResponse, Token
 from ..utils.auth import get_password_hash, verify_password, create_access_token
-from ..utils.dependencies import get_db, get_current_user
+from ..database import get_db, get_read_db
+from ..utils.dependencies import get_current_user
 
 router = APIRouter()
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     """用户注册"""
     
     # 检查邮箱是否已存在
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -27,7 +28,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # 检查用户名是否已存在
-    existing_username = db.query(User).filter(User.username == user_data.username).first()
+    existing_username = await db.scalar(select(User).where(User.username == user_data.username))
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -45,8 +46,8 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         # 生成访问令牌
         access_token = create_access_token(data={"sub": str(new_user.id)})
@@ -58,18 +59,18 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
         
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户创建失败，请检查输入信息"
         )
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_read_db)):
     """用户登录"""
     
     # 查找用户
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == user_credentials.email))
     
     if not user or not verify_password(user_credentials.password, user.password_hash):
         raise HTTPException(
@@ -4,34 +4,51 @@
 实现功能：
 1. 添加费用记录
 2. 获取某行程的费用列表
-3. 当前剩余资金计算（预算 - 已花费）
-4. AI费用提取（从文本中抽取费用信息）
+3. 当前剩余资金计算（预算 - 已花费）与预算统计（SQL 聚合）
+4. AI费用提取（从文本中抽取费用信息，本地规则有把握时不调用大模型）
+5. AI批量费用提取（聊天记录、小票清单，可直接写入行程）
 """
 
 import os
-import json
-from datetime import datetime
-from typing import Optional, List
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Optional, List, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from openai import OpenAI
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.trip import Trip
 from app.models.expense import Expense
-from app.schemas.budget import ExpenseCreate, ExpenseResponse, BudgetSummaryResponse, AIExpenseExtractRequest, AIBudgetAnalysisResponse
+from app.schemas.budget import ExpenseCreate, ExpenseResponse, BudgetSummaryResponse, AIExpenseExtractRequest, AIExpenseBatchExtractRequest, AIBudgetAnalysisResponse, BudgetStatsResponse
 from app.utils.dependencies import get_current_user
 from app.models.user import User
+from app.services.llm_gateway import llm_gateway
+from app.services.resilience import CircuitOpenError
+from app.utils.json_repair import extract_json_object
+from app.utils.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, apply_keyset, next_cursor, page_size, parse_fields, project_row
+from app.services.rate_limiter import PRIORITY_INTERACTIVE, PRIORITY_DEFAULT
+from app.services.expense_batch import expense_batch_extractor
+from app.services.budget_analysis_cache import budget_analysis_cache, build_fingerprint
+from app.services.budget_totals import category_totals
+from app.services.budget_stats import compute_budget_stats
+from app.utils.expense_extractor import extract_expense, category_key
+from app.utils.metrics import metrics
 
 router = APIRouter()
 
+# 本地抽取置信度达到该阈值时直接返回，不调用大模型（设为大于1的值即全部交给大模型）
+EXPENSE_LOCAL_THRESHOLD = float(os.getenv("EXPENSE_LOCAL_THRESHOLD", "0.7"))
+
 
 @router.post("/add", response_model=ExpenseResponse)
-async def add_expense(payload: ExpenseCreate, db: Session = Depends(get_db)):
+async def add_expense(payload: ExpenseCreate, db: AsyncSession = Depends(get_db)):
     """添加费用记录到指定行程。"""
     # 校验行程存在
-    trip = db.query(Trip).filter(Trip.id == payload.trip_id).first()
+    trip = await db.scalar(select(Trip).where(Trip.id == payload.trip_id))
     if not trip:
         raise HTTPException(status_code=404, detail="行程不存在")
 
@@ -55,8 +72,9 @@ async def add_expense(payload: ExpenseCreate, db: Session = Depends(get_db)):
         expense_date=expense_dt,
     )
     db.add(expense)
-    db.commit()
-    db.refresh(expense)
+    await db.commit()
+    await db.refresh(expense)
+    budget_analysis_cache.invalidate(payload.trip_id)
     return ExpenseResponse(
         id=expense.id,
         trip_id=expense.trip_id,
@@ -68,62 +86,101 @@ async def add_expense(payload: ExpenseCreate, db: Session = Depends(get_db)):
     )
 
 
+# 费用列表可返回的字段
+EXPENSE_FIELDS = {
+    "id": Expense.id,
+    "trip_id": Expense.trip_id,
+    "amount": Expense.amount,
+    "category": Expense.category,
+    "description": Expense.description,
+    "expense_date": Expense.expense_date,
+    "created_at": Expense.created_at,
+}
+
+
 @router.get("/list", response_model=List[ExpenseResponse])
 async def get_expenses(
+    response: Response,
     trip_id: int = Query(..., description="行程ID"),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, description=f"每页条数（最多 {MAX_PAGE_SIZE}），不传则返回全部"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，如 amount,category（id 始终返回）"),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取指定行程的费用列表（仅限当前用户拥有的行程）。"""
+    """
+    获取指定行程的费用列表（仅限当前用户拥有的行程，按费用日期升序）。
+    传 limit 时按 (expense_date, id) 游标分页，下一页游标放在响应头 X-Next-Cursor 中。
+    """
+    try:
+        selected = parse_fields(fields, EXPENSE_FIELDS)
+        page_limit = page_size(limit, cursor)
+        statement = apply_keyset(
+            select(*[EXPENSE_FIELDS[name].label(name) for name in selected or EXPENSE_FIELDS]).where(Expense.trip_id == trip_id),
+            [Expense.expense_date, Expense.id], descending=False, cursor=cursor, limit=page_limit, dialect=db.bind.dialect.name,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # 校验行程存在且归属当前用户
-    trip = db.query(Trip).filter(Trip.id == trip_id, Trip.user_id == current_user.id).first()
-    if not trip:
+    owned = await db.scalar(select(Trip.id).where(Trip.id == trip_id, Trip.user_id == current_user.id))
+    if not owned:
         raise HTTPException(status_code=404, detail="行程不存在或无权限")
 
-    expenses = (
-        db.query(Expense)
-        .filter(Expense.trip_id == trip_id)
-        .order_by(Expense.expense_date.asc())
-        .all()
-    )
-    return [
-        ExpenseResponse(
-            id=e.id,
-            trip_id=e.trip_id,
-            amount=float(e.amount),
-            category=e.category,
-            description=e.description,
-            expense_date=e.expense_date,
-            created_at=e.created_at,
-        )
-        for e in expenses
-    ]
+    rows = (await db.execute(statement)).all()
+    headers = {}
+    next_page = next_cursor(rows, page_limit, 2)
+    if next_page:
+        headers[NEXT_CURSOR_HEADER] = next_page
+
+    items = [project_row(row, selected or EXPENSE_FIELDS, {"amount": float}) for row in rows]
+    if selected:
+        # 部分字段不满足响应模型，直接返回字典
+        return JSONResponse(content=jsonable_encoder(items), headers=headers)
+    response.headers.update(headers)
+    return [ExpenseResponse(**item) for item in items]
 
 
 @router.get("/summary", response_model=BudgetSummaryResponse)
-async def get_budget_summary(trip_id: int = Query(..., description="行程ID"), db: Session = Depends(get_db)):
-    """根据行程预算与费用记录计算剩余资金。"""
-    trip = db.query(Trip).filter(Trip.id == trip_id).first()
+async def get_budget_summary(trip_id: int = Query(..., description="行程ID"), db: AsyncSession = Depends(get_read_db)):
+    """根据行程预算与各类别开销合计计算剩余资金（读取汇总表，不加载费用明细）。"""
+    trip = await db.scalar(select(Trip).where(Trip.id == trip_id))
     if not trip:
         raise HTTPException(status_code=404, detail="行程不存在")
 
-    expenses = db.query(Expense).filter(Expense.trip_id == trip_id).all()
-    total_expenses = sum(float(e.amount) for e in expenses)
+    categories = await category_totals(db, trip_id)
+    total_expenses = round(sum(item["amount"] for item in categories), 2)
     total_budget = float(trip.budget) if trip.budget is not None else None
-    remaining_budget = (total_budget - total_expenses) if total_budget is not None else None
+    remaining_budget = round(total_budget - total_expenses, 2) if total_budget is not None else None
 
     return BudgetSummaryResponse(
         trip_id=trip_id,
         total_budget=total_budget,
         total_expenses=total_expenses,
         remaining_budget=remaining_budget,
+        expense_count=sum(item["count"] for item in categories),
+        categories=categories,
     )
 
 
-def build_expense_prompt(user_text: str) -> str:
+@router.get("/stats", response_model=BudgetStatsResponse)
+async def get_budget_stats(
+    trip_id: int = Query(..., description="行程ID"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """预算统计：各类别合计与占比、日均花费、最大几笔开销与超支推算（不调用AI）。"""
+    trip = await db.scalar(select(Trip).where(Trip.id == trip_id, Trip.user_id == current_user.id))
+    if not trip:
+        raise HTTPException(status_code=404, detail="行程不存在或无权限")
+    return BudgetStatsResponse(**await compute_budget_stats(db, trip))
+
+
+def build_expense_prompt(user_text: str, today: Optional[date] = None) -> str:
     """构建用于费用抽取的提示词。"""
+    today = today or date.today()
     return f"""
-从以下文本中严格提取一条费用记录信息，并以JSON格式返回：
+从以下文本中严格提取一条费用记录信息，并以JSON格式返回（今天是{today.isoformat()}）：
 
 文本：
 {user_text}
@@ -139,7 +196,7 @@ def build_expense_prompt(user_text: str) -> str:
 - 若未提到某个字段，返回null；
 - ”费用类别“字段必须要在交通/住宿/食物/娱乐/购物/其他 中选择一个，不要自己创造别的值；
 - 金额单位转换（万→10000，千→1000，中文数字→阿拉伯数字）。
-- “费用时间”字段需要从语义中提取具体日期，如”10月1日”，“10月10日”，“10月10号”等，若年份若未说明则统一为2025年，若实在无法确定则返回null。
+- “费用时间”字段需要从语义中提取具体日期，如”10月1日”，“10月10日”，“10月10号”等，“昨天”“上周五”等按今天推算，年份若未说明则取最近的过去日期，若实在无法确定则返回null。
 
 示例返回：
 {{
@@ -153,115 +210,196 @@ def build_expense_prompt(user_text: str) -> str:
 
 @router.post("/ai-extract")
 async def ai_expense_extract(request: AIExpenseExtractRequest):
-    """AI费用提取：从文本中抽取费用信息并返回严格JSON。"""
-    api_key = os.getenv("DASHSCOPE_API_KEY")
-    if not api_key:
+    """
+    AI费用提取：从文本中抽取费用信息并返回严格JSON。
+
+    先用本地规则抽取，置信度达到 EXPENSE_LOCAL_THRESHOLD 时直接返回；
+    否则交给大模型，大模型没给出的字段用本地结果补齐。
+    """
+    today = date.today()
+    started = time.perf_counter()
+    local = extract_expense(request.text, today)
+    metrics.observe("expense_extract.local.time", time.perf_counter() - started)
+    if local.confidence >= EXPENSE_LOCAL_THRESHOLD:
+        metrics.incr("expense_extract.local.hit")
+        return local.to_response()
+    metrics.incr("expense_extract.local.fallback")
+
+    if not llm_gateway.api_key:
         raise HTTPException(status_code=500, detail="环境变量缺失：DASHSCOPE_API_KEY")
 
-    client = OpenAI(
-        api_key=api_key,
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-        timeout=60.0,
-    )
-    model = os.getenv("DASHSCOPE_MODEL", "qwen-plus")
-
     system_prompt = (
         "你是一个擅长从文本中抽取结构化费用信息的助手。"
         "请严格只输出符合给定字段的JSON，不要任何其他文字。"
     )
 
-    prompt = build_expense_prompt(request.text)
+    prompt = build_expense_prompt(request.text, today)
 
     try:
-        completion = client.chat.completions.create(
-            model=model,
+        completion = await llm_gateway.chat(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt},
             ],
             temperature=0,
+            endpoint="expense_extract",
+            priority=PRIORITY_INTERACTIVE,
+            expected_output_tokens=100,
+            hedge="expense_extract",
         )
 
-        content = completion.choices[0].message.content
+        content = completion.content
+
+        # 只返回JSON（容错解析，被截断时保留已完整的字段，其余为null）
+        empty = {
+            "amount": None,
+            "category": None,
+            "description": None,
+            "expense_date": None,
+        }
+        data = extract_json_object(content, "expense_extract") or {}
+        fallback = local.to_response()
+        # 金额只在本地有把握时补齐；类别没有任何已知特征时不补
+        if local.amount_confidence < EXPENSE_LOCAL_THRESHOLD:
+            fallback["amount"] = None
+        if local.category_confidence == 0:
+            fallback["category"] = None
+        result = {**empty, **data}
+        for name, value in fallback.items():
+            if result.get(name) is None:
+                result[name] = value
+        return result
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"调用AI解析失败: {str(e)}")
 
-        # 只返回JSON
+
+@router.post("/ai-extract/batch")
+async def ai_expense_extract_batch(
+    request: AIExpenseBatchExtractRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    AI批量费用提取：从整段聊天记录或多行小票中抽取多条费用。
+
+    本地规则有把握的行直接采用，其余行按 token 预算打包后并发交给大模型；
+    提供 trip_id 时把金额和类别齐全的记录在同一个事务中写入该行程（仅限当前用户拥有的行程）。
+    """
+    if not request.text and not request.lines:
+        raise HTTPException(status_code=422, detail="text 与 lines 至少提供一个")
+    if request.trip_id is not None:
+        owner_id = await db.scalar(select(Trip.user_id).where(Trip.id == request.trip_id))
+        if owner_id is None:
+            raise HTTPException(status_code=404, detail="行程不存在")
+        if owner_id != current_user.id:
+            raise HTTPException(status_code=403, detail="无权向该行程写入费用")
+    # 调用大模型期间不占用数据库连接
+    await db.close()
+
+    today = date.today()
+    started = time.perf_counter()
+    try:
+        result = await expense_batch_extractor.extract(request.text, request.lines, today)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        metrics.observe("expense_extract.batch.time", time.perf_counter() - started)
+
+    if request.trip_id is None:
+        return result
+
+    expenses = []
+    for item in result["items"]:
+        category = category_key(item.get("category"))
+        if item.get("amount") is None or category is None:
+            continue
         try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            # 尝试从响应中提取JSON
-            start_idx = content.find("{")
-            end_idx = content.rfind("}")
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                json_str = content[start_idx : end_idx + 1]
-                try:
-                    return json.loads(json_str)
-                except Exception:
-                    pass
-            # 如果无法解析，返回字段全部null
-            return {
-                "amount": None,
-                "category": None,
-                "description": None,
-                "expense_date": None,
-            }
+            expense_dt = datetime.strptime(item.get("expense_date") or today.isoformat(), "%Y-%m-%d")
+        except ValueError:
+            expense_dt = datetime.combine(today, datetime.min.time())
+        expense = Expense(
+            trip_id=request.trip_id,
+            amount=item["amount"],
+            category=category,
+            description=item.get("description"),
+            expense_date=expense_dt,
+        )
+        expenses.append((item, expense))
+
+    try:
+        db.add_all([expense for _, expense in expenses])
+        await db.commit()
     except Exception as e:
-        raise HTTPException(status_code=502, detail=f"调用AI解析失败: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"保存费用记录失败: {str(e)}")
+    if expenses:
+        budget_analysis_cache.invalidate(request.trip_id)
+    for item, expense in expenses:
+        item["expense_id"] = expense.id
+    result["saved"] = len(expenses)
+    metrics.incr("expense_extract.batch.saved", len(expenses))
+    return result
+
+
+def build_budget_analysis_prompt(stats: Dict[str, Any]) -> str:
+    """
+    构建用于预算分析的提示词。
+
+    只使用 compute_budget_stats 的聚合结果（类别汇总、日均与推算、最大几笔开销），
+    提示词长度与费用条数无关。
+    """
+    def money(value: Optional[float]) -> str:
+        return f"¥{value:.2f}" if value is not None else "未设置"
+
+    budget_info = f"总预算: {money(stats['total_budget'])}\n已花费: {money(stats['total_expenses'])}（共{stats['expense_count']}笔）\n剩余资金: {money(stats['remaining_budget'])}"
+
+    category_summary = "\n".join(
+        f"- {item['label']}: {money(item['amount'])}（{item['share']:.0%}，{item['count']}笔）"
+        for item in stats["categories"]
+    )
 
+    pace_lines = [f"行程天数: {stats['trip_days']}天，已进行: {stats['elapsed_days']}天，有开销的天数: {stats['active_days']}天"]
+    if stats["daily_average"] is not None:
+        pace_lines.append(f"日均花费: {money(stats['daily_average'])}，按此速度全程预计: {money(stats['projected_total'])}")
+    if stats["projected_overspend"] is not None:
+        if stats["projected_overspend"] > 0:
+            pace_lines.append(f"预计超支: {money(stats['projected_overspend'])}")
+        else:
+            pace_lines.append(f"预计结余: {money(-stats['projected_overspend'])}")
+    if stats["peak_day"]:
+        pace_lines.append(f"花费最多的一天: {stats['peak_day']['date']}（{money(stats['peak_day']['amount'])}）")
+    pace_summary = "\n".join(pace_lines)
+
+    top_expenses = "\n".join(
+        f"- {item['expense_date']}: {item['label']} - {money(item['amount'])} ({(item['description'] or '无描述')[:30]})"
+        for item in stats["top_expenses"]
+    )
 
-def build_budget_analysis_prompt(total_budget: Optional[float], total_expenses: float, remaining_budget: Optional[float], expenses: List[Expense]) -> str:
-    """构建用于预算分析的提示词。"""
-    # 类别中文映射
-    category_labels = {
-        'transport': '交通',
-        'accommodation': '住宿',
-        'food': '食物',
-        'entertainment': '娱乐',
-        'shopping': '购物',
-        'other': '其他'
-    }
-    
-    # 按类别统计开销
-    category_expenses = {}
-    for expense in expenses:
-        cat = expense.category
-        if cat not in category_expenses:
-            category_expenses[cat] = 0
-        category_expenses[cat] += float(expense.amount)
-    
-    # 构建开销明细（使用中文类别）
-    expense_details = "\n".join([
-        f"- {expense.expense_date.strftime('%Y-%m-%d')}: {category_labels.get(expense.category, expense.category)} - ¥{float(expense.amount):.2f} ({expense.description or '无描述'})"
-        for expense in expenses
-    ])
-    
-    # 构建类别统计（使用中文类别）
-    category_summary = "\n".join([
-        f"- {category_labels.get(cat, cat)}: ¥{amount:.2f}"
-        for cat, amount in category_expenses.items()
-    ])
-    
-    budget_info = f"总预算: ¥{total_budget:.2f}" if total_budget is not None else "总预算: 未设置"
-    remaining_info = f"剩余资金: ¥{remaining_budget:.2f}" if remaining_budget is not None else "剩余资金: 未设置"
-    
     return f"""
 你是一位专业的旅游预算分析师。请根据以下信息对当前行程的开销进行分析，并给出三条实用的旅游开销建议。
 
 ## 预算信息
 {budget_info}
-已花费: ¥{total_expenses:.2f}
-{remaining_info}
-
-## 开销明细
-{expense_details}
 
 ## 各类别开销汇总
 {category_summary}
 
+## 花费节奏
+{pace_summary}
+
+## 金额最大的{len(stats['top_expenses'])}笔开销
+{top_expenses}
+
 ## 任务要求
 1. 对当前的开销情况进行简要分析（100字以内），包括：
    - 开销是否合理
    - 各类别支出占比情况
    - 预算使用情况（如果有预算）
+   - 按当前花费速度是否会超支
 
 2. 给出三条具体的旅游开销建议，每条建议应该：
    - 针对性强，基于当前开销数据
@@ -281,85 +419,94 @@ def build_budget_analysis_prompt(total_budget: Optional[float], total_expenses:
 """
 
 
+async def expense_fingerprint(db: AsyncSession, trip: Trip) -> Tuple[int, str]:
+    """用一次聚合查询计算行程费用集合的指纹，返回 (费用条数, 指纹)"""
+    count, total, max_id, max_created_at = (await db.execute(
+        select(
+            func.count(Expense.id),
+            func.sum(Expense.amount),
+            func.max(Expense.id),
+            func.max(Expense.created_at),
+        ).where(Expense.trip_id == trip.id)
+    )).one()
+    return count, build_fingerprint(trip.budget, count, total, max_id, max_created_at)
+
+
 @router.get("/ai-analysis", response_model=AIBudgetAnalysisResponse)
 async def ai_budget_analysis(
     trip_id: int = Query(..., description="行程ID"),
-    db: Session = Depends(get_db),
+    force_refresh: bool = Query(False, description="忽略缓存，重新调用AI分析"),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """AI预算分析：分析当前行程的开销情况并给出建议。"""
+    """
+    AI预算分析：分析当前行程的开销情况并给出建议。
+
+    结果按行程缓存，预算和费用记录都没有变化时直接返回上次的分析，
+    force_refresh=true 时忽略缓存。
+    """
     # 校验行程存在且归属当前用户
-    trip = db.query(Trip).filter(Trip.id == trip_id, Trip.user_id == current_user.id).first()
+    trip = await db.scalar(select(Trip).where(Trip.id == trip_id, Trip.user_id == current_user.id))
     if not trip:
         raise HTTPException(status_code=404, detail="行程不存在或无权限")
-    
-    # 获取费用记录
-    expenses = db.query(Expense).filter(Expense.trip_id == trip_id).order_by(Expense.expense_date.asc()).all()
-    
-    if not expenses:
+
+    # 先用聚合查询比对指纹，命中缓存时不加载费用明细
+    count, fingerprint = await expense_fingerprint(db, trip)
+    if count == 0:
         raise HTTPException(status_code=400, detail="当前行程暂无开销记录，无法进行分析")
-    
-    # 计算预算汇总
-    total_expenses = sum(float(e.amount) for e in expenses)
-    total_budget = float(trip.budget) if trip.budget is not None else None
-    remaining_budget = (total_budget - total_expenses) if total_budget is not None else None
-    
+    if not force_refresh:
+        cached = budget_analysis_cache.get(trip_id, fingerprint)
+        if cached is not None:
+            return AIBudgetAnalysisResponse(**cached)
+    else:
+        metrics.incr("budget_analysis.cache.bypass")
+
+    # 聚合统计（不加载费用明细），之后调用大模型期间不占用数据库连接
+    stats = await compute_budget_stats(db, trip)
+    await db.close()
+
     # 调用AI分析
-    api_key = os.getenv("DASHSCOPE_API_KEY")
-    if not api_key:
+    if not llm_gateway.api_key:
         raise HTTPException(status_code=500, detail="环境变量缺失：DASHSCOPE_API_KEY")
-    
-    client = OpenAI(
-        api_key=api_key,
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-        timeout=60.0,
-    )
-    model = os.getenv("DASHSCOPE_MODEL", "qwen-plus")
-    
+
     system_prompt = (
         "你是一位专业的旅游预算分析师，擅长分析旅游开销并给出实用建议。"
         "请严格按照要求的JSON格式输出，不要包含其他文字。"
     )
-    
-    prompt = build_budget_analysis_prompt(total_budget, total_expenses, remaining_budget, expenses)
+
+    prompt = build_budget_analysis_prompt(stats)
     
     try:
-        completion = client.chat.completions.create(
-            model=model,
+        completion = await llm_gateway.chat(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt},
             ],
             temperature=0,
+            endpoint="budget_analysis",
+            priority=PRIORITY_DEFAULT,
+            expected_output_tokens=300,
         )
         
-        content = completion.choices[0].message.content
+        content = completion.content
         
-        # 解析JSON响应
-        try:
-            result = json.loads(content)
-            return AIBudgetAnalysisResponse(
+        # 解析JSON响应（容错解析）
+        result = extract_json_object(content, "budget_analysis")
+        if result:
+            response = AIBudgetAnalysisResponse(
                 analysis=result.get("analysis", "分析结果解析失败"),
                 suggestions=result.get("suggestions", ["建议1", "建议2", "建议3"])
             )
-        except json.JSONDecodeError:
-            # 尝试从响应中提取JSON
-            start_idx = content.find("{")
-            end_idx = content.rfind("}")
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                json_str = content[start_idx : end_idx + 1]
-                try:
-                    result = json.loads(json_str)
-                    return AIBudgetAnalysisResponse(
-                        analysis=result.get("analysis", "分析结果解析失败"),
-                        suggestions=result.get("suggestions", ["建议1", "建议2", "建议3"])
-                    )
-                except Exception:
-                    pass
-            # 如果无法解析，返回默认值
-            return AIBudgetAnalysisResponse(
-                analysis="AI分析结果解析失败，请稍后重试",
-                suggestions=["建议1", "建议2", "建议3"]
-            )
+            # 只缓存解析成功的结果
+            if "analysis" in result and "suggestions" in result:
+                budget_analysis_cache.put(trip_id, fingerprint, response.model_dump())
+            return response
+        # 如果无法解析，返回默认值
+        return AIBudgetAnalysisResponse(
+            analysis="AI分析结果解析失败，请稍后重试",
+            suggestions=["建议1", "建议2", "建议3"]
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"调用AI分析失败: {str(e)}")
\ No newline at end of file
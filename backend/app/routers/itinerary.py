@@ -2,31 +2,70 @@
 行程规划相关路由
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import json
+import time
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_read_db, AsyncSessionLocal, AsyncReadSessionLocal
 from app.models.trip import Trip
 from app.schemas.itinerary import (
     ItineraryGenerateRequest, 
     ItineraryUpdateRequest,
+    ItineraryRegenerateRequest,
     ItineraryResponse, 
     ItineraryListResponse,
+    ActivityResponse,
+    DayCostResponse,
     GenerateItineraryResponse,
+    GenerationJobResponse,
     APIResponse
 )
+from app.models.job import GenerationJob
 from app.services.ai_service import ai_service
+from app.services.job_queue import job_queue, JobQueueFull
+from app.services.trip_service import save_generated_trip
+from app.services.activity_queries import day_costs, search_activities
+from app.services.budget_analysis_cache import budget_analysis_cache
 from app.utils.dependencies import get_current_user
 from app.models.user import User
+from app.utils.metrics import metrics
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, apply_keyset, next_cursor, page_size, parse_fields, project_row
 
 router = APIRouter()
 
+def _trip_to_response(trip: Trip) -> ItineraryResponse:
+    """将行程ORM对象转换为响应模型"""
+    return ItineraryResponse(
+        id=trip.id,
+        user_id=trip.user_id,
+        title=trip.title,
+        destination=trip.destination,
+        start_date=trip.start_date,
+        end_date=trip.end_date,
+        budget=trip.budget,
+        travelers=trip.travelers,
+        status=trip.status,
+        itinerary=trip.itinerary,
+        created_at=trip.created_at,
+        updated_at=trip.updated_at
+    )
+
+def _sse(event: str, data: Any) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
 @router.post("/generate", response_model=GenerateItineraryResponse)
 async def generate_itinerary(
     request: ItineraryGenerateRequest,
-    db: Session = Depends(get_db),
+    background: bool = Query(False, description="是否以后台任务方式生成，立即返回任务ID"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """生成行程规划"""
@@ -41,8 +80,21 @@ async def generate_itinerary(
                 detail="结束日期必须晚于开始日期"
             )
         
+        # 后台任务模式：入队后立即返回任务ID
+        if background:
+            job = await job_queue.submit(db, current_user.id, request)
+            return GenerateItineraryResponse(
+                success=True,
+                message="行程生成任务已提交",
+                data=None,
+                job_id=job.id
+            )
+        
+        # 等待AI期间释放数据库连接，避免长时间占用连接池
+        await db.close()
+
         # 调用AI服务生成行程
-        ai_result = ai_service.generate_itinerary(
+        ai_result = await ai_service.generate_itinerary(
             destination=request.destination,
             start_date=request.start_date,
             end_date=request.end_date,
@@ -58,48 +110,24 @@ async def generate_itinerary(
                 data=None
             )
         
-        # 生成行程标题
-        title = request.title or f"{request.destination}之旅"
-        
         # 保存到数据库
-        trip = Trip(
-            user_id=current_user.id,
-            title=title,
-            destination=request.destination,
-            start_date=start_date,
-            end_date=end_date,
-            budget=request.budget,
-            travelers=request.travelers,
-            status="planning",
-            itinerary=ai_result["data"]
-        )
-        
-        db.add(trip)
-        db.commit()
-        db.refresh(trip)
-        
-        # 构建响应
-        trip_response = ItineraryResponse(
-            id=trip.id,
-            user_id=trip.user_id,
-            title=trip.title,
-            destination=trip.destination,
-            start_date=trip.start_date,
-            end_date=trip.end_date,
-            budget=trip.budget,
-            travelers=trip.travelers,
-            status=trip.status,
-            itinerary=trip.itinerary,
-            created_at=trip.created_at,
-            updated_at=trip.updated_at
+        trip = await save_generated_trip(
+            db, current_user.id, request, start_date, end_date, ai_result["data"]
         )
         
         return GenerateItineraryResponse(
             success=True,
             message="行程生成成功",
-            data=trip_response
+            data=_trip_to_response(trip)
         )
         
+    except HTTPException:
+        raise
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -111,39 +139,215 @@ async def generate_itinerary(
             detail=f"生成行程失败: {str(e)}"
         )
 
+async def _get_user_job(db: AsyncSession, job_id: int, user_id: int) -> GenerationJob:
+    """获取属于当前用户的生成任务，不存在时抛出404"""
+    job = await db.scalar(select(GenerationJob).where(
+        GenerationJob.id == job_id,
+        GenerationJob.user_id == user_id
+    ))
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="任务不存在"
+        )
+    return job
+
+@router.get("/jobs/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """查询后台生成任务状态（轮询）"""
+    job = await _get_user_job(db, job_id, current_user.id)
+    return GenerationJobResponse(**job.to_dict())
+
+@router.get("/jobs/{job_id}/events")
+async def subscribe_generation_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    订阅后台生成任务状态（Server-Sent Events）
+
+    每次状态变化推送一条 status 事件，任务结束（done/failed）后关闭连接。
+    """
+    job = await _get_user_job(db, job_id, current_user.id)
+    snapshot = job.to_dict()
+    await db.close()
+
+    async def event_stream():
+        queue = job_queue.subscribe(job_id)
+        try:
+            current = snapshot
+            yield _sse("status", current)
+            while current["status"] not in ("done", "failed"):
+                try:
+                    current = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # 超时后回查数据库（任务可能由其他进程执行），同时充当心跳
+                    async with AsyncReadSessionLocal() as session:
+                        current = (await _get_user_job(session, job_id, snapshot["user_id"])).to_dict()
+                yield _sse("status", current)
+        finally:
+            job_queue.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate/stream")
+async def generate_itinerary_stream(
+    request: ItineraryGenerateRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    流式生成行程规划（Server-Sent Events）
+
+    事件类型：
+    - day: 某一天的行程生成完毕，data 为 {"key": "dayN", "data": {...}}
+    - done: 全部生成完毕并已保存，data 为完整的行程响应
+    - error: 生成失败，data 为 {"message": "..."}
+    """
+    try:
+        start_date = datetime.strptime(request.start_date, "%Y-%m-%d")
+        end_date = datetime.strptime(request.end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="日期格式不正确，请使用YYYY-MM-DD格式"
+        )
+
+    if start_date >= end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="结束日期必须晚于开始日期"
+        )
+
+    user_id = current_user.id
+    # 流式响应期间不占用请求级数据库会话，保存时另开会话
+    await db.close()
+
+    async def event_stream():
+        started = time.perf_counter()
+        itinerary: Dict[str, Any] = {}
+        try:
+            async for key, day in ai_service.stream_itinerary(
+                destination=request.destination,
+                start_date=request.start_date,
+                end_date=request.end_date,
+                budget=request.budget,
+                preferences=request.preferences,
+                travelers=request.travelers
+            ):
+                if not itinerary:
+                    metrics.observe("itinerary.stream.time_to_first_day", time.perf_counter() - started)
+                itinerary[key] = day
+                yield _sse("day", {"key": key, "data": day})
+        except Exception as e:
+            metrics.incr("itinerary.stream.failed")
+            yield _sse("error", {"message": f"生成行程失败: {str(e)}"})
+            return
+
+        metrics.observe("itinerary.stream.total_time", time.perf_counter() - started)
+
+        # 流结束后一次性保存行程
+        async with AsyncSessionLocal() as session:
+            try:
+                trip = await save_generated_trip(
+                    session, user_id, request, start_date, end_date, itinerary
+                )
+                yield _sse("done", _trip_to_response(trip).model_dump(mode="json"))
+            except Exception as e:
+                await session.rollback()
+                yield _sse("error", {"message": f"保存行程失败: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 行程列表可返回的字段（不含 itinerary 大字段）
+LIST_FIELDS = {
+    "id": Trip.id,
+    "title": Trip.title,
+    "destination": Trip.destination,
+    "start_date": Trip.start_date,
+    "end_date": Trip.end_date,
+    "travelers": Trip.travelers,
+    "status": Trip.status,
+    "created_at": Trip.created_at,
+}
+
 @router.get("/list", response_model=List[ItineraryListResponse])
 async def get_itineraries(
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, description=f"每页条数（最多 {MAX_PAGE_SIZE}），不传则返回全部"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，如 title,status（id 始终返回）"),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取用户的行程列表"""
-    trips = db.query(Trip).filter(Trip.user_id == current_user.id).order_by(Trip.created_at.desc()).all()
-    
-    return [
-        ItineraryListResponse(
-            id=trip.id,
-            title=trip.title,
-            destination=trip.destination,
-            start_date=trip.start_date,
-            end_date=trip.end_date,
-            travelers=trip.travelers,
-            status=trip.status,
-            created_at=trip.created_at
+    """
+    获取用户的行程列表（按创建时间倒序）
+    只查询列表需要的列，不加载行程详情JSON；传 limit 时按 (created_at, id) 游标分页，
+    下一页游标放在响应头 X-Next-Cursor 中。
+    """
+    try:
+        selected = parse_fields(fields, LIST_FIELDS)
+        page_limit = page_size(limit, cursor)
+        statement = apply_keyset(
+            select(*[LIST_FIELDS[name].label(name) for name in selected or LIST_FIELDS]).where(Trip.user_id == current_user.id),
+            [Trip.created_at, Trip.id], descending=True, cursor=cursor, limit=page_limit, dialect=db.bind.dialect.name,
         )
-        for trip in trips
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    rows = (await db.execute(statement)).all()
+    headers = {}
+    next_page = next_cursor(rows, page_limit, 2)
+    if next_page:
+        headers[NEXT_CURSOR_HEADER] = next_page
+
+    if selected:
+        # 部分字段不满足响应模型，直接返回字典
+        return JSONResponse(content=jsonable_encoder([project_row(row, selected) for row in rows]), headers=headers)
+    response.headers.update(headers)
+    return [ItineraryListResponse(**project_row(row, LIST_FIELDS)) for row in rows]
+
+@router.get("/activities", response_model=List[ActivityResponse])
+async def get_activities(
+    activity_type: Optional[str] = Query(None, alias="type", description="活动类型，如 景点、餐饮"),
+    min_cost: Optional[float] = Query(None, ge=0, description="最低计划费用"),
+    max_cost: Optional[float] = Query(None, ge=0, description="最高计划费用"),
+    location: Optional[str] = Query(None, min_length=1, max_length=100, description="地点包含的文字，如 外滩"),
+    trip_id: Optional[int] = Query(None, description="只查询该行程"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="最多返回条数"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """在当前用户的所有行程中按类型、费用、地点查询活动（读取活动表，不解码行程JSON）"""
+    return await search_activities(
+        db, current_user.id, activity_type=activity_type, min_cost=min_cost, max_cost=max_cost,
+        location=location, trip_id=trip_id, limit=limit,
+    )
 
 @router.get("/{itinerary_id}", response_model=ItineraryResponse)
 async def get_itinerary(
     itinerary_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """获取单个行程详情"""
-    trip = db.query(Trip).filter(
+    trip = await db.scalar(select(Trip).where(
         Trip.id == itinerary_id,
         Trip.user_id == current_user.id
-    ).first()
+    ))
     
     if not trip:
         raise HTTPException(
@@ -166,18 +370,36 @@ async def get_itinerary(
         updated_at=trip.updated_at
     )
 
+@router.get("/{itinerary_id}/day-costs", response_model=List[DayCostResponse])
+async def get_day_costs(
+    itinerary_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """按天汇总行程的计划费用、活动数与时长"""
+    owned = await db.scalar(select(Trip.id).where(
+        Trip.id == itinerary_id,
+        Trip.user_id == current_user.id
+    ))
+    if not owned:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程不存在"
+        )
+    return await day_costs(db, itinerary_id)
+
 @router.put("/{itinerary_id}", response_model=APIResponse)
 async def update_itinerary(
     itinerary_id: int,
     request: ItineraryUpdateRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """更新行程"""
-    trip = db.query(Trip).filter(
+    trip = await db.scalar(select(Trip).where(
         Trip.id == itinerary_id,
         Trip.user_id == current_user.id
-    ).first()
+    ))
     
     if not trip:
         raise HTTPException(
@@ -192,6 +414,8 @@ async def update_itinerary(
         if request.destination is not None:
             trip.destination = request.destination
         if request.budget is not None:
+            if request.budget != trip.budget:
+                budget_analysis_cache.invalidate(trip.id)
             trip.budget = request.budget
         if request.travelers is not None:
             trip.travelers = request.travelers
@@ -216,7 +440,7 @@ async def update_itinerary(
                 detail="结束日期必须晚于开始日期"
             )
         
-        db.commit()
+        await db.commit()
         
         return APIResponse(
             success=True,
@@ -234,17 +458,129 @@ async def update_itinerary(
             detail=f"更新行程失败: {str(e)}"
         )
 
+@router.post("/{itinerary_id}/regenerate", response_model=GenerateItineraryResponse)
+async def regenerate_itinerary_part(
+    itinerary_id: int,
+    request: ItineraryRegenerateRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """只重新生成已保存行程中的某一天或某个活动，结果原地替换"""
+    trip = await db.scalar(select(Trip).where(
+        Trip.id == itinerary_id,
+        Trip.user_id == current_user.id
+    ))
+
+    if not trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程不存在"
+        )
+
+    day_key = f"day{request.day}"
+    itinerary = dict(trip.itinerary or {})
+    day = itinerary.get(day_key)
+    if not isinstance(day, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"行程中不存在第{request.day}天"
+        )
+    activities = day.get("activities") or []
+    if request.activity_index is not None and request.activity_index >= len(activities):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"第{request.day}天不存在第{request.activity_index + 1}个活动"
+        )
+
+    context = dict(
+        destination=trip.destination,
+        itinerary=itinerary,
+        index=request.day,
+        start_date=trip.start_date.strftime("%Y-%m-%d"),
+        budget=float(trip.budget) if trip.budget is not None else None,
+        travelers=trip.travelers,
+        instructions=request.instructions
+    )
+    # 等待AI期间释放数据库连接，避免长时间占用连接池
+    await db.close()
+
+    started = time.perf_counter()
+    target = "day" if request.activity_index is None else "activity"
+    try:
+        if request.activity_index is None:
+            ai_result = await ai_service.regenerate_day(**context)
+        else:
+            ai_result = await ai_service.regenerate_activity(
+                activity_index=request.activity_index, **context
+            )
+    finally:
+        metrics.observe(f"itinerary.regenerate.{target}.time", time.perf_counter() - started)
+
+    if not ai_result["success"]:
+        metrics.incr(f"itinerary.regenerate.{target}.failed")
+        return GenerateItineraryResponse(
+            success=False,
+            message=ai_result["message"],
+            data=None
+        )
+
+    try:
+        # 重新读取行程，在最新内容上替换，避免覆盖等待期间的其他修改
+        trip = await db.scalar(select(Trip).where(
+            Trip.id == itinerary_id,
+            Trip.user_id == current_user.id
+        ))
+        if not trip:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="行程不存在"
+            )
+
+        itinerary = dict(trip.itinerary or {})
+        if request.activity_index is None:
+            itinerary[day_key] = ai_result["data"]
+        else:
+            day = dict(itinerary.get(day_key) or {})
+            activities = list(day.get("activities") or [])
+            if request.activity_index >= len(activities):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="行程已被修改，请刷新后重试"
+                )
+            activities[request.activity_index] = ai_result["data"]
+            day["activities"] = activities
+            itinerary[day_key] = day
+        # 整体重新赋值，JSON 列才会被识别为已修改
+        trip.itinerary = itinerary
+        await db.commit()
+        await db.refresh(trip)
+        metrics.incr(f"itinerary.regenerate.{target}.succeeded")
+
+        return GenerateItineraryResponse(
+            success=True,
+            message=ai_result["message"],
+            data=_trip_to_response(trip)
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"保存行程失败: {str(e)}"
+        )
+
 @router.delete("/{itinerary_id}", response_model=APIResponse)
 async def delete_itinerary(
     itinerary_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """删除行程"""
-    trip = db.query(Trip).filter(
+    trip = await db.scalar(select(Trip).where(
         Trip.id == itinerary_id,
         Trip.user_id == current_user.id
-    ).first()
+    ))
     
     if not trip:
         raise HTTPException(
@@ -252,8 +588,8 @@ async def delete_itinerary(
             detail="行程不存在"
         )
     
-    db.delete(trip)
-    db.commit()
+    await db.delete(trip)
+    await db.commit()
     
     return APIResponse(
         success=True,
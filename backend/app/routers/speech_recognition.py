@@ -7,12 +7,15 @@
 
 import os
 import json
+import asyncio
 import http.client
 import logging
 from typing import Optional
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
 
+from app.services.resilience import asr_breaker, retry_async, CircuitOpenError
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,6 +23,13 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 单次ASR请求的超时时间（秒）
+ASR_TIMEOUT = float(os.getenv("ALIYUN_ASR_TIMEOUT", "30"))
+
+
+class ASRUpstreamError(http.client.HTTPException):
+    """ASR服务返回5xx，视为可重试的瞬时错误"""
+
 
 def build_asr_request_path(
     app_key: str,
@@ -54,10 +64,12 @@ def aliyun_asr_recognize(
     host: str,
     request_path: str,
     audio_bytes: bytes,
+    secure: bool = True,
 ):
     """调用阿里云 ASR RESTful 接口，返回解析后的JSON。
 
     若识别成功，返回包含status、result等字段的JSON；失败抛出异常。
+    secure=False 时使用明文HTTP（仅用于本地替身服务）。
     """
     headers = {
         "X-NLS-Token": token,
@@ -65,7 +77,8 @@ def aliyun_asr_recognize(
         "Content-Length": str(len(audio_bytes)),
     }
 
-    conn = http.client.HTTPSConnection(host)
+    connection_class = http.client.HTTPSConnection if secure else http.client.HTTPConnection
+    conn = connection_class(host, timeout=ASR_TIMEOUT)
     try:
         # logger.info(f"发送ASR请求到: {host}{request_path}")
         # logger.info(f"音频数据大小: {len(audio_bytes)} bytes")
@@ -77,6 +90,9 @@ def aliyun_asr_recognize(
         
         body = response.read()
         # logger.info(f"ASR响应内容: {body.decode('utf-8', errors='ignore')}")
+
+        if response.status >= 500:
+            raise ASRUpstreamError(f"ASR服务异常: {response.status} {response.reason}")
         
         try:
             data = json.loads(body)
@@ -131,11 +147,15 @@ async def recognize_speech(
         logger.error("环境变量ALIYUN_TOKEN未设置")
         raise HTTPException(status_code=500, detail="环境变量缺失：ALIYUN_TOKEN")
 
-    # 解析host（http.client需要host与path分离）
-    if not endpoint.startswith("https://"):
-        raise HTTPException(status_code=500, detail="ALIYUN_ASR_ENDPOINT 必须以 https:// 开头")
+    # 解析host（http.client需要host与path分离）；http:// 仅用于本地替身服务
+    if endpoint.startswith("https://"):
+        secure = True
+    elif endpoint.startswith("http://"):
+        secure = False
+    else:
+        raise HTTPException(status_code=500, detail="ALIYUN_ASR_ENDPOINT 必须以 https:// 或 http:// 开头")
 
-    host = endpoint.replace("https://", "")
+    host = endpoint.split("://", 1)[1].rstrip("/")
     # 构建请求路径
     request_path = build_asr_request_path(
         app_key=app_key,
@@ -155,17 +175,24 @@ async def recognize_speech(
     if not audio_bytes:
         raise HTTPException(status_code=400, detail="音频数据为空")
 
-    # 调用阿里云ASR
-    try:
-        result = aliyun_asr_recognize(
+    # 调用阿里云ASR（在线程中执行阻塞请求，经熔断器并对瞬时错误重试）
+    async def attempt():
+        return await asyncio.to_thread(
+            aliyun_asr_recognize,
             token=token,
             host=host,
             request_path=request_path,
             audio_bytes=audio_bytes,
+            secure=secure,
         )
+
+    try:
+        result = await retry_async(lambda: asr_breaker.call(attempt), "aliyun_asr")
     except HTTPException:
         # 透传HTTP异常
         raise
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"调用ASR失败: {str(e)}")
 
@@ -2,41 +2,82 @@
 文本解析路由：调用通义千问（DashScope 兼容接口）解析上传文本并提取行程信息。
 
 从请求文本中抽取 destination、title、start_date、end_date、budget、travelers、preferences。
+简单文本由本地规则预解析（app.utils.trip_preparser）直接给出结果，其余只把缺失字段交给大模型。
 仅返回JSON，不含其他解释。
 """
 
 import os
-import json
-from typing import Optional
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from openai import OpenAI
+
+from app.services.llm_gateway import llm_gateway
+from app.services.resilience import CircuitOpenError
+from app.utils.json_repair import extract_json_object
+from app.utils.metrics import metrics
+from app.utils.trip_preparser import preparse_trip
+from app.services.rate_limiter import PRIORITY_INTERACTIVE
 
 
 router = APIRouter()
 
+# 是否先用本地规则预解析（可通过 TEXT_PARSE_LOCAL_ENABLED=false 关闭，全部交给大模型）
+LOCAL_PARSE_ENABLED = os.getenv("TEXT_PARSE_LOCAL_ENABLED", "true").lower() != "false"
+
 
 class TextParseRequest(BaseModel):
     text: str
 
 
-def build_prompt(user_text: str) -> str:
-    """构建用于信息抽取的提示词。"""
+# 各字段的抽取说明与返回格式
+FIELD_SPECS = {
+    "destination": ('目的地（字符串，如"日本"、"东京"）', '"目的地或null"'),
+    "title": ("根据用户的行程内容生成的一个简短标题，10字以内。（字符串，如“南京之旅”、“北京三日游”）", '"标题或null"'),
+    "start_date": ('出发日期（字符串，格式YYYY-MM-DD，如"2023-03-25"）', '"YYYY-MM-DD格式日期或null"'),
+    "end_date": ('结束日期（字符串，格式YYYY-MM-DD，如"2023-12-27"，如果用户没有具体给出，需要你通过出发日期和天数自行计算）', '"YYYY-MM-DD格式日期或null"'),
+    "budget": ('预算金额（浮点数，单位为元，将"一万元"、"1万元"转换为10000）', "预算数字或null"),
+    "travelers": ('旅行人数（整数，将"两人"、"2人"等转换为数字2）', "人数数字或null"),
+    "preferences": ('旅行偏好（字符串，多个偏好用顿号分隔，如"美食、动漫文化"）', '"偏好或null"'),
+}
+
+
+def build_prompt(
+    user_text: str,
+    fields: Optional[List[str]] = None,
+    known: Optional[Dict[str, Any]] = None,
+    today: Optional[date] = None
+) -> str:
+    """
+    构建用于信息抽取的提示词。
+
+    Args:
+        user_text: 用户文本
+        fields: 需要提取的字段，默认全部
+        known: 本地预解析已得到的信息，作为上下文提供给模型
+        today: 解析相对日期的基准日，默认服务器当天
+    """
+    fields = fields or list(FIELD_SPECS)
+    today = today or date.today()
+    specs = "\n".join(
+        f"{index}. {name}: {FIELD_SPECS[name][0]}" for index, name in enumerate(fields, start=1)
+    )
+    formats = ",\n".join(f'  "{name}": {FIELD_SPECS[name][1]}' for name in fields)
+    known_text = ""
+    if known:
+        known_text = "\n已识别的信息（供参考）：\n" + "\n".join(
+            f"- {name}: {value}" for name, value in known.items()
+        ) + "\n"
     return f"""
-从上传的文本中提取旅行规划信息，并以JSON格式返回。
+从上传的文本中提取旅行规划信息，并以JSON格式返回。今天是{today.isoformat()}。
 
 文本具体内容：
 {user_text}
-
+{known_text}
 请提取以下信息（如果文本中没有提到某项信息，则该字段返回null）：
-1. destination: 目的地（字符串，如"日本"、"东京"）
-2. title: 根据用户的行程内容生成的一个简短标题，10字以内。（字符串，如“南京之旅”、“北京三日游”）
-3. start_date: 出发日期（字符串，格式YYYY-MM-DD，如"2023-03-25"）
-4. end_date: 结束日期（字符串，格式YYYY-MM-DD，如"2023-12-27"，如果用户没有具体给出，需要你通过出发日期和天数自行计算）
-5. budget: 预算金额（浮点数，单位为元，将"一万元"、"1万元"转换为10000）
-6. travelers: 旅行人数（整数，将"两人"、"2人"等转换为数字2）
-7. preferences: 旅行偏好（字符串，多个偏好用顿号分隔，如"美食、动漫文化"）
+{specs}
 
 注意：
 - 中文数字要转换为阿拉伯数字（一、二、三 → 1、2、3）
@@ -45,80 +86,77 @@ def build_prompt(user_text: str) -> str:
 - 日期转换：
   * "明天"、"后天" → 计算具体日期
   * "下周一"、"下个月1号" → 计算具体日期
-  * "12月25号"、"12月25日" → 转换为当年的2024-12-25格式
+  * "12月25号"、"12月25日" → 转换为当年的{today.year}-12-25格式
   * 只给出了出发日期和游玩天数 → 自行计算结束日期
   * "元旦"、"春节"、"国庆" → 转换为对应的具体日期
-  * 如果只说"月日"没说年份，默认是2025年（就近原则）
+  * 如果只说"月日"没说年份，默认是今天之后最近的那一天（就近原则）
 
 只返回JSON，不要其他解释。格式如下：
 {{
-  "destination": "目的地或null",
-  "title": "标题或null",
-  "start_date": "YYYY-MM-DD格式日期或null",
-  "end_date": "YYYY-MM-DD格式日期或null",
-  "budget": 预算数字或null,
-  "travelers": 人数数字或null,
-  "preferences": "偏好或null"
+{formats}
 }}
 """
 
 
 @router.post("/parse")
 async def parse_text(request: TextParseRequest):
-    """解析上传文本，返回旅行规划信息JSON。"""
-    api_key = os.getenv("DASHSCOPE_API_KEY")
-    if not api_key:
+    """
+    解析上传文本，返回旅行规划信息JSON。
+
+    先用本地规则预解析，只有本地没把握的字段才交给大模型；
+    文本能被完整识别时直接返回，不调用大模型。
+    """
+    empty = {name: None for name in FIELD_SPECS}
+    today = date.today()
+
+    local = None
+    if LOCAL_PARSE_ENABLED:
+        started = time.perf_counter()
+        local = preparse_trip(request.text, today)
+        metrics.observe("text_parse.local.time", time.perf_counter() - started)
+        if local.complete:
+            metrics.incr("text_parse.local.full")
+            return {**empty, **local.fields}
+        metrics.incr("text_parse.local.partial" if local.fields else "text_parse.local.miss")
+
+    if not llm_gateway.api_key:
         raise HTTPException(status_code=500, detail="环境变量缺失：DASHSCOPE_API_KEY")
 
-    # 使用 DashScope 兼容模式
-    client = OpenAI(
-        api_key=api_key,
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-        timeout=60.0,
-    )
-    model = os.getenv("DASHSCOPE_MODEL", "qwen-plus")
-
     system_prompt = (
         "你是一个擅长从文本中抽取结构化信息的助手。"
         "请严格只输出符合给定字段的JSON，不要任何其他文字。"
     )
 
-    prompt = build_prompt(request.text)
+    if local is not None:
+        fields = local.missing
+        known = {name: value for name, value in {**local.fields, **local.hints}.items() if value is not None}
+        prompt = build_prompt(request.text, fields, known, today)
+    else:
+        fields = list(FIELD_SPECS)
+        prompt = build_prompt(request.text, today=today)
 
     try:
-        completion = client.chat.completions.create(
-            model=model,
+        # 使用共享的 DashScope 兼容模式异步网关
+        completion = await llm_gateway.chat(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt},
             ],
             temperature=0,
+            endpoint="text_parse",
+            priority=PRIORITY_INTERACTIVE,
+            expected_output_tokens=20 + 20 * len(fields),
+            hedge="text_parse",
         )
 
-        content = completion.choices[0].message.content
-
-        # 只返回JSON
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            # 尝试从响应中提取JSON
-            start_idx = content.find("{")
-            end_idx = content.rfind("}")
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                json_str = content[start_idx : end_idx + 1]
-                try:
-                    return json.loads(json_str)
-                except Exception:
-                    pass
-            # 如果无法解析，返回字段全部null
-            return {
-                "destination": None,
-                "title": None,
-                "start_date": None,
-                "end_date": None,
-                "budget": None,
-                "travelers": None,
-                "preferences": None,
-            }
+        content = completion.content
+
+        # 只返回JSON（容错解析，被截断时保留已完整的字段，其余为null）
+        data = extract_json_object(content, "text_parse") or {}
+        result = {**empty, **(local.fields if local else {})}
+        result.update({name: data.get(name) for name in fields if name in data})
+        return result
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=502, detail=f"调用AI解析失败: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=502, detail=f"调用AI解析失败: {str(e)}")
@@ -3,7 +3,7 @@
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -27,12 +27,57 @@ class ExpenseResponse(BaseModel):
     created_at: datetime
 
 
+class BudgetCategoryStat(BaseModel):
+    """单个类别的开销统计"""
+    category: str
+    label: str = Field(..., description="类别中文名称")
+    amount: float
+    share: float = Field(..., description="占总开销的比例（0-1）")
+    count: int
+
+
 class BudgetSummaryResponse(BaseModel):
     """预算汇总响应模型"""
     trip_id: int
     total_budget: Optional[float] = Field(None, description="行程预算，可能为空")
     total_expenses: float = Field(..., description="总开销")
     remaining_budget: Optional[float] = Field(None, description="剩余预算，预算为空时返回null")
+    expense_count: int = Field(0, description="费用条数")
+    categories: List[BudgetCategoryStat] = Field(default_factory=list, description="各类别合计，按金额从高到低")
+
+
+class BudgetDayStat(BaseModel):
+    """单日开销"""
+    date: str
+    amount: float
+
+
+class BudgetTopExpense(BaseModel):
+    """金额较大的一笔开销"""
+    id: int
+    amount: float
+    category: str
+    label: str
+    description: Optional[str]
+    expense_date: str
+
+
+class BudgetStatsResponse(BaseModel):
+    """预算统计响应模型"""
+    trip_id: int
+    total_budget: Optional[float] = Field(None, description="行程预算，可能为空")
+    total_expenses: float
+    remaining_budget: Optional[float] = Field(None, description="剩余预算，预算为空时返回null")
+    expense_count: int
+    categories: List[BudgetCategoryStat] = Field(..., description="各类别统计，按金额从高到低")
+    trip_days: int
+    elapsed_days: int = Field(..., description="行程已进行的天数，尚未开始时为0")
+    active_days: int = Field(..., description="有开销记录的天数")
+    daily_average: Optional[float] = Field(None, description="日均花费，行程尚未开始时为空")
+    peak_day: Optional[BudgetDayStat] = Field(None, description="花费最多的一天")
+    projected_total: Optional[float] = Field(None, description="按日均花费推算的全程开销")
+    projected_overspend: Optional[float] = Field(None, description="推算超支金额（负数表示结余），无预算时为空")
+    top_expenses: List[BudgetTopExpense] = Field(..., description="金额最大的几笔开销")
 
 
 class AIExpenseExtractRequest(BaseModel):
@@ -40,6 +85,13 @@ class AIExpenseExtractRequest(BaseModel):
     text: str = Field(..., description="需要解析的原始文本")
 
 
+class AIExpenseBatchExtractRequest(BaseModel):
+    """AI批量费用提取请求模型（text 与 lines 至少提供一个）"""
+    text: Optional[str] = Field(None, max_length=20000, description="整段文本（聊天记录、小票清单），按行拆分")
+    lines: Optional[List[str]] = Field(None, max_length=500, description="已拆好的多行文本，每行最多一条费用")
+    trip_id: Optional[int] = Field(None, description="提供时把抽取出的费用写入该行程（单个事务）")
+
+
 class AIBudgetAnalysisResponse(BaseModel):
     """AI预算分析响应模型"""
     analysis: str = Field(..., description="预算分析结果")
@@ -4,7 +4,7 @@
 
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
-from datetime import datetime
+from datetime import datetime, time
 
 class ItineraryGenerateRequest(BaseModel):
     """生成行程请求模型"""
@@ -27,6 +27,12 @@ class ItineraryUpdateRequest(BaseModel):
     status: Optional[str] = Field(None, description="行程状态")
     itinerary: Optional[Dict[str, Any]] = Field(None, description="详细行程")
 
+class ItineraryRegenerateRequest(BaseModel):
+    """局部重新生成请求模型"""
+    day: int = Field(..., description="要重新生成的天（从1开始）", ge=1)
+    activity_index: Optional[int] = Field(None, description="只重新生成该天的第几个活动（从0开始），不填则重新生成整天", ge=0)
+    instructions: Optional[str] = Field(None, description="修改意见", max_length=200)
+
 class ActivityModel(BaseModel):
     """活动模型"""
     time: str = Field(..., description="时间")
@@ -73,6 +79,38 @@ class GenerateItineraryResponse(BaseModel):
     success: bool = Field(..., description="是否成功")
     message: str = Field(..., description="响应消息")
     data: Optional[ItineraryResponse] = Field(None, description="行程数据")
+    job_id: Optional[int] = Field(None, description="后台生成任务ID（background=true 时返回）")
+
+class ActivityResponse(BaseModel):
+    """活动查询结果（来自 itinerary_activities 表）"""
+    trip_id: int = Field(..., description="行程ID")
+    trip_title: str = Field(..., description="行程标题")
+    day_index: int = Field(..., description="第几天（从1开始）")
+    position: int = Field(..., description="当天的第几个活动（从0开始）")
+    start_time: Optional[time] = Field(None, description="开始时间")
+    duration_minutes: Optional[int] = Field(None, description="持续时间（分钟）")
+    cost: Optional[float] = Field(None, description="计划费用")
+    activity_type: Optional[str] = Field(None, description="活动类型")
+    name: Optional[str] = Field(None, description="活动名称")
+    location: Optional[str] = Field(None, description="地点")
+
+class DayCostResponse(BaseModel):
+    """单日计划费用汇总"""
+    day_index: int = Field(..., description="第几天（从1开始）")
+    activity_count: int = Field(..., description="活动数")
+    planned_cost: float = Field(..., description="计划费用合计（无法解析的费用按0计）")
+    duration_minutes: int = Field(..., description="活动时长合计（分钟）")
+
+class GenerationJobResponse(BaseModel):
+    """行程生成任务响应模型"""
+    id: int = Field(..., description="任务ID")
+    status: str = Field(..., description="任务状态: queued, running, done, failed")
+    trip_id: Optional[int] = Field(None, description="生成的行程ID")
+    error: Optional[str] = Field(None, description="失败原因")
+    attempts: int = Field(..., description="已执行次数")
+    created_at: Optional[datetime] = Field(None, description="创建时间")
+    started_at: Optional[datetime] = Field(None, description="开始执行时间")
+    finished_at: Optional[datetime] = Field(None, description="结束时间")
     
 class APIResponse(BaseModel):
     """通用API响应模型"""
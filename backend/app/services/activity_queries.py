@@ -0,0 +1,102 @@
+"""
+行程活动查询
+在 itinerary_activities 表上用 SQL 完成按类型/费用/地点筛选活动与按天汇总计划费用，
+不再逐个解码行程JSON。
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.activity import ItineraryActivity
+from app.models.trip import Trip
+
+
+async def search_activities(
+    db: AsyncSession,
+    user_id: int,
+    activity_type: Optional[str] = None,
+    min_cost: Optional[float] = None,
+    max_cost: Optional[float] = None,
+    location: Optional[str] = None,
+    trip_id: Optional[int] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    查询用户行程中的活动（如“费用超过200元的景点”“去外滩的行程”）
+
+    Args:
+        db: 异步数据库会话
+        user_id: 当前用户ID
+        activity_type: 活动类型，精确匹配
+        min_cost / max_cost: 计划费用范围（含边界）
+        location: 地点包含的文字
+        trip_id: 只查某个行程
+        limit: 最多返回条数
+
+    Returns:
+        活动列表，按行程创建时间倒序、天与活动顺序排列
+    """
+    activity = ItineraryActivity
+    statement = (
+        select(
+            activity.trip_id, Trip.title.label("trip_title"), activity.day_index, activity.position,
+            activity.start_time, activity.duration_minutes, activity.cost, activity.activity_type,
+            activity.name, activity.location,
+        )
+        .join(Trip, Trip.id == activity.trip_id)
+        .where(Trip.user_id == user_id)
+    )
+    if trip_id is not None:
+        statement = statement.where(activity.trip_id == trip_id)
+    if activity_type:
+        statement = statement.where(activity.activity_type == activity_type)
+    if min_cost is not None:
+        statement = statement.where(activity.cost >= min_cost)
+    if max_cost is not None:
+        statement = statement.where(activity.cost <= max_cost)
+    if location:
+        statement = statement.where(activity.location.contains(location, autoescape=True))
+    statement = statement.order_by(
+        Trip.created_at.desc(), activity.trip_id.desc(), activity.day_index, activity.position
+    ).limit(limit)
+
+    return [
+        {**row._asdict(), "cost": float(row.cost) if row.cost is not None else None}
+        for row in (await db.execute(statement)).all()
+    ]
+
+
+async def day_costs(db: AsyncSession, trip_id: int) -> List[Dict[str, Any]]:
+    """
+    行程每天的活动数、计划费用与时长合计
+
+    Args:
+        db: 异步数据库会话
+        trip_id: 行程ID
+
+    Returns:
+        [{"day_index", "activity_count", "planned_cost", "duration_minutes"}, ...]，按天排列
+    """
+    activity = ItineraryActivity
+    rows = (await db.execute(
+        select(
+            activity.day_index,
+            func.count(activity.id),
+            func.coalesce(func.sum(activity.cost), 0),
+            func.coalesce(func.sum(activity.duration_minutes), 0),
+        )
+        .where(activity.trip_id == trip_id)
+        .group_by(activity.day_index)
+        .order_by(activity.day_index)
+    )).all()
+    return [
+        {
+            "day_index": day_index,
+            "activity_count": count,
+            "planned_cost": round(float(cost), 2),
+            "duration_minutes": int(minutes),
+        }
+        for day_index, count, cost, minutes in rows
+    ]
@@ -4,28 +4,63 @@ AI服务模块
 """
 
 import os
-import json
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from openai import OpenAI
+from typing import Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime, timedelta
 
+from app.services.llm_gateway import llm_gateway
+from app.services.rate_limiter import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from app.services.itinerary_cache import itinerary_cache, build_cache_key, trip_days
+from app.utils.json_repair import TolerantJSONParser, parse_model_json, extract_json_object
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "你是一个专业的旅行规划师，擅长制定详细的旅行行程。请严格按照要求的JSON格式返回结果。"
+
+ACTIVITY_JSON_EXAMPLE = """{
+  "time": "09:00",
+  "activity": "外滩观光",
+  "location": "外滩",
+  "duration": "2小时",
+  "cost": 0,
+  "type": "景点",
+  "description": "漫步外滩，欣赏黄浦江两岸风光和历史建筑"
+}"""
+
+
+def _day_json_example(date: str) -> str:
+    """单日行程的JSON格式示例"""
+    activity = "\n".join("    " + line for line in ACTIVITY_JSON_EXAMPLE.splitlines())
+    return f'''{{
+  "date": "{date}",
+  "activities": [
+{activity}
+  ]
+}}'''
+
+
+def _summarize_day(day: Optional[Dict[str, Any]]) -> str:
+    """把一天的活动压缩成一行，作为相邻天的上下文"""
+    if not day or not day.get("activities"):
+        return "无"
+    return "；".join(
+        f"{activity.get('time', '')} {activity.get('activity', '')}（{activity.get('location', '')}）"
+        for activity in day["activities"]
+        if isinstance(activity, dict)
+    )
+
 class AIService:
     """AI服务类，用于调用通义千问API"""
     
     def __init__(self):
         """初始化AI服务"""
-        self.client = OpenAI(
-            api_key=os.getenv("DASHSCOPE_API_KEY"),
-            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-            timeout=90.0  # 设置90秒超时
-        )
-        self.model = "qwen-plus"
-        
-    def generate_itinerary(
+        # 长行程采用“骨架 + 并行逐日填充”模式的最少天数，以及逐日生成的并发上限
+        self.parallel_min_days = int(os.getenv("ITINERARY_PARALLEL_MIN_DAYS", "7"))
+        self.parallel_concurrency = int(os.getenv("ITINERARY_PARALLEL_CONCURRENCY", "4"))
+
+    async def generate_itinerary(
         self,
         destination: str,
         start_date: str,
@@ -48,49 +83,76 @@ class AIService:
             生成的行程数据
         """
         try:
+            # 相同的规范化请求直接复用缓存结果（temperature=0，结果稳定）
+            cache_key = build_cache_key(
+                destination, start_date, end_date, budget, preferences, travelers
+            )
+            cached = await itinerary_cache.get(start_date, cache_key)
+            if cached:
+                return {
+                    "success": True,
+                    "data": cached,
+                    "message": "行程生成成功"
+                }
+
+            # 长行程：先生成骨架，再并行逐日填充
+            if trip_days(start_date, end_date) >= self.parallel_min_days:
+                itinerary_data = {}
+                async for key, day in self._plan_parallel(
+                    destination, start_date, end_date, budget, preferences, travelers
+                ):
+                    itinerary_data[key] = day
+                itinerary_data = dict(
+                    sorted(itinerary_data.items(), key=lambda item: int(item[0][3:]))
+                )
+                await itinerary_cache.set(cache_key, itinerary_data)
+                return {
+                    "success": True,
+                    "data": itinerary_data,
+                    "message": "行程生成成功"
+                }
+
             # 构建提示词
             prompt = self._build_prompt(
                 destination, start_date, end_date, budget, preferences, travelers
             )
             
-            # 调用API
-            completion = self.client.chat.completions.create(
-                model=self.model,
+            # 通过共享的异步网关调用API，不阻塞事件循环
+            completion = await llm_gateway.chat(
+                endpoint="itinerary",
                 messages=[
-                    {"role": "system", "content": "你是一个专业的旅行规划师，擅长制定详细的旅行行程。请严格按照要求的JSON格式返回结果。"},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0  # 设置温度为0，确保结果稳定
+                temperature=0,  # 设置温度为0，确保结果稳定
+                priority=PRIORITY_BULK,
+                expected_output_tokens=400 * trip_days(start_date, end_date)
             )
             
             # 解析响应
-            response_content = completion.choices[0].message.content
+            response_content = completion.content
             logger.info(f"AI响应内容: {response_content}")
             
-            # 尝试解析JSON
-            try:
-                itinerary_data = json.loads(response_content)
+            # 容错解析JSON（代码块、尾逗号、全角标点、截断等），尽量避免重新生成
+            result = parse_model_json(response_content)
+            if isinstance(result.data, dict) and result.data:
+                itinerary_data = result.data
+                self._log_repairs(result)
+                # 被截断后挽救出的行程不完整，不写入缓存
+                if not result.truncated:
+                    await itinerary_cache.set(cache_key, itinerary_data)
                 return {
                     "success": True,
                     "data": itinerary_data,
                     "message": "行程生成成功"
                 }
-            except json.JSONDecodeError:
-                # 如果直接解析失败，尝试提取JSON部分
-                itinerary_data = self._extract_json_from_response(response_content)
-                if itinerary_data:
-                    return {
-                        "success": True,
-                        "data": itinerary_data,
-                        "message": "行程生成成功"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "data": None,
-                        "message": "AI返回的数据格式不正确",
-                        "raw_response": response_content
-                    }
+            else:
+                return {
+                    "success": False,
+                    "data": None,
+                    "message": "AI返回的数据格式不正确",
+                    "raw_response": response_content
+                }
                     
         except Exception as e:
             logger.error(f"生成行程时发生错误: {str(e)}")
@@ -100,6 +162,90 @@ class AIService:
                 "message": f"生成行程失败: {str(e)}"
             }
     
+    async def stream_itinerary(
+        self,
+        destination: str,
+        start_date: str,
+        end_date: str,
+        budget: Optional[float] = None,
+        preferences: Optional[str] = None,
+        travelers: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        流式生成行程规划，每当某一天的JSON完整时立即产出
+
+        Yields:
+            (dayN, 当天行程数据)
+
+        Raises:
+            ValueError: AI返回的数据无法解析出任何一天的行程
+        """
+        cache_key = build_cache_key(
+            destination, start_date, end_date, budget, preferences, travelers
+        )
+        cached = await itinerary_cache.get(start_date, cache_key)
+        if cached:
+            for key, value in cached.items():
+                yield key, value
+            return
+
+        itinerary_data: Dict[str, Any] = {}
+
+        # 长行程：各天并行生成，按完成顺序产出
+        if trip_days(start_date, end_date) >= self.parallel_min_days:
+            async for key, day in self._plan_parallel(
+                destination, start_date, end_date, budget, preferences, travelers
+            ):
+                itinerary_data[key] = day
+                yield key, day
+            itinerary_data = dict(
+                sorted(itinerary_data.items(), key=lambda item: int(item[0][3:]))
+            )
+            await itinerary_cache.set(cache_key, itinerary_data)
+            return
+
+        prompt = self._build_prompt(
+            destination, start_date, end_date, budget, preferences, travelers
+        )
+        parser = TolerantJSONParser()
+        chunks = []
+
+        async for delta in llm_gateway.stream_chat(
+            endpoint="itinerary",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0,
+            priority=PRIORITY_BULK,
+            expected_output_tokens=400 * trip_days(start_date, end_date)
+        ):
+            chunks.append(delta)
+            for key, value in parser.feed(delta):
+                if key.startswith("day") and isinstance(value, dict):
+                    itinerary_data[key] = value
+                    yield key, value
+
+        # 输出结束：补全被截断的部分，产出挽救出的天
+        result = parser.finish()
+        self._log_repairs(result)
+        for key, value in parser.take_completed():
+            if key.startswith("day") and isinstance(value, dict):
+                itinerary_data[key] = value
+                yield key, value
+
+        if not itinerary_data:
+            # 没有得到任何 dayN 时，按整体结果返回
+            if not isinstance(result.data, dict) or not result.data:
+                logger.info(f"AI流式响应内容: {''.join(chunks)}")
+                raise ValueError("AI返回的数据格式不正确")
+            itinerary_data = result.data
+            for key, value in itinerary_data.items():
+                yield key, value
+
+        if not result.truncated:
+            await itinerary_cache.set(cache_key, itinerary_data)
+
     def _build_prompt(
         self,
         destination: str,
@@ -219,20 +365,341 @@ class AIService:
         
         return prompt
     
-    def _extract_json_from_response(self, response: str) -> Optional[Dict[str, Any]]:
-        """从响应中提取JSON数据"""
+    async def _plan_parallel(
+        self,
+        destination: str,
+        start_date: str,
+        end_date: str,
+        budget: Optional[float] = None,
+        preferences: Optional[str] = None,
+        travelers: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        两阶段生成长行程：先用一次短调用确定每天的主题和区域（骨架），
+        再按骨架并发生成每天的活动，并发数受 parallel_concurrency 限制。
+
+        Yields:
+            (dayN, 当天行程数据)，按完成顺序产出
+        """
+        days = trip_days(start_date, end_date)
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+
+        skeleton = await self._chat_json(
+            self._build_skeleton_prompt(destination, start_date, days, budget, preferences, travelers),
+            expected_output_tokens=30 * days
+        )
+        if not skeleton:
+            raise ValueError("AI返回的行程骨架格式不正确")
+
+        semaphore = asyncio.Semaphore(self.parallel_concurrency)
+
+        async def fill_day(index: int) -> Tuple[str, Dict[str, Any]]:
+            date = (start_dt + timedelta(days=index - 1)).strftime("%Y-%m-%d")
+            prompt = self._build_day_prompt(
+                destination, date, index, days, skeleton, budget, preferences, travelers
+            )
+            async with semaphore:
+                day = await self._chat_json(prompt, priority=PRIORITY_BULK)
+            if not day or not isinstance(day.get("activities"), list):
+                raise ValueError(f"AI返回的第{index}天行程格式不正确")
+            day["date"] = date
+            return f"day{index}", day
+
+        tasks = [asyncio.create_task(fill_day(index)) for index in range(1, days + 1)]
         try:
-            # 尝试找到JSON部分
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx]
-                return json.loads(json_str)
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 任一天失败或调用方提前退出时，取消其余仍在进行的调用
+            for task in tasks:
+                task.cancel()
+
+    def _day_date(self, itinerary: Dict[str, Any], index: int, start_date: str) -> str:
+        """第 index 天的日期：优先取行程中记录的日期"""
+        date = (itinerary.get(f"day{index}") or {}).get("date")
+        if date:
+            return date
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        return (start_dt + timedelta(days=index - 1)).strftime("%Y-%m-%d")
+
+    async def regenerate_day(
+        self,
+        destination: str,
+        itinerary: Dict[str, Any],
+        index: int,
+        start_date: str,
+        budget: Optional[float] = None,
+        travelers: Optional[int] = None,
+        instructions: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        只重新生成行程中的某一天
+
+        提示词只包含前后相邻两天的安排，输出约为整体生成的 1/天数。
+
+        Returns:
+            与 generate_itinerary 相同结构的结果，data 为新的一天
+        """
+        try:
+            days = sum(1 for key in itinerary if key.startswith("day"))
+            date = self._day_date(itinerary, index, start_date)
+            prompt = self._build_regenerate_day_prompt(
+                destination, date, index, days, itinerary, budget, travelers, instructions
+            )
+            day = await self._chat_json(prompt, priority=PRIORITY_INTERACTIVE)
+            if not day or not isinstance(day.get("activities"), list):
+                return {"success": False, "data": None, "message": "AI返回的数据格式不正确"}
+            day["date"] = date
+            return {"success": True, "data": day, "message": f"第{index}天已重新生成"}
         except Exception as e:
-            logger.error(f"提取JSON失败: {str(e)}")
-        
-        return None
+            logger.error(f"重新生成第{index}天时发生错误: {str(e)}")
+            return {"success": False, "data": None, "message": f"重新生成失败: {str(e)}"}
+
+    async def regenerate_activity(
+        self,
+        destination: str,
+        itinerary: Dict[str, Any],
+        index: int,
+        activity_index: int,
+        start_date: str,
+        budget: Optional[float] = None,
+        travelers: Optional[int] = None,
+        instructions: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        只重新生成某一天中的单个活动
+
+        提示词只包含当天其余活动作为上下文，新活动沿用原来的时间段。
+
+        Returns:
+            与 generate_itinerary 相同结构的结果，data 为新的活动
+        """
+        try:
+            day = itinerary[f"day{index}"]
+            original = day["activities"][activity_index]
+            date = self._day_date(itinerary, index, start_date)
+            prompt = self._build_regenerate_activity_prompt(
+                destination, date, day, activity_index, budget, travelers, instructions
+            )
+            activity = await self._chat_json(prompt, expected_output_tokens=100, priority=PRIORITY_INTERACTIVE)
+            if not activity or not activity.get("activity"):
+                return {"success": False, "data": None, "message": "AI返回的数据格式不正确"}
+            activity["time"] = original.get("time", activity.get("time"))
+            return {"success": True, "data": activity, "message": f"第{index}天的活动已重新生成"}
+        except Exception as e:
+            logger.error(f"重新生成第{index}天第{activity_index + 1}个活动时发生错误: {str(e)}")
+            return {"success": False, "data": None, "message": f"重新生成失败: {str(e)}"}
+
+    async def _chat_json(
+        self,
+        prompt: str,
+        expected_output_tokens: int = 400,
+        priority: int = PRIORITY_BULK
+    ) -> Optional[Dict[str, Any]]:
+        """发送单个提示词并解析返回的JSON对象"""
+        completion = await llm_gateway.chat(
+            endpoint="itinerary",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0,
+            priority=priority,
+            expected_output_tokens=expected_output_tokens
+        )
+        return self._extract_json_from_response(completion.content)
+
+    def _build_skeleton_prompt(
+        self,
+        destination: str,
+        start_date: str,
+        days: int,
+        budget: Optional[float] = None,
+        preferences: Optional[str] = None,
+        travelers: Optional[int] = None
+    ) -> str:
+        """构建行程骨架提示词：只确定每天的主题和游玩区域"""
+        prompt = f"""
+请为一次{days}天的{destination}旅行制定行程骨架，只需确定每天的主题和主要游玩区域，不要安排具体活动。
+
+旅行信息：
+- 目的地：{destination}
+- 开始日期：{start_date}
+- 旅行天数：{days}天
+"""
+        if budget:
+            prompt += f"- 预算：{budget}元\n"
+        if preferences:
+            prompt += f"- 偏好：{preferences}\n"
+        if travelers is not None:
+            prompt += f"- 人数：{travelers}人\n"
+
+        prompt += """
+请严格按照以下JSON格式返回，共包含每一天，不要添加任何其他文字：
+
+{
+  "day1": {"theme": "老城区历史文化", "area": "外滩、南京路"},
+  "day2": {"theme": "江南园林与古镇", "area": "豫园、朱家角"}
+}
+
+要求：
+1. 相邻两天的区域尽量不重复，整体路线顺畅
+2. 第一天和最后一天考虑抵达与离开，安排轻松一些
+3. 只返回JSON格式，不要任何其他文字
+"""
+        return prompt
+
+    def _build_day_prompt(
+        self,
+        destination: str,
+        date: str,
+        index: int,
+        days: int,
+        skeleton: Dict[str, Any],
+        budget: Optional[float] = None,
+        preferences: Optional[str] = None,
+        travelers: Optional[int] = None
+    ) -> str:
+        """构建单日行程提示词，包含整体骨架作为上下文"""
+        outline = "\n".join(
+            f"- 第{i}天：{(skeleton.get(f'day{i}') or {}).get('theme', '自由安排')}"
+            f"（{(skeleton.get(f'day{i}') or {}).get('area', '不限')}）"
+            for i in range(1, days + 1)
+        )
+        today = skeleton.get(f"day{index}") or {}
+
+        prompt = f"""
+请为{destination}旅行的第{index}天（共{days}天，日期{date}）制定详细的活动安排。
+
+整体行程骨架：
+{outline}
+
+今天的主题：{today.get('theme', '自由安排')}
+今天的区域：{today.get('area', '不限')}
+"""
+        if budget:
+            prompt += f"- 全程预算：{budget}元（今天约{budget / days:.0f}元）\n"
+        if preferences:
+            prompt += f"- 偏好：{preferences}\n"
+        if travelers is not None:
+            prompt += f"- 人数：{travelers}人\n"
+
+        prompt += f"""
+请严格按照以下JSON格式返回这一天的行程，不要添加任何其他文字：
+
+{_day_json_example(date)}
+
+要求：
+1. 活动围绕今天的主题和区域，包含交通、住宿、景点、餐厅等
+2. 每个活动包含：时间、活动名称、地点、持续时间、费用、类型、描述
+3. 活动类型包括：景点、餐饮、住宿、交通、购物、娱乐等
+4. 酒店如果想不到适合的，统一默认为“如家酒店（城市名店）”
+5. 费用要符合实际情况，免费景点费用为0
+6. 规划需考虑旅行人数（例如分餐、交通与住宿安排）
+7. 只返回JSON格式，不要任何其他文字
+"""
+        return prompt
+
+    def _build_regenerate_day_prompt(
+        self,
+        destination: str,
+        date: str,
+        index: int,
+        days: int,
+        itinerary: Dict[str, Any],
+        budget: Optional[float] = None,
+        travelers: Optional[int] = None,
+        instructions: Optional[str] = None
+    ) -> str:
+        """构建重新生成单日的提示词，只带前后相邻两天作为上下文"""
+        prompt = f"""
+请为{destination}旅行的第{index}天（共{days}天，日期{date}）重新制定活动安排。
+
+前一天的安排：{_summarize_day(itinerary.get(f"day{index - 1}"))}
+后一天的安排：{_summarize_day(itinerary.get(f"day{index + 1}"))}
+原来这一天的安排（用户不满意）：{_summarize_day(itinerary.get(f"day{index}"))}
+"""
+        if instructions:
+            prompt += f"- 用户的修改意见：{instructions}\n"
+        if budget:
+            prompt += f"- 全程预算：{budget}元（今天约{budget / max(days, 1):.0f}元）\n"
+        if travelers is not None:
+            prompt += f"- 人数：{travelers}人\n"
+
+        prompt += f"""
+请严格按照以下JSON格式返回这一天的行程，不要添加任何其他文字：
+
+{_day_json_example(date)}
+
+要求：
+1. 与原来这一天的安排明显不同，且不要重复前后两天已安排的景点
+2. 与前后两天的路线衔接顺畅
+3. 每个活动包含：时间、活动名称、地点、持续时间、费用、类型、描述
+4. 费用要符合实际情况，免费景点费用为0
+5. 只返回JSON格式，不要任何其他文字
+"""
+        return prompt
+
+    def _build_regenerate_activity_prompt(
+        self,
+        destination: str,
+        date: str,
+        day: Dict[str, Any],
+        activity_index: int,
+        budget: Optional[float] = None,
+        travelers: Optional[int] = None,
+        instructions: Optional[str] = None
+    ) -> str:
+        """构建重新生成单个活动的提示词，只带当天其余活动作为上下文"""
+        activities = day.get("activities") or []
+        original = activities[activity_index]
+        previous = activities[activity_index - 1] if activity_index > 0 else None
+        following = activities[activity_index + 1] if activity_index + 1 < len(activities) else None
+
+        def describe(activity: Optional[Dict[str, Any]]) -> str:
+            if not activity:
+                return "无"
+            return f"{activity.get('time', '')} {activity.get('activity', '')}（{activity.get('location', '')}）"
+
+        prompt = f"""
+请为{destination}旅行{date}这一天替换一个活动。
+
+需要替换的活动（用户不满意）：{describe(original)}，类型：{original.get('type', '不限')}，时长：{original.get('duration', '不限')}
+前一个活动：{describe(previous)}
+后一个活动：{describe(following)}
+当天其他活动：{_summarize_day(day)}
+"""
+        if instructions:
+            prompt += f"- 用户的修改意见：{instructions}\n"
+        if budget:
+            prompt += f"- 全程预算：{budget}元\n"
+        if travelers is not None:
+            prompt += f"- 人数：{travelers}人\n"
+
+        prompt += f"""
+请严格按照以下JSON格式只返回一个活动，不要添加任何其他文字：
+
+{ACTIVITY_JSON_EXAMPLE}
+
+要求：
+1. 时间沿用{original.get('time', '原来的时间')}，与前后活动的地点衔接顺畅
+2. 不要与当天其他活动重复
+3. 费用要符合实际情况，免费景点费用为0
+4. 只返回JSON格式，不要任何其他文字
+"""
+        return prompt
+
+    def _extract_json_from_response(self, response: str) -> Optional[Dict[str, Any]]:
+        """从响应中提取JSON数据（容错解析，见 app.utils.json_repair）"""
+        return extract_json_object(response, "itinerary")
+
+    def _log_repairs(self, result):
+        """记录容错解析做过的修复和挽救的字段"""
+        if result.repaired:
+            logger.warning(
+                f"行程JSON已修复: {', '.join(result.repairs)}；"
+                f"挽救: {result.salvaged_fields or '无'}，丢弃: {result.dropped_fields or '无'}"
+            )
 
 # 创建全局AI服务实例
 ai_service = AIService()
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+AI预算分析缓存
+按行程缓存最近一次分析结果，并记录生成时费用集合的指纹
+（预算、费用条数、金额合计、最新记录的 id 与创建时间）。
+
+读取时指纹不一致即视为失效；添加费用或修改预算时也会主动清除对应行程的缓存。
+仅保存在进程内（LRU，容量 BUDGET_ANALYSIS_CACHE_SIZE，有效期 BUDGET_ANALYSIS_CACHE_TTL 秒）。
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from app.utils.metrics import metrics
+
+
+def build_fingerprint(
+    budget: Optional[float],
+    count: int,
+    total: Optional[float],
+    max_id: Optional[int],
+    max_created_at: Optional[datetime],
+) -> str:
+    """费用集合指纹：新增或删除费用、金额合计变化或预算变化都会改变指纹"""
+    parts = [
+        "" if budget is None else f"{float(budget):.2f}",
+        str(count),
+        f"{float(total or 0):.2f}",
+        str(max_id or 0),
+        str(max_created_at or ""),
+    ]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class BudgetAnalysisCache:
+    """按行程缓存预算分析结果"""
+
+    def __init__(self):
+        """初始化缓存配置"""
+        self.enabled = os.getenv("BUDGET_ANALYSIS_CACHE_ENABLED", "true").lower() != "false"
+        self.max_size = int(os.getenv("BUDGET_ANALYSIS_CACHE_SIZE", "512"))
+        self.ttl = float(os.getenv("BUDGET_ANALYSIS_CACHE_TTL", str(24 * 3600)))
+        self._entries: "OrderedDict[int, Tuple[str, float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, trip_id: int, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """指纹一致且未过期时返回缓存的分析结果"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(trip_id)
+            if entry is None:
+                metrics.incr("budget_analysis.cache.miss")
+                return None
+            cached_fingerprint, stored_at, value = entry
+            if cached_fingerprint != fingerprint or time.time() - stored_at > self.ttl:
+                del self._entries[trip_id]
+                metrics.incr("budget_analysis.cache.stale")
+                return None
+            self._entries.move_to_end(trip_id)
+        metrics.incr("budget_analysis.cache.hit")
+        return value
+
+    def put(self, trip_id: int, fingerprint: str, value: Dict[str, Any]):
+        """保存分析结果，超出容量时淘汰最久未使用的行程"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[trip_id] = (fingerprint, time.time(), value)
+            self._entries.move_to_end(trip_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, trip_id: int):
+        """清除某个行程的缓存（添加费用、修改预算时调用）"""
+        with self._lock:
+            if self._entries.pop(trip_id, None) is not None:
+                metrics.incr("budget_analysis.cache.invalidated")
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def size(self) -> int:
+        """当前缓存的行程数"""
+        return len(self._entries)
+
+
+# 创建全局预算分析缓存实例
+budget_analysis_cache = BudgetAnalysisCache()
@@ -0,0 +1,110 @@
+"""
+行程预算统计服务
+用 SQL 聚合计算行程开销统计：各类别合计与占比、日均花费与峰值日、
+金额最大的几笔开销，以及按当前花费速度推算的超支情况。
+
+统计结果的大小与费用条数无关，既直接返回给前端，也作为AI预算分析的提示词输入。
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.expense import Expense
+from app.models.trip import Trip
+from app.services.budget_totals import category_totals
+from app.utils.expense_extractor import CATEGORY_LABELS
+
+# 返回的最大开销条数
+TOP_EXPENSES = 5
+
+
+def _as_date(value: Any) -> Optional[date]:
+    """SQL 的 date() 在不同数据库上可能返回字符串或日期"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+async def compute_budget_stats(db: AsyncSession, trip: Trip, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    计算行程的预算统计（全部由汇总表与聚合查询完成，不加载费用明细）
+
+    推算规则：行程进行中按已过天数计算日均花费，行程已结束按全部天数计算，
+    行程尚未开始时不推算（此时的费用多为提前预订）。
+
+    Args:
+        db: 异步数据库会话
+        trip: 行程
+        today: 基准日，默认服务器当天
+
+    Returns:
+        统计结果字典，字段与 BudgetStatsResponse 一致
+    """
+    today = today or date.today()
+    total_budget = float(trip.budget) if trip.budget is not None else None
+
+    # 各类别合计来自维护的汇总表（见 app.services.budget_totals）
+    categories = await category_totals(db, trip.id)
+    count = sum(item["count"] for item in categories)
+    total_expenses = sum(item["amount"] for item in categories)
+
+    by_trip = Expense.trip_id == trip.id
+    day = func.date(Expense.expense_date)
+    daily_total = func.sum(Expense.amount)
+    peak = (await db.execute(
+        select(day, daily_total).where(by_trip).group_by(day).order_by(daily_total.desc()).limit(1)
+    )).first()
+    active_days = await db.scalar(select(func.count(func.distinct(day))).where(by_trip)) or 0
+
+    top_rows = (await db.scalars(
+        select(Expense).where(by_trip).order_by(Expense.amount.desc(), Expense.id.asc()).limit(TOP_EXPENSES)
+    )).all()
+    top_expenses = [
+        {
+            "id": expense.id,
+            "amount": float(expense.amount),
+            "category": expense.category,
+            "label": CATEGORY_LABELS.get(expense.category, expense.category),
+            "description": expense.description,
+            "expense_date": expense.expense_date.strftime("%Y-%m-%d"),
+        }
+        for expense in top_rows
+    ]
+
+    start = trip.start_date.date()
+    end = trip.end_date.date()
+    trip_days = max((end - start).days + 1, 1)
+    if today < start:
+        elapsed_days = 0
+    else:
+        elapsed_days = min((today - start).days + 1, trip_days)
+
+    daily_average = round(total_expenses / elapsed_days, 2) if elapsed_days else None
+    projected_total = round(daily_average * trip_days, 2) if daily_average is not None else None
+    projected_overspend = None
+    if projected_total is not None and total_budget is not None:
+        projected_overspend = round(projected_total - total_budget, 2)
+
+    return {
+        "trip_id": trip.id,
+        "total_budget": total_budget,
+        "total_expenses": round(total_expenses, 2),
+        "remaining_budget": round(total_budget - total_expenses, 2) if total_budget is not None else None,
+        "expense_count": count,
+        "categories": categories,
+        "trip_days": trip_days,
+        "elapsed_days": elapsed_days,
+        "active_days": active_days,
+        "daily_average": daily_average,
+        "peak_day": {"date": _as_date(peak[0]).isoformat(), "amount": round(float(peak[1]), 2)} if peak else None,
+        "projected_total": projected_total,
+        "projected_overspend": projected_overspend,
+        "top_expenses": top_expenses,
+    }
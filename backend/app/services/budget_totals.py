@@ -0,0 +1,55 @@
+"""
+行程开销汇总读取
+预算汇总与预算统计共用的按类别合计：默认读取 trip_budget_totals 维护表（每个类别一行，
+与费用条数无关）；BUDGET_TOTALS_ENABLED=false 时改为对 expenses 做 SUM/GROUP BY。
+"""
+
+import os
+from typing import Any, Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.budget_total import TripBudgetTotal
+from app.models.expense import Expense
+from app.utils.expense_extractor import CATEGORY_LABELS
+
+BUDGET_TOTALS_ENABLED = os.getenv("BUDGET_TOTALS_ENABLED", "true").lower() != "false"
+
+
+async def category_totals(db: AsyncSession, trip_id: int, use_totals: bool = BUDGET_TOTALS_ENABLED) -> List[Dict[str, Any]]:
+    """
+    行程各类别的金额合计与条数，按金额从高到低
+
+    Args:
+        db: 异步数据库会话
+        trip_id: 行程ID
+        use_totals: 是否读取维护表（否则在 expenses 上聚合）
+
+    Returns:
+        [{"category", "label", "amount", "share", "count"}, ...]
+    """
+    if use_totals:
+        statement = (
+            select(TripBudgetTotal.category, TripBudgetTotal.amount, TripBudgetTotal.expense_count)
+            .where(TripBudgetTotal.trip_id == trip_id, TripBudgetTotal.expense_count > 0)
+        )
+    else:
+        statement = (
+            select(Expense.category, func.sum(Expense.amount), func.count(Expense.id))
+            .where(Expense.trip_id == trip_id)
+            .group_by(Expense.category)
+        )
+    rows = sorted((await db.execute(statement)).all(), key=lambda row: float(row[1] or 0), reverse=True)
+
+    total = sum(float(amount or 0) for _, amount, _ in rows)
+    return [
+        {
+            "category": category,
+            "label": CATEGORY_LABELS.get(category, category),
+            "amount": round(float(amount or 0), 2),
+            "share": round(float(amount or 0) / total, 4) if total else 0.0,
+            "count": count,
+        }
+        for category, amount, count in rows
+    ]
@@ -0,0 +1,253 @@
+"""
+批量费用抽取服务
+把整段聊天记录或小票清单拆成逐条费用：
+
+1. 按行拆分，聊天记录的时间戳行和没有任何数字的行（问候、闲聊）直接跳过
+2. 每行先走本地规则抽取，置信度足够的直接采用
+3. 其余行按 token 预算打包，每次调用让模型一次抽取多条，各批并发请求
+4. 模型没返回或调用失败的行，用本地有把握的字段兜底
+"""
+
+import os
+import re
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from app.services.llm_gateway import llm_gateway
+from app.services.rate_limiter import PRIORITY_DEFAULT, estimate_tokens
+from app.services.resilience import CircuitOpenError
+from app.utils.cn_numbers import cn_to_number
+from app.utils.expense_extractor import CATEGORY_LABELS, ExpenseExtraction, category_key, extract_expense
+from app.utils.json_repair import extract_json_object
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "你是一个擅长从文本中抽取结构化费用信息的助手。"
+    "请严格只输出符合给定字段的JSON，不要任何其他文字。"
+)
+
+# 每条费用预期的输出 token 数（用于打包与限流估算）
+ITEM_OUTPUT_TOKENS = 45
+# 单行最大长度，超出部分截断（避免一行超长文本占满一批）
+MAX_LINE_LENGTH = 200
+
+# 聊天记录中的时间戳/昵称行，如“张三 10:21”“2025-10-01 12:30:05”
+_TIMESTAMP_RE = re.compile(r"^\s*(?:\S{1,20}\s+)?(?:\d{4}[-/.]\d{1,2}[-/.]\d{1,2}\s*)?\d{1,2}:\d{2}(?::\d{2})?\s*$")
+_HAS_NUMBER_RE = re.compile(r"[\d零〇一二两三四五六七八九十百千万]")
+_LINE_SPLIT_RE = re.compile(r"[\r\n]+|[；;](?=\s*\S)")
+
+
+@dataclass
+class BatchItem:
+    """批量抽取中的一行"""
+    index: int
+    text: str
+    local: ExpenseExtraction
+    result: Dict[str, Any] = field(default_factory=dict)
+    # local: 本地规则；llm: 模型；none: 未识别出费用（模型判定不是费用或调用失败，且本地没把握）
+    source: str = "local"
+
+
+def _as_amount(value: Any) -> Optional[float]:
+    """模型返回的金额可能是字符串（如“35元”），无法识别时返回 None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if value >= 0 else None
+    if isinstance(value, str):
+        number = cn_to_number(re.sub(r"[￥¥元块钱\s,，]", "", value))
+        return number if number is not None and number >= 0 else None
+    return None
+
+
+def split_lines(text: Optional[str] = None, lines: Optional[List[str]] = None) -> List[str]:
+    """拆分为候选行：换行和分号分隔，去掉空行与聊天记录的时间戳行"""
+    raw: List[str] = []
+    for part in (lines or []) + ([text] if text else []):
+        raw.extend(_LINE_SPLIT_RE.split(part))
+    return [line.strip()[:MAX_LINE_LENGTH] for line in raw if line.strip() and not _TIMESTAMP_RE.match(line)]
+
+
+def build_batch_prompt(items: List[BatchItem], today: date) -> str:
+    """构建一次抽取多条费用的提示词"""
+    numbered = "\n".join(f"{item.index}. {item.text}" for item in items)
+    return f"""
+以下每一行最多对应一条费用记录，请逐行抽取并以JSON格式返回（今天是{today.isoformat()}）：
+
+{numbered}
+
+每条记录的字段（若无则为null）：
+1. index: 行号（与上面的编号一致）
+2. amount: 金额（浮点数，单位为元，将“100元”“一百块”“1千”等转换为数字）
+3. category: 费用类别（在 交通/住宿/食物/娱乐/购物/其他 中选择一个）
+4. description: 费用描述（如“打车到酒店”）
+5. expense_date: 发生日期（YYYY-MM-DD，“昨天”“上周五”等按今天推算，无法确定则为null）
+
+注意：
+- 仅返回JSON，不要其他文字；
+- 不是费用的行（闲聊、问候等）不要返回；
+- 按行号顺序返回。
+
+返回格式：
+{{
+  "items": [
+    {{"index": 1, "amount": 35.5, "category": "食物", "description": "晚餐", "expense_date": "2025-10-01"}}
+  ]
+}}
+"""
+
+
+class ExpenseBatchExtractor:
+    """批量费用抽取"""
+
+    def __init__(self):
+        """初始化批量抽取配置"""
+        # 单次调用的 token 预算（提示词 + 预期输出）、单批最多行数与并发批数
+        self.token_budget = int(os.getenv("EXPENSE_BATCH_TOKEN_BUDGET", "2000"))
+        self.max_items = int(os.getenv("EXPENSE_BATCH_MAX_ITEMS", "25"))
+        self.concurrency = int(os.getenv("EXPENSE_BATCH_CONCURRENCY", "4"))
+        # 本地抽取置信度达到该阈值的行不交给模型
+        self.local_threshold = float(os.getenv("EXPENSE_LOCAL_THRESHOLD", "0.7"))
+
+    def pack(self, items: List[BatchItem], today: date) -> List[List[BatchItem]]:
+        """按 token 预算贪心打包，每批至少一行"""
+        base = estimate_tokens(
+            [{"content": SYSTEM_PROMPT}, {"content": build_batch_prompt([], today)}],
+            ITEM_OUTPUT_TOKENS,
+        )
+        chunks: List[List[BatchItem]] = []
+        current: List[BatchItem] = []
+        used = base
+        for item in items:
+            cost = len(item.text) + len(str(item.index)) + 3 + ITEM_OUTPUT_TOKENS
+            if current and (used + cost > self.token_budget or len(current) >= self.max_items):
+                chunks.append(current)
+                current, used = [], base
+            current.append(item)
+            used += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _extract_chunk(self, chunk: List[BatchItem], today: date, semaphore: asyncio.Semaphore) -> Dict[int, Dict[str, Any]]:
+        """调用模型抽取一批，返回 行号 -> 字段"""
+        prompt = build_batch_prompt(chunk, today)
+        async with semaphore:
+            completion = await llm_gateway.chat(
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0,
+                endpoint="expense_extract",
+                priority=PRIORITY_DEFAULT,
+                expected_output_tokens=ITEM_OUTPUT_TOKENS * len(chunk),
+            )
+        # 输出被截断时容错解析器会保留已完整的条目
+        data = extract_json_object(completion.content, "expense_batch") or {}
+        indexes = {item.index for item in chunk}
+        results = {}
+        for record in data.get("items") or []:
+            if not isinstance(record, dict):
+                continue
+            try:
+                index = int(record.get("index"))
+            except (TypeError, ValueError):
+                continue
+            if index in indexes:
+                results[index] = record
+        return results
+
+    def _local_fallback(self, item: BatchItem) -> Dict[str, Any]:
+        """本地结果中有把握的字段"""
+        fallback = item.local.to_response()
+        if item.local.amount_confidence < self.local_threshold:
+            fallback["amount"] = None
+        if item.local.category_confidence == 0:
+            fallback["category"] = None
+        return fallback
+
+    async def extract(self, text: Optional[str] = None, lines: Optional[List[str]] = None, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        批量抽取费用
+
+        Args:
+            text: 整段文本（聊天记录、小票清单），按行拆分
+            lines: 已拆好的多行文本
+            today: 解析相对日期的基准日，默认服务器当天
+
+        Returns:
+            {"items": [...], "skipped": 跳过的行数, "llm_calls": 模型调用次数, "failed_calls": 失败次数}
+        """
+        today = today or date.today()
+        candidates = split_lines(text, lines)
+        items: List[BatchItem] = []
+        skipped = 0
+        for line in candidates:
+            if not _HAS_NUMBER_RE.search(line):
+                skipped += 1
+                continue
+            items.append(BatchItem(index=len(items) + 1, text=line, local=extract_expense(line, today)))
+
+        pending = [item for item in items if item.local.confidence < self.local_threshold]
+        for item in items:
+            if item.local.confidence >= self.local_threshold:
+                item.result = item.local.to_response()
+        metrics.incr("expense_extract.batch.local", len(items) - len(pending))
+        metrics.incr("expense_extract.batch.skipped", skipped)
+
+        chunks = self.pack(pending, today) if pending else []
+        failed_calls = 0
+        if chunks:
+            if not llm_gateway.api_key:
+                raise RuntimeError("环境变量缺失：DASHSCOPE_API_KEY")
+            semaphore = asyncio.Semaphore(self.concurrency)
+            outcomes = await asyncio.gather(
+                *(self._extract_chunk(chunk, today, semaphore) for chunk in chunks),
+                return_exceptions=True,
+            )
+            for chunk, outcome in zip(chunks, outcomes):
+                if isinstance(outcome, BaseException):
+                    failed_calls += 1
+                    logger.warning(f"批量费用抽取失败（{len(chunk)} 行）: {outcome}")
+                    outcome = {}
+                for item in chunk:
+                    fallback = self._local_fallback(item)
+                    record = outcome.get(item.index)
+                    if record is None:
+                        item.result = fallback
+                        item.source = "local" if fallback["amount"] is not None else "none"
+                        continue
+                    merged = {name: record.get(name) for name in fallback}
+                    merged["amount"] = _as_amount(merged["amount"])
+                    key = category_key(merged["category"])
+                    merged["category"] = CATEGORY_LABELS[key] if key else None
+                    for name, value in fallback.items():
+                        if merged.get(name) is None:
+                            merged[name] = value
+                    item.result = merged
+                    item.source = "llm"
+            metrics.incr("expense_extract.batch.llm_items", len(pending))
+            # 全部批次都因熔断失败时交给调用方返回 503
+            if failed_calls == len(chunks) and all(isinstance(o, CircuitOpenError) for o in outcomes):
+                raise outcomes[0]
+
+        return {
+            "items": [
+                {"index": item.index, "text": item.text, **item.result, "source": item.source}
+                for item in items
+            ],
+            "skipped": skipped,
+            "llm_calls": len(chunks),
+            "failed_calls": failed_calls,
+        }
+
+
+# 创建全局批量费用抽取实例
+expense_batch_extractor = ExpenseBatchExtractor()
@@ -0,0 +1,295 @@
+"""
+行程生成缓存
+以规范化后的生成请求为键，缓存AI生成的行程，避免相同需求重复调用大模型。
+
+两级缓存：
+- 进程内 LRU（容量由 ITINERARY_CACHE_LRU_SIZE 控制）
+- SQLite 持久层（有效期 ITINERARY_CACHE_TTL 秒，总大小上限 ITINERARY_CACHE_MAX_BYTES）
+
+缓存键不包含绝对日期而只包含天数，命中后按调用方的开始日期重新编排每天的 date。
+
+LRU 在事件循环中读写，持久层在工作线程中读写，两者各用一把锁，写盘期间不阻塞内存命中。
+LRU 中保存的是独立副本，读出时再深拷贝一份，调用方修改返回的行程不会污染缓存。
+"""
+
+import os
+import copy
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.database import BACKEND_DIR
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = BACKEND_DIR / "data" / "itinerary_cache.db"
+
+# 偏好分隔符：顿号、逗号、分号、斜杠及空白
+_PREFERENCE_SPLIT = re.compile(r"[、,，;；/|\s]+")
+# 目的地中可去掉的行政区划后缀
+_DESTINATION_SUFFIXES = ("特别行政区", "自治区", "市", "省")
+
+
+def canonicalize_destination(destination: str) -> str:
+    """目的地规范化：全半角统一、去空白、小写、去掉“市/省”等后缀"""
+    text = unicodedata.normalize("NFKC", destination or "")
+    text = re.sub(r"\s+", "", text).lower()
+    for suffix in _DESTINATION_SUFFIXES:
+        if text.endswith(suffix) and len(text) > len(suffix) + 1:
+            text = text[: -len(suffix)]
+            break
+    return text
+
+
+def bucket_budget(budget: Optional[float]) -> Optional[int]:
+    """预算分桶：5000以内按500取整，2万以内按1000取整，再往上按5000取整"""
+    if budget is None:
+        return None
+    if budget <= 5000:
+        step = 500
+    elif budget <= 20000:
+        step = 1000
+    else:
+        step = 5000
+    return int(round(budget / step) * step)
+
+
+def tokenize_preferences(preferences: Optional[str]) -> List[str]:
+    """偏好分词、去重并排序"""
+    if not preferences:
+        return []
+    text = unicodedata.normalize("NFKC", preferences).lower()
+    return sorted({token for token in _PREFERENCE_SPLIT.split(text) if token})
+
+
+def trip_days(start_date: str, end_date: str) -> int:
+    """根据起止日期计算天数"""
+    start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+    end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+    return (end_dt - start_dt).days + 1
+
+
+def build_cache_key(
+    destination: str,
+    start_date: str,
+    end_date: str,
+    budget: Optional[float] = None,
+    preferences: Optional[str] = None,
+    travelers: Optional[int] = None
+) -> str:
+    """根据规范化后的生成请求计算缓存键"""
+    normalized = {
+        "destination": canonicalize_destination(destination),
+        "days": trip_days(start_date, end_date),
+        "budget": bucket_budget(budget),
+        "preferences": tokenize_preferences(preferences),
+        "travelers": travelers,
+    }
+    raw = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _day_index(key: str) -> Optional[int]:
+    """从 dayN 中取出 N"""
+    match = re.fullmatch(r"day(\d+)", key)
+    return int(match.group(1)) if match else None
+
+
+def rebase_itinerary(itinerary: Dict[str, Any], start_date: str) -> Dict[str, Any]:
+    """将缓存中的行程按新的开始日期重新编排每天的 date 字段"""
+    start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+    rebased = {}
+    for key, day in itinerary.items():
+        index = _day_index(key)
+        if index is not None and isinstance(day, dict):
+            day = dict(day)
+            day["date"] = (start_dt + timedelta(days=index - 1)).strftime("%Y-%m-%d")
+        rebased[key] = day
+    return rebased
+
+
+class ItineraryCache:
+    """进程内 LRU + SQLite 持久层的两级行程缓存"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        lru_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        """初始化缓存（SQLite 文件在首次使用时创建）"""
+        self.path = path or os.getenv("ITINERARY_CACHE_PATH") or str(DEFAULT_CACHE_PATH)
+        self.lru_size = lru_size if lru_size is not None else int(os.getenv("ITINERARY_CACHE_LRU_SIZE", "256"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("ITINERARY_CACHE_TTL", str(7 * 24 * 3600)))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("ITINERARY_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+        self.enabled = os.getenv("ITINERARY_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+        self._lru: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # ---------- SQLite 持久层 ----------
+
+    def _get_conn(self) -> sqlite3.Connection:
+        """获取（必要时创建）SQLite 连接"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS itinerary_cache ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_itinerary_cache_last_access ON itinerary_cache (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """从持久层读取未过期的条目，并刷新访问时间"""
+        now = time.time()
+        with self._disk_lock:
+            conn = self._get_conn()
+            row = conn.execute(
+                "SELECT payload, created_at FROM itinerary_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, created_at = row
+            if now - created_at > self.ttl:
+                conn.execute("DELETE FROM itinerary_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE itinerary_cache SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return created_at, json.loads(payload)
+
+    def _disk_set(self, key: str, created_at: float, itinerary: Dict[str, Any]):
+        """写入持久层，并按过期时间和总大小淘汰旧条目"""
+        payload = json.dumps(itinerary, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        with self._disk_lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO itinerary_cache (key, payload, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, created_at, created_at),
+            )
+            conn.execute("DELETE FROM itinerary_cache WHERE created_at < ?", (created_at - self.ttl,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM itinerary_cache").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, old_size in conn.execute(
+                    "SELECT key, size FROM itinerary_cache ORDER BY last_access ASC"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM itinerary_cache WHERE key = ?", (old_key,))
+                    total -= old_size
+                    evicted += 1
+                metrics.incr("itinerary_cache.evicted", evicted)
+            conn.commit()
+
+    # ---------- 进程内 LRU ----------
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """从 LRU 读取未过期的条目（返回深拷贝）"""
+        with self._memory_lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return None
+            created_at, itinerary = entry
+            if time.time() - created_at > self.ttl:
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+        # LRU 中的条目写入后不再修改，可以在锁外拷贝
+        return copy.deepcopy(itinerary)
+
+    def _memory_set(self, key: str, created_at: float, itinerary: Dict[str, Any]) -> Dict[str, Any]:
+        """写入 LRU（保存调用方数据的深拷贝），超出容量时淘汰最久未使用的条目，返回保存的副本"""
+        itinerary = copy.deepcopy(itinerary)
+        with self._memory_lock:
+            self._lru[key] = (created_at, itinerary)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+        return itinerary
+
+    # ---------- 对外接口 ----------
+
+    async def get(self, start_date: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存
+
+        Args:
+            start_date: 调用方的开始日期，命中后按它重新编排日期
+            key: build_cache_key 计算的缓存键
+
+        Returns:
+            重新编排日期后的行程，未命中返回 None
+        """
+        if not self.enabled:
+            return None
+
+        itinerary = self._memory_get(key)
+        if itinerary is not None:
+            metrics.incr("itinerary_cache.hit.memory")
+            return rebase_itinerary(itinerary, start_date)
+
+        try:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        except Exception as e:
+            logger.warning(f"读取行程缓存失败: {e}")
+            entry = None
+
+        if entry is None:
+            metrics.incr("itinerary_cache.miss")
+            return None
+
+        created_at, itinerary = entry
+        self._memory_set(key, created_at, itinerary)
+        metrics.incr("itinerary_cache.hit.disk")
+        return rebase_itinerary(itinerary, start_date)
+
+    async def set(self, key: str, itinerary: Dict[str, Any]):
+        """写入两级缓存"""
+        if not self.enabled or not itinerary:
+            return
+
+        created_at = time.time()
+        # 工作线程序列化保存的副本，调用方之后修改行程也不影响写盘内容
+        stored = self._memory_set(key, created_at, itinerary)
+        try:
+            await asyncio.to_thread(self._disk_set, key, created_at, stored)
+            metrics.incr("itinerary_cache.store")
+        except Exception as e:
+            logger.warning(f"写入行程缓存失败: {e}")
+
+    def clear(self):
+        """清空两级缓存"""
+        with self._memory_lock:
+            self._lru.clear()
+        with self._disk_lock:
+            if self._conn is not None or os.path.exists(self.path):
+                conn = self._get_conn()
+                conn.execute("DELETE FROM itinerary_cache")
+                conn.commit()
+
+
+# 创建全局行程缓存实例
+itinerary_cache = ItineraryCache()
@@ -0,0 +1,220 @@
+"""
+行程生成后台任务队列
+POST /api/itinerary/generate?background=true 时立即返回任务ID，由固定数量的 worker 异步执行。
+
+任务状态保存在 generation_jobs 表中，进程重启后：
+- queued 的任务重新入队
+- running 的任务视为被中断，未超过最大执行次数则重新入队，否则标记为 failed
+"""
+
+import os
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models.job import GenerationJob
+from app.schemas.itinerary import ItineraryGenerateRequest
+from app.services.ai_service import ai_service
+from app.services.trip_service import save_generated_trip
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """待执行任务数已达上限"""
+
+
+class JobQueue:
+    """基于数据库持久化的行程生成任务队列"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        max_attempts: Optional[int] = None
+    ):
+        """
+        Args:
+            workers: worker 数量（同时执行的生成任务上限）
+            max_pending: 排队任务上限，超过后拒绝提交
+            max_attempts: 单个任务的最大执行次数（含重启后的恢复执行）
+        """
+        self.workers = workers or int(os.getenv("ITINERARY_JOB_WORKERS", "4"))
+        self.max_pending = max_pending or int(os.getenv("ITINERARY_JOB_MAX_PENDING", "100"))
+        self.max_attempts = max_attempts or int(os.getenv("ITINERARY_JOB_MAX_ATTEMPTS", "2"))
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[int, List[asyncio.Queue]] = {}
+
+    async def start(self):
+        """恢复未完成的任务并启动 worker（应用启动时调用）"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for job_id in await self._recover():
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        metrics.set_gauge("jobs.queue_depth", self._queue.qsize())
+        logger.info(f"行程生成任务队列已启动，worker数: {self.workers}")
+
+    async def stop(self):
+        """停止 worker（应用关闭时调用，执行中的任务会在下次启动时恢复）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _recover(self) -> List[int]:
+        """处理上次进程遗留的任务，返回需要重新入队的任务ID"""
+        async with AsyncSessionLocal() as db:
+            interrupted = (await db.scalars(select(GenerationJob).where(GenerationJob.status == "running"))).all()
+            for job in interrupted:
+                if job.attempts < self.max_attempts:
+                    job.status = "queued"
+                    metrics.incr("jobs.resumed")
+                else:
+                    job.status = "failed"
+                    job.error = "服务重启导致任务中断，且已达到最大重试次数"
+                    job.finished_at = datetime.now(timezone.utc)
+                    metrics.incr("jobs.failed")
+            await db.commit()
+
+            pending = await db.scalars(
+                select(GenerationJob.id)
+                .where(GenerationJob.status == "queued")
+                .order_by(GenerationJob.id.asc())
+            )
+            return list(pending)
+
+    async def submit(self, db: AsyncSession, user_id: int, request: ItineraryGenerateRequest) -> GenerationJob:
+        """
+        提交一个生成任务
+
+        Raises:
+            JobQueueFull: 排队任务已达上限
+            RuntimeError: 队列尚未启动
+        """
+        if self._queue is None:
+            raise RuntimeError("任务队列未启动")
+        if self._queue.qsize() >= self.max_pending:
+            metrics.incr("jobs.rejected")
+            raise JobQueueFull("排队中的生成任务过多，请稍后再试")
+
+        job = GenerationJob(
+            user_id=user_id,
+            status="queued",
+            request=request.model_dump(),
+            attempts=0
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+
+        self._queue.put_nowait(job.id)
+        metrics.incr("jobs.submitted")
+        metrics.set_gauge("jobs.queue_depth", self._queue.qsize())
+        return job
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        """订阅任务状态变化，返回接收状态字典的队列"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        return queue
+
+    def unsubscribe(self, job_id: int, queue: asyncio.Queue):
+        """取消订阅"""
+        queues = self._subscribers.get(job_id, [])
+        if queue in queues:
+            queues.remove(queue)
+        if not queues:
+            self._subscribers.pop(job_id, None)
+
+    def _publish(self, job: GenerationJob):
+        """通知订阅者任务状态已变化"""
+        for queue in self._subscribers.get(job.id, []):
+            queue.put_nowait(job.to_dict())
+
+    async def _worker(self, index: int):
+        """worker 循环：逐个取出任务执行"""
+        while True:
+            job_id = await self._queue.get()
+            metrics.set_gauge("jobs.queue_depth", self._queue.qsize())
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"worker {index} 执行任务 {job_id} 时发生错误: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: int):
+        """执行单个任务并记录状态"""
+        async with AsyncSessionLocal() as db:
+            job = await db.get(GenerationJob, job_id)
+            if job is None or job.status != "queued":
+                return
+
+            started_at = datetime.now(timezone.utc)
+            job.status = "running"
+            job.attempts += 1
+            job.started_at = started_at
+            await db.commit()
+            self._publish(job)
+            if job.created_at is not None:
+                # SQLite 返回不带时区的 UTC 时间
+                created_at = job.created_at if job.created_at.tzinfo else job.created_at.replace(tzinfo=timezone.utc)
+                metrics.observe("jobs.queue_wait", (started_at - created_at).total_seconds())
+
+            user_id = job.user_id
+            request = ItineraryGenerateRequest(**job.request)
+            # 等待AI期间释放数据库连接
+            await db.close()
+
+            started = time.perf_counter()
+            try:
+                ai_result = await ai_service.generate_itinerary(
+                    destination=request.destination,
+                    start_date=request.start_date,
+                    end_date=request.end_date,
+                    budget=request.budget,
+                    preferences=request.preferences,
+                    travelers=request.travelers
+                )
+                trip = None
+                if ai_result["success"]:
+                    trip = await save_generated_trip(
+                        db,
+                        user_id,
+                        request,
+                        datetime.strptime(request.start_date, "%Y-%m-%d"),
+                        datetime.strptime(request.end_date, "%Y-%m-%d"),
+                        ai_result["data"]
+                    )
+                error = None if trip else ai_result["message"]
+            except Exception as e:
+                await db.rollback()
+                trip, error = None, f"生成行程失败: {str(e)}"
+
+            job = await db.get(GenerationJob, job_id)
+            job.status = "done" if trip else "failed"
+            job.trip_id = trip.id if trip else None
+            job.error = error
+            job.finished_at = datetime.now(timezone.utc)
+            await db.commit()
+            self._publish(job)
+
+            metrics.observe("jobs.run_time", time.perf_counter() - started)
+            metrics.incr("jobs.done" if trip else "jobs.failed")
+
+
+# 创建全局任务队列实例
+job_queue = JobQueue()
@@ -0,0 +1,440 @@
+"""
+LLM网关模块
+统一封装对通义千问（DashScope 兼容模式）的异步调用。
+
+全进程共享一个 AsyncOpenAI 客户端及其底层 httpx 连接池（keep-alive，
+环境中安装了 h2 时启用 HTTP/2），调用期间不会阻塞事件循环，
+单个 worker 即可同时保持大量生成请求在途。
+
+配置（密钥、接口地址、各业务接口的模型与超时）在应用启动时读取一次，
+随后预热连接池，首个用户请求无需再经历建连与握手。
+按业务接口调用时经 model_router 在主模型与备用模型之间路由。
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.services.singleflight import SingleFlight
+from app.services.rate_limiter import rate_limiter, estimate_tokens, PRIORITY_DEFAULT
+from app.services.resilience import CircuitOpenError, llm_breaker, latency_tracker, retry_async, hedged, is_transient
+from app.services.model_router import model_router
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+DEFAULT_MODEL = "qwen-plus"
+
+# 各业务接口的默认超时（秒），模型默认取所属任务的主模型（见 model_router）；
+# 均可通过 LLM_<NAME>_MODEL / LLM_<NAME>_TIMEOUT 覆盖，如 LLM_TEXT_PARSE_MODEL=qwen-plus
+ENDPOINT_DEFAULTS = {
+    "itinerary": 90.0,
+    "text_parse": 60.0,
+    "expense_extract": 60.0,
+    "budget_analysis": 60.0,
+}
+
+
+def _http2_available() -> bool:
+    """检测是否安装了 h2，用于决定是否启用 HTTP/2"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class LLMConfigError(RuntimeError):
+    """LLM配置缺失（如未设置 DASHSCOPE_API_KEY）"""
+
+
+@dataclass
+class EndpointConfig:
+    """单个业务接口的模型与超时配置"""
+    model: str
+    timeout: float
+    # 是否通过 LLM_<NAME>_MODEL 显式指定了主模型
+    pinned: bool = False
+
+
+@dataclass
+class ChatResult:
+    """一次对话补全调用的结果"""
+    content: str
+    model: str
+    usage: Optional[Dict[str, int]] = None
+    latency: float = 0.0
+
+
+class LLMGateway:
+    """异步LLM网关，持有全局唯一的连接池"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        default_timeout: float = 90.0,
+        hedge_min_delay: float = 1.0,
+    ):
+        """初始化网关（客户端在首次调用时才创建，避免导入时依赖环境变量）"""
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.default_timeout = default_timeout
+        # 对冲触发时间的下限，以及样本不足时使用的默认值
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "5"))
+        self._client: Optional[AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._singleflight = SingleFlight("llm")
+        self._configured = False
+        self._api_key: Optional[str] = None
+        self._base_url = DEFAULT_BASE_URL
+        self.default_model = DEFAULT_MODEL
+        self._endpoints: Dict[str, EndpointConfig] = {}
+
+    def configure(self):
+        """
+        从环境变量读取配置（应用启动时调用一次）
+
+        - DASHSCOPE_API_KEY / DASHSCOPE_BASE_URL / DASHSCOPE_MODEL
+        - LLM_<NAME>_MODEL / LLM_<NAME>_TIMEOUT：各业务接口的主模型与超时
+        - LLM_<TASK>_MODELS / LLM_<TASK>_SLO：各任务的模型列表与延迟目标（见 model_router）
+        """
+        self._api_key = os.getenv("DASHSCOPE_API_KEY") or None
+        self._base_url = os.getenv("DASHSCOPE_BASE_URL", DEFAULT_BASE_URL)
+        self.default_model = os.getenv("DASHSCOPE_MODEL", DEFAULT_MODEL)
+        model_router.configure(self.default_model)
+        self._endpoints = {}
+        for name, timeout in ENDPOINT_DEFAULTS.items():
+            pinned = os.getenv(f"LLM_{name.upper()}_MODEL")
+            tier = model_router.tier(name)
+            self._endpoints[name] = EndpointConfig(
+                model=pinned or (tier.models[0] if tier else self.default_model),
+                timeout=float(os.getenv(f"LLM_{name.upper()}_TIMEOUT", str(timeout))),
+                pinned=bool(pinned),
+            )
+        self._configured = True
+
+    def _ensure_configured(self):
+        """未显式调用 configure 时（如脚本中直接使用）在首次使用时读取配置"""
+        if not self._configured:
+            self.configure()
+
+    @property
+    def api_key(self) -> Optional[str]:
+        """DashScope 密钥，未配置时为 None"""
+        self._ensure_configured()
+        return self._api_key
+
+    @property
+    def base_url(self) -> str:
+        """DashScope 兼容接口地址，可通过 DASHSCOPE_BASE_URL 覆盖（便于本地替身服务）"""
+        self._ensure_configured()
+        return self._base_url
+
+    def endpoint(self, name: str) -> EndpointConfig:
+        """获取业务接口的模型与超时配置，未登记的接口使用默认模型和超时"""
+        self._ensure_configured()
+        config = self._endpoints.get(name)
+        if config is None:
+            config = EndpointConfig(model=self.default_model, timeout=self.default_timeout)
+        return config
+
+    def route(self, endpoint: str) -> List[str]:
+        """业务接口本次调用依次尝试的模型"""
+        config = self.endpoint(endpoint)
+        return model_router.route(endpoint, config.model if config.pinned else None) or [config.model]
+
+    def _get_client(self) -> AsyncOpenAI:
+        """获取共享客户端，首次调用时创建连接池"""
+        if self._client is None:
+            api_key = self.api_key
+            if not api_key:
+                raise LLMConfigError("环境变量缺失：DASHSCOPE_API_KEY")
+
+            self._http_client = httpx.AsyncClient(
+                http2=_http2_available(),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.default_timeout, connect=10.0),
+            )
+            self._client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=self.base_url,
+                http_client=self._http_client,
+                max_retries=0,  # 重试由 resilience.retry_async 统一负责
+            )
+        return self._client
+
+    async def warmup(self, connections: Optional[int] = None):
+        """
+        预热连接池：并发请求模型列表接口，提前完成 DNS、TCP 和 TLS 握手
+
+        失败只记录日志，不影响应用启动。
+
+        Args:
+            connections: 预先建立的连接数，默认读取 LLM_WARMUP_CONNECTIONS（2），0 表示跳过
+        """
+        connections = connections if connections is not None else int(os.getenv("LLM_WARMUP_CONNECTIONS", "2"))
+        if connections <= 0 or not self.api_key:
+            return
+
+        self._get_client()
+        started = time.perf_counter()
+        url = self.base_url.rstrip("/") + "/models"
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        results = await asyncio.gather(
+            *(self._http_client.get(url, headers=headers, timeout=5.0) for _ in range(connections)),
+            return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - started
+        failures = [r for r in results if isinstance(r, Exception)]
+        metrics.observe("llm.warmup", elapsed)
+        if failures:
+            logger.warning(f"LLM连接预热失败 {len(failures)}/{connections}: {failures[0]}")
+        else:
+            logger.info(f"LLM连接预热完成：{connections} 个连接，耗时 {elapsed:.2f}秒")
+
+    async def chat(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        temperature: float = 0,
+        timeout: Optional[float] = None,
+        coalesce: bool = True,
+        priority: int = PRIORITY_DEFAULT,
+        expected_output_tokens: int = 512,
+        hedge: Optional[str] = None,
+        endpoint: Optional[str] = None,
+    ) -> ChatResult:
+        """
+        调用对话补全接口
+
+        相同模型、消息和温度的并发调用会合并为一次上游请求（如重复点击、前端超时重试），
+        由 coalesce 控制是否启用。
+
+        Args:
+            messages: OpenAI 格式的消息列表
+            model: 模型名称；为空且指定了 endpoint 时按路由选择，否则为 DASHSCOPE_MODEL（qwen-plus）
+            temperature: 采样温度
+            timeout: 本次调用的超时时间（秒），默认取 endpoint 的配置
+            coalesce: 是否合并相同的在途请求
+            priority: 限流排队优先级（见 rate_limiter.PRIORITY_*）
+            expected_output_tokens: 预期输出 token 数，用于限流预估
+            hedge: 对冲分组名（如 "text_parse"），为空时不对冲；
+                超过该分组近期 p95 延迟仍未返回时会再发一个相同请求
+            endpoint: 业务接口名（如 "text_parse"），用于模型路由与默认超时
+
+        Returns:
+            ChatResult，model 为实际处理请求的模型
+        """
+        self._ensure_configured()
+        if model is None and endpoint is not None:
+            target = f"endpoint:{endpoint}"
+
+            def call():
+                return self._routed_chat(
+                    endpoint, messages, temperature, timeout, priority, expected_output_tokens, hedge
+                )
+        else:
+            model = model or self.default_model
+            target = model
+
+            def call():
+                return self._chat(messages, model, temperature, timeout, priority, expected_output_tokens, hedge)
+
+        if not coalesce:
+            return await call()
+
+        key = hashlib.sha256(
+            json.dumps([target, temperature, messages], ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return await self._singleflight.do(key, call)
+
+    async def _routed_chat(
+        self,
+        endpoint: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        timeout: Optional[float],
+        priority: int,
+        expected_output_tokens: int,
+        hedge: Optional[str] = None,
+    ) -> ChatResult:
+        """按路由顺序尝试各模型，瞬时错误（重试后仍失败）时改用下一个模型"""
+        timeout = timeout or self.endpoint(endpoint).timeout
+        candidates = self.route(endpoint)
+        for index, model in enumerate(candidates):
+            started = time.perf_counter()
+            try:
+                result = await self._chat(
+                    messages, model, temperature, timeout, priority, expected_output_tokens, hedge
+                )
+            except CircuitOpenError:
+                # 熔断针对整个 DashScope，换模型也无济于事
+                raise
+            except Exception as e:
+                model_router.record(endpoint, model, time.perf_counter() - started, ok=False)
+                if index + 1 >= len(candidates) or not is_transient(e):
+                    raise
+                logger.warning(f"{endpoint} 调用 {model} 失败（{type(e).__name__}），改用 {candidates[index + 1]}")
+                continue
+            model_router.record(endpoint, model, result.latency, ok=True)
+            return result
+
+    async def _chat(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        timeout: Optional[float],
+        priority: int,
+        expected_output_tokens: int,
+        hedge: Optional[str] = None,
+    ) -> ChatResult:
+        """经过限流、熔断、重试（及可选对冲）后实际发起对话补全请求"""
+        client = self._get_client()
+        estimated = estimate_tokens(messages, expected_output_tokens)
+        latency_key = f"{model}:{hedge or 'default'}"
+
+        async def attempt():
+            await rate_limiter.acquire(estimated, priority)
+            attempt_started = time.perf_counter()
+            result = await llm_breaker.call(
+                lambda: client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    timeout=timeout or self.default_timeout,
+                )
+            )
+            latency_tracker.record(latency_key, time.perf_counter() - attempt_started)
+            return result
+
+        async def run():
+            if not hedge:
+                return await attempt()
+            delay = max(self.hedge_min_delay, latency_tracker.p95(latency_key) or self.hedge_default_delay)
+            return await hedged(attempt, delay, hedge)
+
+        started = time.perf_counter()
+        completion = await retry_async(run, "dashscope")
+        latency = time.perf_counter() - started
+
+        usage = None
+        if getattr(completion, "usage", None) is not None:
+            usage = {
+                "prompt_tokens": completion.usage.prompt_tokens,
+                "completion_tokens": completion.usage.completion_tokens,
+                "total_tokens": completion.usage.total_tokens,
+            }
+        rate_limiter.record_usage(estimated, usage)
+
+        return ChatResult(
+            content=completion.choices[0].message.content or "",
+            model=getattr(completion, "model", None) or model,
+            usage=usage,
+            latency=latency,
+        )
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        temperature: float = 0,
+        timeout: Optional[float] = None,
+        priority: int = PRIORITY_DEFAULT,
+        expected_output_tokens: int = 512,
+        endpoint: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        以流式方式调用对话补全接口，逐段产出增量文本
+
+        指定 endpoint 时使用路由选出的第一个模型；已开始输出后不再切换模型。
+
+        Args:
+            messages: OpenAI 格式的消息列表
+            model: 模型名称，默认 DASHSCOPE_MODEL（qwen-plus）
+            temperature: 采样温度
+            timeout: 本次调用的超时时间（秒），默认取 endpoint 的配置
+            priority: 限流排队优先级
+            expected_output_tokens: 预期输出 token 数，用于限流预估
+            endpoint: 业务接口名，用于模型路由与默认超时
+        """
+        client = self._get_client()
+        if model is None and endpoint is not None:
+            model = self.route(endpoint)[0]
+            timeout = timeout or self.endpoint(endpoint).timeout
+        model = model or self.default_model
+        estimated = estimate_tokens(messages, expected_output_tokens)
+
+        async def open_stream():
+            await rate_limiter.acquire(estimated, priority)
+            return await llm_breaker.call(
+                lambda: client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    timeout=timeout or self.default_timeout,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+            )
+
+        # 只对建立流之前的失败重试，已开始输出后不再重放
+        started = time.perf_counter()
+        ok = abandoned = False
+        try:
+            stream = await retry_async(open_stream, "dashscope")
+        except Exception as e:
+            if endpoint is not None and not isinstance(e, CircuitOpenError):
+                model_router.record(endpoint, model, time.perf_counter() - started, ok=False)
+            raise
+        usage = None
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = {
+                        "prompt_tokens": chunk.usage.prompt_tokens,
+                        "completion_tokens": chunk.usage.completion_tokens,
+                        "total_tokens": chunk.usage.total_tokens,
+                    }
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            ok = True
+        except (GeneratorExit, asyncio.CancelledError):
+            # 调用方中途放弃（如客户端断开），不计入模型表现
+            abandoned = True
+            raise
+        finally:
+            rate_limiter.record_usage(estimated, usage)
+            await stream.close()
+            if endpoint is not None and not abandoned:
+                model_router.record(endpoint, model, time.perf_counter() - started, ok=ok)
+
+    async def aclose(self):
+        """关闭连接池（应用关闭时调用）"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._client = None
+        self._http_client = None
+        self._configured = False
+
+
+# 创建全局LLM网关实例
+llm_gateway = LLMGateway()
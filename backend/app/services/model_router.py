@@ -0,0 +1,197 @@
+"""
+模型分级与延迟感知路由
+
+每类任务（行程生成、信息抽取、预算分析）配置一个主模型和若干备用模型：
+- 按 (任务, 模型) 维护最近一段时间的延迟与错误率滑动窗口
+- 主模型近期 p95 超过该任务的 SLO 或错误率过高时，优先改用健康的备用模型
+- 仍按 probe_ratio 的比例把少量请求发给主模型，恢复后自动切回
+- 记录每个请求实际由哪个模型处理（日志与 router.* 指标）
+
+配置（均可选）：
+- LLM_<TASK>_MODELS：逗号分隔的模型列表，第一个为主模型，如 LLM_EXTRACTION_MODELS=qwen-turbo,qwen-plus
+- LLM_<TASK>_SLO：该任务的 p95 延迟目标（秒）
+- LLM_ROUTER_WINDOW / LLM_ROUTER_MIN_SAMPLES / LLM_ROUTER_MAX_ERROR_RATE / LLM_ROUTER_PROBE_RATIO
+"""
+
+import os
+import time
+import random
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 业务接口所属的任务类型
+ENDPOINT_TASKS = {
+    "itinerary": "itinerary",
+    "text_parse": "extraction",
+    "expense_extract": "extraction",
+    "budget_analysis": "analysis",
+}
+
+# 各任务的默认模型列表（None 表示 DASHSCOPE_MODEL）与 p95 延迟目标（秒）。
+# 抽取类提示词很短，turbo 级模型即可胜任且快得多
+TASK_DEFAULTS = {
+    "itinerary": ([None, "qwen-turbo"], 45.0),
+    "extraction": (["qwen-turbo", None], 4.0),
+    "analysis": ([None, "qwen-turbo"], 15.0),
+}
+
+
+@dataclass
+class ModelTier:
+    """一类任务的模型列表与延迟目标"""
+    models: List[str]
+    slo: float
+
+
+class ModelWindow:
+    """单个 (任务, 模型) 最近一段时间的调用结果"""
+
+    def __init__(self, window: float, max_samples: int = 200):
+        self.window = window
+        self._samples: Deque[Tuple[float, float, bool]] = deque(maxlen=max_samples)
+        self.served = 0
+
+    def record(self, latency: float, ok: bool):
+        """记录一次调用的耗时与是否成功"""
+        self._samples.append((time.monotonic(), latency, ok))
+
+    def _prune(self):
+        """丢弃超出时间窗口的样本"""
+        cutoff = time.monotonic() - self.window
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def stats(self) -> Tuple[int, Optional[float], float]:
+        """返回 (样本数, 成功调用的 p95 延迟, 错误率)"""
+        self._prune()
+        count = len(self._samples)
+        if not count:
+            return 0, None, 0.0
+        latencies = sorted(latency for _, latency, ok in self._samples if ok)
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else None
+        errors = sum(1 for _, _, ok in self._samples if not ok)
+        return count, p95, errors / count
+
+
+class ModelRouter:
+    """按任务类型在主模型与备用模型之间路由"""
+
+    def __init__(self):
+        self._tiers: Dict[str, ModelTier] = {}
+        self._windows: Dict[Tuple[str, str], ModelWindow] = {}
+        self.window = 300.0
+        self.min_samples = 10
+        self.max_error_rate = 0.2
+        self.probe_ratio = 0.05
+
+    def configure(self, default_model: str):
+        """从环境变量读取各任务的模型列表与延迟目标（由 LLMGateway.configure 调用）"""
+        self.window = float(os.getenv("LLM_ROUTER_WINDOW", "300"))
+        self.min_samples = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "10"))
+        self.max_error_rate = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.2"))
+        self.probe_ratio = float(os.getenv("LLM_ROUTER_PROBE_RATIO", "0.05"))
+        self._tiers = {}
+        for task, (models, slo) in TASK_DEFAULTS.items():
+            configured = os.getenv(f"LLM_{task.upper()}_MODELS")
+            if configured:
+                names = [name.strip() for name in configured.split(",") if name.strip()]
+            else:
+                names = [name or default_model for name in models]
+            self._tiers[task] = ModelTier(
+                models=list(dict.fromkeys(names)),
+                slo=float(os.getenv(f"LLM_{task.upper()}_SLO", str(slo))),
+            )
+        self._windows = {}
+
+    def tier(self, endpoint: str) -> Optional[ModelTier]:
+        """业务接口所属任务的模型配置，未登记的接口返回 None"""
+        return self._tiers.get(ENDPOINT_TASKS.get(endpoint, endpoint))
+
+    def _window(self, task: str, model: str) -> ModelWindow:
+        key = (task, model)
+        if key not in self._windows:
+            self._windows[key] = ModelWindow(self.window)
+        return self._windows[key]
+
+    def is_healthy(self, task: str, model: str) -> bool:
+        """样本足够且 p95 超过 SLO 或错误率过高时视为不健康"""
+        tier = self._tiers.get(task)
+        count, p95, error_rate = self._window(task, model).stats()
+        if tier is None or count < self.min_samples:
+            return True
+        if error_rate > self.max_error_rate:
+            return False
+        return p95 is None or p95 <= tier.slo
+
+    def _rank(self, task: str, model: str) -> Tuple[bool, bool, float]:
+        """排序键：健康的优先，其次错误率未超标的，再按 p95 从低到高"""
+        count, p95, error_rate = self._window(task, model).stats()
+        return (
+            not self.is_healthy(task, model),
+            error_rate > self.max_error_rate,
+            p95 if p95 is not None and count >= self.min_samples else 0.0,
+        )
+
+    def route(self, endpoint: str, pinned: Optional[str] = None) -> List[str]:
+        """
+        返回本次调用依次尝试的模型列表
+
+        Args:
+            endpoint: 业务接口名（如 "text_parse"）
+            pinned: 显式指定的主模型（LLM_<NAME>_MODEL），其余模型仍作为备用
+        """
+        task = ENDPOINT_TASKS.get(endpoint, endpoint)
+        tier = self._tiers.get(task)
+        if tier is None:
+            return [pinned] if pinned else []
+
+        models = list(tier.models)
+        if pinned:
+            models = [pinned] + [model for model in models if model != pinned]
+        if len(models) == 1 or self.is_healthy(task, models[0]) or random.random() < self.probe_ratio:
+            return models
+
+        # 主模型不健康：健康的备用模型优先；都不健康时选错误率未超标且最快的
+        ordered = sorted(models, key=lambda model: self._rank(task, model))
+        if ordered[0] == models[0]:
+            return models
+        metrics.incr(f"router.{task}.rerouted")
+        return ordered
+
+    def record(self, endpoint: str, model: str, latency: float, ok: bool):
+        """记录一次调用结果，成功时计入该模型处理的请求数"""
+        task = ENDPOINT_TASKS.get(endpoint, endpoint)
+        window = self._window(task, model)
+        window.record(latency, ok)
+        metrics.incr(f"router.{task}.{model}.{'served' if ok else 'failed'}")
+        if ok:
+            window.served += 1
+            logger.info(f"{endpoint} 请求由 {model} 处理，耗时 {latency:.2f}秒")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出各任务的模型配置与近期表现（用于 /metrics）"""
+        result = {}
+        for task, tier in self._tiers.items():
+            models = {}
+            for model in tier.models:
+                count, p95, error_rate = self._window(task, model).stats()
+                models[model] = {
+                    "samples": count,
+                    "p95": p95,
+                    "error_rate": error_rate,
+                    "healthy": self.is_healthy(task, model),
+                    "served": self._window(task, model).served,
+                }
+            result[task] = {"slo": tier.slo, "primary": tier.models[0], "models": models}
+        return result
+
+
+# 创建全局模型路由实例
+model_router = ModelRouter()
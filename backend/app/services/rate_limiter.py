@@ -0,0 +1,206 @@
+"""
+上游准入控制
+对 DashScope 的调用做每秒请求数（RPS）和每分钟 token 数（TPM）双令牌桶限流。
+
+- 调用前按提示词长度预估 token 并预扣，调用后按 completion.usage 的实际用量多退少补
+- 等待中的调用按优先级排队：交互式请求（如文本解析）优先于批量生成
+- 导出队列深度与等待时间指标
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 优先级：数值越小越优先
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BULK = 2
+
+_PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_DEFAULT: "default",
+    PRIORITY_BULK: "bulk",
+}
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], expected_output_tokens: int = 0) -> int:
+    """
+    粗略估算一次调用的 token 数
+
+    中文约 1 字 1 token，英文约 4 字符 1 token，这里统一按字符数估算输入（偏保守），
+    再加上调用方给出的预期输出 token 数。
+    """
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return prompt_chars + expected_output_tokens
+
+
+class TokenBucket:
+    """令牌桶，允许余额为负（实际用量超出预估时记为欠账）"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发量）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        """按流逝时间补充令牌"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """取得 amount 个令牌还需等待的秒数"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        """扣减令牌"""
+        self.tokens -= amount
+
+    def adjust(self, delta: float):
+        """按实际用量修正（delta 为实际减预估，正数表示多扣）"""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class RateLimiter:
+    """双令牌桶 + 优先级队列的异步限流器"""
+
+    def __init__(self, rps: Optional[float] = None, tpm: Optional[float] = None):
+        """
+        Args:
+            rps: 每秒请求数上限，0 表示不限制
+            tpm: 每分钟 token 数上限，0 表示不限制
+        """
+        rps = rps if rps is not None else float(os.getenv("DASHSCOPE_RPS", "10"))
+        tpm = tpm if tpm is not None else float(os.getenv("DASHSCOPE_TPM", "500000"))
+        self.requests = TokenBucket(rps, max(1.0, rps)) if rps > 0 else None
+        self.tokens = TokenBucket(tpm / 60.0, tpm) if tpm > 0 else None
+        self._waiters: list = []
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _wait_time(self, estimated_tokens: int, now: float) -> float:
+        """同时满足两个令牌桶所需的等待时间"""
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(estimated_tokens, now))
+        return wait
+
+    def _consume(self, estimated_tokens: int):
+        """预扣一次请求和预估的 token"""
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(estimated_tokens)
+
+    def _refund(self, estimated_tokens: int):
+        """退回预扣但未使用的一次请求和 token"""
+        if self.requests is not None:
+            self.requests.adjust(-1)
+        if self.tokens is not None:
+            self.tokens.adjust(-estimated_tokens)
+
+    def _update_depth(self):
+        """更新各优先级的排队深度指标"""
+        depth = {name: 0 for name in _PRIORITY_NAMES.values()}
+        for priority, _, future, _ in self._waiters:
+            if not future.done():
+                depth[_PRIORITY_NAMES.get(priority, "default")] += 1
+        for name, value in depth.items():
+            metrics.set_gauge(f"llm.limiter.queue_depth.{name}", value)
+
+    async def acquire(self, estimated_tokens: int, priority: int = PRIORITY_DEFAULT):
+        """
+        等待直到允许发起一次调用
+
+        Args:
+            estimated_tokens: 预估的 token 数（预扣）
+            priority: 优先级，数值越小越优先
+        """
+        started = time.perf_counter()
+        name = _PRIORITY_NAMES.get(priority, "default")
+
+        # 快速路径：无人排队且额度充足时直接放行
+        if not self._waiters and self._wait_time(estimated_tokens, time.monotonic()) <= 0:
+            self._consume(estimated_tokens)
+            metrics.observe(f"llm.limiter.wait.{name}", 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future, estimated_tokens))
+        self._update_depth()
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已放行但调用方在恢复执行前被取消：预扣的额度没有用上，退回桶中
+                self._refund(estimated_tokens)
+                if self._waiters:
+                    self._wakeup.set()
+            raise
+        finally:
+            self._update_depth()
+            metrics.observe(f"llm.limiter.wait.{name}", time.perf_counter() - started)
+
+    async def _dispatch(self):
+        """按优先级依次放行排队的调用"""
+        while self._waiters:
+            priority, _, future, estimated_tokens = self._waiters[0]
+            if future.done():
+                # 调用方已取消
+                heapq.heappop(self._waiters)
+                continue
+
+            wait = self._wait_time(estimated_tokens, time.monotonic())
+            if wait <= 0:
+                heapq.heappop(self._waiters)
+                self._consume(estimated_tokens)
+                future.set_result(None)
+                continue
+
+            # 等待额度恢复；期间若有更高优先级的调用入队则提前醒来重新排序
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def record_usage(self, estimated_tokens: int, usage: Optional[Dict[str, int]]):
+        """根据实际用量修正 token 桶，并记录用量指标"""
+        if not usage:
+            return
+        actual = usage.get("total_tokens") or 0
+        metrics.incr("llm.tokens.prompt", usage.get("prompt_tokens") or 0)
+        metrics.incr("llm.tokens.completion", usage.get("completion_tokens") or 0)
+        if self.tokens is not None and actual:
+            self.tokens.adjust(actual - estimated_tokens)
+
+
+# 创建全局限流器实例
+rate_limiter = RateLimiter()
@@ -0,0 +1,225 @@
+"""
+上游调用的容错工具
+- 抖动指数退避重试（仅针对超时、连接失败、限流、5xx 等瞬时错误）
+- 熔断器：连续失败达到阈值后快速失败，冷却后放行一次探测请求
+- 对冲请求：首个请求超过近期 p95 延迟仍未返回时再发一个，取先成功者
+
+同时用于 DashScope（OpenAI 兼容接口）和阿里云 ASR。
+"""
+
+import os
+import time
+import random
+import socket
+import asyncio
+import logging
+import http.client
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+import openai
+
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被直接拒绝"""
+
+
+def is_transient(exc: BaseException) -> bool:
+    """判断异常是否为值得重试的瞬时错误"""
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500 or exc.status_code == 429
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if isinstance(exc, (asyncio.TimeoutError, socket.timeout, ConnectionError, http.client.HTTPException)):
+        return True
+    return False
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    closed: 正常放行，统计连续失败
+    open: 连续失败达到阈值，reset_timeout 秒内直接拒绝
+    half_open: 冷却结束，只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+        self.reset_timeout = reset_timeout or float(os.getenv("UPSTREAM_BREAKER_RESET", "30"))
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str):
+        """切换状态并记录指标"""
+        if state != self.state:
+            logger.warning(f"熔断器 {self.name} 状态变化: {self.state} -> {state}")
+            self.state = state
+            metrics.incr(f"breaker.{self.name}.{state}")
+        metrics.set_gauge(f"breaker.{self.name}.open", 1 if state == "open" else 0)
+
+    def allow(self) -> bool:
+        """是否允许发起一次调用"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._set_state("half_open")
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        """记录一次成功调用"""
+        self.failures = 0
+        self._probe_in_flight = False
+        self._set_state("closed")
+
+    def record_failure(self):
+        """记录一次失败调用"""
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state("open")
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        经熔断器执行一次调用，仅瞬时错误计为失败
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+        """
+        if not self.allow():
+            metrics.incr(f"breaker.{self.name}.rejected")
+            raise CircuitOpenError(f"上游服务 {self.name} 暂不可用，请稍后再试")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._probe_in_flight = False
+            raise
+        except Exception as e:
+            if is_transient(e):
+                self.record_failure()
+            else:
+                self._probe_in_flight = False
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出熔断器状态（用于健康检查）"""
+        retry_in = None
+        if self.state == "open" and self.opened_at is not None:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in_seconds": retry_in,
+        }
+
+
+async def retry_async(
+    fn: Callable[[], Awaitable[Any]],
+    name: str,
+    attempts: Optional[int] = None,
+    base_delay: Optional[float] = None,
+    max_delay: float = 8.0
+) -> Any:
+    """
+    抖动指数退避重试（full jitter）
+
+    只有瞬时错误才会重试；熔断器打开时不再重试。
+    """
+    attempts = attempts or int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", "3"))
+    base_delay = base_delay if base_delay is not None else float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "0.5"))
+
+    for attempt in range(1, attempts + 1):
+        try:
+            return await fn()
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            if attempt >= attempts or not is_transient(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+            metrics.incr(f"retry.{name}")
+            logger.warning(f"{name} 第{attempt}次调用失败（{type(e).__name__}: {e}），{delay:.2f}秒后重试")
+            await asyncio.sleep(delay)
+
+
+class LatencyTracker:
+    """按键记录最近的调用延迟，用于确定对冲触发时间"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, key: str, latency: float):
+        """记录一次成功调用的延迟"""
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(latency)
+
+    def p95(self, key: str) -> Optional[float]:
+        """最近样本的 p95，样本不足时返回 None"""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+async def hedged(fn: Callable[[], Awaitable[Any]], delay: float, name: str) -> Any:
+    """
+    对冲请求：首个调用在 delay 秒内未完成时再发起一个相同调用，返回先成功的结果
+
+    两个调用都失败时抛出最后一个异常；返回、失败或调用方被取消时都会取消仍在进行的调用。
+    """
+    tasks = [asyncio.ensure_future(fn())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            metrics.incr(f"hedge.{name}.fired")
+            tasks.append(asyncio.ensure_future(fn()))
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    error = asyncio.CancelledError()
+                elif task.exception() is not None:
+                    error = task.exception()
+                else:
+                    if len(tasks) > 1 and task is tasks[1]:
+                        metrics.incr(f"hedge.{name}.won")
+                    return task.result()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+# 全局熔断器与延迟统计
+llm_breaker = CircuitBreaker("dashscope")
+asr_breaker = CircuitBreaker("aliyun_asr")
+latency_tracker = LatencyTracker()
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """所有熔断器的当前状态"""
+    return {breaker.name: breaker.snapshot() for breaker in (llm_breaker, asr_breaker)}
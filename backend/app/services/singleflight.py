@@ -0,0 +1,54 @@
+"""
+请求合并（single-flight）
+相同键的并发调用只向上游发起一次，其余调用方共享同一个结果。
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """按键合并在途的异步调用"""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: 指标前缀，如 "llm"
+        """
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        """调用结束后移出在途表，并标记异常已被读取，避免无人等待时告警"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"{self.name} 合并调用失败: {task.exception()}")
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行或加入一次调用
+
+        上游调用运行在独立任务中，调用方通过 shield 等待：
+        任何一个调用方（包括最先发起者）断开或被取消，都不会取消上游调用和其他等待者。
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._on_done(key, done))
+            metrics.incr(f"{self.name}.singleflight.calls")
+        else:
+            metrics.incr(f"{self.name}.singleflight.saved")
+        return await asyncio.shield(task)
+
+    @property
+    def inflight(self) -> int:
+        """当前在途的上游调用数"""
+        return len(self._inflight)
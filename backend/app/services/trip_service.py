@@ -0,0 +1,51 @@
+"""
+行程持久化服务
+统一保存AI生成的行程，供同步接口、流式接口和后台任务共用
+"""
+
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.trip import Trip
+from app.schemas.itinerary import ItineraryGenerateRequest
+
+
+async def save_generated_trip(
+    db: AsyncSession,
+    user_id: int,
+    request: ItineraryGenerateRequest,
+    start_date: datetime,
+    end_date: datetime,
+    itinerary: Dict[str, Any]
+) -> Trip:
+    """
+    保存AI生成的行程
+
+    Args:
+        db: 异步数据库会话
+        user_id: 行程所属用户ID
+        request: 原始生成请求
+        start_date: 开始日期
+        end_date: 结束日期
+        itinerary: AI生成的详细行程
+
+    Returns:
+        已提交并刷新的行程对象
+    """
+    trip = Trip(
+        user_id=user_id,
+        title=request.title or f"{request.destination}之旅",
+        destination=request.destination,
+        start_date=start_date,
+        end_date=end_date,
+        budget=request.budget,
+        travelers=request.travelers,
+        status="planning",
+        itinerary=itinerary
+    )
+    db.add(trip)
+    await db.commit()
+    await db.refresh(trip)
+    return trip
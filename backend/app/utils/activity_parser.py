@@ -0,0 +1,155 @@
+"""
+行程活动字段解析
+把AI生成的行程JSON（dayN.activities[]）展开为带类型的活动行：开始时间、时长（分钟）、
+费用等字段在JSON里是“09:00”“1个半小时”“约80元”之类的文本，这里统一转换，
+解析不了的字段记为 None，不影响其他字段。
+"""
+
+import re
+from datetime import time
+from typing import Any, Dict, List, Optional
+
+from app.utils.cn_numbers import NUMBER_PATTERN, cn_to_number, find_numbers, normalize_digits
+
+_DAY_KEY_RE = re.compile(r"day(\d+)")
+
+_CLOCK_RE = re.compile(r"(\d{1,2})\s*[:：]\s*(\d{2})")
+_HOUR_POINT_RE = re.compile(rf"(上午|早上|中午|下午|傍晚|晚上)?\s*({NUMBER_PATTERN})\s*[点時时](半)?")
+_AFTERNOON = ("下午", "傍晚", "晚上")
+
+_HOURS_RE = re.compile(
+    rf"({NUMBER_PATTERN})(?:\s*[-~～至到]\s*({NUMBER_PATTERN}))?\s*个?\s*(半)?\s*(?:小时|钟头|hours?|hrs?|h)",
+    re.IGNORECASE,
+)
+_MINUTES_RE = re.compile(
+    rf"({NUMBER_PATTERN})(?:\s*[-~～至到]\s*({NUMBER_PATTERN}))?\s*(?:分钟|分|minutes?|mins?)",
+    re.IGNORECASE,
+)
+# 没有具体数字的常见说法
+_DURATION_WORDS = {"半小时": 30, "半个小时": 30, "半天": 240, "全天": 480, "一整天": 480, "一天": 480}
+_FREE_WORDS = ("免费", "免门票", "无需门票", "不要钱")
+
+
+def day_index(key: str) -> Optional[int]:
+    """行程JSON的键（如 "day3"）对应的天序号，不是天的键返回 None"""
+    match = _DAY_KEY_RE.fullmatch(key)
+    return int(match.group(1)) if match else None
+
+
+def parse_start_time(value: Any) -> Optional[time]:
+    """解析开始时间：“09:00”“14:00-16:00”取开始，“下午3点半”等口语写法"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = normalize_digits(value)
+    match = _CLOCK_RE.search(text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+    else:
+        match = _HOUR_POINT_RE.search(text)
+        hour_value = cn_to_number(match.group(2)) if match else None
+        if hour_value is None:
+            return None
+        hour, minute = int(hour_value), 30 if match.group(3) else 0
+        if match.group(1) in _AFTERNOON and hour < 12:
+            hour += 12
+    if 0 <= hour < 24 and 0 <= minute < 60:
+        return time(hour, minute)
+    return None
+
+
+def _range_value(low: str, high: Optional[str]) -> Optional[float]:
+    """“2-3”取中间值"""
+    low_value = cn_to_number(low)
+    high_value = cn_to_number(high) if high else None
+    if low_value is None:
+        return None
+    return (low_value + high_value) / 2 if high_value is not None else low_value
+
+
+def parse_duration_minutes(value: Any) -> Optional[int]:
+    """解析持续时间为分钟：“2小时”“1.5小时”“一个半小时”“1小时30分钟”“90min”“半天”"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # 纯数字按小时理解（与提示词中的“2小时”一致）
+        return int(round(value * 60)) if value >= 0 else None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = normalize_digits(value.strip())
+    for word, minutes in _DURATION_WORDS.items():
+        if text == word:
+            return minutes
+
+    total = 0.0
+    matched = False
+    hours = _HOURS_RE.search(text)
+    if hours:
+        amount = _range_value(hours.group(1), hours.group(2))
+        if amount is not None:
+            total += amount * 60 + (30 if hours.group(3) else 0)
+            matched = True
+        text = text[hours.end():]
+    minutes = _MINUTES_RE.search(text)
+    if minutes:
+        amount = _range_value(minutes.group(1), minutes.group(2))
+        if amount is not None:
+            total += amount
+            matched = True
+    if not matched and "半小时" in text:
+        return 30
+    return int(round(total)) if matched else None
+
+
+def parse_cost(value: Any) -> Optional[float]:
+    """解析费用：数字直接使用，文本取第一个金额（“约80元”“人均50”），“免费”为0"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return round(float(value), 2) if value >= 0 else None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    if any(word in value for word in _FREE_WORDS):
+        return 0.0
+    numbers = find_numbers(value)
+    return round(numbers[0][0], 2) if numbers else None
+
+
+def _text(value: Any, max_length: int) -> Optional[str]:
+    """非空文本截断到列长度"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text[:max_length] if text else None
+
+
+def activity_rows(itinerary: Any) -> List[Dict[str, Any]]:
+    """
+    把行程JSON展开为活动行（不含 trip_id）
+
+    Args:
+        itinerary: Trip.itinerary，{"day1": {"date", "activities": [...]}, ...}
+
+    Returns:
+        [{"day_index", "position", "start_time", "duration_minutes", "cost",
+          "activity_type", "name", "location"}, ...]，按天、活动顺序排列
+    """
+    if not isinstance(itinerary, dict):
+        return []
+    rows = []
+    days = sorted((index, day) for index, day in ((day_index(key), day) for key, day in itinerary.items()) if index is not None)
+    for index, day in days:
+        activities = day.get("activities") if isinstance(day, dict) else None
+        if not isinstance(activities, list):
+            continue
+        for position, activity in enumerate(activities):
+            if not isinstance(activity, dict):
+                continue
+            rows.append({
+                "day_index": index,
+                "position": position,
+                "start_time": parse_start_time(activity.get("time")),
+                "duration_minutes": parse_duration_minutes(activity.get("duration")),
+                "cost": parse_cost(activity.get("cost")),
+                "activity_type": _text(activity.get("type"), 50),
+                "name": _text(activity.get("activity") or activity.get("name"), 200),
+                "location": _text(activity.get("location"), 200),
+            })
+    return rows
@@ -0,0 +1,248 @@
+"""
+中文日期表达解析
+以服务器当天为基准，把“明天”“下周一”“10月1号”“下个月5号”“国庆”“三天后”“昨天”等
+解析为具体日期，并识别“玩三天”“五天四晚”“一周”等行程天数。
+行程文本中的日期默认取将来最近的一天，费用记录则取过去最近的一天（prefer_future=False）。
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Optional
+
+from app.utils.cn_numbers import NUMBER_PATTERN, cn_to_number, normalize_digits
+
+# 农历节日与清明的公历日期
+LUNAR_HOLIDAYS = {
+    "春节": {
+        2024: date(2024, 2, 10), 2025: date(2025, 1, 29), 2026: date(2026, 2, 17), 2027: date(2027, 2, 6),
+        2028: date(2028, 1, 26), 2029: date(2029, 2, 13), 2030: date(2030, 2, 3),
+    },
+    "清明": {
+        2024: date(2024, 4, 4), 2025: date(2025, 4, 4), 2026: date(2026, 4, 5), 2027: date(2027, 4, 5),
+        2028: date(2028, 4, 4), 2029: date(2029, 4, 4), 2030: date(2030, 4, 5),
+    },
+    "端午": {
+        2024: date(2024, 6, 10), 2025: date(2025, 5, 31), 2026: date(2026, 6, 19), 2027: date(2027, 6, 9),
+        2028: date(2028, 5, 28), 2029: date(2029, 6, 16), 2030: date(2030, 6, 5),
+    },
+    "中秋": {
+        2024: date(2024, 9, 17), 2025: date(2025, 10, 6), 2026: date(2026, 9, 25), 2027: date(2027, 9, 15),
+        2028: date(2028, 10, 3), 2029: date(2029, 9, 22), 2030: date(2030, 9, 12),
+    },
+}
+# 公历节日（月, 日）
+SOLAR_HOLIDAYS = {"元旦": (1, 1), "五一": (5, 1), "国庆": (10, 1)}
+HOLIDAY_ALIASES = {
+    "元旦": "元旦", "春节": "春节", "过年": "春节", "大年初一": "春节", "清明": "清明",
+    "五一": "五一", "劳动节": "五一", "端午": "端午", "中秋": "中秋", "国庆": "国庆",
+    "清明节": "清明", "端午节": "端午", "中秋节": "中秋", "国庆节": "国庆",
+}
+
+_WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6, "末": 5,
+             "1": 0, "2": 1, "3": 2, "4": 3, "5": 4, "6": 5, "7": 6}
+_RELATIVE_DAYS = {
+    "今天": 0, "今日": 0, "明天": 1, "明日": 1, "后天": 2, "大后天": 3,
+    "昨天": -1, "昨日": -1, "前天": -2, "大前天": -3,
+}
+
+_N = f"({NUMBER_PATTERN})"
+_ISO_RE = re.compile(r"(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*[日号]?")
+_MONTH_DAY_RE = re.compile(rf"{_N}\s*月\s*{_N}\s*[日号]?")
+_NEXT_MONTH_DAY_RE = re.compile(rf"下个?月\s*{_N}\s*[日号]")
+_DAY_ONLY_RE = re.compile(rf"(?<![月\d]){_N}\s*号")
+_RANGE_END_RE = re.compile(rf"\s*(?:到|至|~|～|-|—|－)+\s*(?:{_N}\s*月\s*)?{_N}\s*[日号]?")
+_WEEKDAY_RANGE_END_RE = re.compile(r"\s*(?:到|至|~|～|-|—|－)+\s*(?:周|星期|礼拜)?([一二三四五六日天1-7])")
+_RELATIVE_RE = re.compile("大后天|后天|明天|明日|今天|今日|大前天|前天|昨天|昨日")
+_AFTER_DAYS_RE = re.compile(rf"{_N}\s*天\s*[以之]?后")
+_WEEKDAY_RE = re.compile(r"(下下|下|上|这|本)?个?(?:周|星期|礼拜)([一二三四五六日天末1-7])")
+_HOLIDAY_RE = re.compile("|".join(sorted(HOLIDAY_ALIASES, key=len, reverse=True)) + r"|十一(?=假期|黄金周|长假|期间|小长假|去|出发|的时候)")
+_VAGUE_RE = re.compile(r"下下?(?:个)?(?:周|星期|礼拜)(?![一二三四五六日天末1-7])|下个?月(?!\s*" + NUMBER_PATTERN + r"\s*[日号])|月底|月初|年底|过几天|改天|寒假|暑假")
+
+_DURATION_RE = re.compile(
+    rf"(?<![第月\d零〇一二两俩三四五六七八九十百千]){_N}\s*(?:个)?\s*(天|日|晚上|晚|夜|周|星期|礼拜)(?:\s*{_N}\s*(?:晚|夜))?(?!\s*[以之]?后)"
+)
+
+
+@dataclass
+class DateMatch:
+    """文本中识别出的一个日期"""
+    value: date
+    start: int
+    end: int
+    kind: str
+    # 对应区间的结束日期（如“10月1日到5日”）
+    range_end: Optional[date] = None
+
+
+@dataclass
+class DurationMatch:
+    """文本中识别出的行程天数"""
+    days: int
+    start: int
+    end: int
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    """构造日期，非法日期返回 None"""
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _nearest_month_day(month: int, day: int, today: date, prefer_future: bool = True) -> Optional[date]:
+    """只给出月日时取最近的将来日期（今年已过则为明年）；prefer_future 为 False 时取最近的过去日期"""
+    value = _safe_date(today.year, month, day)
+    if value is None:
+        return None
+    if prefer_future and value < today:
+        return _safe_date(today.year + 1, month, day)
+    if not prefer_future and value > today:
+        return _safe_date(today.year - 1, month, day)
+    return value
+
+
+def _int(text: Optional[str]) -> Optional[int]:
+    """中文/阿拉伯数字转整数"""
+    if not text:
+        return None
+    value = cn_to_number(text)
+    if value is None or value != int(value):
+        return None
+    return int(value)
+
+
+def holiday_date(name: str, today: date) -> Optional[date]:
+    """节日最近一次（含今天）的开始日期"""
+    name = HOLIDAY_ALIASES.get(name, name)
+    for year in (today.year, today.year + 1):
+        if name in SOLAR_HOLIDAYS:
+            value = date(year, *SOLAR_HOLIDAYS[name])
+        else:
+            value = LUNAR_HOLIDAYS.get(name, {}).get(year)
+        if value is not None and value >= today:
+            return value
+    return None
+
+
+def _overlaps(spans: List[DateMatch], start: int, end: int) -> bool:
+    return any(match.start < end and start < match.end for match in spans)
+
+
+def find_dates(text: str, today: date, prefer_future: bool = True) -> List[DateMatch]:
+    """
+    找出文本中的具体日期（按出现位置排序）
+
+    “10月1日到5日”“1号-3号”这类区间会把结束日期记录在 range_end 上。
+
+    Args:
+        text: 文本
+        today: 基准日
+        prefer_future: 只给出月日、日或星期几时取将来最近的一天，为 False 时取过去最近的一天
+    """
+    text = normalize_digits(text)
+    matches: List[DateMatch] = []
+
+    def add(value: Optional[date], start: int, end: int, kind: str):
+        if value is None or _overlaps(matches, start, end):
+            return
+        match = DateMatch(value, start, end, kind)
+        # 区间：“到5日”“-10月3日”
+        tail = _RANGE_END_RE.match(text, end)
+        if tail and kind in ("iso", "month_day", "day", "next_month_day"):
+            month = _int(tail.group(1)) or value.month
+            day = _int(tail.group(2))
+            if day is not None:
+                range_end = _safe_date(value.year, month, day)
+                if range_end is not None and range_end < value:
+                    range_end = _safe_date(value.year + 1, month, day)
+                if range_end is not None and range_end >= value:
+                    match.range_end = range_end
+                    match.end = tail.end()
+        # “下周一到周三”
+        tail = _WEEKDAY_RANGE_END_RE.match(text, end)
+        if tail and kind == "weekday":
+            offset = _WEEKDAYS[tail.group(1)] - value.weekday()
+            if offset > 0:
+                match.range_end = value + timedelta(days=offset)
+                match.end = tail.end()
+        matches.append(match)
+
+    for m in _ISO_RE.finditer(text):
+        add(_safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3))), m.start(), m.end(), "iso")
+    for m in _NEXT_MONTH_DAY_RE.finditer(text):
+        first = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+        day = _int(m.group(1))
+        add(_safe_date(first.year, first.month, day) if day else None, m.start(), m.end(), "next_month_day")
+    for m in _MONTH_DAY_RE.finditer(text):
+        month, day = _int(m.group(1)), _int(m.group(2))
+        if month and day:
+            add(_nearest_month_day(month, day, today, prefer_future), m.start(), m.end(), "month_day")
+    for m in _DAY_ONLY_RE.finditer(text):
+        day = _int(m.group(1))
+        if day:
+            value = _safe_date(today.year, today.month, day)
+            if value is not None and prefer_future and value < today:
+                first = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+                value = _safe_date(first.year, first.month, day)
+            elif value is not None and not prefer_future and value > today:
+                last = today.replace(day=1) - timedelta(days=1)
+                value = _safe_date(last.year, last.month, day)
+            add(value, m.start(), m.end(), "day")
+    for m in _AFTER_DAYS_RE.finditer(text):
+        days = _int(m.group(1))
+        if days is not None:
+            add(today + timedelta(days=days), m.start(), m.end(), "relative")
+    for m in _RELATIVE_RE.finditer(text):
+        add(today + timedelta(days=_RELATIVE_DAYS[m.group()]), m.start(), m.end(), "relative")
+    for m in _WEEKDAY_RE.finditer(text):
+        prefix, weekday = m.group(1), _WEEKDAYS[m.group(2)]
+        monday = today - timedelta(days=today.weekday())
+        if prefix in ("这", "本"):
+            value = monday + timedelta(days=weekday)
+        elif prefix == "下":
+            value = monday + timedelta(days=7 + weekday)
+        elif prefix == "下下":
+            value = monday + timedelta(days=14 + weekday)
+        elif prefix == "上":
+            value = monday + timedelta(days=weekday - 7)
+        elif prefer_future:
+            # 只说“周五”：取之后最近的一个
+            value = today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+        else:
+            # 费用记录中的“周五”：取之前最近的一个（含今天）
+            value = today - timedelta(days=(today.weekday() - weekday) % 7)
+        add(value, m.start(), m.end(), "weekday")
+    for m in _HOLIDAY_RE.finditer(text):
+        name = "国庆" if m.group() == "十一" else m.group()
+        add(holiday_date(name, today), m.start(), m.end(), "holiday")
+
+    return sorted(matches, key=lambda match: match.start)
+
+
+def has_vague_date(text: str) -> bool:
+    """是否含有无法精确到天的时间（如“下周”“下个月”“暑假”）"""
+    return bool(_VAGUE_RE.search(normalize_digits(text)))
+
+
+def find_duration(text: str, dates: Optional[List[DateMatch]] = None) -> Optional[DurationMatch]:
+    """
+    识别行程天数：“玩三天”“3日游”“五天四晚”“一周”“两个晚上”
+
+    只给出晚数时天数为晚数加一；与已识别日期重叠的部分（如“10月1日”）不计。
+    """
+    text = normalize_digits(text)
+    for m in _DURATION_RE.finditer(text):
+        count = _int(m.group(1))
+        if not count or _overlaps(dates or [], m.start(), m.end()):
+            continue
+        unit = m.group(2)
+        if unit in ("天", "日"):
+            days = count
+        elif unit in ("周", "星期", "礼拜"):
+            days = count * 7
+        else:
+            days = count + 1
+        return DurationMatch(days, m.start(), m.end())
+    return None
@@ -0,0 +1,138 @@
+"""
+中文数字与金额解析
+把“三”“十五”“两万三”“3.5万”“五千块”“1.2w”等口语写法转换为数值，
+供行程文本预解析和费用抽取共用。
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+_DIGITS = {
+    "零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "俩": 2, "三": 3, "四": 4,
+    "五": 5, "六": 6, "七": 7, "八": 8, "九": 9,
+}
+_UNITS = {"十": 10, "拾": 10, "百": 100, "佰": 100, "千": 1000, "仟": 1000, "k": 1000, "K": 1000}
+_BIG_UNITS = {"万": 10_000, "w": 10_000, "W": 10_000, "亿": 100_000_000}
+
+# 全角数字和小数点转半角
+_FULLWIDTH = str.maketrans("０１２３４５６７８９．", "0123456789.")
+
+# 数字表达式：阿拉伯数字与中文数字、单位的任意组合
+NUMBER_PATTERN = r"(?:\d+(?:\.\d+)?|[零〇一二两俩三四五六七八九十拾百佰千仟])(?:\d+(?:\.\d+)?|[零〇一二两俩三四五六七八九十拾百佰千仟万亿]|(?<=\d)[kKwW])*"
+# 单独的单位字（如“万”）不是数字，需要前面有数字
+_NUMBER_RE = re.compile(NUMBER_PATTERN)
+_ARABIC_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# 金额：数字 + 货币单位
+_MONEY_RE = re.compile(rf"({NUMBER_PATTERN})\s*(块钱|块|元|rmb|RMB|人民币|￥)?")
+_CURRENCY_PREFIX_RE = re.compile(rf"[￥¥]\s*({NUMBER_PATTERN})")
+
+
+def normalize_digits(text: str) -> str:
+    """全角数字转半角"""
+    return text.translate(_FULLWIDTH)
+
+
+def _tokens(text: str) -> List[Tuple[str, float]]:
+    """拆分为 ("num", 值) / ("unit", 倍数) / ("big", 倍数) / ("zero", 0) 序列"""
+    tokens = []
+    i = 0
+    while i < len(text):
+        match = _ARABIC_RE.match(text, i)
+        if match:
+            tokens.append(("num", float(match.group())))
+            i = match.end()
+            continue
+        ch = text[i]
+        if ch in ("零", "〇"):
+            tokens.append(("zero", 0))
+        elif ch in _DIGITS:
+            tokens.append(("num", _DIGITS[ch]))
+        elif ch in _UNITS:
+            tokens.append(("unit", _UNITS[ch]))
+        elif ch in _BIG_UNITS:
+            tokens.append(("big", _BIG_UNITS[ch]))
+        else:
+            return []
+        i += 1
+    return tokens
+
+
+def cn_to_number(text: str) -> Optional[float]:
+    """
+    把中文/混合数字转换为数值，无法识别时返回 None
+
+    支持“二十五”“一百零五”“两万三”（口语，= 23000）“一千二”（= 1200）
+    “3.5万”“1万5”“5k”“1.2w”等写法。
+    """
+    tokens = _tokens(normalize_digits(text.strip()))
+    if not tokens:
+        return None
+
+    total = 0.0
+    section = 0.0
+    number: Optional[float] = None
+    last_unit = 0
+    largest_big = 0
+    zero_seen = False
+    for kind, value in tokens:
+        if kind == "num":
+            if number is not None:
+                # 连续两个数字（如“一二”）不是合法写法
+                return None
+            number = value
+        elif kind == "zero":
+            zero_seen = True
+        elif kind == "unit":
+            section += (number if number is not None else 1) * value
+            number = None
+            last_unit = value
+            zero_seen = False
+        else:
+            head = section + (number or 0)
+            if value > largest_big:
+                # “一亿两千万”：更大的单位作用于此前的全部数值
+                total = (total + head) * value
+                largest_big = value
+            else:
+                total += head * value
+            section = 0.0
+            number = None
+            last_unit = value
+            zero_seen = False
+
+    if number is not None:
+        # 口语省略末尾单位：“两万三”= 23000，“一千二”= 1200；“一千零二”不省略
+        if last_unit >= 100 and not zero_seen and number < 10:
+            number *= last_unit / 10
+        section += number
+    return total + section
+
+
+def to_cn_numeral(value: int) -> str:
+    """把 0~99 的整数写成中文数字（用于标题，如“三日游”）"""
+    chars = "零一二三四五六七八九"
+    if value < 10:
+        return chars[value]
+    tens, ones = divmod(value, 10)
+    return ("" if tens == 1 else chars[tens]) + "十" + (chars[ones] if ones else "")
+
+
+def find_numbers(text: str) -> List[Tuple[float, int, int]]:
+    """找出文本中所有数字表达式，返回 (数值, 起始位置, 结束位置)"""
+    text = normalize_digits(text)
+    results = []
+    for match in _NUMBER_RE.finditer(text):
+        value = cn_to_number(match.group())
+        if value is not None:
+            results.append((value, match.start(), match.end()))
+    return results
+
+
+def parse_money(text: str) -> Optional[float]:
+    """解析一个金额表达式（如“五千块”“3.5万元”“￥35”），失败时返回 None"""
+    text = normalize_digits(text.strip())
+    match = _CURRENCY_PREFIX_RE.fullmatch(text) or _MONEY_RE.fullmatch(text)
+    if not match:
+        return None
+    return cn_to_number(match.group(1))
@@ -0,0 +1,126 @@
+"""
+SQL 执行统计
+基于 SQLAlchemy 引擎事件统计每条语句的耗时，替代 echo=True 的逐条打印：
+
+- 按请求汇总查询次数与数据库耗时（由 HTTP 中间件写入响应头并记录到指标）
+- 慢查询日志（超过 SQL_SLOW_QUERY_MS 毫秒）
+- N+1 检测：同一请求内同一形状的 SELECT 执行超过 SQL_N_PLUS_ONE_THRESHOLD 次时告警
+
+请求上下文保存在 ContextVar 中，异步会话的语句在请求协程内执行，同样计入该请求的统计对象；
+后台任务等请求之外的查询只计入全局指标。
+"""
+
+import os
+import re
+import time
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+# 日志中语句的最大长度
+MAX_LOGGED_STATEMENT = 500
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# 展开的 IN 列表、字面量数字与字符串都归一为占位符
+_IN_LIST_RE = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def statement_shape(statement: str) -> str:
+    """语句形状：合并空白、折叠 IN 列表并把字面量替换为占位符"""
+    shape = _WHITESPACE_RE.sub(" ", statement).strip()
+    shape = _IN_LIST_RE.sub("(?)", shape)
+    return _LITERAL_RE.sub("?", shape)
+
+
+@dataclass
+class RequestQueryStats:
+    """单个请求的 SQL 统计"""
+    label: str
+    queries: int = 0
+    db_time: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    # 已告警过的 N+1 语句形状（每个请求每种形状只告警一次）
+    reported: set = field(default_factory=set)
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("sql_request_stats", default=None)
+
+
+def begin_request(label: str) -> RequestQueryStats:
+    """开始统计一个请求，返回其统计对象"""
+    stats = RequestQueryStats(label=label)
+    _current.set(stats)
+    return stats
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+    """当前请求的统计对象（请求之外为 None）"""
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    _record(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # 出错的语句不会触发 after_cursor_execute，这里弹出计时避免错位
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+        metrics.incr("db.errors")
+
+
+def _record(statement: str, elapsed: float):
+    """记录一条语句的耗时，并做慢查询与 N+1 检查"""
+    metrics.incr("db.queries")
+    metrics.observe("db.query.time", elapsed)
+
+    stats = _current.get()
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        metrics.incr("db.slow_queries")
+        logger.warning(
+            f"慢查询 {elapsed * 1000:.1f}ms"
+            f"{f' [{stats.label}]' if stats else ''}: {_WHITESPACE_RE.sub(' ', statement)[:MAX_LOGGED_STATEMENT]}"
+        )
+    if stats is None:
+        return
+
+    stats.queries += 1
+    stats.db_time += elapsed
+    if not statement.lstrip()[:6].upper() == "SELECT":
+        return
+    shape = statement_shape(statement)
+    stats.shapes[shape] += 1
+    if stats.shapes[shape] > N_PLUS_ONE_THRESHOLD and shape not in stats.reported:
+        stats.reported.add(shape)
+        metrics.incr("db.n_plus_one")
+        logger.warning(
+            f"疑似 N+1 查询 [{stats.label}]：同一语句已执行 {stats.shapes[shape]} 次: {shape[:MAX_LOGGED_STATEMENT]}"
+        )
+
+
+def instrument_engine(engine: Engine):
+    """为引擎注册执行统计事件（重复调用无副作用）"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
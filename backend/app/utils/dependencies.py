@@ -5,27 +5,20 @@ FastAPI依赖项
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from ..database import SessionLocal
+from ..database import get_read_db
 from ..models.user import User
 from ..utils.auth import verify_token
 
 # HTTP Bearer认证方案
 security = HTTPBearer()
 
-def get_db() -> Session:
-    """获取数据库会话"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> User:
     """获取当前认证用户"""
     credentials_exception = HTTPException(
@@ -43,20 +36,22 @@ def get_current_user(
         user_id: int = payload.get("sub")
         if user_id is None:
             raise credentials_exception
+        # sub 为字符串，转换为整数（PostgreSQL 等不会隐式转换参数类型）
+        user_id = int(user_id)
             
     except Exception:
         raise credentials_exception
     
     # 从数据库获取用户
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if user is None:
         raise credentials_exception
     
     return user
 
-def get_current_user_optional(
+async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Optional[User]:
     """获取当前用户（可选）"""
     if not credentials:
@@ -71,7 +66,7 @@ def get_current_user_optional(
         if user_id is None:
             return None
             
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.scalar(select(User).where(User.id == int(user_id)))
         return user
         
     except Exception:
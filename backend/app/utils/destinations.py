@@ -0,0 +1,53 @@
+"""
+目的地词表
+常见国内城市、热门景区与出境目的地，供本地预解析按最长匹配识别目的地。
+"""
+
+import re
+from typing import List, Tuple
+
+DOMESTIC_CITIES = (
+    "北京 上海 天津 重庆 广州 深圳 杭州 南京 苏州 无锡 常州 扬州 镇江 南通 徐州 宁波 温州 绍兴 嘉兴 湖州 舟山 "
+    "台州 金华 义乌 衢州 丽水 合肥 黄山 芜湖 安庆 福州 厦门 泉州 漳州 莆田 武夷山 南昌 景德镇 九江 赣州 婺源 上饶 "
+    "济南 青岛 烟台 威海 潍坊 淄博 泰安 曲阜 日照 临沂 郑州 开封 洛阳 安阳 武汉 宜昌 襄阳 恩施 十堰 长沙 张家界 "
+    "湘西 凤凰 岳阳 衡阳 株洲 南宁 桂林 阳朔 北海 柳州 海口 三亚 万宁 成都 乐山 峨眉山 都江堰 九寨沟 稻城 稻城亚丁 "
+    "康定 甘孜 阿坝 宜宾 自贡 贵阳 遵义 安顺 荔波 黔东南 昆明 大理 丽江 香格里拉 西双版纳 腾冲 普洱 拉萨 林芝 "
+    "日喀则 西安 延安 宝鸡 汉中 兰州 敦煌 张掖 嘉峪关 天水 西宁 青海湖 银川 中卫 乌鲁木齐 喀什 伊犁 阿勒泰 吐鲁番 "
+    "喀纳斯 呼和浩特 包头 呼伦贝尔 鄂尔多斯 阿尔山 满洲里 哈尔滨 漠河 雪乡 长春 吉林 延吉 长白山 沈阳 大连 丹东 "
+    "石家庄 秦皇岛 北戴河 承德 保定 唐山 张家口 崇礼 太原 大同 平遥 五台山 佛山 珠海 汕头 潮州 惠州 湛江 "
+    "中山 东莞 清远 韶关 梅州 香港 澳门 台北 高雄 台中 台南 花莲 垦丁 鼓浪屿 千岛湖 乌镇 西塘 周庄 同里 普陀山 "
+    "黄果树 泸沽湖 洱海 莫干山 庐山 泰山 华山 武当山 长江三峡 涠洲岛 平潭 霞浦"
+).split()
+
+PROVINCES = (
+    "云南 四川 西藏 新疆 青海 甘肃 宁夏 内蒙古 黑龙江 吉林省 辽宁 河北 山西 陕西 山东 河南 湖北 湖南 江苏 浙江 "
+    "安徽 福建 江西 广东 广西 海南 贵州 台湾 东北 江南 川西 西北"
+).split()
+
+INTERNATIONAL = (
+    "日本 东京 大阪 京都 奈良 北海道 札幌 冲绳 名古屋 福冈 横滨 箱根 韩国 首尔 釜山 济州岛 泰国 曼谷 清迈 普吉岛 "
+    "芭提雅 苏梅岛 新加坡 马来西亚 吉隆坡 槟城 沙巴 亚庇 越南 河内 胡志明市 岘港 芽庄 柬埔寨 暹粒 吴哥窟 印尼 巴厘岛 "
+    "菲律宾 长滩岛 宿务 马尔代夫 斯里兰卡 尼泊尔 加德满都 印度 迪拜 阿联酋 土耳其 伊斯坦布尔 埃及 开罗 摩洛哥 "
+    "法国 巴黎 尼斯 英国 伦敦 爱丁堡 德国 柏林 慕尼黑 意大利 罗马 米兰 威尼斯 佛罗伦萨 西班牙 巴塞罗那 马德里 "
+    "葡萄牙 里斯本 瑞士 苏黎世 日内瓦 因特拉肯 荷兰 阿姆斯特丹 比利时 奥地利 维也纳 捷克 布拉格 匈牙利 布达佩斯 "
+    "希腊 雅典 圣托里尼 冰岛 挪威 瑞典 芬兰 丹麦 俄罗斯 莫斯科 圣彼得堡 美国 纽约 洛杉矶 旧金山 拉斯维加斯 "
+    "夏威夷 西雅图 加拿大 温哥华 多伦多 墨西哥 澳大利亚 澳洲 悉尼 墨尔本 新西兰 奥克兰 皇后镇 大溪地"
+).split()
+
+# 按长度倒序，保证最长匹配（“稻城亚丁”优先于“稻城”，“吉林省”优先于“吉林”）
+_NAMES = sorted(set(DOMESTIC_CITIES + PROVINCES + INTERNATIONAL), key=len, reverse=True)
+_NAME_RE = re.compile("|".join(re.escape(name) for name in _NAMES))
+# 可省略的行政区划后缀
+_SUFFIX_RE = re.compile(r"市|省|自治区|特别行政区")
+
+
+def find_destinations(text: str) -> List[Tuple[str, int, int]]:
+    """找出文本中出现的目的地，返回 (名称, 起始位置, 结束位置)，名称去掉“市”“省”等后缀"""
+    results = []
+    for match in _NAME_RE.finditer(text):
+        end = match.end()
+        suffix = _SUFFIX_RE.match(text, end)
+        if suffix:
+            end = suffix.end()
+        results.append((_SUFFIX_RE.sub("", match.group()) or match.group(), match.start(), end))
+    return results
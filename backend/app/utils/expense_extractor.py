@@ -0,0 +1,240 @@
+"""
+费用文本的本地抽取
+把“打车到酒店 35 块”“昨天在海底捞吃火锅花了三百二”这类短句转换为
+{amount, category, description, expense_date}，不经过大模型：
+
+- 金额：带货币单位的金额优先，其次是唯一的裸数字（排除日期、时间和数量），支持中文数字
+- 类别：基于字符 1-gram/2-gram 的朴素贝叶斯分类器，用各类别的种子词训练，
+  输出 add_expense 允许的六个类别之一（返回中文名称，与大模型接口一致）
+- 日期：昨天、上周五、10月1日等，取过去最近的一天
+
+每次抽取给出置信度（金额与类别置信度的较小值），低于阈值时由调用方交给大模型。
+"""
+
+import re
+import math
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.cn_numbers import NUMBER_PATTERN, cn_to_number, normalize_digits
+from app.utils.cn_dates import find_dates
+
+# add_expense 允许的类别及其中文名称
+CATEGORY_LABELS = {
+    "transport": "交通",
+    "accommodation": "住宿",
+    "food": "食物",
+    "entertainment": "娱乐",
+    "shopping": "购物",
+    "other": "其他",
+}
+# 中文名称（含模型常用的同义词）到类别的映射
+LABEL_CATEGORIES = {
+    **{label: category for category, label in CATEGORY_LABELS.items()},
+    "餐饮": "food",
+    "饮食": "food",
+    "门票": "entertainment",
+    "景点": "entertainment",
+}
+
+# 各类别的种子词，用于训练字符 n-gram 分类器
+CATEGORY_SEEDS = {
+    "transport": (
+        "打车 出租车 的士 滴滴 网约车 快车 专车 地铁 公交 巴士 大巴 高铁 动车 火车 车票 火车票 高铁票 机票 飞机 航班 "
+        "船票 轮渡 加油 油费 停车 停车费 过路费 高速费 租车 共享单车 单车 电动车 接机 送机 包车 交通 路费 坐车 "
+        "打的 叫车 车费 机场大巴 摆渡车 改签 退票费 行李托运 坐船 船费 渡轮"
+    ),
+    "accommodation": (
+        "酒店 宾馆 民宿 住宿 房费 旅馆 客栈 青旅 青年旅舍 订房 房间 住一晚 入住 续住 房租 公寓 度假村 "
+        "住 睡 床位 标间 大床房 押金 携程订房"
+    ),
+    "food": (
+        "吃 饭 吃饭 早餐 早饭 早点 午餐 午饭 中饭 晚餐 晚饭 夜宵 宵夜 火锅 烧烤 小吃 奶茶 咖啡 饮料 喝 水 矿泉水 "
+        "零食 餐厅 饭店 外卖 烤鸭 点心 水果 甜品 面 面条 米线 米粉 啤酒 海鲜 自助餐 快餐 肯德基 麦当劳 海底捞 "
+        "包子 饺子 粥 汉堡 披萨 蛋糕 茶 喜茶 星巴克 瑞幸 聚餐 请客 食堂 食物 餐饮"
+    ),
+    "entertainment": (
+        "门票 景区 景点 电影 电影票 演出 演唱会 话剧 KTV 唱歌 酒吧 游乐园 迪士尼 环球影城 乐园 博物馆 展览 "
+        "温泉 按摩 足疗 泡脚 索道 缆车 游船 漂流 潜水 滑雪 表演 剧本杀 密室 游戏 网吧 娱乐 讲解 导游 门票钱 "
+        "游玩 观光车 租船 骑马 蹦极 玩"
+    ),
+    "shopping": (
+        "买 购物 纪念品 特产 衣服 裤子 鞋 帽子 化妆品 口红 手信 礼物 超市 商场 免税店 伴手礼 明信片 充电宝 "
+        "雨伞 防晒霜 包 手机壳 冰箱贴 丝巾 茶叶 买东西 逛街 淘宝 日用品"
+    ),
+    "other": (
+        "保险 旅游保险 签证 手续费 小费 药 药店 医院 看病 话费 流量 电话卡 寄存 行李寄存 快递 洗衣 罚款 罚单 "
+        "维修 充电 厕所 押金退还 服务费 杂费 其他"
+    ),
+}
+
+_N = f"({NUMBER_PATTERN})"
+_MONEY_RE = re.compile(rf"[￥¥]\s*{_N}|{_N}\s*(块钱|块|元|rmb|RMB|人民币|刀|美元|日元)")
+_TOTAL_RE = re.compile(r"(?:一共|总共|共计|合计|共|总计)\s*(?:花了?|付了?|是)?\s*$")
+_BARE_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?\s*[kKwW万千]?|[零〇一二两三四五六七八九十百千万]{2,}|[一二两三四五六七八九十]百[零〇一二两三四五六七八九十]*")
+# 数字后面跟这些字时表示数量或时间，不是金额
+_QUANTITY_RE = re.compile(r"\s*(?:张|个|人|位|晚|天|日|号|月|份|瓶|杯|次|公里|km|点|:|：|分钟|小时|碗|串|件|双|岁|楼|层|路|站|折)")
+_FILLER_RE = re.compile(
+    r"花了|花费|用了|付了|支付|消费|共计|一共|总共|合计|共|总计|大概|大约|差不多|左右|[我们]+|今天|刚刚|刚才|"
+    r"[\s，。！？、,.!?~～；;：:（）()]+"
+)
+# 描述的最大长度
+MAX_DESCRIPTION_LENGTH = 50
+
+
+def _features(text: str) -> List[str]:
+    """字符 1-gram 与 2-gram（忽略数字和标点）"""
+    chars = re.sub(r"[\d\s\W_]+", " ", text)
+    features = []
+    for part in chars.split():
+        features.extend(part)
+        features.extend(part[i:i + 2] for i in range(len(part) - 1))
+    return features
+
+
+class NaiveBayesClassifier:
+    """多项式朴素贝叶斯（拉普拉斯平滑），只统计训练中出现过的特征"""
+
+    def __init__(self, seeds: Dict[str, str]):
+        self.counts: Dict[str, Counter] = {}
+        self.totals: Dict[str, int] = {}
+        vocabulary = set()
+        for label, words in seeds.items():
+            counter = Counter()
+            for word in words.split():
+                counter.update(_features(word))
+            self.counts[label] = counter
+            self.totals[label] = sum(counter.values())
+            vocabulary.update(counter)
+        self.vocabulary = vocabulary
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """返回 (类别, 后验概率)；没有任何已知特征时置信度为 0"""
+        features = [feature for feature in _features(text) if feature in self.vocabulary]
+        if not features:
+            return "other", 0.0
+        size = len(self.vocabulary)
+        scores = {
+            label: sum(
+                # 2-gram 比单字更有区分度，加倍计入
+                (2 if len(feature) == 2 else 1) * math.log((counter[feature] + 1) / (self.totals[label] + size))
+                for feature in features
+            )
+            for label, counter in self.counts.items()
+        }
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        total = sum(math.exp(score - top) for score in scores.values())
+        return best, 1.0 / total
+
+
+@dataclass
+class ExpenseExtraction:
+    """本地抽取结果"""
+    amount: Optional[float]
+    category: str
+    description: Optional[str]
+    expense_date: Optional[str]
+    amount_confidence: float
+    category_confidence: float
+
+    @property
+    def confidence(self) -> float:
+        """整体置信度：金额与类别置信度的较小值"""
+        return min(self.amount_confidence, self.category_confidence)
+
+    def to_response(self) -> Dict[str, Optional[object]]:
+        """转换为 /api/budget/ai-extract 的返回格式（类别为中文名称）"""
+        return {
+            "amount": self.amount,
+            "category": CATEGORY_LABELS[self.category],
+            "description": self.description,
+            "expense_date": self.expense_date,
+        }
+
+
+_classifier = NaiveBayesClassifier(CATEGORY_SEEDS)
+
+
+def category_key(label: Optional[str]) -> Optional[str]:
+    """把中文类别名称（或英文类别）转换为 add_expense 使用的类别，无法识别时返回 None"""
+    if not label:
+        return None
+    label = label.strip()
+    if label in CATEGORY_LABELS:
+        return label
+    return LABEL_CATEGORIES.get(label)
+
+
+def _parse_amount(text: str, taken: List[Tuple[int, int]]) -> Tuple[Optional[float], float, List[Tuple[int, int]]]:
+    """返回 (金额, 置信度, 金额所在位置)"""
+    money = []
+    for m in _MONEY_RE.finditer(text):
+        value = cn_to_number(m.group(1) or m.group(2))
+        if value is not None:
+            money.append((value, m.start(), m.end()))
+    if len(money) == 1:
+        value, start, end = money[0]
+        return value, 1.0, [(start, end)]
+    if money:
+        # 多个金额时取“一共/合计”后面的那个
+        totals = [item for item in money if _TOTAL_RE.search(text[max(0, item[1] - 6):item[1]])]
+        if len(totals) == 1:
+            return totals[0][0], 0.9, [(start, end) for _, start, end in money]
+        return None, 0.3, [(start, end) for _, start, end in money]
+
+    bare = []
+    for m in _BARE_NUMBER_RE.finditer(text):
+        if any(start < m.end() and m.start() < end for start, end in taken):
+            continue
+        if _QUANTITY_RE.match(text, m.end()):
+            continue
+        value = cn_to_number(m.group())
+        if value is not None:
+            bare.append((value, m.start(), m.end()))
+    if len(bare) == 1:
+        value, start, end = bare[0]
+        return value, 0.8, [(start, end)]
+    if bare:
+        return None, 0.3, [(start, end) for _, start, end in bare]
+    return None, 0.0, []
+
+
+def _description(text: str, spans: List[Tuple[int, int]]) -> Optional[str]:
+    """去掉金额、日期和连接词后剩余的文字作为描述"""
+    chars = list(text)
+    for start, end in spans:
+        for i in range(start, min(end, len(chars))):
+            chars[i] = " "
+    description = _FILLER_RE.sub(" ", "".join(chars)).strip()
+    description = re.sub(r"\s+", "", description)
+    return description[:MAX_DESCRIPTION_LENGTH] or None
+
+
+def extract_expense(text: str, today: Optional[date] = None) -> ExpenseExtraction:
+    """
+    本地抽取一条费用记录
+
+    Args:
+        text: 用户输入（如“打车到酒店 35 块”）
+        today: 解析相对日期的基准日，默认服务器当天
+    """
+    today = today or date.today()
+    text = normalize_digits(text.strip())
+
+    dates = find_dates(text, today, prefer_future=False)
+    date_spans = [(match.start, match.end) for match in dates]
+    amount, amount_confidence, amount_spans = _parse_amount(text, date_spans)
+    description = _description(text, date_spans + amount_spans)
+    category, category_confidence = _classifier.predict(description or text)
+
+    return ExpenseExtraction(
+        amount=amount,
+        category=category,
+        description=description,
+        expense_date=dates[0].value.isoformat() if dates else None,
+        amount_confidence=amount_confidence,
+        category_confidence=category_confidence,
+    )
@@ -0,0 +1,539 @@
+"""
+模型输出的容错JSON解析
+流式和非流式调用共用的增量解析器：边接收边把模型输出规整为合法JSON，
+顶层对象的某个键（如 day1）的值一旦完整就立即返回；结束时修复残缺部分并报告挽救了哪些字段。
+
+可修复的常见问题：
+- ```json 代码块标记、JSON 前后的说明文字
+- 多余的逗号（尾逗号、连续逗号）和缺失的逗号/冒号（换行分隔的成员之间）
+- 字符串外的全角标点（，：｛｝［］“”）和单引号字符串
+- 输出被截断：补全未闭合的括号，丢弃值被截断的成员（未闭合的字符串、可能没写完的数字、
+  没有任何完整成员的对象和数组）和只有键没有值的残缺成员
+- 字符串中未转义的换行、引号和非法转义
+- True/False/None 等 Python 字面量、未加引号的键和值
+
+同一行内两个字符串之间缺逗号（如 {"a": "x" "b": 2}）无法判断引号是内容还是分隔，
+不猜测合并，直接放弃解析（data 为 None）。
+"""
+
+import io
+import re
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 字符串外出现时按半角处理的全角标点
+_FULLWIDTH = {"，": ",", "：": ":", "｛": "{", "｝": "}", "［": "[", "］": "]"}
+_QUOTES = "\"“”'"
+# 各种开引号对应的闭引号
+_CLOSERS = {'"': '"', "“": '”"', "”": '”"', "'": "'"}
+_LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+    "NaN": "null", "Infinity": "null", "undefined": "null",
+}
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+# 字符串内需要逐字符处理的位置：引号、反斜杠、控制字符
+_STRING_SPECIAL = {
+    '"': re.compile(r'["\\\x00-\x1f]'),
+    '”"': re.compile(r'["”\\\x00-\x1f]'),
+    "'": re.compile(r'[\'"\\\x00-\x1f]'),
+}
+_HEX = set("0123456789abcdefABCDEF")
+
+
+@dataclass
+class RepairResult:
+    """容错解析结果"""
+    data: Any
+    repairs: List[str] = field(default_factory=list)
+    complete_fields: List[str] = field(default_factory=list)
+    salvaged_fields: List[str] = field(default_factory=list)
+    dropped_fields: List[str] = field(default_factory=list)
+    truncated: bool = False
+
+    @property
+    def repaired(self) -> bool:
+        """是否经过了修复"""
+        return bool(self.repairs)
+
+
+@dataclass
+class _Frame:
+    """一层未闭合的对象或数组"""
+    kind: str
+    state: str
+    count: int = 0
+    member_start: int = 0
+    value_start: int = 0
+    key: Optional[str] = None
+    comma: bool = False
+
+
+class TolerantJSONParser:
+    """
+    容错的增量JSON解析器
+
+    逐段送入模型输出（feed），返回新完成的顶层 (键, 值)；全部送入后调用 finish
+    得到修复后的完整结果。内部只向前扫描一次，已处理的文本不会重复解析。
+    """
+
+    def __init__(self):
+        self._out = io.StringIO()
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._in_string = False
+        self._string_is_key = False
+        self._closers = '"'
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._quote_pending = False
+        self._pending_ws = ""
+        self._bare: Optional[str] = None
+        self._bare_is_key = False
+        self._finishing = False
+        self._completed: List[Tuple[str, Any]] = []
+        self.repairs: List[str] = []
+        self.complete_fields: List[str] = []
+        self.salvaged_fields: List[str] = []
+        self.dropped_fields: List[str] = []
+        self.done = False
+        self.failed = False
+
+    # ---- 输出缓冲 ----
+
+    def _write(self, text: str):
+        self._out.write(text)
+
+    def _pos(self) -> int:
+        return self._out.tell()
+
+    def _truncate(self, pos: int):
+        self._out.seek(pos)
+        self._out.truncate()
+
+    def _repair(self, kind: str):
+        """记录一种修复（去重）"""
+        if kind not in self.repairs:
+            self.repairs.append(kind)
+
+    def _fail(self, kind: str):
+        """遇到无法可靠修复的结构错误，停止解析"""
+        self._repair(kind)
+        self.failed = True
+        self.done = True
+        logger.warning(f"容错解析放弃: {kind}，已输出 {self._pos()} 个字符")
+
+    # ---- 结构处理 ----
+
+    def _begin_member(self, frame: _Frame):
+        """对象中开始一个新成员（键）；成员间的逗号统一在这里补写，原文中的逗号只用于断开标量"""
+        if frame.state == "after":
+            self._repair("missing_comma")
+        frame.comma = False
+        frame.member_start = self._pos()
+        frame.key = None
+        if frame.count:
+            self._write(",")
+        frame.state = "key"
+
+    def _begin_value(self, frame: _Frame) -> bool:
+        """开始一个值；返回 False 表示该位置不能放值（应忽略）"""
+        if frame.kind == "{":
+            if frame.state == "colon":
+                self._write(":")
+                self._repair("missing_colon")
+                frame.state = "value"
+            if frame.state != "value":
+                return False
+        else:
+            if frame.state == "after":
+                self._repair("missing_comma")
+            frame.comma = False
+            frame.member_start = self._pos()
+            if frame.count:
+                self._write(",")
+            frame.state = "value"
+        frame.value_start = self._pos()
+        return True
+
+    def _end_value(self, frame: _Frame):
+        """当前值已完整"""
+        frame.count += 1
+        frame.state = "after"
+        if frame is self._stack[0] and frame.kind == "{":
+            raw = self._out.getvalue()[frame.value_start:]
+            try:
+                value = json.loads(raw)
+            except json.JSONDecodeError as e:
+                logger.warning(f"容错解析跳过无法解析的字段 {frame.key}: {e}")
+                return
+            self._completed.append((frame.key, value))
+            if self._finishing:
+                self.salvaged_fields.append(frame.key)
+            else:
+                self.complete_fields.append(frame.key)
+
+    def _drop_member(self, frame: _Frame):
+        """丢弃没有完整值的残缺成员（对象的键值对或数组元素）"""
+        self._truncate(frame.member_start)
+        if frame.kind == "{":
+            if frame is self._stack[0] and frame.key is not None:
+                self.dropped_fields.append(frame.key)
+            frame.state = "after" if frame.count else "key"
+        else:
+            frame.state = "after" if frame.count else "value"
+        self._repair("dropped_incomplete_member")
+
+    def _close(self, frame: _Frame, bracket: Optional[str] = None):
+        """闭合当前层；bracket 为 None 表示输出被截断时补全"""
+        if frame.kind == "{" and frame.state in ("colon", "value"):
+            self._drop_member(frame)
+        if bracket is None and frame.count == 0 and len(self._stack) > 1:
+            # 截断时没有任何完整成员的对象/数组（如 [{"time": "10: 丢弃成员后剩下的 {}）同样是残缺的值
+            self._stack.pop()
+            self._drop_member(self._stack[-1])
+            return
+        closing = "}" if frame.kind == "{" else "]"
+        if bracket is not None and bracket != closing:
+            self._repair("mismatched_bracket")
+        if bracket is not None and frame.comma:
+            self._repair("trailing_comma")
+        self._write(closing)
+        self._stack.pop()
+        if not self._stack:
+            self.done = True
+        else:
+            self._end_value(self._stack[-1])
+
+    # ---- 字符串 ----
+
+    def _start_string(self, frame: _Frame, quote: str):
+        """遇到引号，开始一个键或字符串值"""
+        if quote != '"':
+            self._repair("nonstandard_quote")
+        if frame.kind == "{" and frame.state in ("key", "after"):
+            self._begin_member(frame)
+            self._string_is_key = True
+        else:
+            if not self._begin_value(frame):
+                return False
+            self._string_is_key = False
+        frame.value_start = self._pos()
+        self._write('"')
+        self._in_string = True
+        self._closers = _CLOSERS[quote]
+        return True
+
+    def _finish_string(self):
+        """字符串结束"""
+        self._write('"')
+        self._in_string = False
+        self._quote_pending = False
+        self._pending_ws = ""
+        frame = self._stack[-1]
+        if self._string_is_key:
+            frame.key = json.loads(self._out.getvalue()[frame.value_start:])
+            frame.state = "colon"
+        else:
+            self._end_value(frame)
+
+    def _consume_string(self, chunk: str, i: int) -> int:
+        """处理字符串内部的文本，返回下一个待处理位置"""
+        if self._quote_pending:
+            ch = chunk[i]
+            if ch.isspace():
+                self._pending_ws += ch
+                return i + 1
+            structural = _FULLWIDTH.get(ch, ch)
+            if structural in ",}]:" or (structural in _QUOTES and "\n" in self._pending_ws):
+                # 引号确为字符串结尾（后跟换行再出现引号，视为缺逗号的下一个成员）
+                self._finish_string()
+                return i
+            if structural in _QUOTES:
+                # 同一行紧接着又是引号：可能是缺逗号的两个字符串，也可能是内容中的引号，不猜测
+                self._fail("ambiguous_missing_comma")
+                return i
+            # 引号后紧跟普通文字：是字符串内容中未转义的引号
+            self._write('\\"' + json.dumps(self._pending_ws)[1:-1])
+            self._quote_pending = False
+            self._pending_ws = ""
+            self._repair("unescaped_quote")
+            return i
+
+        if self._unicode is not None:
+            # \uXXXX 转义需要凑齐4位十六进制数
+            ch = chunk[i]
+            if ch in _HEX:
+                self._unicode += ch
+                if len(self._unicode) == 4:
+                    self._write("\\u" + self._unicode)
+                    self._unicode = None
+                return i + 1
+            self._write("\\\\u" + self._unicode)
+            self._unicode = None
+            self._repair("invalid_escape")
+            return i
+
+        if self._escape:
+            ch = chunk[i]
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+            elif ch in '"\\/bfnrt':
+                self._write("\\" + ch)
+            else:
+                self._write("\\\\" + json.dumps(ch, ensure_ascii=False)[1:-1])
+                self._repair("invalid_escape")
+            return i + 1
+
+        match = _STRING_SPECIAL[self._closers].search(chunk, i)
+        if match is None:
+            self._write(chunk[i:])
+            return len(chunk)
+
+        start = match.start()
+        self._write(chunk[i:start])
+        ch = chunk[start]
+        if ch == "\\":
+            self._escape = True
+        elif ch in self._closers:
+            self._quote_pending = True
+            self._pending_ws = ""
+        elif ch == '"':
+            # 单引号字符串中的双引号
+            self._write('\\"')
+        else:
+            self._write(json.dumps(ch)[1:-1])
+            self._repair("control_character")
+        return start + 1
+
+    # ---- 未加引号的标量 ----
+
+    def _start_bare(self, frame: _Frame, ch: str) -> bool:
+        """开始一个未加引号的键或值（数字、字面量或裸字符串）"""
+        if frame.kind == "{" and frame.state in ("key", "after"):
+            self._begin_member(frame)
+            self._bare_is_key = True
+        else:
+            if not self._begin_value(frame):
+                return False
+            self._bare_is_key = False
+        self._bare = ch
+        return True
+
+    def _end_bare(self, truncated: bool = False):
+        """结束未加引号的标量并写出规整后的JSON"""
+        token = self._bare.strip()
+        self._bare = None
+        frame = self._stack[-1]
+
+        if self._bare_is_key:
+            if truncated:
+                self._drop_member(frame)
+                return
+            frame.value_start = self._pos()
+            self._write(json.dumps(token, ensure_ascii=False))
+            frame.key = token
+            frame.state = "colon"
+            self._repair("unquoted_key")
+            return
+
+        if token in _LITERALS:
+            if _LITERALS[token] != token:
+                self._repair("python_literal")
+            self._write(_LITERALS[token])
+        elif truncated:
+            # 被截断的字面量、数字或裸字符串（如 "tru"、"12" 可能是 "128"）无法确定原值，整体丢弃
+            self._drop_member(frame)
+            return
+        elif _NUMBER.match(token):
+            self._write(token)
+        else:
+            try:
+                number = float(token)
+                self._write(json.dumps(int(number) if number.is_integer() and "." not in token else number))
+                self._repair("malformed_number")
+            except ValueError:
+                self._write(json.dumps(token, ensure_ascii=False))
+                self._repair("unquoted_value")
+        self._end_value(frame)
+
+    # ---- 对外接口 ----
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        送入一段新文本
+
+        Returns:
+            本次新完成的顶层 (键, 值) 列表（顶层为对象时）
+        """
+        i = 0
+        n = len(chunk)
+        while i < n and not self.done:
+            if self._in_string:
+                i = self._consume_string(chunk, i)
+                continue
+
+            ch = _FULLWIDTH.get(chunk[i], chunk[i])
+
+            if self._bare is not None:
+                if ch in ",}]\n" or ch in _QUOTES or (self._bare_is_key and ch == ":"):
+                    self._end_bare()
+                else:
+                    self._bare += ch
+                    i += 1
+                    continue
+
+            if not self._started:
+                # 跳过JSON之前的代码块标记和说明文字
+                if ch in "{[":
+                    self._started = True
+                    self._stack.append(_Frame(kind=ch, state="key" if ch == "{" else "value"))
+                    self._write(ch)
+                elif not ch.isspace():
+                    self._repair("leading_text")
+                i += 1
+                continue
+
+            if chunk[i] in _FULLWIDTH:
+                self._repair("fullwidth_punctuation")
+
+            frame = self._stack[-1]
+            if ch.isspace():
+                pass
+            elif ch in _QUOTES:
+                if not self._start_string(frame, ch):
+                    self._repair("unexpected_value")
+            elif ch in "{[":
+                if self._begin_value(frame):
+                    self._stack.append(_Frame(kind=ch, state="key" if ch == "{" else "value"))
+                    self._write(ch)
+                else:
+                    self._repair("stray_bracket")
+            elif ch in "}]":
+                self._close(frame, ch)
+            elif ch == ":":
+                if frame.kind == "{" and frame.state == "colon":
+                    self._write(":")
+                    frame.state = "value"
+                else:
+                    self._repair("stray_colon")
+            elif ch == ",":
+                if frame.state == "after":
+                    frame.state = "key" if frame.kind == "{" else "value"
+                    frame.comma = True
+                elif frame.kind == "{" and frame.state in ("colon", "value"):
+                    self._drop_member(frame)
+                    frame.state = "key"
+                else:
+                    self._repair("extra_comma")
+            else:
+                if not self._start_bare(frame, ch):
+                    self._repair("unexpected_value")
+            i += 1
+
+        if self.done and not self.failed and i < n and chunk[i:].strip().strip("`").strip():
+            self._repair("trailing_text")
+
+        completed, self._completed = self._completed, []
+        return completed
+
+    def finish(self) -> RepairResult:
+        """
+        结束输入：补全被截断的部分并返回完整结果
+
+        Returns:
+            RepairResult，无法得到任何JSON时 data 为 None
+        """
+        truncated = self._started and not self.done
+        self._finishing = True
+
+        if self._started and not self.done:
+            self._repair("truncated")
+            if self._in_string:
+                if self._quote_pending:
+                    self._finish_string()
+                else:
+                    self._unicode = None
+                    self._escape = False
+                    self._in_string = False
+                    # 键或值被截断：丢弃整个成员，不保留半截的值（如 "time": "10:）
+                    self._drop_member(self._stack[-1])
+            elif self._bare is not None:
+                self._end_bare(truncated=True)
+            while self._stack:
+                self._close(self._stack[-1])
+
+        data = None
+        if self._started and not self.failed:
+            try:
+                data = json.loads(self._out.getvalue())
+            except json.JSONDecodeError as e:
+                logger.error(f"容错解析失败: {e}")
+
+        return RepairResult(
+            data=data,
+            repairs=list(self.repairs),
+            complete_fields=list(self.complete_fields),
+            salvaged_fields=list(self.salvaged_fields),
+            dropped_fields=list(self.dropped_fields),
+            truncated=truncated,
+        )
+
+    def take_completed(self) -> List[Tuple[str, Any]]:
+        """取出 finish 时挽救出的顶层 (键, 值)"""
+        completed, self._completed = self._completed, []
+        return completed
+
+
+def parse_model_json(text: str) -> RepairResult:
+    """
+    解析一段完整的模型输出
+
+    合法JSON直接走 json.loads；否则用容错解析器修复。
+    """
+    try:
+        data = json.loads(text)
+        fields = list(data.keys()) if isinstance(data, dict) else []
+        metrics.incr("json_repair.clean")
+        return RepairResult(data=data, complete_fields=fields)
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    parser = TolerantJSONParser()
+    parser.feed(text or "")
+    result = parser.finish()
+    if result.data is None:
+        metrics.incr("json_repair.failed")
+    elif result.salvaged_fields or result.dropped_fields or result.truncated:
+        metrics.incr("json_repair.salvaged")
+    else:
+        metrics.incr("json_repair.repaired")
+    return result
+
+
+def extract_json_object(text: str, source: str) -> Optional[Dict[str, Any]]:
+    """
+    从模型输出中提取JSON对象，修复失败或结果不是对象时返回 None
+
+    Args:
+        text: 模型输出
+        source: 调用来源（用于日志），如 "text_parse"
+    """
+    result = parse_model_json(text)
+    if not isinstance(result.data, dict):
+        logger.error(f"{source} 无法从模型输出中提取JSON对象")
+        return None
+    if result.repaired:
+        logger.warning(
+            f"{source} 修复了模型输出的JSON: {', '.join(result.repairs)}；"
+            f"挽救字段: {result.salvaged_fields or '无'}，丢弃字段: {result.dropped_fields or '无'}"
+        )
+    return result.data
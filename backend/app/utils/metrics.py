@@ -0,0 +1,82 @@
+"""
+进程内指标统计
+提供计数器、仪表值和耗时分布（滑动窗口分位数），通过 /metrics 接口导出
+"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict
+
+
+class Metrics:
+    """简单的线程安全指标注册表"""
+
+    def __init__(self, window: int = 1000):
+        """
+        Args:
+            window: 每个耗时指标保留的最近样本数，用于计算分位数
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, deque] = {}
+        self._totals: Dict[str, list] = {}
+
+    def incr(self, name: str, value: float = 1):
+        """计数器累加"""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        """设置仪表值（如队列深度）"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """记录一次观测值（通常为秒）"""
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window)
+                self._totals[name] = [0, 0.0]
+            self._samples[name].append(value)
+            self._totals[name][0] += 1
+            self._totals[name][1] += value
+
+    def get_counter(self, name: str) -> float:
+        """读取计数器当前值"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    @staticmethod
+    def _percentile(ordered: list, q: float) -> float:
+        """在已排序样本上取分位数（最近秩法）"""
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出所有指标的当前快照"""
+        with self._lock:
+            timings = {}
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                count, total = self._totals[name]
+                timings[name] = {
+                    "count": count,
+                    "avg": total / count if count else 0.0,
+                    "p50": self._percentile(ordered, 0.50),
+                    "p95": self._percentile(ordered, 0.95),
+                    "p99": self._percentile(ordered, 0.99),
+                    "max": ordered[-1] if ordered else 0.0,
+                }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": timings,
+            }
+
+
+# 创建全局指标实例
+metrics = Metrics()
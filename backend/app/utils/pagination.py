@@ -0,0 +1,159 @@
+"""
+列表接口的游标分页与字段选择
+
+游标（keyset）分页按排序列 + 主键定位下一页：WHERE (排序列, id) 在上一页最后一行之后，
+配合 (过滤列, 排序列) 复合索引，翻到第几页都只读取一页的行，不像 OFFSET 那样越往后越慢，
+翻页期间插入新记录也不会造成重复或遗漏。
+
+游标是对上一页最后一行排序键的 base64url 编码（JSON），对客户端不透明。
+SQLite 按文本比较日期时间，而 server_default 写入的时间没有微秒部分，绑定参数却带微秒，
+因此在 SQLite 上游标保存并比较数据库里的原始文本；其他数据库按时间类型比较。
+"""
+
+import os
+import json
+import base64
+import binascii
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import DateTime, Select, String, cast, literal, tuple_, type_coerce
+from sqlalchemy.sql.elements import ColumnElement
+
+# 单页条数：limit 与 cursor 都未指定时返回全部（兼容旧客户端）；只带 cursor 时按默认条数，
+# limit 不超过最大值
+DEFAULT_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "200"))
+
+# 下一页游标的响应头（没有下一页时不返回）
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析或与当前排序不匹配"""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """把排序键编码为游标"""
+    payload = json.dumps([value if isinstance(value, (int, float)) or value is None else str(value) for value in values])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """解析游标，返回排序键（长度需与排序列数一致）"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError, binascii.Error) as e:
+        raise InvalidCursor("无效的分页游标") from e
+    if not isinstance(values, list) or len(values) != size or any(value is None for value in values):
+        raise InvalidCursor("无效的分页游标")
+    return values
+
+
+def page_size(limit: Optional[int], cursor: Optional[str] = None) -> Optional[int]:
+    """规范化请求的 limit：None 表示不分页，否则限制在 [1, MAX_PAGE_SIZE]"""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE if cursor else None
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    解析逗号分隔的字段选择
+
+    Args:
+        fields: 如 "title,status"，为空表示返回全部字段
+        allowed: 允许选择的字段（按响应中的顺序）
+
+    Returns:
+        选中的字段（始终包含 id，按 allowed 中的顺序），未指定时返回 None
+
+    Raises:
+        ValueError: 包含不支持的字段
+    """
+    if not fields:
+        return None
+    allowed = list(allowed)
+    requested: Set[str] = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}，可选: {', '.join(allowed)}")
+    requested.add("id")
+    return [name for name in allowed if name in requested]
+
+
+def sort_key(column, dialect: str) -> ColumnElement:
+    """游标比较与读取用的排序键表达式（SQLite 上日期时间列按存储的原始文本）"""
+    if dialect == "sqlite" and isinstance(column.type, DateTime):
+        return type_coerce(column, String)
+    return column
+
+
+def cursor_columns(columns: Sequence, dialect: str) -> List[ColumnElement]:
+    """需要额外查询的排序键列（标签 cursor_0、cursor_1...），供 next_cursor 生成游标"""
+    return [sort_key(column, dialect).label(f"cursor_{i}") for i, column in enumerate(columns)]
+
+
+def _bound(column, value, dialect: str):
+    """游标中的值作为比较参数"""
+    if dialect != "sqlite" and isinstance(column.type, DateTime):
+        return cast(literal(value), column.type)
+    return literal(value)
+
+
+def keyset_condition(columns: Sequence, values: Sequence[Any], descending: bool, dialect: str) -> ColumnElement:
+    """
+    位于游标之后的行：(c1, c2, ...) > (v1, v2, ...)（降序时为 <）
+
+    使用行值比较（SQLite 3.15+、PostgreSQL、MySQL 均支持）：SQLite 能直接在
+    (过滤列, c1, rowid) 索引上定位，展开成 OR 条件时则要逐行过滤与游标同一时间的记录
+    """
+    keys = [sort_key(column, dialect) for column in columns]
+    bounds = [_bound(column, value, dialect) for column, value in zip(columns, values)]
+    return tuple_(*keys) < tuple_(*bounds) if descending else tuple_(*keys) > tuple_(*bounds)
+
+
+def apply_keyset(statement: Select, columns: Sequence, descending: bool, cursor: Optional[str],
+                 limit: Optional[int], dialect: str) -> Select:
+    """
+    给列表查询加上排序、游标条件与条数限制，并附带 cursor_columns
+
+    Args:
+        statement: 已投影所需列、带过滤条件的查询
+        columns: 排序列（最后一列应为主键，保证顺序唯一）
+        descending: 是否降序
+        cursor: 上一页返回的游标
+        limit: page_size 规范化后的条数，None 表示不分页
+        dialect: 数据库方言名
+
+    Raises:
+        InvalidCursor: 游标无效
+    """
+    statement = statement.add_columns(*cursor_columns(columns, dialect)).order_by(
+        *[column.desc() if descending else column.asc() for column in columns]
+    )
+    if cursor:
+        statement = statement.where(keyset_condition(columns, decode_cursor(cursor, len(columns)), descending, dialect))
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def next_cursor(rows: Sequence, limit: Optional[int], size: int) -> Optional[str]:
+    """本页满额时用最后一行的排序键（cursor_columns 查出的列）生成下一页游标"""
+    if limit is None or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor([getattr(last, f"cursor_{i}") for i in range(size)])
+
+
+def project_row(row, names: Sequence[str], converters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """把投影查询的一行转成只含所选字段的字典"""
+    converters = converters or {}
+    item = {}
+    for name in names:
+        value = getattr(row, name)
+        if value is not None and name in converters:
+            value = converters[name](value)
+        item[name] = value
+    return item
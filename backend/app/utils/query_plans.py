@@ -0,0 +1,75 @@
+"""
+热点查询的执行计划检查（EXPLAIN QUERY PLAN，SQLite）
+列出行程列表、费用列表/汇总、归属校验等高频查询，检查执行计划中是否出现全表扫描
+或未用上索引的排序；scripts/check_query_plans.py 与测试共用。
+"""
+
+from typing import List, Tuple
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.engine import Connection
+
+from app.models import Expense, GenerationJob, ItineraryActivity, Trip, TripBudgetTotal, User
+from app.utils.pagination import apply_keyset, encode_cursor
+
+
+def hot_queries() -> List[Tuple[str, Select, bool]]:
+    """返回 (名称, 语句, 是否允许临时排序)；语句与各路由中的查询保持一致"""
+    by_trip = Expense.trip_id == 1
+    activity = ItineraryActivity
+    user_activities = (
+        select(activity.trip_id, Trip.title, activity.name, activity.cost)
+        .join(Trip, Trip.id == activity.trip_id).where(Trip.user_id == 1)
+        .order_by(Trip.created_at.desc(), activity.trip_id.desc(), activity.day_index, activity.position).limit(50)
+    )
+    day = func.date(Expense.expense_date)
+    return [
+        ("itinerary.list", apply_keyset(select(Trip.id, Trip.title, Trip.status).where(Trip.user_id == 1), [Trip.created_at, Trip.id],
+            descending=True, cursor=None, limit=None, dialect="sqlite"), False),
+        ("itinerary.list.page", apply_keyset(
+            select(Trip.id, Trip.title, Trip.status).where(Trip.user_id == 1), [Trip.created_at, Trip.id],
+            descending=True, cursor=encode_cursor(["2025-10-01 00:00:00", 100]), limit=50, dialect="sqlite"), False),
+        ("trip.ownership", select(Trip).where(Trip.id == 1, Trip.user_id == 1), False),
+        ("budget.list", apply_keyset(select(Expense.id, Expense.amount, Expense.expense_date).where(by_trip), [Expense.expense_date, Expense.id],
+            descending=False, cursor=None, limit=None, dialect="sqlite"), False),
+        ("budget.list.page", apply_keyset(
+            select(Expense.id, Expense.amount, Expense.expense_date).where(by_trip), [Expense.expense_date, Expense.id],
+            descending=False, cursor=encode_cursor(["2025-10-01 00:00:00.000000", 100]), limit=50, dialect="sqlite"), False),
+        ("budget.summary", select(TripBudgetTotal.category, TripBudgetTotal.amount, TripBudgetTotal.expense_count)
+            .where(TripBudgetTotal.trip_id == 1, TripBudgetTotal.expense_count > 0), False),
+        # 分组和按金额取前几名需要临时排序，只要求按行程走索引
+        ("budget.summary.aggregate", select(Expense.category, func.sum(Expense.amount), func.count(Expense.id))
+            .where(by_trip).group_by(Expense.category), True),
+        ("budget.fingerprint", select(
+            func.count(Expense.id), func.sum(Expense.amount), func.max(Expense.id), func.max(Expense.created_at)
+        ).where(by_trip), False),
+        ("budget.stats.peak_day", select(day, func.sum(Expense.amount)).where(by_trip).group_by(day)
+            .order_by(func.sum(Expense.amount).desc()).limit(1), True),
+        ("budget.stats.top", select(Expense).where(by_trip).order_by(Expense.amount.desc(), Expense.id.asc()).limit(5), True),
+        ("activity.day_costs", select(activity.day_index, func.count(activity.id), func.sum(activity.cost))
+            .where(activity.trip_id == 1).group_by(activity.day_index).order_by(activity.day_index), False),
+        # 跨行程的活动查询按行程创建时间排序，结果集小，允许临时排序
+        ("activity.search", user_activities, True),
+        ("activity.search.type_cost", user_activities.where(activity.activity_type == "景点", activity.cost >= 200), True),
+        ("activity.search.location", user_activities.where(activity.location.contains("外滩", autoescape=True)), True),
+        ("auth.current_user", select(User).where(User.id == 1), False),
+        ("auth.login", select(User).where(User.email == "user@example.com"), False),
+        ("job.lookup", select(GenerationJob).where(GenerationJob.id == 1, GenerationJob.user_id == 1), False),
+    ]
+
+
+def plan_problems(details: List[str], allow_temp_sort: bool) -> List[str]:
+    """从执行计划中找出全表扫描与未用上索引的排序"""
+    problems = []
+    for detail in details:
+        if detail.startswith("SCAN ") and "CONSTANT ROW" not in detail:
+            problems.append(f"全表扫描: {detail}")
+        elif "TEMP B-TREE FOR ORDER BY" in detail and not allow_temp_sort:
+            problems.append(f"排序未使用索引: {detail}")
+    return problems
+
+
+def explain(conn: Connection, statement: Select) -> List[str]:
+    """返回语句的执行计划（每步的描述）"""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
@@ -0,0 +1,66 @@
+"""
+SQLite 存储配置
+在建立连接时设置 PRAGMA，使 SQLite 能承受并发的费用写入与行程读取：
+
+- journal_mode=WAL：读写互不阻塞，读连接不会因写事务而串行
+- synchronous=NORMAL：WAL 模式下仍保证一致性，提交时少一次 fsync
+- busy_timeout：遇到锁时等待而不是立即报 "database is locked"
+- mmap_size / cache_size / temp_store：内存映射读取、页缓存大小与临时表放在内存
+
+各项均可通过环境变量调整；只读连接额外开启 query_only，防止误写入读连接池。
+"""
+
+import os
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    """按环境变量生成连接时执行的 PRAGMA（顺序即执行顺序）"""
+    return {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+        # 256MB 内存映射；页缓存为负数时单位是 KiB（每个连接 16MB）
+        "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+        "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-16000"),
+        "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    }
+
+
+def is_sqlite_file(url: str) -> bool:
+    """是否为文件型 SQLite（内存库没有 WAL，也不能拆分连接池）"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _execute_pragmas(dbapi_connection, pragmas: Dict[str, str]):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _on_connect(dbapi_connection, connection_record):
+    _execute_pragmas(dbapi_connection, sqlite_pragmas())
+
+
+def _on_connect_read_only(dbapi_connection, connection_record):
+    _execute_pragmas(dbapi_connection, {**sqlite_pragmas(), "query_only": "ON"})
+
+
+def apply_sqlite_profile(engine: Engine, read_only: bool = False):
+    """
+    为 SQLite 引擎注册连接时的 PRAGMA 设置（重复调用无副作用）
+
+    Args:
+        engine: 同步引擎；异步引擎传入其 sync_engine
+        read_only: 是否为只读连接池（开启 query_only）
+    """
+    listener = _on_connect_read_only if read_only else _on_connect
+    if not event.contains(engine, "connect", listener):
+        event.listen(engine, "connect", listener)
@@ -0,0 +1,338 @@
+"""
+行程文本的本地预解析
+在调用大模型之前，用确定性规则从“下周一去杭州玩三天，两个人，预算五千”这类文本中
+抽取目的地、日期、人数、预算和偏好：
+
+- 中文数字与金额单位（万/千/块）
+- 出行人数（“两个人”“一家三口”“两个大人一个小孩”“情侣”）
+- 相对日期与节假日（明天、下周一、国庆），以服务器当天为基准
+- 目的地词表
+
+只把有把握的字段填上；识别不了或有歧义的字段列在 missing 中交给大模型，
+文本中除已识别内容外几乎没有其他信息时，未提到的字段直接为 null，完全不调用大模型。
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.cn_numbers import NUMBER_PATTERN, cn_to_number, normalize_digits, to_cn_numeral
+from app.utils.cn_dates import find_dates, find_duration, has_vague_date
+from app.utils.destinations import find_destinations
+
+FIELDS = ("destination", "title", "start_date", "end_date", "budget", "travelers", "preferences")
+
+_N = f"({NUMBER_PATTERN})"
+_MONEY_RE = re.compile(rf"{_N}\s*(块钱|块|元|万元|千元|rmb|RMB|人民币)")
+_BUDGET_PREFIX_RE = re.compile(
+    rf"(?:预算|经费|花费|总共花|一共花|控制在|不超过)(?:是|为|在|有|大概|大约|约|差不多|控制在|不超过|[:：])*\s*{_N}\s*(块钱|块|元)?"
+)
+_PER_PERSON_RE = re.compile(r"人均|每人|每个人|每位")
+_PER_PERSON_BUDGET_RE = re.compile(rf"(?:人均|每人|每个人|每位)(?:预算|花费|消费)?(?:大概|大约|约|差不多)?\s*{_N}\s*(块钱|块|元)?")
+_TRAVELERS_RE = re.compile(rf"{_N}\s*个?\s*(?:人|位)(?![民均])")
+_FAMILY_RE = re.compile(rf"一家\s*{_N}\s*口|{_N}\s*口之家|{_N}\s*口人")
+_ADULTS_RE = re.compile(rf"{_N}\s*个?\s*(?:大人|成人)")
+_CHILDREN_RE = re.compile(rf"{_N}\s*个?\s*(?:小孩|孩子|儿童|宝宝|娃)")
+_COUPLE_RE = re.compile(r"情侣|夫妻|两口子|小两口|我俩|我们俩|咱俩|蜜月|和(?:老婆|老公|女朋友|男朋友|女友|男友|对象)")
+# 情侣说法之后再出现的同行人（“和老婆孩子”“夫妻带爸妈”），人数不止两人
+_OTHER_COMPANION_RE = re.compile(r"孩子|小孩|儿子|女儿|宝宝|娃|爸妈|父母|爸爸|妈妈|公婆|岳父|岳母|老人|家人|朋友|同学|闺蜜|同事|室友|兄弟|姐妹")
+_SOLO_RE = re.compile(r"独自|独行|自己一个人|一个人去|穷游一个人|solo")
+_COMPANION_RE = re.compile(r"(?:和|跟|带|陪)(?:着)?(?:朋友|同学|爸妈|父母|家人|孩子|小孩|闺蜜|同事|老人|室友|兄弟)")
+_ORIGIN_RE = re.compile(r"从\s*$")
+_ORIGIN_TAIL_RE = re.compile(r"^\s*(?:出发|飞|坐|开车|自驾)")
+
+PREFERENCE_KEYWORDS: List[Tuple[str, str]] = [
+    ("美食", r"美食|好吃的|小吃|吃货|吃吃喝喝|吃"),
+    ("亲子游", r"亲子|带娃|带孩子|小孩|孩子|宝宝|儿童"),
+    ("悠闲", r"不想早起|不喜欢早起|不早起|睡懒觉|悠闲|休闲|慢节奏|轻松|躺平|度假"),
+    ("购物", r"购物|逛街|买买买|免税"),
+    ("自然风光", r"自然风光|大自然|风景|山水|爬山|徒步|登山"),
+    ("海边", r"海边|看海|海岛|沙滩|潜水"),
+    ("历史文化", r"历史|古迹|古镇|古城|博物馆|寺庙|文化"),
+    ("动漫文化", r"动漫|二次元|漫展|手办"),
+    ("拍照打卡", r"拍照|打卡|网红|出片"),
+    ("夜生活", r"酒吧|夜生活|蹦迪|夜店"),
+    ("夜景", r"夜景"),
+    ("特种兵", r"特种兵|暴走|紧凑"),
+    ("温泉", r"温泉"),
+    ("滑雪", r"滑雪"),
+    ("主题乐园", r"迪士尼|环球影城|游乐园|乐园"),
+]
+_PREFERENCE_RE = [(label, re.compile(pattern)) for label, pattern in PREFERENCE_KEYWORDS]
+_NEGATION_RE = re.compile(r"[不别没]\S{0,2}$")
+
+# 不携带信息的连接词与语气词，去掉后剩余内容很少即认为文本已被完整识别
+_FILLER_RE = re.compile(
+    r"我们|咱们|大家|我|一个|从|想要|想|要|打算|准备|计划|希望|出发|出去|过去|去|到|飞|玩儿|玩|旅游|旅行|度假|游|"
+    r"一趟|一下|一次|左右|大概|大约|差不多|上下|以内|之内|预算|经费|总共|一共|共|和|跟|一起|的|了|吧|呢|啊|哦|呀|嘛|"
+    r"在|是|为|待|呆|个|人|天|元|块|钱|有|请|帮|安排|规划|行程|计划一下|时候|然后|再|就|也|还|吗|出行|回来|返回|喜欢|爱|"
+    r"[\s，。！？、,.!?~～；;：:（）()\-—]"
+)
+# 剩余字符不超过该值时视为完整识别
+RESIDUAL_LIMIT = 2
+
+
+@dataclass
+class TripPreParse:
+    """本地预解析结果"""
+    # 有把握的字段（值可能为 None，表示文本中确实没有提到）
+    fields: Dict[str, Any] = field(default_factory=dict)
+    # 需要交给大模型的字段
+    missing: List[str] = field(default_factory=list)
+    # 本地识别出但没把握的值（如剩余文本中可能还有其他偏好），供大模型参考
+    hints: Dict[str, Any] = field(default_factory=dict)
+    # 去掉已识别内容后剩余的文本
+    residual: str = ""
+
+    @property
+    def complete(self) -> bool:
+        """是否无需调用大模型"""
+        return not self.missing
+
+
+def _int(text: str) -> Optional[int]:
+    value = cn_to_number(text)
+    return int(value) if value is not None and value == int(value) and value > 0 else None
+
+
+class _Spans:
+    """记录已识别内容的位置，用于计算剩余文本"""
+
+    def __init__(self):
+        self.items: List[Tuple[int, int]] = []
+
+    def add(self, start: int, end: int):
+        self.items.append((start, end))
+
+    def residual(self, text: str) -> str:
+        chars = list(text)
+        for start, end in self.items:
+            for i in range(start, min(end, len(chars))):
+                chars[i] = " "
+        return _FILLER_RE.sub("", "".join(chars))
+
+
+def _parse_destination(text: str, spans: _Spans) -> Tuple[Optional[str], bool]:
+    """返回 (目的地, 是否有把握)；出发地（“从上海出发”）不算目的地"""
+    candidates = []
+    for name, start, end in find_destinations(text):
+        spans.add(start, end)
+        if _ORIGIN_RE.search(text[max(0, start - 2):start]) or _ORIGIN_TAIL_RE.match(text[end:]):
+            continue
+        if name not in candidates:
+            candidates.append(name)
+    if len(candidates) == 1:
+        return candidates[0], True
+    return None, not candidates
+
+
+def _parse_dates(text: str, today: date, spans: _Spans) -> Tuple[Dict[str, Optional[str]], List[str], Optional[int]]:
+    """返回 (日期字段, 没把握的字段, 天数)"""
+    dates = find_dates(text, today)
+    duration = find_duration(text, dates)
+    for match in dates:
+        spans.add(match.start, match.end)
+    if duration:
+        spans.add(duration.start, duration.end)
+
+    start = end = None
+    uncertain: List[str] = []
+    if len(dates) > 2:
+        return {"start_date": None, "end_date": None}, ["start_date", "end_date"], None
+    if dates:
+        start = dates[0].value
+        if len(dates) == 2 and dates[1].kind == "weekday" and dates[1].value <= start:
+            # “下周三去，周五回来”：返回日按出发日所在的星期推算
+            while dates[1].value <= start:
+                dates[1].value += timedelta(days=7)
+        if dates[0].range_end:
+            end = dates[0].range_end
+        elif len(dates) == 2:
+            if dates[1].value > start:
+                end = dates[1].value
+            else:
+                uncertain.append("end_date")
+        elif duration:
+            end = start + timedelta(days=max(duration.days, 1) - 1)
+        elif dates[0].kind == "holiday":
+            # 只说“国庆去”，结束日期交给大模型按假期推断
+            uncertain.append("end_date")
+    elif has_vague_date(text):
+        uncertain += ["start_date", "end_date"]
+    elif duration:
+        # 只有天数没有出发日期，结束日期无法确定
+        uncertain.append("end_date")
+
+    days = duration.days if duration else ((end - start).days + 1 if start and end else None)
+    return {
+        "start_date": start.isoformat() if start else None,
+        "end_date": end.isoformat() if end else None,
+    }, uncertain, days
+
+
+def _parse_budget(text: str, spans: _Spans) -> Tuple[Optional[float], bool]:
+    """返回 (预算, 是否有把握)；人均预算或出现多个金额时交给大模型"""
+    per_person = _PER_PERSON_BUDGET_RE.search(text)
+    if per_person:
+        spans.add(per_person.start(), per_person.end())
+        return None, False
+    amounts = []
+    for regex in (_BUDGET_PREFIX_RE, _MONEY_RE):
+        for m in regex.finditer(text):
+            value = cn_to_number(m.group(1))
+            if value is None:
+                continue
+            if _PER_PERSON_RE.search(text[max(0, m.start() - 4):m.start()]):
+                spans.add(m.start(), m.end())
+                return None, False
+            spans.add(m.start(), m.end())
+            if value not in amounts:
+                amounts.append(value)
+    if len(amounts) > 1:
+        return None, False
+    return (amounts[0] if amounts else None), True
+
+
+def _parse_travelers(text: str, spans: _Spans) -> Tuple[Optional[int], bool]:
+    """返回 (人数, 是否有把握)"""
+    companion = _COMPANION_RE.search(text)
+    if companion:
+        spans.add(companion.start(), companion.end())
+    adults = _ADULTS_RE.search(text)
+    children = _CHILDREN_RE.search(text)
+    if adults or children:
+        total = 0
+        counted = [m for m in (adults, children) if m]
+        for m in counted:
+            count = _int(m.group(1))
+            if count is None:
+                return None, False
+            spans.add(m.start(), m.end())
+            total += count
+        if adults and children:
+            return total, True
+        # 只数了大人或只数了孩子：计数之外还提到其他同行人时人数不确定
+        others = [
+            m for m in _OTHER_COMPANION_RE.finditer(text)
+            if not any(c.start() <= m.start() < c.end() for c in counted)
+        ]
+        if others:
+            return None, False
+        if adults:
+            return total, True
+        # “和老婆带两个孩子”：孩子加上夫妻两人；只说“带两个孩子”时大人数交给大模型
+        couple = _COUPLE_RE.search(text)
+        if couple:
+            spans.add(couple.start(), couple.end())
+            return total + 2, True
+        return None, False
+
+    family = _FAMILY_RE.search(text)
+    if family:
+        spans.add(family.start(), family.end())
+        count = _int(next(group for group in family.groups() if group))
+        return count, count is not None
+
+    counts = []
+    for m in _TRAVELERS_RE.finditer(text):
+        # “人均”“每人”后面的数字不是人数
+        if _PER_PERSON_RE.match(text, m.start()):
+            continue
+        count = _int(m.group(1))
+        if count is not None:
+            spans.add(m.start(), m.end())
+            if count not in counts:
+                counts.append(count)
+    if len(counts) == 1:
+        return counts[0], True
+    if len(counts) > 1:
+        return None, False
+
+    couple = _COUPLE_RE.search(text)
+    if couple:
+        spans.add(couple.start(), couple.end())
+        if _OTHER_COMPANION_RE.search(text, couple.end()):
+            # “和老婆孩子去”：还有其他同行人，人数交给大模型
+            return None, False
+        return 2, True
+    solo = _SOLO_RE.search(text)
+    if solo:
+        spans.add(solo.start(), solo.end())
+        return 1, True
+    if companion:
+        # “和朋友去”：人数不确定
+        return None, False
+    return None, True
+
+
+def _parse_preferences(text: str, spans: _Spans) -> Tuple[Optional[str], bool]:
+    """返回 (偏好, 是否有把握)；出现否定（“不喜欢购物”）时交给大模型"""
+    found: List[Tuple[int, str]] = []
+    confident = True
+    for label, regex in _PREFERENCE_RE:
+        for m in regex.finditer(text):
+            spans.add(m.start(), m.end())
+            if _NEGATION_RE.search(text[max(0, m.start() - 3):m.start()]):
+                confident = False
+                continue
+            if label not in (item[1] for item in found):
+                found.append((m.start(), label))
+    labels = [label for _, label in sorted(found)]
+    return ("、".join(labels) if labels else None), confident
+
+
+def preparse_trip(text: str, today: Optional[date] = None) -> TripPreParse:
+    """
+    本地预解析行程文本
+
+    Args:
+        text: 用户输入
+        today: 解析相对日期的基准日，默认服务器当天
+
+    Returns:
+        TripPreParse，fields 中为有把握的字段，missing 为需要大模型补充的字段
+    """
+    today = today or date.today()
+    text = normalize_digits(text)
+    spans = _Spans()
+    result = TripPreParse()
+    uncertain: List[str] = []
+
+    destination, ok = _parse_destination(text, spans)
+    if ok:
+        result.fields["destination"] = destination
+    else:
+        uncertain += ["destination", "title"]
+
+    dates, date_uncertain, days = _parse_dates(text, today, spans)
+    uncertain += date_uncertain
+    for key, value in dates.items():
+        if key not in date_uncertain:
+            result.fields[key] = value
+
+    for key, parse in (("budget", _parse_budget), ("travelers", _parse_travelers), ("preferences", _parse_preferences)):
+        value, ok = parse(text, spans)
+        if ok:
+            result.fields[key] = value
+        else:
+            uncertain.append(key)
+
+    if destination:
+        if days and days < 100:
+            result.fields["title"] = f"{destination}{'两' if days == 2 else to_cn_numeral(days)}日游"
+        else:
+            result.fields["title"] = f"{destination}之旅"
+
+    result.residual = spans.residual(text)
+    if len(result.residual) > RESIDUAL_LIMIT:
+        # 还有未识别的内容：没填上的字段和偏好都交给大模型
+        uncertain += [key for key in FIELDS if result.fields.get(key) is None]
+        uncertain.append("preferences")
+
+    result.missing = [key for key in FIELDS if key in uncertain]
+    for key in result.missing:
+        value = result.fields.pop(key, None)
+        if value is not None:
+            result.hints[key] = value
+    return result
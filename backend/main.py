@@ -5,11 +5,17 @@ AI Travel Planner - FastAPI Backend
 
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, itinerary, budget, speech_recognition, text_parse
-from app.database import Base, engine
-from app.models import User, Trip, Expense  # 导入所有模型以确保它们被注册
+from app.database import run_migrations_async, dispose_engines
+from app.models import User, Trip, Expense, GenerationJob  # 导入所有模型以确保它们被注册
+from app.services.llm_gateway import llm_gateway
+from app.services.model_router import model_router
+from app.services.job_queue import job_queue
+from app.services.resilience import breaker_states
+from app.utils.metrics import metrics
+from app.utils.db_profiler import begin_request
 import uvicorn
 
 # 加载.env文件中的环境变量
@@ -54,18 +60,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Queries", "X-DB-Time-Ms", "X-Next-Cursor"],
 )
 
+# 按请求统计SQL查询次数与数据库耗时
+@app.middleware("http")
+async def sql_stats_middleware(request: Request, call_next):
+    """
+    把本次请求的查询次数和数据库耗时写入响应头（X-DB-Queries / X-DB-Time-Ms）并记录到指标。
+    流式响应的响应头在开始输出时发送，只包含此前执行的查询。
+    """
+    stats = begin_request(f"{request.method} {request.url.path}")
+    response = await call_next(request)
+    # 按处理函数归类（如 "GET budget.get_budget_stats"），路径参数不会产生新的指标名
+    endpoint = request.scope.get("endpoint")
+    label = f"{request.method} {endpoint.__module__.rsplit('.', 1)[-1]}.{endpoint.__name__}" if endpoint else "unmatched"
+    stats.label = label
+    response.headers["X-DB-Queries"] = str(stats.queries)
+    response.headers["X-DB-Time-Ms"] = f"{stats.db_time * 1000:.1f}"
+    if stats.queries:
+        metrics.observe("db.request.time", stats.db_time)
+        metrics.observe("db.request.queries", stats.queries)
+        metrics.observe(f"db.route.{label}.queries", stats.queries)
+        metrics.observe(f"db.route.{label}.time", stats.db_time)
+    return response
+
 # 数据库初始化事件
 @app.on_event("startup")
 async def startup_event():
     """
-    应用启动时自动创建数据库表
-    如果表已存在则不会重复创建
+    应用启动时执行尚未应用的数据库迁移
+    已应用的版本记录在 schema_version 表中，不会重复执行
     """
     print("正在初始化数据库...")
-    Base.metadata.create_all(bind=engine)
+    applied = await run_migrations_async()
+    if applied:
+        print(f"已应用数据库迁移: {applied}")
     print("数据库初始化完成！")
+    # 读取LLM配置并预热连接池
+    llm_gateway.configure()
+    await llm_gateway.warmup()
+    # 启动行程生成任务队列（恢复上次未完成的任务）
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    应用关闭时停止任务队列并释放LLM网关与数据库的连接池
+    """
+    await job_queue.stop()
+    await llm_gateway.aclose()
+    await dispose_engines()
 
 # 注册路由
 app.include_router(auth.router, prefix="/api/auth", tags=["认证"])
@@ -86,8 +131,19 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """健康检查接口"""
-    return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z"}
+    """健康检查接口（包含上游熔断器状态，任一熔断器打开时为 degraded）"""
+    breakers = breaker_states()
+    degraded = any(state["state"] == "open" for state in breakers.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "timestamp": "2024-01-01T00:00:00Z",
+        "upstreams": breakers,
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """进程内运行指标（计数器、仪表值、耗时分位数与各任务的模型路由状态）"""
+    return {**metrics.snapshot(), "model_routes": model_router.snapshot()}
 
 @app.get("/api/test")
 async def test_api():
@@ -0,0 +1,184 @@
+"""
+基准测试：活动查询——解码行程JSON vs itinerary_activities 表
+
+为一个用户写入 --trips 个行程（每个 --days 天、每天 --activities 个活动），比较：
+
+1. 费用不低于 200 元的景点：加载全部行程JSON在 Python 中筛选 vs search_activities
+2. 地点包含“外滩”的活动：同上
+3. 单个行程的按天计划费用：解码该行程JSON后累加 vs day_costs
+
+并校验两种方式结果一致。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_activity_queries.py
+   python scripts/bench_activity_queries.py --trips 2000 --rounds 10
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TYPES = ["景点", "餐饮", "交通", "购物", "住宿", "娱乐"]
+LOCATIONS = ["外滩", "豫园", "南京路步行街", "东方明珠塔", "新天地", "田子坊", "如家酒店（上海人民广场店）"]
+
+
+def seed(trips: int, days: int, activities: int) -> int:
+    """执行迁移并批量写入行程（Core 插入后重建活动表），返回用户ID"""
+    from sqlalchemy import insert
+    from app.database import SessionLocal, create_tables
+    from app.models import Trip, User
+    from app.models.activity import rebuild_itinerary_activities
+
+    create_tables()
+    rng = random.Random(0)
+    start = datetime(2025, 10, 1)
+
+    def itinerary():
+        return {
+            f"day{day}": {
+                "date": (start + timedelta(days=day - 1)).strftime("%Y-%m-%d"),
+                "activities": [
+                    {
+                        "time": f"{9 + i:02d}:00",
+                        "activity": f"活动{day}-{i}",
+                        "location": rng.choice(LOCATIONS),
+                        "duration": f"{rng.randint(1, 3)}小时",
+                        "cost": rng.choice([0, 50, 80, 120, 180, 200, 260, 400]),
+                        "type": rng.choice(TYPES),
+                        "description": "x" * 60,
+                    }
+                    for i in range(activities)
+                ],
+            }
+            for day in range(1, days + 1)
+        }
+
+    with SessionLocal() as db:
+        user = User(username="benchuser", email="bench@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        db.execute(insert(Trip), [
+            {
+                "user_id": user.id,
+                "title": f"基准行程{i}",
+                "destination": "上海",
+                "start_date": start,
+                "end_date": start + timedelta(days=days - 1),
+                "status": "planning",
+                "itinerary": itinerary(),
+            }
+            for i in range(trips)
+        ])
+        rebuild_itinerary_activities(db.connection())
+        db.commit()
+        return user.id
+
+
+async def json_search(db, user_id: int, predicate):
+    """改造前：加载用户全部行程JSON后逐个活动筛选"""
+    from sqlalchemy import select
+    from app.models import Trip
+    from app.utils.activity_parser import activity_rows
+
+    rows = (await db.execute(select(Trip.id, Trip.itinerary).where(Trip.user_id == user_id))).all()
+    return sorted(
+        (trip_id, row["day_index"], row["position"])
+        for trip_id, itinerary in rows for row in activity_rows(itinerary) if predicate(row)
+    )
+
+
+async def json_day_costs(db, trip_id: int):
+    from sqlalchemy import select
+    from app.models import Trip
+    from app.utils.activity_parser import activity_rows
+
+    itinerary = await db.scalar(select(Trip.itinerary).where(Trip.id == trip_id))
+    totals = defaultdict(float)
+    for row in activity_rows(itinerary):
+        totals[row["day_index"]] += row["cost"] or 0
+    return [round(totals[day], 2) for day in sorted(totals)]
+
+
+def summarize(samples) -> str:
+    """返回 p50/p95（毫秒）"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50={statistics.median(ordered) * 1000:8.2f}ms p95={p95 * 1000:8.2f}ms"
+
+
+async def run(args, user_id: int):
+    from app.database import AsyncReadSessionLocal, dispose_engines
+    from app.services.activity_queries import day_costs, search_activities
+
+    limit = args.trips * args.days * args.activities
+
+    async def sql_search(db, **filters):
+        return sorted(
+            (item["trip_id"], item["day_index"], item["position"])
+            for item in await search_activities(db, user_id, limit=limit, **filters)
+        )
+
+    async def sql_day_costs(db):
+        return [item["planned_cost"] for item in await day_costs(db, 1)]
+
+    cases = [
+        ("景点且费用>=200", {
+            "json": lambda db: json_search(db, user_id, lambda row: row["activity_type"] == "景点" and (row["cost"] or 0) >= 200),
+            "sql": lambda db: sql_search(db, activity_type="景点", min_cost=200),
+        }),
+        ("地点包含外滩", {
+            "json": lambda db: json_search(db, user_id, lambda row: "外滩" in (row["location"] or "")),
+            "sql": lambda db: sql_search(db, location="外滩"),
+        }),
+        ("单个行程按天费用", {
+            "json": lambda db: json_day_costs(db, 1),
+            "sql": sql_day_costs,
+        }),
+    ]
+    print(f"{args.trips} 个行程 × {args.days} 天 × {args.activities} 个活动，每种方式 {args.rounds} 次\n")
+    for title, methods in cases:
+        print(title)
+        results = {}
+        for name, method in methods.items():
+            samples = []
+            for _ in range(args.rounds):
+                async with AsyncReadSessionLocal() as db:
+                    started = time.perf_counter()
+                    results[name] = await method(db)
+                    samples.append(time.perf_counter() - started)
+            print(f"  {name:<6}{len(results[name]):>7} 条  {summarize(samples)}")
+        print(f"  结果一致: {results['json'] == results['sql']}\n")
+
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="活动查询方式基准测试")
+    parser.add_argument("--trips", type=int, default=500, help="用户的行程数")
+    parser.add_argument("--days", type=int, default=5, help="每个行程的天数")
+    parser.add_argument("--activities", type=int, default=6, help="每天的活动数")
+    parser.add_argument("--rounds", type=int, default=10, help="每种方式的测量次数")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ.setdefault("SQL_SLOW_QUERY_MS", "100000")
+    logging.disable(logging.WARNING)
+
+    user_id = seed(args.trips, args.days, args.activities)
+    asyncio.run(run(args, user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+基准测试：预算汇总的三种计算方式
+
+在一个有 --expenses 条费用（默认 20000）的行程上比较：
+
+1. python：加载全部 Expense 对象后在 Python 中求和（改造前的 /api/budget/summary）
+2. sql：在 expenses 上 SUM/GROUP BY category
+3. totals：读取 trip_budget_totals 维护表（每个类别一行）
+
+并校验三者结果一致。另外测量维护汇总表给单条费用写入带来的额外耗时
+（同一事务内多一条 upsert）。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_budget_summary.py
+   python scripts/bench_budget_summary.py --expenses 100000 --rounds 10 --writes 1000
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ["transport", "accommodation", "food", "entertainment", "shopping", "other"]
+
+
+def seed(expenses: int) -> int:
+    """执行迁移并批量写入一个行程的费用，返回行程ID"""
+    from sqlalchemy import insert
+    from app.database import SessionLocal, create_tables
+    from app.models import Expense, Trip, User
+    from app.models.budget_total import rebuild_budget_totals
+
+    create_tables()
+    rng = random.Random(0)
+    start = datetime(2025, 10, 1)
+    with SessionLocal() as db:
+        user = User(username="benchuser", email="bench@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        trip = Trip(user_id=user.id, title="基准行程", destination="上海", start_date=start, end_date=start + timedelta(days=29), budget=500000)
+        db.add(trip)
+        db.flush()
+        # Core 批量插入不触发 ORM 事件，写完后一次性重建汇总
+        db.execute(insert(Expense), [
+            {
+                "trip_id": trip.id,
+                "amount": round(rng.uniform(5, 500), 2),
+                "category": rng.choice(CATEGORIES),
+                "description": f"费用{i}",
+                "expense_date": start + timedelta(days=rng.randrange(30)),
+            }
+            for i in range(expenses)
+        ])
+        rebuild_budget_totals(db.connection(), trip.id)
+        db.commit()
+        return trip.id
+
+
+async def python_summary(db, trip_id: int):
+    """改造前：加载全部费用对象后在 Python 中汇总"""
+    from sqlalchemy import select
+    from app.models import Expense
+
+    expenses = (await db.scalars(select(Expense).where(Expense.trip_id == trip_id))).all()
+    totals = defaultdict(float)
+    counts = defaultdict(int)
+    for expense in expenses:
+        totals[expense.category] += float(expense.amount)
+        counts[expense.category] += 1
+    return {category: (round(totals[category], 2), counts[category]) for category in totals}
+
+
+async def service_summary(db, trip_id: int, use_totals: bool):
+    from app.services.budget_totals import category_totals
+
+    return {item["category"]: (item["amount"], item["count"]) for item in await category_totals(db, trip_id, use_totals=use_totals)}
+
+
+def summarize(samples) -> str:
+    """返回 p50/p95（毫秒）"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50={statistics.median(ordered) * 1000:8.2f}ms p95={p95 * 1000:8.2f}ms"
+
+
+async def measure_writes(trip_id: int, count: int, maintained: bool):
+    """逐条写入费用（每条一个事务），返回每条耗时"""
+    from sqlalchemy import event
+    from app.database import AsyncSessionLocal
+    from app.models import Expense
+    from app.models import budget_total
+
+    if not maintained:
+        event.remove(Expense, "after_insert", budget_total._expense_inserted)
+    samples = []
+    try:
+        for i in range(count):
+            started = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                db.add(Expense(trip_id=trip_id, amount=12.5, category=CATEGORIES[i % len(CATEGORIES)],
+                               description="基准写入", expense_date=datetime(2025, 10, 2)))
+                await db.commit()
+            samples.append(time.perf_counter() - started)
+    finally:
+        if not maintained:
+            event.listen(Expense, "after_insert", budget_total._expense_inserted)
+    return samples
+
+
+async def run(args, trip_id: int):
+    from app.database import AsyncReadSessionLocal, dispose_engines
+
+    methods = {
+        "python": lambda db: python_summary(db, trip_id),
+        "sql": lambda db: service_summary(db, trip_id, use_totals=False),
+        "totals": lambda db: service_summary(db, trip_id, use_totals=True),
+    }
+    print(f"单个行程 {args.expenses} 条费用，每种方式 {args.rounds} 次\n")
+    results = {}
+    for name, method in methods.items():
+        samples = []
+        for _ in range(args.rounds):
+            async with AsyncReadSessionLocal() as db:
+                started = time.perf_counter()
+                results[name] = await method(db)
+                samples.append(time.perf_counter() - started)
+        print(f"  {name:<8}{summarize(samples)}")
+
+    consistent = all(
+        abs(results[name][category][0] - results["python"][category][0]) < 0.01
+        and results[name][category][1] == results["python"][category][1]
+        for name in ("sql", "totals") for category in results["python"]
+    ) and len(results["sql"]) == len(results["totals"]) == len(results["python"])
+    print(f"\n三种方式结果一致: {consistent}")
+
+    if args.writes:
+        without = await measure_writes(trip_id, args.writes, maintained=False)
+        with_totals = await measure_writes(trip_id, args.writes, maintained=True)
+        print(f"\n单条写入（{args.writes} 次）")
+        print(f"  不维护汇总  {summarize(without)}")
+        print(f"  维护汇总    {summarize(with_totals)}")
+
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预算汇总计算方式基准测试")
+    parser.add_argument("--expenses", type=int, default=20000, help="行程的费用条数")
+    parser.add_argument("--rounds", type=int, default=20, help="每种方式的测量次数")
+    parser.add_argument("--writes", type=int, default=300, help="写入开销测量的费用条数，0 表示跳过")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ.setdefault("SQL_SLOW_QUERY_MS", "100000")
+    logging.disable(logging.WARNING)
+
+    trip_id = seed(args.expenses)
+    asyncio.run(run(args, trip_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+基准测试：同步会话与异步会话在读写混合负载下的吞吐与事件循环延迟
+
+在同一个 SQLite 文件和同一套模型上构建两个最小 FastAPI 应用：
+
+- sync：async 路由中直接使用同步 Session（迁移前的写法，查询在事件循环线程上阻塞执行）
+- async：使用 AsyncSession（aiosqlite，迁移后的写法）
+
+两者都提供 添加费用（写）、费用列表（读）、费用汇总（聚合读）三个接口，
+以固定并发按 --write-ratio 混合发起请求，统计吞吐、各类请求的 p50/p95 延迟，
+并用一个每 10ms 醒来一次的探针协程测量事件循环延迟（实际唤醒时间超出预期的部分）。
+
+事件循环延迟反映的是同进程内其他请求（如 SSE 推送、LLM 流式响应）被数据库查询拖慢的程度；
+纯吞吐上 aiosqlite 需要在线程间传递结果，本地 SQLite 上未必更快。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_db_async.py
+   python scripts/bench_db_async.py --requests 3000 --concurrency 32 --write-ratio 0.3 --seed 20000
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ["transport", "accommodation", "food", "entertainment", "shopping", "other"]
+PROBE_INTERVAL = 0.01
+WRITE_DATE = datetime(2025, 10, 2)
+
+
+def build_app(mode: str):
+    """构建只包含费用读写接口的最小应用"""
+    from fastapi import FastAPI, Depends
+    from sqlalchemy import func, select
+    from app.database import SessionLocal, get_db
+    from app.models.expense import Expense
+
+    app = FastAPI()
+
+    if mode == "sync":
+        def get_sync_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        @app.post("/expenses/{trip_id}")
+        async def add_expense(trip_id: int, payload: dict, db=Depends(get_sync_db)):
+            expense = Expense(trip_id=trip_id, expense_date=WRITE_DATE, **payload)
+            db.add(expense)
+            db.commit()
+            return {"id": expense.id}
+
+        @app.get("/expenses/{trip_id}")
+        async def list_expenses(trip_id: int, db=Depends(get_sync_db)):
+            rows = db.scalars(
+                select(Expense).where(Expense.trip_id == trip_id).order_by(Expense.expense_date.desc()).limit(50)
+            ).all()
+            return [expense.to_dict() for expense in rows]
+
+        @app.get("/expenses/{trip_id}/summary")
+        async def summary(trip_id: int, db=Depends(get_sync_db)):
+            rows = db.execute(
+                select(Expense.category, func.sum(Expense.amount)).where(Expense.trip_id == trip_id).group_by(Expense.category)
+            ).all()
+            return {category: float(amount) for category, amount in rows}
+    else:
+        @app.post("/expenses/{trip_id}")
+        async def add_expense(trip_id: int, payload: dict, db=Depends(get_db)):
+            expense = Expense(trip_id=trip_id, expense_date=WRITE_DATE, **payload)
+            db.add(expense)
+            await db.commit()
+            return {"id": expense.id}
+
+        @app.get("/expenses/{trip_id}")
+        async def list_expenses(trip_id: int, db=Depends(get_db)):
+            rows = (await db.scalars(
+                select(Expense).where(Expense.trip_id == trip_id).order_by(Expense.expense_date.desc()).limit(50)
+            )).all()
+            return [expense.to_dict() for expense in rows]
+
+        @app.get("/expenses/{trip_id}/summary")
+        async def summary(trip_id: int, db=Depends(get_db)):
+            rows = (await db.execute(
+                select(Expense.category, func.sum(Expense.amount)).where(Expense.trip_id == trip_id).group_by(Expense.category)
+            )).all()
+            return {category: float(amount) for category, amount in rows}
+
+    return app
+
+
+def seed(trips: int, expenses: int) -> list:
+    """写入测试用户、行程与费用，返回行程ID列表"""
+    from app.database import SessionLocal, create_tables
+    from app.models.expense import Expense
+    from app.models.trip import Trip
+    from app.models.user import User
+
+    create_tables()
+    rng = random.Random(0)
+    db = SessionLocal()
+    try:
+        user = User(username="benchuser", email="bench@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        start = datetime(2025, 10, 1)
+        trip_rows = [
+            Trip(user_id=user.id, title=f"行程{i}", destination="上海", start_date=start, end_date=start + timedelta(days=6))
+            for i in range(trips)
+        ]
+        db.add_all(trip_rows)
+        db.flush()
+        db.add_all([
+            Expense(
+                trip_id=trip_rows[i % trips].id,
+                amount=round(rng.uniform(5, 500), 2),
+                category=rng.choice(CATEGORIES),
+                description=f"费用{i}",
+                expense_date=start + timedelta(days=rng.randrange(7)),
+            )
+            for i in range(expenses)
+        ])
+        db.commit()
+        return [trip.id for trip in trip_rows]
+    finally:
+        db.close()
+
+
+def summarize(samples) -> str:
+    """返回 p50/p95/max（毫秒）"""
+    if not samples:
+        return "-"
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50={statistics.median(ordered) * 1000:6.1f}ms p95={p95 * 1000:6.1f}ms max={ordered[-1] * 1000:6.1f}ms"
+
+
+async def probe_loop(lags: list, stop: asyncio.Event):
+    """每隔 PROBE_INTERVAL 醒来一次，记录实际唤醒时间超出预期的部分"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def run_mode(mode: str, trip_ids: list, args) -> dict:
+    """以固定并发对一个应用发起读写混合请求"""
+    import httpx
+
+    app = build_app(mode)
+    rng = random.Random(1)
+    plan = []
+    for _ in range(args.requests):
+        roll = rng.random()
+        if roll < args.write_ratio:
+            plan.append("write")
+        elif roll < args.write_ratio + (1 - args.write_ratio) / 2:
+            plan.append("list")
+        else:
+            plan.append("summary")
+
+    latencies = {"write": [], "list": [], "summary": []}
+    errors = 0
+    cursor = iter(plan)
+    lags: list = []
+    stop = asyncio.Event()
+
+    async def worker(client):
+        nonlocal errors
+        for kind in cursor:
+            trip_id = rng.choice(trip_ids)
+            started = time.perf_counter()
+            if kind == "write":
+                resp = await client.post(f"/expenses/{trip_id}", json={
+                    "amount": 35.5, "category": rng.choice(CATEGORIES),
+                    "description": "基准写入",
+                })
+            elif kind == "list":
+                resp = await client.get(f"/expenses/{trip_id}")
+            else:
+                resp = await client.get(f"/expenses/{trip_id}/summary")
+            latencies[kind].append(time.perf_counter() - started)
+            if resp.status_code != 200:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        probe = asyncio.create_task(probe_loop(lags, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    return {"elapsed": elapsed, "latencies": latencies, "errors": errors, "lags": lags}
+
+
+async def run(args, trip_ids):
+    from app.database import async_engine
+
+    results = {}
+    for mode in ("sync", "async"):
+        results[mode] = await run_mode(mode, trip_ids, args)
+    await async_engine.dispose()
+
+    print(f"请求 {args.requests} 次，并发 {args.concurrency}，写比例 {args.write_ratio:.0%}，"
+          f"初始费用 {args.seed} 条 / {args.trips} 个行程\n")
+    for mode, result in results.items():
+        title = "同步 Session" if mode == "sync" else "AsyncSession"
+        print(f"[{title}] 吞吐 {args.requests / result['elapsed']:.0f} req/s（{result['elapsed']:.2f}s），错误 {result['errors']}")
+        for kind, samples in result["latencies"].items():
+            print(f"  {kind:<8}{len(samples):>6} 次  {summarize(samples)}")
+        print(f"  事件循环延迟 {summarize(result['lags'])}（探针 {len(result['lags'])} 次）\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步与异步数据库会话的读写混合负载基准测试")
+    parser.add_argument("--requests", type=int, default=2000, help="每种模式的总请求数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发请求数")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="写请求比例，其余读请求在列表与汇总间平分")
+    parser.add_argument("--trips", type=int, default=20, help="行程数")
+    parser.add_argument("--seed", type=int, default=10000, help="预先写入的费用条数")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ.setdefault("SQL_SLOW_QUERY_MS", "10000")
+    logging.disable(logging.WARNING)
+
+    trip_ids = seed(args.trips, args.seed)
+    asyncio.run(run(args, trip_ids))
+
+
+if __name__ == "__main__":
+    main()
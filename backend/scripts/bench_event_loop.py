@@ -0,0 +1,152 @@
+"""
+基准测试：行程生成进行中时 /api/auth/me 的延迟
+
+启动一个本地的慢速 OpenAI 兼容替身服务，在同一事件循环中并发发起若干
+/api/itinerary/generate 请求，同时持续测量 /api/auth/me 的延迟。
+若LLM调用阻塞事件循环，/me 的延迟会随生成耗时一起飙升；使用异步网关后应保持平稳。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_event_loop.py --generations 20 --delay 3
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FAKE_ITINERARY = {
+    "day1": {
+        "date": "2025-10-01",
+        "activities": [
+            {"time": "09:00", "activity": "外滩观光", "location": "外滩", "duration": "2小时",
+             "cost": 0, "type": "景点", "description": "漫步外滩"}
+        ]
+    }
+}
+
+
+def start_fake_llm(delay: float) -> ThreadingHTTPServer:
+    """启动一个固定延迟的 chat/completions 替身服务"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(delay)
+            body = json.dumps({
+                "id": "bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "qwen-plus",
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": json.dumps(FAKE_ITINERARY, ensure_ascii=False)},
+                }],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 100, "total_tokens": 200},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summarize(samples):
+    """返回 p50/p95/max（毫秒）"""
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1] if len(ordered) >= 20 else ordered[-1]
+    return f"p50={statistics.median(ordered) * 1000:.1f}ms p95={p95 * 1000:.1f}ms max={ordered[-1] * 1000:.1f}ms"
+
+
+async def measure_me(client, headers, count: int):
+    """顺序请求 /api/auth/me 并记录每次的延迟"""
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        resp = await client.get("/api/auth/me", headers=headers)
+        samples.append(time.perf_counter() - started)
+        assert resp.status_code == 200, resp.text
+        await asyncio.sleep(0.02)
+    return samples
+
+
+async def run(args):
+    import httpx
+    from main import app
+    from app.database import create_tables, engine
+
+    # 关闭SQL回显与请求日志，避免输出干扰测量
+    engine.echo = False
+    for name in ("httpx", "app.services.ai_service"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    create_tables()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        resp = await client.post("/api/auth/register", json={
+            "username": "benchuser", "email": "bench@example.com", "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+        idle = await measure_me(client, headers, args.samples)
+        print(f"空闲时 /api/auth/me:            {summarize(idle)}")
+
+        payload = {"destination": "上海", "start_date": "2025-10-01", "end_date": "2025-10-03"}
+        started = time.perf_counter()
+        generations = [
+            asyncio.create_task(client.post("/api/itinerary/generate", json=payload, headers=headers))
+            for _ in range(args.generations)
+        ]
+        await asyncio.sleep(0.1)
+        busy = await measure_me(client, headers, args.samples)
+        results = await asyncio.gather(*generations)
+        elapsed = time.perf_counter() - started
+
+        ok = sum(1 for r in results if r.status_code == 200 and r.json().get("success"))
+        print(f"{args.generations}个生成在途时 /api/auth/me:  {summarize(busy)}")
+        print(f"生成完成 {ok}/{args.generations}，总耗时 {elapsed:.2f}s（单次上游延迟 {args.delay}s）")
+
+    from app.services.llm_gateway import llm_gateway
+    await llm_gateway.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行程生成期间事件循环响应性基准测试")
+    parser.add_argument("--generations", type=int, default=20, help="并发生成请求数")
+    parser.add_argument("--delay", type=float, default=3.0, help="替身LLM的响应延迟（秒）")
+    parser.add_argument("--samples", type=int, default=50, help="/me 采样次数")
+    args = parser.parse_args()
+
+    server = start_fake_llm(args.delay)
+    db_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ["DASHSCOPE_API_KEY"] = "bench"
+    os.environ["DASHSCOPE_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+费用文本本地抽取的命中率、准确率与延迟基准
+
+在标注语料 scripts/expense_corpus.jsonl（每行 text / today / expect）上运行
+app.utils.expense_extractor.extract_expense，统计：
+
+1. 在给定置信度阈值下本地直接返回（不调用大模型）的比例，以及命中样例中
+   金额、类别、日期与标注一致的比例（不一致的样例会逐条列出）
+2. 不同阈值下的命中率与准确率，用于选择 EXPENSE_LOCAL_THRESHOLD
+3. 本地抽取的耗时分布
+
+标注中金额或类别为 null 的样例表示本地不应命中（信息不足或有多笔金额）。
+描述为自由文本，不参与准确率统计。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_expense_extract.py
+   python scripts/bench_expense_extract.py --threshold 0.8 --rounds 200 --verbose
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.expense_extractor import extract_expense  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "expense_corpus.jsonl")
+SCORED_FIELDS = ["amount", "category", "expense_date"]
+SWEEP = [0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+
+
+def load_corpus():
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def same(actual, expected) -> bool:
+    """比较字段值（金额按浮点比较）"""
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return abs(actual - expected) < 1e-6
+    return actual == expected
+
+
+def evaluate(cases):
+    """对每条语料运行一次本地抽取，返回 (样例, 抽取结果, 各字段是否正确)"""
+    results = []
+    for case in cases:
+        extraction = extract_expense(case["text"], date.fromisoformat(case["today"]))
+        response = extraction.to_response()
+        checks = {name: same(response[name], case["expect"][name]) for name in SCORED_FIELDS}
+        results.append((case, extraction, checks))
+    return results
+
+
+def run_accuracy(results, threshold: float, verbose: bool):
+    """统计给定阈值下的命中率与准确率"""
+    total = len(results)
+    hits = [(case, extraction, checks) for case, extraction, checks in results if extraction.confidence >= threshold]
+    print(f"语料 {total} 条（{CORPUS_PATH}），阈值 {threshold}")
+    print(f"  本地直接返回: {len(hits):>3} ({len(hits) / total:.0%})")
+    print(f"  交给大模型:   {total - len(hits):>3} ({(total - len(hits)) / total:.0%})")
+
+    if hits:
+        print(f"\n{'字段':<14}{'命中样例准确率':>10}")
+        for name in SCORED_FIELDS:
+            correct = sum(1 for _, _, checks in hits if checks[name])
+            print(f"{name:<14}{correct / len(hits):>10.1%}")
+        exact = sum(1 for _, _, checks in hits if all(checks.values()))
+        print(f"{'全部字段':<14}{exact / len(hits):>10.1%}")
+
+    errors = [(case, extraction) for case, extraction, checks in hits if not all(checks.values())]
+    if errors:
+        print("\n本地直接返回但与标注不一致：")
+        for case, extraction in errors:
+            print(f"  {case['text']}\n    本地 {extraction.to_response()}\n    标注 {case['expect']}")
+
+    if verbose:
+        print("\n逐条结果：")
+        for case, extraction, _ in results:
+            mark = "本地" if extraction.confidence >= threshold else "大模型"
+            print(f"  [{mark}] {case['text']}  -> {extraction.to_response()}  "
+                  f"金额置信度={extraction.amount_confidence:.2f} 类别置信度={extraction.category_confidence:.2f}")
+
+
+def run_sweep(results):
+    """不同阈值下的命中率与命中样例的全字段准确率"""
+    total = len(results)
+    print(f"\n{'阈值':<8}{'命中率':>8}{'准确率':>10}")
+    for threshold in SWEEP:
+        hits = [checks for _, extraction, checks in results if extraction.confidence >= threshold]
+        accuracy = f"{sum(1 for checks in hits if all(checks.values())) / len(hits):.1%}" if hits else "-"
+        print(f"{threshold:<8}{len(hits) / total:>8.0%}{accuracy:>10}")
+
+
+def run_latency(cases, rounds: int):
+    """本地抽取耗时"""
+    samples = []
+    for _ in range(rounds):
+        for case in cases:
+            today = date.fromisoformat(case["today"])
+            started = time.perf_counter()
+            extract_expense(case["text"], today)
+            samples.append(time.perf_counter() - started)
+    samples.sort()
+
+    def pick(q):
+        return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+
+    print(f"\n本地抽取耗时（{len(samples)} 次）: p50={pick(0.5):.3f}ms  p95={pick(0.95):.3f}ms  p99={pick(0.99):.3f}ms  max={samples[-1] * 1000:.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="费用文本本地抽取的命中率、准确率与延迟基准")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("EXPENSE_LOCAL_THRESHOLD", "0.7")), help="本地直接返回的置信度阈值")
+    parser.add_argument("--rounds", type=int, default=50, help="延迟测试轮数")
+    parser.add_argument("--verbose", action="store_true", help="逐条打印本地抽取结果")
+    args = parser.parse_args()
+
+    cases = load_corpus()
+    results = evaluate(cases)
+    run_accuracy(results, args.threshold, args.verbose)
+    run_sweep(results)
+    run_latency(cases, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
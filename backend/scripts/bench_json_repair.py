@@ -0,0 +1,206 @@
+"""
+容错JSON解析的语料测试、模糊测试与性能基准
+
+1. 语料：scripts/json_repair_corpus.jsonl 中收集的残缺模型输出
+   （代码块、尾逗号、截断、全角标点等），对比旧的 find('{')/rfind('}') 切片方案
+   与新的容错解析器各能恢复多少期望字段、能避免多少次重新生成。
+   发现新的失败样例时，可把原始输出追加到语料文件中。
+2. 模糊测试：对合法行程随机施加常见缺陷（截断、尾逗号、全角标点、代码块、
+   Python 字面量、未转义换行），检查能否恢复，以及未截断时结果是否与原数据一致。
+3. 性能：合法输入的快速路径、需要修复时的整体解析，以及按小分片流式喂入的耗时。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_json_repair.py
+   python scripts/bench_json_repair.py --fuzz 2000 --seed 7
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+from typing import Any, Dict, Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.json_repair import TolerantJSONParser, parse_model_json  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "json_repair_corpus.jsonl")
+
+
+def legacy_extract(text: str) -> Optional[Dict[str, Any]]:
+    """旧方案：直接解析，失败后按首个 { 和最后一个 } 切片再解析一次"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    start_idx = text.find("{")
+    end_idx = text.rfind("}")
+    if start_idx != -1 and end_idx > start_idx:
+        try:
+            return json.loads(text[start_idx:end_idx + 1])
+        except json.JSONDecodeError:
+            return None
+    return None
+
+
+def recovered_fields(data: Any, expected: list) -> int:
+    """结果中包含的期望字段数"""
+    if not isinstance(data, dict):
+        return 0
+    return sum(1 for key in expected if key in data)
+
+
+def run_corpus():
+    """在语料上对比新旧方案"""
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    legacy_ok = new_ok = legacy_fields = new_fields = total_fields = 0
+    print(f"{'语料':<40}{'旧方案':>8}{'新方案':>8}  修复")
+    for case in cases:
+        expected = case["expect_fields"]
+        legacy = recovered_fields(legacy_extract(case["text"]), expected)
+        result = parse_model_json(case["text"])
+        new = recovered_fields(result.data, expected)
+        total_fields += len(expected)
+        legacy_fields += legacy
+        new_fields += new
+        legacy_ok += legacy > 0
+        new_ok += new > 0
+        name = f"{case['source']}/{case['name']}"
+        print(f"{name:<40}{legacy:>5}/{len(expected):<2}{new:>5}/{len(expected):<2}  {', '.join(result.repairs) or '-'}")
+
+    print(
+        f"\n可用结果: 旧方案 {legacy_ok}/{len(cases)}，新方案 {new_ok}/{len(cases)}"
+        f"（避免 {new_ok - legacy_ok} 次重新生成）；"
+        f"恢复字段: 旧方案 {legacy_fields}/{total_fields}，新方案 {new_fields}/{total_fields}"
+    )
+
+
+def make_itinerary(rng: random.Random, days: int) -> Dict[str, Any]:
+    """构造一个合法的行程"""
+    places = ["外滩", "豫园", "南京路", "田子坊", "陆家嘴", "朱家角", "新天地", "武康路"]
+    return {
+        f"day{i}": {
+            "date": f"2025-10-{i:02d}",
+            "activities": [
+                {
+                    "time": f"{9 + 3 * j:02d}:00",
+                    "activity": f"{rng.choice(places)}游览",
+                    "location": rng.choice(places),
+                    "duration": "2小时",
+                    "cost": rng.choice([0, 40, 80, 120]),
+                    "type": rng.choice(["景点", "餐饮", "购物"]),
+                    "description": "推荐\"打卡\"拍照" if rng.random() < 0.1 else "建议早点出发",
+                }
+                for j in range(rng.randint(2, 4))
+            ],
+        }
+        for i in range(1, days + 1)
+    }
+
+
+def mutate(text: str, rng: random.Random):
+    """随机施加一种常见缺陷，返回 (缺陷名, 文本, 是否截断)"""
+    kind = rng.choice(["truncate", "trailing_comma", "fullwidth", "fence", "python_literal", "newline", "preamble"])
+    if kind == "truncate":
+        return kind, text[:rng.randint(len(text) // 4, len(text) - 1)], True
+    if kind == "trailing_comma":
+        return kind, text.replace("}", ",}").replace("]", ",]"), False
+    if kind == "fullwidth":
+        return kind, text.replace('", "', '"，"').replace('": ', '"：'), False
+    if kind == "fence":
+        return kind, f"```json\n{text}\n```", False
+    if kind == "python_literal":
+        return kind, text.replace('"cost": 0', '"cost": None').replace("null", "None"), False
+    if kind == "newline":
+        return kind, text.replace("建议早点出发", "建议早点\n出发"), False
+    return kind, f"好的，以下是行程安排：\n{text}\n如有需要请告诉我。", False
+
+
+def run_fuzz(iterations: int, seed: int):
+    """模糊测试：统计各类缺陷的恢复率"""
+    rng = random.Random(seed)
+    stats: Dict[str, Dict[str, int]] = {}
+    mismatches = 0
+    for _ in range(iterations):
+        original = make_itinerary(rng, rng.randint(1, 7))
+        text = json.dumps(original, ensure_ascii=False)
+        kind, mutated, truncated = mutate(text, rng)
+        # 部分缺陷会改变数据本身，期望值随之调整
+        if kind == "python_literal":
+            original = json.loads(text.replace('"cost": 0', '"cost": null'))
+        elif kind == "newline":
+            original = json.loads(text.replace("建议早点出发", "建议早点\\n出发"))
+        bucket = stats.setdefault(kind, {"cases": 0, "legacy": 0, "new": 0, "days": 0, "days_total": 0})
+        bucket["cases"] += 1
+        bucket["legacy"] += isinstance(legacy_extract(mutated), dict)
+
+        result = parse_model_json(mutated)
+        if isinstance(result.data, dict):
+            bucket["new"] += 1
+            if truncated:
+                complete = sum(1 for key in result.complete_fields if result.data.get(key) == original.get(key))
+                bucket["days"] += complete
+                # 只统计截断点之前已完整输出的天
+                bucket["days_total"] += sum(
+                    1 for key, value in original.items()
+                    if f'"{key}": {json.dumps(value, ensure_ascii=False)}' in mutated
+                )
+            elif result.data != original:
+                mismatches += 1
+
+    print(f"\n模糊测试（{iterations} 次，seed={seed}）")
+    print(f"{'缺陷':<16}{'样本':>6}{'旧方案可用':>12}{'新方案可用':>12}")
+    for kind, bucket in sorted(stats.items()):
+        print(f"{kind:<16}{bucket['cases']:>6}{bucket['legacy'] / bucket['cases']:>12.1%}{bucket['new'] / bucket['cases']:>12.1%}")
+    truncate = stats.get("truncate")
+    if truncate and truncate["days_total"]:
+        print(f"截断样本中完整保留的天数: {truncate['days']}/{truncate['days_total']}")
+    print(f"未截断样本修复后与原数据不一致: {mismatches}")
+
+
+def run_perf(rounds: int):
+    """性能：快速路径、整体修复、流式喂入"""
+    rng = random.Random(0)
+    text = json.dumps(make_itinerary(rng, 14), ensure_ascii=False)
+    broken = text.replace("}", ",}")[:-200]
+
+    def timed(fn) -> float:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        return (time.perf_counter() - started) / rounds * 1000
+
+    def streamed(source: str, size: int):
+        parser = TolerantJSONParser()
+        for i in range(0, len(source), size):
+            parser.feed(source[i:i + size])
+        return parser.finish()
+
+    print(f"\n性能（14天行程，{len(text)} 字符，每项 {rounds} 轮平均）")
+    print(f"  json.loads:                {timed(lambda: json.loads(text)):8.3f}ms")
+    print(f"  parse_model_json 合法输入: {timed(lambda: parse_model_json(text)):8.3f}ms")
+    print(f"  parse_model_json 需要修复: {timed(lambda: parse_model_json(broken)):8.3f}ms")
+    print(f"  流式喂入（每片4字符）:     {timed(lambda: streamed(text, 4)):8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="容错JSON解析的语料、模糊测试与性能基准")
+    parser.add_argument("--fuzz", type=int, default=1000, help="模糊测试次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--rounds", type=int, default=50, help="性能测试轮数")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    run_corpus()
+    run_fuzz(args.fuzz, args.seed)
+    run_perf(args.rounds)
+
+
+if __name__ == "__main__":
+    main()
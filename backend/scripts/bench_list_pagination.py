@@ -0,0 +1,167 @@
+"""
+基准测试：行程/费用列表的列投影与游标分页
+
+为一个用户写入 --trips 个行程（每个带约 --itinerary-kb KB 的行程详情JSON）和一个有
+--expenses 条费用的行程，比较：
+
+行程列表
+1. orm-full：select(Trip) 加载完整 ORM 对象（改造前的 /api/itinerary/list，连带读出 itinerary 大字段）
+2. projected：只查询列表需要的列，返回全部行
+3. page：投影 + 取第一页（--page-size 条）
+4. keyset-deep / offset-deep：取最后一页附近的一页，游标定位与 OFFSET 跳过对比
+
+费用列表
+5. orm-full / projected / page / keyset-deep / offset-deep，同上
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_list_pagination.py
+   python scripts/bench_list_pagination.py --trips 2000 --expenses 50000 --rounds 30
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ["transport", "accommodation", "food", "entertainment", "shopping", "other"]
+
+
+def seed(trips: int, expenses: int, itinerary_kb: int):
+    """执行迁移并批量写入行程与费用，返回 (用户ID, 费用所在行程ID)"""
+    from sqlalchemy import insert
+    from app.database import SessionLocal, create_tables
+    from app.models import Expense, Trip, User
+    from app.models.budget_total import rebuild_budget_totals
+
+    create_tables()
+    rng = random.Random(0)
+    start = datetime(2025, 10, 1)
+    itinerary = {"days": [{"day": day, "activities": [{"name": "景点", "description": "x" * 200}] * 5} for day in range(1, 6)]}
+    while len(str(itinerary)) < itinerary_kb * 1024:
+        itinerary["days"].append(dict(itinerary["days"][0]))
+    with SessionLocal() as db:
+        user = User(username="benchuser", email="bench@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        db.execute(insert(Trip), [
+            {
+                "user_id": user.id,
+                "title": f"基准行程{i}",
+                "destination": "上海",
+                "start_date": start,
+                "end_date": start + timedelta(days=4),
+                "status": "planned",
+                "itinerary": itinerary,
+                "created_at": start + timedelta(minutes=i),
+            }
+            for i in range(trips)
+        ])
+        trip_id = db.scalars(Trip.__table__.select().with_only_columns(Trip.id).limit(1)).first()
+        db.execute(insert(Expense), [
+            {
+                "trip_id": trip_id,
+                "amount": round(rng.uniform(5, 500), 2),
+                "category": rng.choice(CATEGORIES),
+                "description": f"费用{i}",
+                "expense_date": start + timedelta(days=rng.randrange(30)),
+            }
+            for i in range(expenses)
+        ])
+        rebuild_budget_totals(db.connection(), trip_id)
+        db.commit()
+        return user.id, trip_id
+
+
+def summarize(samples) -> str:
+    """返回 p50/p95（毫秒）"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50={statistics.median(ordered) * 1000:8.2f}ms p95={p95 * 1000:8.2f}ms"
+
+
+async def deep_cursor(db, base, columns, descending, page_size: int, skip: int, dialect: str):
+    """取跳过 skip 行后那一页的游标（即前一行的排序键）"""
+    from app.utils.pagination import apply_keyset, encode_cursor
+
+    statement = apply_keyset(base, columns, descending, None, None, dialect).offset(skip - 1).limit(1)
+    row = (await db.execute(statement)).first()
+    return encode_cursor([row.cursor_0, row.cursor_1])
+
+
+async def run(args, user_id: int, trip_id: int):
+    from sqlalchemy import select
+    from app.database import AsyncReadSessionLocal, dispose_engines
+    from app.models import Expense, Trip
+    from app.routers.budget import EXPENSE_FIELDS
+    from app.routers.itinerary import LIST_FIELDS
+    from app.utils.pagination import apply_keyset
+
+    async with AsyncReadSessionLocal() as db:
+        dialect = db.bind.dialect.name
+
+    suites = [
+        ("行程列表", args.trips, select(Trip).where(Trip.user_id == user_id).order_by(Trip.created_at.desc()),
+         select(*[column.label(name) for name, column in LIST_FIELDS.items()]).where(Trip.user_id == user_id),
+         [Trip.created_at, Trip.id], True),
+        ("费用列表", args.expenses, select(Expense).where(Expense.trip_id == trip_id).order_by(Expense.expense_date.asc()),
+         select(*[column.label(name) for name, column in EXPENSE_FIELDS.items()]).where(Expense.trip_id == trip_id),
+         [Expense.expense_date, Expense.id], False),
+    ]
+    for title, total, orm_full, projected, columns, descending in suites:
+        skip = max(1, total - args.page_size)
+        async with AsyncReadSessionLocal() as db:
+            cursor = await deep_cursor(db, projected, columns, descending, args.page_size, skip, dialect)
+        methods = {
+            "orm-full": lambda db: db.scalars(orm_full),
+            "projected": lambda db: db.execute(apply_keyset(projected, columns, descending, None, None, dialect)),
+            "page": lambda db: db.execute(apply_keyset(projected, columns, descending, None, args.page_size, dialect)),
+            "keyset-deep": lambda db: db.execute(apply_keyset(projected, columns, descending, cursor, args.page_size, dialect)),
+            "offset-deep": lambda db: db.execute(
+                apply_keyset(projected, columns, descending, None, args.page_size, dialect).offset(skip)
+            ),
+        }
+        print(f"{title}（{total} 行，每页 {args.page_size} 条，每种方式 {args.rounds} 次）")
+        pages = {}
+        for name, method in methods.items():
+            samples = []
+            for _ in range(args.rounds):
+                async with AsyncReadSessionLocal() as db:
+                    started = time.perf_counter()
+                    rows = (await method(db)).all()
+                    samples.append(time.perf_counter() - started)
+            pages[name] = [row.id for row in rows]
+            print(f"  {name:<12}{len(rows):>7} 行  {summarize(samples)}")
+        print(f"  游标与 OFFSET 取到的深页一致: {pages['keyset-deep'] == pages['offset-deep']}\n")
+
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表列投影与游标分页基准测试")
+    parser.add_argument("--trips", type=int, default=500, help="用户的行程数")
+    parser.add_argument("--itinerary-kb", type=int, default=20, help="每个行程详情JSON的大致大小（KB）")
+    parser.add_argument("--expenses", type=int, default=20000, help="行程的费用条数")
+    parser.add_argument("--page-size", type=int, default=50, help="每页条数")
+    parser.add_argument("--rounds", type=int, default=20, help="每种方式的测量次数")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ.setdefault("SQL_SLOW_QUERY_MS", "100000")
+    logging.disable(logging.WARNING)
+
+    user_id, trip_id = seed(args.trips, args.expenses, args.itinerary_kb)
+    asyncio.run(run(args, user_id, trip_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+基准测试：LLM 客户端的单次调用开销
+
+对比两种方式调用同一个零延迟的本地替身服务：
+- before：每个请求新建一个 OpenAI 客户端（新的连接池、新的握手、重新读取环境变量）
+- after：进程内共享的 LLMGateway（配置只读一次、连接复用，启动时预热）
+
+替身服务不产生模型延迟，测得的时间即客户端自身开销。
+本地替身为明文 HTTP，不含 TLS 握手；用 --base-url 指向 HTTPS 服务可测得包含握手的开销。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_llm_client.py --calls 200
+   python scripts/bench_llm_client.py --base-url https://example.com/v1 --calls 50
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import threading
+import statistics
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standin_server import PROFILES, ReplayStore, StandInServer, make_handler  # noqa: E402
+
+MESSAGES = [
+    {"role": "system", "content": "你是一个擅长从文本中抽取结构化信息的助手。"},
+    {"role": "user", "content": "从文本中提取旅行规划信息：下周去杭州玩三天"},
+]
+
+
+def start_standin() -> StandInServer:
+    """在后台线程启动零延迟替身服务"""
+    args = SimpleNamespace(
+        profile="instant", error_rate=0.0, upstream=None, chunk_chars=4,
+        asr_text="", verbose=False,
+    )
+    server = StandInServer(("127.0.0.1", 0), make_handler(args, dict(PROFILES["instant"]), ReplayStore()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summarize(name: str, samples: list):
+    """打印延迟统计（毫秒）"""
+    ordered = sorted(samples)
+    print(
+        f"{name:<28} mean={statistics.mean(samples) * 1000:7.2f}ms  "
+        f"p50={ordered[len(ordered) // 2] * 1000:7.2f}ms  "
+        f"p95={ordered[int(len(ordered) * 0.95) - 1] * 1000:7.2f}ms  "
+        f"first={samples[0] * 1000:7.2f}ms"
+    )
+
+
+def bench_per_request_client(calls: int) -> list:
+    """旧方式：每次调用都读取环境变量并新建 OpenAI 客户端"""
+    from openai import OpenAI
+
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        client = OpenAI(api_key=os.getenv("DASHSCOPE_API_KEY"), base_url=os.getenv("DASHSCOPE_BASE_URL"))
+        client.chat.completions.create(
+            model=os.getenv("DASHSCOPE_MODEL", "qwen-plus"),
+            messages=MESSAGES,
+            temperature=0,
+            timeout=60.0,
+        )
+        client.close()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def bench_shared_gateway(calls: int, warmup: bool) -> list:
+    """新方式：共享网关（可选启动预热）"""
+    from app.services.llm_gateway import LLMGateway
+
+    gateway = LLMGateway()
+    gateway.configure()
+    if warmup:
+        await gateway.warmup()
+
+    samples = []
+    try:
+        for _ in range(calls):
+            config = gateway.endpoint("text_parse")
+            started = time.perf_counter()
+            await gateway.chat(
+                MESSAGES, model=config.model, timeout=config.timeout, coalesce=False
+            )
+            samples.append(time.perf_counter() - started)
+    finally:
+        await gateway.aclose()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 客户端单次调用开销基准测试")
+    parser.add_argument("--calls", type=int, default=200, help="每种方式的调用次数")
+    parser.add_argument("--base-url", help="被测服务地址，默认启动本地零延迟替身服务")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # 关闭限流，避免测到排队时间
+    os.environ["DASHSCOPE_RPS"] = "0"
+    os.environ["DASHSCOPE_TPM"] = "0"
+    os.environ.setdefault("DASHSCOPE_API_KEY", "bench")
+    if args.base_url:
+        os.environ["DASHSCOPE_BASE_URL"] = args.base_url
+    else:
+        server = start_standin()
+        os.environ["DASHSCOPE_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+
+    print(f"目标: {os.environ['DASHSCOPE_BASE_URL']}，每种方式 {args.calls} 次顺序调用\n")
+    before = bench_per_request_client(args.calls)
+    after_cold = asyncio.run(bench_shared_gateway(args.calls, warmup=False))
+    after_warm = asyncio.run(bench_shared_gateway(args.calls, warmup=True))
+
+    summarize("before: 每请求新建客户端", before)
+    summarize("after: 共享网关（未预热）", after_cold)
+    summarize("after: 共享网关（预热）", after_warm)
+    saved = statistics.mean(before) - statistics.mean(after_warm)
+    print(f"\n平均每次调用节省 {saved * 1000:.2f}ms（{saved / statistics.mean(before):.0%}）")
+
+
+if __name__ == "__main__":
+    main()
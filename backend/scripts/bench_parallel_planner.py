@@ -0,0 +1,144 @@
+"""
+基准测试：长行程“骨架 + 并行逐日填充”与单次整体生成的耗时对比
+
+本地替身LLM按输出规模模拟延迟：整体生成 N 天耗时约 N * --day-latency，
+单日生成耗时约 --day-latency，骨架调用耗时约 --skeleton-latency。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_parallel_planner.py --days 1 3 7 10 14 --concurrency 4
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def fake_day(date: str) -> dict:
+    """构造一天的占位行程"""
+    return {
+        "date": date,
+        "activities": [
+            {"time": "09:00", "activity": "景点游览", "location": "市中心", "duration": "2小时",
+             "cost": 50, "type": "景点", "description": "基准测试占位活动"}
+        ]
+    }
+
+
+def start_fake_llm(day_latency: float, skeleton_latency: float) -> ThreadingHTTPServer:
+    """启动按输出规模模拟延迟的 chat/completions 替身服务"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            prompt = request["messages"][-1]["content"]
+
+            if "行程骨架，只需确定" in prompt:
+                days = int(re.search(r"一次(\d+)天", prompt).group(1))
+                content = {f"day{i}": {"theme": f"主题{i}", "area": f"区域{i}"} for i in range(1, days + 1)}
+                time.sleep(skeleton_latency)
+            elif "这一天的行程" in prompt:
+                date = re.search(r"日期(\d{4}-\d{2}-\d{2})", prompt).group(1)
+                content = fake_day(date)
+                time.sleep(day_latency)
+            else:
+                days = int(re.search(r"旅行天数：(\d+)天", prompt).group(1))
+                content = {f"day{i}": fake_day("2025-01-01") for i in range(1, days + 1)}
+                time.sleep(day_latency * days)
+
+            body = json.dumps({
+                "id": "bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "qwen-plus"),
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": json.dumps(content, ensure_ascii=False)},
+                }],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # 并发逐日请求会同时建连，调大监听队列避免握手排队
+        request_queue_size = 128
+
+    server = Server(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def timed_generate(ai_service, days: int) -> float:
+    """生成一次指定天数的行程并返回耗时"""
+    started = time.perf_counter()
+    result = await ai_service.generate_itinerary(
+        destination="上海",
+        start_date="2025-01-01",
+        end_date=f"2025-01-{days:02d}",
+    )
+    elapsed = time.perf_counter() - started
+    assert result["success"] and len(result["data"]) == days, result
+    return elapsed
+
+
+async def run(args):
+    from app.services.ai_service import ai_service
+    from app.services.itinerary_cache import itinerary_cache
+    from app.services.llm_gateway import llm_gateway
+
+    itinerary_cache.enabled = False
+    ai_service.parallel_concurrency = args.concurrency
+
+    # 预热：建立连接并完成客户端初始化，避免首轮结果失真
+    await timed_generate(ai_service, 1)
+
+    print(f"{'天数':>4} | {'单次整体生成':>10} | {'骨架+并行':>10} | 加速比")
+    for days in args.days:
+        ai_service.parallel_min_days = 10 ** 6
+        sequential = await timed_generate(ai_service, days)
+        ai_service.parallel_min_days = 1
+        parallel = await timed_generate(ai_service, days)
+        print(f"{days:>6} | {sequential:>14.2f}s | {parallel:>11.2f}s | {sequential / parallel:.1f}x")
+
+    await llm_gateway.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长行程并行生成基准测试")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 3, 7, 10, 14], help="测试的行程天数")
+    parser.add_argument("--concurrency", type=int, default=4, help="逐日生成的并发上限")
+    parser.add_argument("--day-latency", type=float, default=0.5, help="生成一天行程的模拟耗时（秒）")
+    parser.add_argument("--skeleton-latency", type=float, default=0.3, help="骨架调用的模拟耗时（秒）")
+    args = parser.parse_args()
+
+    logging.getLogger("app.services.ai_service").setLevel(logging.WARNING)
+    server = start_fake_llm(args.day_latency, args.skeleton_latency)
+    os.environ["DASHSCOPE_API_KEY"] = "bench"
+    os.environ["DASHSCOPE_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
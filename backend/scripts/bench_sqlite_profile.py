@@ -0,0 +1,204 @@
+"""
+基准测试：SQLite 存储配置（WAL + 连接参数 + 读写分池）前后的并发读写吞吐
+
+分别在三个 SQLite 文件上运行相同的负载：
+
+- default：迁移前的配置，回滚日志模式、默认连接参数，读写共用一个连接池
+- wal：只加 app.utils.sqlite_profile 的 WAL 等连接参数，仍共用一个连接池
+- profile：连接参数 + 写连接池 1 个连接、只读连接池多个连接（应用实际使用的配置）
+
+负载为若干写协程与读协程在 --duration 秒内持续运行：
+写协程每次查询行程后插入一条费用并提交（与 /api/budget/add 相同），
+读协程每次查询最近 50 条费用并按类别汇总（与费用列表、汇总接口相同）。
+统计读写各自的吞吐、p50/p95 延迟与错误数（主要是 "database is locked"）。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_sqlite_profile.py
+   python scripts/bench_sqlite_profile.py --writers 8 --readers 32 --duration 10 --seed 50000
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from collections import Counter
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ["transport", "accommodation", "food", "entertainment", "shopping", "other"]
+PROFILES = {"default": "默认配置", "wal": "WAL 连接参数", "profile": "WAL + 读写分池"}
+
+
+def seed(path: str, trips: int, expenses: int, profile: bool) -> list:
+    """建表并写入测试数据，返回行程ID列表"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.database import Base
+    from app.models.expense import Expense
+    from app.models.trip import Trip
+    from app.models.user import User
+    from app.utils.sqlite_profile import apply_sqlite_profile
+
+    engine = create_engine(f"sqlite:///{path}")
+    if profile:
+        apply_sqlite_profile(engine)
+    Base.metadata.create_all(engine)
+    rng = random.Random(0)
+    with Session(engine) as db:
+        user = User(username="benchuser", email="bench@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        start = datetime(2025, 10, 1)
+        trip_rows = [
+            Trip(user_id=user.id, title=f"行程{i}", destination="上海", start_date=start, end_date=start + timedelta(days=6))
+            for i in range(trips)
+        ]
+        db.add_all(trip_rows)
+        db.flush()
+        db.add_all([
+            Expense(
+                trip_id=trip_rows[i % trips].id,
+                amount=round(rng.uniform(5, 500), 2),
+                category=rng.choice(CATEGORIES),
+                description=f"费用{i}",
+                expense_date=start + timedelta(days=rng.randrange(7)),
+            )
+            for i in range(expenses)
+        ])
+        db.commit()
+        trip_ids = [trip.id for trip in trip_rows]
+    engine.dispose()
+    return trip_ids
+
+
+def build_engines(path: str, name: str, readers: int):
+    """返回 (写引擎, 读引擎)；default 与 wal 配置下两者为同一个引擎"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.utils.sqlite_profile import apply_sqlite_profile
+
+    url = f"sqlite+aiosqlite:///{path}"
+    if name != "profile":
+        engine = create_async_engine(url)
+        if name == "wal":
+            apply_sqlite_profile(engine.sync_engine)
+        return engine, engine
+    write_engine = create_async_engine(url, pool_size=1, max_overflow=0)
+    read_engine = create_async_engine(url, pool_size=readers, max_overflow=0)
+    apply_sqlite_profile(write_engine.sync_engine)
+    apply_sqlite_profile(read_engine.sync_engine, read_only=True)
+    return write_engine, read_engine
+
+
+def summarize(samples) -> str:
+    """返回 p50/p95/max（毫秒）"""
+    if not samples:
+        return "-"
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50={statistics.median(ordered) * 1000:6.1f}ms p95={p95 * 1000:6.1f}ms max={ordered[-1] * 1000:7.1f}ms"
+
+
+async def run_profile(name: str, path: str, trip_ids: list, args) -> dict:
+    """在一个数据库文件上运行读写混合负载"""
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    from app.models.expense import Expense
+    from app.models.trip import Trip
+
+    write_engine, read_engine = build_engines(path, name, args.readers)
+    WriteSession = async_sessionmaker(write_engine, class_=AsyncSession, expire_on_commit=False)
+    ReadSession = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+    latencies = {"write": [], "read": []}
+    errors: Counter = Counter()
+    deadline = time.perf_counter() + args.duration
+
+    async def writer(seed_value: int):
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with WriteSession() as db:
+                    trip = await db.scalar(select(Trip).where(Trip.id == rng.choice(trip_ids)))
+                    db.add(Expense(
+                        trip_id=trip.id, amount=35.5, category=rng.choice(CATEGORIES),
+                        description="基准写入", expense_date=datetime(2025, 10, 2),
+                    ))
+                    await db.commit()
+                latencies["write"].append(time.perf_counter() - started)
+            except Exception as e:
+                errors[f"write: {str(e).splitlines()[0][:60]}"] += 1
+
+    async def reader(seed_value: int):
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            trip_id = rng.choice(trip_ids)
+            started = time.perf_counter()
+            try:
+                async with ReadSession() as db:
+                    (await db.scalars(
+                        select(Expense).where(Expense.trip_id == trip_id).order_by(Expense.expense_date.desc()).limit(50)
+                    )).all()
+                    (await db.execute(
+                        select(Expense.category, func.sum(Expense.amount)).where(Expense.trip_id == trip_id).group_by(Expense.category)
+                    )).all()
+                latencies["read"].append(time.perf_counter() - started)
+            except Exception as e:
+                errors[f"read: {str(e).splitlines()[0][:60]}"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(writer(i) for i in range(args.writers)),
+        *(reader(1000 + i) for i in range(args.readers)),
+    )
+    elapsed = time.perf_counter() - started
+
+    await write_engine.dispose()
+    if read_engine is not write_engine:
+        await read_engine.dispose()
+    return {"elapsed": elapsed, "latencies": latencies, "errors": errors}
+
+
+async def run(args, paths, trip_ids):
+    print(f"写协程 {args.writers}，读协程 {args.readers}，每种配置运行 {args.duration}s，"
+          f"初始费用 {args.seed} 条 / {args.trips} 个行程\n")
+    for name in PROFILES:
+        result = await run_profile(name, paths[name], trip_ids[name], args)
+        title = PROFILES[name]
+        print(f"[{title}]")
+        for kind, samples in result["latencies"].items():
+            print(f"  {kind:<6}{len(samples) / result['elapsed']:>8.0f} 次/s  {summarize(samples)}")
+        total_errors = sum(result["errors"].values())
+        print(f"  错误 {total_errors}")
+        for message, count in result["errors"].most_common(3):
+            print(f"    {count:>5} × {message}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 存储配置前后的并发读写基准测试")
+    parser.add_argument("--writers", type=int, default=4, help="写协程数")
+    parser.add_argument("--readers", type=int, default=16, help="读协程数（profile 下也是只读连接池大小）")
+    parser.add_argument("--duration", type=float, default=5.0, help="每种配置的运行时长（秒）")
+    parser.add_argument("--trips", type=int, default=20, help="行程数")
+    parser.add_argument("--seed", type=int, default=20000, help="预先写入的费用条数")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    # app.database 导入时会创建引擎，这里指向临时目录，避免在默认数据库上建连接
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'unused.db')}"
+    logging.disable(logging.WARNING)
+
+    paths = {name: os.path.join(db_dir, f"{name}.db") for name in PROFILES}
+    trip_ids = {name: seed(path, args.trips, args.seed, name != "default") for name, path in paths.items()}
+    asyncio.run(run(args, paths, trip_ids))
+
+
+if __name__ == "__main__":
+    main()
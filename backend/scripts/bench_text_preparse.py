@@ -0,0 +1,127 @@
+"""
+行程文本本地预解析的准确率与延迟基准
+
+在标注语料 scripts/text_parse_corpus.jsonl（每行 text / today / expect）上运行
+app.utils.trip_preparser.preparse_trip，统计：
+
+1. 完全跳过大模型、只需补充部分字段、完全交给大模型的请求占比
+2. 各字段的本地填充率，以及本地填充值与标注一致的比例（本地只填有把握的字段，
+   准确率应接近 100%；不一致的样例会逐条列出）
+3. 本地预解析的耗时分布，以及按字段数估算的大模型输出 token 节省
+
+标题由规则生成，不参与准确率统计。发现新的失败样例时，可把文本和标注追加到语料文件中。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/bench_text_preparse.py
+   python scripts/bench_text_preparse.py --rounds 200 --verbose
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.trip_preparser import FIELDS, preparse_trip  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "text_parse_corpus.jsonl")
+SCORED_FIELDS = [name for name in FIELDS if name != "title"]
+
+
+def load_corpus():
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def same(actual, expected) -> bool:
+    """比较字段值（数值按浮点比较，偏好按集合比较）"""
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return abs(actual - expected) < 1e-6
+    if isinstance(expected, str) and isinstance(actual, str) and "、" in expected + actual:
+        return set(expected.split("、")) == set(actual.split("、"))
+    return actual == expected
+
+
+def run_accuracy(cases, verbose: bool):
+    """统计跳过率、填充率与准确率"""
+    full = partial = miss = 0
+    filled = {name: 0 for name in SCORED_FIELDS}
+    correct = {name: 0 for name in SCORED_FIELDS}
+    errors = []
+    llm_fields = 0
+
+    for case in cases:
+        result = preparse_trip(case["text"], date.fromisoformat(case["today"]))
+        if result.complete:
+            full += 1
+        elif result.fields:
+            partial += 1
+        else:
+            miss += 1
+        llm_fields += len(result.missing)
+        for name in SCORED_FIELDS:
+            if name not in result.fields:
+                continue
+            filled[name] += 1
+            if same(result.fields[name], case["expect"][name]):
+                correct[name] += 1
+            else:
+                errors.append((case["text"], name, result.fields[name], case["expect"][name]))
+        if verbose:
+            print(f"{case['text']}\n    本地: {result.fields}\n    交给大模型: {result.missing}  剩余: {result.residual!r}")
+
+    total = len(cases)
+    print(f"语料 {total} 条（{CORPUS_PATH}）")
+    print(f"  完全跳过大模型: {full:>3} ({full / total:.0%})")
+    print(f"  只补充部分字段: {partial:>3} ({partial / total:.0%})")
+    print(f"  完全交给大模型: {miss:>3} ({miss / total:.0%})")
+    print(f"  交给大模型的字段: {llm_fields}/{total * len(FIELDS)}（原先每条都请求全部 {len(FIELDS)} 个字段）")
+
+    print(f"\n{'字段':<14}{'本地填充率':>10}{'准确率':>10}")
+    for name in SCORED_FIELDS:
+        accuracy = f"{correct[name] / filled[name]:.1%}" if filled[name] else "-"
+        print(f"{name:<14}{filled[name] / total:>10.0%}{accuracy:>10}")
+    total_filled = sum(filled.values())
+    if total_filled:
+        print(f"{'合计':<14}{total_filled / (total * len(SCORED_FIELDS)):>10.0%}{sum(correct.values()) / total_filled:>10.1%}")
+
+    if errors:
+        print("\n本地结果与标注不一致：")
+        for text, name, actual, expected in errors:
+            print(f"  {text}\n    {name}: 本地 {actual!r}，标注 {expected!r}")
+
+
+def run_latency(cases, rounds: int):
+    """本地预解析耗时"""
+    samples = []
+    for _ in range(rounds):
+        for case in cases:
+            today = date.fromisoformat(case["today"])
+            started = time.perf_counter()
+            preparse_trip(case["text"], today)
+            samples.append(time.perf_counter() - started)
+    samples.sort()
+
+    def pick(q):
+        return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+
+    print(f"\n本地预解析耗时（{len(samples)} 次）: p50={pick(0.5):.3f}ms  p95={pick(0.95):.3f}ms  p99={pick(0.99):.3f}ms  max={samples[-1] * 1000:.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行程文本本地预解析的准确率与延迟基准")
+    parser.add_argument("--rounds", type=int, default=50, help="延迟测试轮数")
+    parser.add_argument("--verbose", action="store_true", help="逐条打印本地解析结果")
+    args = parser.parse_args()
+
+    cases = load_corpus()
+    run_accuracy(cases, args.verbose)
+    run_latency(cases, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
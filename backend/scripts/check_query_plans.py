@@ -0,0 +1,72 @@
+"""
+热点查询的执行计划检查（EXPLAIN QUERY PLAN）
+
+对 app/utils/query_plans.py 中的高频查询（行程列表、费用列表/汇总、归属校验等）执行 EXPLAIN QUERY PLAN，
+任何一条退化为全表扫描（SCAN 表）或需要但未用上索引排序（USE TEMP B-TREE FOR ORDER BY）时
+打印执行计划并以退出码 1 结束，可直接接入 CI。
+
+默认在临时 SQLite 文件上从零执行全部迁移后检查；--database 可指定已有数据库
+（先执行 ANALYZE，按真实数据分布检查）。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/check_query_plans.py
+   python scripts/check_query_plans.py --database ./travel_planner.db --verbose
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def check(engine, verbose: bool) -> int:
+    """检查全部热点查询，返回有问题的查询数"""
+    from app.utils.query_plans import explain, hot_queries, plan_problems
+
+    failures = 0
+    with engine.connect() as conn:
+        for name, statement, allow_temp_sort in hot_queries():
+            details = explain(conn, statement)
+            problems = plan_problems(details, allow_temp_sort)
+            print(f"{'FAIL' if problems else 'ok  '} {name}")
+            if problems or verbose:
+                for detail in details:
+                    print(f"       {detail}")
+            for problem in problems:
+                print(f"     ! {problem}")
+            failures += bool(problems)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点查询的执行计划检查")
+    parser.add_argument("--database", default=None, help="检查已有的 SQLite 数据库文件，默认在临时库上执行全部迁移后检查")
+    parser.add_argument("--verbose", action="store_true", help="打印每条查询的执行计划")
+    args = parser.parse_args()
+
+    path = args.database or os.path.join(tempfile.mkdtemp(), "plans.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+
+    from sqlalchemy import text
+    from app.database import engine
+    from app.migrations import current_version, upgrade
+
+    with engine.begin() as conn:
+        if args.database:
+            conn.execute(text("ANALYZE"))
+        else:
+            upgrade(conn)
+        print(f"数据库 {path}，迁移版本 {current_version(conn)}\n")
+
+    failures = check(engine, args.verbose)
+    if failures:
+        print(f"\n{failures} 条热点查询未使用索引")
+        sys.exit(1)
+    print("\n全部热点查询均使用索引")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+端到端压测工具
+
+按可配置的并发度驱动后端的主要接口，输出每个接口的 p50/p95/p99 延迟、
+吞吐量和错误率，并可与基线结果比较以在发布前发现性能回退。
+
+覆盖的接口：
+- generate:        POST /api/itinerary/generate
+- text_parse:      POST /api/text/parse
+- budget_add:      POST /api/budget/add
+- budget_list:     GET  /api/budget/list
+- budget_summary:  GET  /api/budget/summary
+- budget_extract:  POST /api/budget/ai-extract
+- budget_analysis: GET  /api/budget/ai-analysis
+- speech:          POST /api/speech/recognize
+
+建议配合本地替身服务运行，避免消耗真实额度：
+   python scripts/standin_server.py --profile realistic
+   DASHSCOPE_BASE_URL=http://127.0.0.1:8900/v1 ALIYUN_ASR_ENDPOINT=http://127.0.0.1:8900 \\
+       ALIYUN_APP_KEY=x ALIYUN_TOKEN=x python main.py
+
+使用方法（在 backend 目录下运行）：
+   python scripts/load_test.py --concurrency 20 --requests 100
+   python scripts/load_test.py --endpoints text_parse,budget_extract --output result.json
+   python scripts/load_test.py --baseline result.json --tolerance 0.2
+"""
+
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+DESTINATIONS = ["上海", "杭州", "北京", "成都", "西安", "广州", "厦门", "青岛"]
+TEXTS = [
+    "下周末和女朋友去杭州玩三天，预算五千，喜欢美食和自然风光",
+    "国庆带孩子去北京五日游，一家三口，预算一万五",
+    "12月25号出发去成都，四天，两个人，想吃火锅",
+]
+EXPENSE_TEXTS = [
+    "午饭吃了一碗面35元",
+    "打车去酒店花了86块",
+    "10月2号买门票两张共240元",
+]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """最近秩法计算百分位数"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Scenario:
+    """单个接口的压测场景"""
+
+    def __init__(self, name: str, send: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]):
+        self.name = name
+        self.send = send
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.elapsed = 0.0
+
+    async def run(self, client: httpx.AsyncClient, requests: int, concurrency: int):
+        """以固定并发发送 requests 个请求"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(index: int):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await self.send(client, index)
+                    ok = response.status_code < 400
+                    error = None if ok else str(response.status_code)
+                except httpx.HTTPError as e:
+                    ok, error = False, type(e).__name__
+                latency = time.perf_counter() - started
+                if ok:
+                    self.latencies.append(latency)
+                else:
+                    self.errors[error] = self.errors.get(error, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        self.elapsed = time.perf_counter() - started
+
+    def report(self) -> Dict[str, Any]:
+        """汇总结果（延迟单位为毫秒）"""
+        total = len(self.latencies) + sum(self.errors.values())
+        return {
+            "requests": total,
+            "errors": dict(self.errors),
+            "error_rate": (total - len(self.latencies)) / total if total else 0.0,
+            "throughput_rps": len(self.latencies) / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": percentile(self.latencies, 50) * 1000,
+            "p95_ms": percentile(self.latencies, 95) * 1000,
+            "p99_ms": percentile(self.latencies, 99) * 1000,
+            "mean_ms": statistics.mean(self.latencies) * 1000 if self.latencies else 0.0,
+        }
+
+
+async def prepare(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    """注册压测用户并准备一个带开销记录的行程"""
+    suffix = uuid.uuid4().hex[:8]
+    response = await client.post("/api/auth/register", json={
+        "username": f"load_{suffix}",
+        "email": f"load_{suffix}@example.com",
+        "password": "loadtest123",
+    })
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = await client.post("/api/itinerary/generate", headers=headers, json={
+        "destination": "上海",
+        "start_date": "2025-10-01",
+        "end_date": "2025-10-03",
+        "budget": 5000,
+        "travelers": 2,
+    })
+    response.raise_for_status()
+    trip_id = response.json()["data"]["id"]
+
+    for i in range(args.seed_expenses):
+        await client.post("/api/budget/add", headers=headers, json={
+            "trip_id": trip_id,
+            "amount": 20 + i,
+            "category": ["food", "transport", "entertainment"][i % 3],
+            "description": f"压测开销{i}",
+            "expense_date": "2025-10-01",
+        })
+    return {"headers": headers, "trip_id": trip_id}
+
+
+def build_scenarios(context: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Scenario]:
+    """构建所有压测场景"""
+    headers = context["headers"]
+    trip_id = context["trip_id"]
+    run_id = uuid.uuid4().hex[:6]
+    audio = open(args.audio, "rb").read() if args.audio else b"\x00\x00" * 16000 * 2
+
+    def generate(client: httpx.AsyncClient, i: int):
+        # 偏好中带唯一标记以避开行程缓存；--cache-hits 时复用同一请求
+        preferences = "美食" if args.cache_hits else f"美食、压测{run_id}{i}"
+        return client.post("/api/itinerary/generate", headers=headers, json={
+            "destination": DESTINATIONS[i % len(DESTINATIONS)],
+            "start_date": "2025-10-01",
+            "end_date": f"2025-10-{args.trip_days:02d}",
+            "budget": 5000,
+            "travelers": 2,
+            "preferences": preferences,
+        })
+
+    def text_parse(client: httpx.AsyncClient, i: int):
+        return client.post("/api/text/parse", json={"text": f"{TEXTS[i % len(TEXTS)]}（{run_id}{i}）"})
+
+    def budget_add(client: httpx.AsyncClient, i: int):
+        return client.post("/api/budget/add", headers=headers, json={
+            "trip_id": trip_id,
+            "amount": 10 + i % 90,
+            "category": "food",
+            "description": f"压测开销{run_id}{i}",
+            "expense_date": "2025-10-02",
+        })
+
+    def budget_list(client: httpx.AsyncClient, i: int):
+        return client.get("/api/budget/list", headers=headers, params={"trip_id": trip_id})
+
+    def budget_summary(client: httpx.AsyncClient, i: int):
+        return client.get("/api/budget/summary", headers=headers, params={"trip_id": trip_id})
+
+    def budget_extract(client: httpx.AsyncClient, i: int):
+        return client.post("/api/budget/ai-extract", headers=headers,
+                           json={"text": f"{EXPENSE_TEXTS[i % len(EXPENSE_TEXTS)]}（{run_id}{i}）"})
+
+    def budget_analysis(client: httpx.AsyncClient, i: int):
+        return client.get("/api/budget/ai-analysis", headers=headers, params={"trip_id": trip_id})
+
+    def speech(client: httpx.AsyncClient, i: int):
+        return client.post("/api/speech/recognize", files={"file": ("audio.pcm", audio, "application/octet-stream")})
+
+    scenarios = [
+        Scenario("generate", generate),
+        Scenario("text_parse", text_parse),
+        Scenario("budget_add", budget_add),
+        Scenario("budget_list", budget_list),
+        Scenario("budget_summary", budget_summary),
+        Scenario("budget_extract", budget_extract),
+        Scenario("budget_analysis", budget_analysis),
+        Scenario("speech", speech),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """与基线比较 p95 和错误率，返回回退描述"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        limit = base["p95_ms"] * (1 + tolerance)
+        if base["p95_ms"] and result["p95_ms"] > limit:
+            regressions.append(f"{name}: p95 {result['p95_ms']:.1f}ms > 基线 {base['p95_ms']:.1f}ms × {1 + tolerance:.2f}")
+        if result["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{name}: 错误率 {result['error_rate']:.1%} > 基线 {base['error_rate']:.1%}")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> int:
+    """执行压测并输出报告"""
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        context = await prepare(client, args)
+        scenarios = build_scenarios(context, args)
+
+        names = [name.strip() for name in args.endpoints.split(",")] if args.endpoints else list(scenarios)
+        unknown = [name for name in names if name not in scenarios]
+        if unknown:
+            print(f"未知接口: {', '.join(unknown)}，可选: {', '.join(scenarios)}")
+            return 2
+
+        results = {}
+        for name in names:
+            scenario = scenarios[name]
+            print(f"压测 {name}: {args.requests} 个请求，并发 {args.concurrency} ...", flush=True)
+            await scenario.run(client, args.requests, args.concurrency)
+            results[name] = scenario.report()
+
+    print()
+    print(f"{'接口':<16}{'请求':>6}{'错误率':>8}{'吞吐(rps)':>11}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<16}{result['requests']:>6}{result['error_rate']:>8.1%}{result['throughput_rps']:>11.1f}"
+            f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+        )
+        if result["errors"]:
+            print(f"{'':<16}错误: {result['errors']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n发现性能回退：")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\n与基线相比未发现回退")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后端端到端压测")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="后端地址")
+    parser.add_argument("--concurrency", type=int, default=10, help="每个接口的并发请求数")
+    parser.add_argument("--requests", type=int, default=50, help="每个接口的请求总数")
+    parser.add_argument("--endpoints", help="逗号分隔的接口名，默认全部")
+    parser.add_argument("--timeout", type=float, default=180.0, help="单个请求超时（秒）")
+    parser.add_argument("--trip-days", type=int, default=3, help="生成行程的天数")
+    parser.add_argument("--cache-hits", action="store_true", help="生成接口复用相同请求（测缓存命中路径）")
+    parser.add_argument("--seed-expenses", type=int, default=10, help="预先写入的开销记录数")
+    parser.add_argument("--audio", help="语音识别使用的音频文件，默认 2 秒静音 PCM")
+    parser.add_argument("--output", help="将结果写入 JSON 文件（可作为基线）")
+    parser.add_argument("--baseline", help="基线结果 JSON 文件")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的 p95 退化比例")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
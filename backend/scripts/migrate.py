@@ -0,0 +1,44 @@
+"""
+数据库迁移命令行
+查看当前版本与待执行的迁移，或手动升级到指定版本（应用启动时也会自动升级到最新版本）
+
+使用方法（在 backend 目录下运行，数据库由环境变量 DATABASE_URL 指定）：
+   python scripts/migrate.py --status
+   python scripts/migrate.py
+   python scripts/migrate.py --target 2
+"""
+
+import os
+import sys
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine  # noqa: E402
+from app.migrations import LATEST_VERSION, current_version, pending_migrations, upgrade  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库版本化迁移")
+    parser.add_argument("--status", action="store_true", help="只查看当前版本与待执行的迁移")
+    parser.add_argument("--target", type=int, default=None, help="升级到的版本，默认最新")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        print(f"数据库: {engine.url.render_as_string(hide_password=True)}")
+        print(f"当前版本: {current_version(conn)}，最新版本: {LATEST_VERSION}")
+        if args.status:
+            for migration in pending_migrations(conn):
+                print(f"  待执行 {migration.version}: {migration.description}")
+            return
+        applied = upgrade(conn, args.target)
+
+    if applied:
+        print(f"已应用迁移: {applied}")
+    else:
+        print("没有需要执行的迁移")
+
+
+if __name__ == "__main__":
+    main()
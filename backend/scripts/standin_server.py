@@ -0,0 +1,427 @@
+"""
+本地 LLM / ASR 替身服务
+
+用于压测和联调，避免消耗真实的 DashScope 与阿里云 NLS 额度：
+- OpenAI 兼容的 /v1/chat/completions（含 stream=True 的 SSE 流式输出）
+- 阿里云一句话识别 RESTful 接口 /stream/v1/asr
+- 可配置的延迟档位（首 token 延迟、抖动、token 输出速率、错误率）
+- 回放录制的响应；也可作为代理转发到真实上游并录制，供之后离线回放
+
+相同请求总是得到相同的响应和延迟（以请求内容为随机种子），便于前后对比。
+
+使用方法（在 backend 目录下运行）：
+   python scripts/standin_server.py --profile realistic --port 8900
+   python scripts/standin_server.py --replay data/recorded.jsonl
+   python scripts/standin_server.py --record data/recorded.jsonl --upstream https://dashscope.aliyuncs.com/compatible-mode/v1
+
+然后让后端指向替身服务：
+   DASHSCOPE_BASE_URL=http://127.0.0.1:8900/v1
+   ALIYUN_ASR_ENDPOINT=http://127.0.0.1:8900
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+import urllib.request
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+# 延迟档位：首 token 延迟（秒）、抖动比例、每秒输出 token 数、ASR 实时率
+PROFILES = {
+    "instant": {"ttft": 0.0, "jitter": 0.0, "tokens_per_second": 0, "asr_rtf": 0.0},
+    "fast": {"ttft": 0.05, "jitter": 0.2, "tokens_per_second": 500, "asr_rtf": 0.05},
+    "realistic": {"ttft": 0.6, "jitter": 0.5, "tokens_per_second": 40, "asr_rtf": 0.3},
+    "slow": {"ttft": 2.0, "jitter": 0.5, "tokens_per_second": 15, "asr_rtf": 0.8},
+}
+
+DESTINATION_AREAS = ["老城区", "滨江步道", "博物馆片区", "美食街", "城市公园", "古镇", "商业中心", "艺术园区"]
+ACTIVITY_TYPES = ["景点", "餐饮", "购物", "休闲"]
+
+
+def count_tokens(text: str) -> int:
+    """粗略估算 token 数：中文 1 字 1 token，其余约 4 字符 1 token"""
+    cjk = sum(1 for ch in text if ord(ch) > 0x2E80)
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def messages_key(messages: List[Dict[str, Any]]) -> str:
+    """请求消息的稳定哈希，用作回放键"""
+    raw = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ReplayStore:
+    """录制/回放存储（JSON Lines）
+
+    对话条目：{"key": 消息哈希, "match": 可选的提示词子串, "content": 响应文本}
+    识别条目：{"asr": 识别文本}
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.chat_by_key: Dict[str, str] = {}
+        self.chat_by_match: List[Dict[str, str]] = []
+        self.asr: List[str] = []
+        self._asr_index = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._add(json.loads(line))
+
+    def _add(self, entry: Dict[str, Any]):
+        """载入一条记录"""
+        if "asr" in entry:
+            self.asr.append(entry["asr"])
+        elif "key" in entry:
+            self.chat_by_key[entry["key"]] = entry["content"]
+        elif "match" in entry:
+            self.chat_by_match.append(entry)
+
+    def find_chat(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """按消息哈希或提示词子串查找录制的响应"""
+        content = self.chat_by_key.get(messages_key(messages))
+        if content is not None:
+            return content
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        for entry in self.chat_by_match:
+            if entry["match"] in prompt:
+                return entry["content"]
+        return None
+
+    def next_asr(self) -> Optional[str]:
+        """依次循环返回录制的识别文本"""
+        with self._lock:
+            if not self.asr:
+                return None
+            text = self.asr[self._asr_index % len(self.asr)]
+            self._asr_index += 1
+            return text
+
+    def record(self, entry: Dict[str, Any]):
+        """追加一条录制记录"""
+        with self._lock:
+            self._add(entry)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def _activities(rng: random.Random, destination: str, area: str, count: int = 4) -> List[Dict[str, Any]]:
+    """生成一天的活动列表"""
+    activities = []
+    hour = 9
+    for i in range(count):
+        activity_type = ACTIVITY_TYPES[i % len(ACTIVITY_TYPES)]
+        activities.append({
+            "time": f"{hour:02d}:00",
+            "activity": f"{area}{activity_type}体验",
+            "location": f"{destination}{area}",
+            "duration": "2小时",
+            "cost": rng.choice([0, 30, 60, 80, 120, 200]),
+            "type": activity_type,
+            "description": f"在{destination}{area}安排的{activity_type}活动",
+        })
+        hour += 3
+    return activities
+
+
+def synthesize_content(messages: List[Dict[str, Any]], rng: random.Random) -> str:
+    """根据提示词类型生成确定性的合成响应"""
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    destination_match = re.search(r"目的地：(\S+)", prompt)
+    destination = destination_match.group(1) if destination_match else "上海"
+
+    # 单日提示词中也包含"整体行程骨架"，需先判断
+    if "这一天的行程" in prompt:
+        date_match = re.search(r"日期(\d{4}-\d{2}-\d{2})", prompt)
+        area_match = re.search(r"今天的区域：(\S+)", prompt)
+        destination_match = re.search(r"请为(\S+?)旅行的第", prompt)
+        day = {
+            "date": date_match.group(1) if date_match else "2025-10-01",
+            "activities": _activities(
+                rng,
+                destination_match.group(1) if destination_match else destination,
+                area_match.group(1) if area_match else rng.choice(DESTINATION_AREAS),
+            ),
+        }
+        return json.dumps(day, ensure_ascii=False)
+
+    if "行程骨架" in prompt:
+        days = int((re.search(r"一次(\d+)天", prompt) or re.search(r"(\d+)天", prompt)).group(1))
+        skeleton = {
+            f"day{i}": {"theme": f"第{i}天主题", "area": DESTINATION_AREAS[(i - 1) % len(DESTINATION_AREAS)]}
+            for i in range(1, days + 1)
+        }
+        return json.dumps(skeleton, ensure_ascii=False)
+
+    if "旅行行程规划" in prompt:
+        start_match = re.search(r"开始日期：(\d{4}-\d{2}-\d{2})", prompt)
+        days_match = re.search(r"旅行天数：(\d+)天", prompt)
+        start = datetime.strptime(start_match.group(1), "%Y-%m-%d") if start_match else datetime(2025, 10, 1)
+        days = int(days_match.group(1)) if days_match else 3
+        itinerary = {
+            f"day{i}": {
+                "date": (start + timedelta(days=i - 1)).strftime("%Y-%m-%d"),
+                "activities": _activities(rng, destination, DESTINATION_AREAS[(i - 1) % len(DESTINATION_AREAS)]),
+            }
+            for i in range(1, days + 1)
+        }
+        return json.dumps(itinerary, ensure_ascii=False)
+
+    if "提取旅行规划信息" in prompt:
+        return json.dumps({
+            "destination": "杭州",
+            "title": "杭州三日游",
+            "start_date": "2025-10-01",
+            "end_date": "2025-10-03",
+            "budget": 5000,
+            "travelers": 2,
+            "preferences": "美食、自然风光",
+        }, ensure_ascii=False)
+
+    if "费用记录信息" in prompt:
+        text_match = re.search(r"文本：\s*\n(.*)", prompt)
+        amount_match = re.search(r"(\d+(?:\.\d+)?)", text_match.group(1) if text_match else "")
+        return json.dumps({
+            "amount": float(amount_match.group(1)) if amount_match else 100.0,
+            "category": "食物",
+            "description": "午餐",
+            "expense_date": "2025-10-01",
+        }, ensure_ascii=False)
+
+    if "suggestions" in prompt:
+        return json.dumps({
+            "analysis": "目前开销整体处于预算范围内，餐饮占比较高。",
+            "suggestions": ["提前预订门票享受优惠", "选择公共交通出行", "午餐尝试本地小吃"],
+        }, ensure_ascii=False)
+
+    return "好的"
+
+
+def make_handler(args: argparse.Namespace, profile: Dict[str, float], store: ReplayStore):
+    """构造请求处理类"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 响应头和响应体分两次写出，关闭 Nagle 以免与客户端的延迟确认叠加出约 40ms 的停顿
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _delay(self, rng: random.Random, base: float) -> float:
+            """在基础延迟上叠加确定性抖动"""
+            if base <= 0:
+                return 0.0
+            return max(0.0, base * (1 + rng.uniform(-profile["jitter"], profile["jitter"])))
+
+        def do_GET(self):
+            path = urlparse(self.path).path.rstrip("/")
+            if path in ("", "/health"):
+                self._send_json(200, {"status": "ok", "profile": args.profile})
+            elif path.endswith("/models"):
+                # 供网关启动预热使用
+                self._send_json(200, {"object": "list", "data": [{"id": "qwen-plus", "object": "model"}]})
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length)
+            path = urlparse(self.path).path
+            if path.endswith("/chat/completions"):
+                self._chat(json.loads(raw or b"{}"))
+            elif path.rstrip("/").endswith("/stream/v1/asr"):
+                self._asr(raw)
+            else:
+                self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+
+        def _chat(self, request: Dict[str, Any]):
+            messages = request.get("messages", [])
+            model = request.get("model", "qwen-plus")
+            rng = random.Random(messages_key(messages))
+
+            if args.error_rate and random.random() < args.error_rate:
+                self._send_json(503, {"error": {"message": "stand-in injected failure", "type": "server_error"}})
+                return
+
+            content = store.find_chat(messages)
+            if content is None and args.upstream:
+                content = fetch_upstream(args.upstream, request)
+                store.record({"key": messages_key(messages), "content": content})
+            if content is None:
+                content = synthesize_content(messages, rng)
+
+            prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in messages)
+            completion_tokens = count_tokens(content)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            rate = profile["tokens_per_second"]
+            ttft = self._delay(rng, profile["ttft"])
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+            if not request.get("stream"):
+                time.sleep(ttft + (completion_tokens / rate if rate else 0))
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": content},
+                    }],
+                    "usage": usage,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(ttft)
+
+            def event(delta: Dict[str, Any], finish_reason: Optional[str] = None, chunk_usage=None) -> bytes:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+                }
+                if chunk_usage is not None:
+                    chunk["usage"] = chunk_usage
+                return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+
+            try:
+                step = args.chunk_chars
+                for i in range(0, len(content), step):
+                    piece = content[i:i + step]
+                    self._write_chunk(event({"content": piece}))
+                    if rate:
+                        time.sleep(count_tokens(piece) / rate)
+                self._write_chunk(event({}, "stop"))
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    self._write_chunk(event(None, chunk_usage=usage))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端提前断开（如对冲请求被取消）
+                pass
+
+        def _asr(self, audio: bytes):
+            rng = random.Random(hashlib.sha256(audio).hexdigest())
+            if args.error_rate and random.random() < args.error_rate:
+                self._send_json(500, {"status": 50000000, "message": "stand-in injected failure"})
+                return
+
+            # 16kHz 16bit 单声道 PCM：每秒 32000 字节
+            audio_seconds = len(audio) / 32000
+            time.sleep(self._delay(rng, profile["ttft"]) + audio_seconds * profile["asr_rtf"])
+            text = store.next_asr() or args.asr_text
+            self._send_json(200, {
+                "task_id": uuid.uuid4().hex,
+                "result": text,
+                "status": 20000000,
+                "message": "SUCCESS",
+            })
+
+    return Handler
+
+
+def fetch_upstream(base_url: str, request: Dict[str, Any]) -> str:
+    """把请求（以非流式方式）转发到真实上游，返回响应文本用于录制"""
+    payload = dict(request, stream=False)
+    payload.pop("stream_options", None)
+    upstream_request = urllib.request.Request(
+        base_url.rstrip("/") + "/chat/completions",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {os.getenv('DASHSCOPE_API_KEY', '')}",
+        },
+        method="POST",
+    )
+    with urllib.request.urlopen(upstream_request, timeout=120) as response:
+        data = json.loads(response.read())
+    return data["choices"][0]["message"]["content"]
+
+
+class StandInServer(ThreadingHTTPServer):
+    """多线程服务器，加大监听队列以承受压测时的并发建连"""
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 LLM / ASR 替身服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8900, help="监听端口")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast", help="延迟档位")
+    parser.add_argument("--ttft", type=float, help="覆盖首 token 延迟（秒）")
+    parser.add_argument("--jitter", type=float, help="覆盖延迟抖动比例（0~1）")
+    parser.add_argument("--tokens-per-second", type=float, help="覆盖输出速率，0 表示不限速")
+    parser.add_argument("--asr-rtf", type=float, help="覆盖 ASR 实时率（处理时长/音频时长）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 5xx 的比例")
+    parser.add_argument("--chunk-chars", type=int, default=4, help="流式输出每个分片的字符数")
+    parser.add_argument("--asr-text", default="明天去杭州玩三天预算五千元", help="无回放时的识别文本")
+    parser.add_argument("--replay", help="回放文件（JSON Lines）")
+    parser.add_argument("--record", help="录制文件（JSON Lines），需配合 --upstream")
+    parser.add_argument("--upstream", help="录制模式下转发的真实上游地址")
+    parser.add_argument("--verbose", action="store_true", help="打印访问日志")
+    args = parser.parse_args()
+
+    if args.upstream and not args.record:
+        parser.error("--upstream 需要同时指定 --record")
+
+    profile = dict(PROFILES[args.profile])
+    for name in ("ttft", "jitter", "tokens_per_second", "asr_rtf"):
+        value = getattr(args, name)
+        if value is not None:
+            profile[name] = value
+
+    store = ReplayStore(args.record or args.replay)
+    server = StandInServer((args.host, args.port), make_handler(args, profile, store))
+    print(f"替身服务已启动: http://{args.host}:{args.port}  档位: {args.profile} {profile}")
+    print(f"  DASHSCOPE_BASE_URL=http://{args.host}:{args.port}/v1")
+    print(f"  ALIYUN_ASR_ENDPOINT=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+测试公共配置
+导入应用之前把数据库、行程缓存指向临时目录，并关闭大模型连接预热；
+大模型调用在各测试中按需替换，不访问外部服务。
+"""
+
+import os
+import sys
+import uuid
+import tempfile
+
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix="travel_planner_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ["ITINERARY_CACHE_PATH"] = os.path.join(_TMP_DIR, "itinerary_cache.db")
+os.environ["ITINERARY_CACHE_ENABLED"] = "false"
+os.environ["LLM_WARMUP_CONNECTIONS"] = "0"
+os.environ.setdefault("DASHSCOPE_API_KEY", "test-key")
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def database():
+    """执行全部迁移后的测试库（同步引擎）"""
+    from app.database import create_tables, engine
+
+    create_tables()
+    return engine
+
+
+@pytest.fixture
+def db_session(database):
+    """同步会话，测试结束时关闭"""
+    from app.database import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    """启动完整应用（含启动/关闭事件）的测试客户端"""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def register_user(client):
+    """注册一个新用户，返回 (用户ID, 认证请求头)"""
+    def register():
+        suffix = uuid.uuid4().hex[:8]
+        response = client.post("/api/auth/register", json={
+            "username": f"user_{suffix}",
+            "email": f"{suffix}@example.com",
+            "password": "password123",
+        })
+        assert response.status_code == 201, response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+        return user_id, headers
+    return register
+
+
+@pytest.fixture
+def make_trip(db_session):
+    """为指定用户直接写入一个行程，返回行程对象"""
+    from datetime import datetime
+    from app.models import Trip
+
+    def make(user_id: int, itinerary=None, budget=3000):
+        trip = Trip(
+            user_id=user_id,
+            title="测试行程",
+            destination="上海",
+            start_date=datetime(2025, 10, 1),
+            end_date=datetime(2025, 10, 3),
+            budget=budget,
+            itinerary=itinerary,
+        )
+        db_session.add(trip)
+        db_session.commit()
+        return trip
+    return make
@@ -0,0 +1,43 @@
+"""
+行程生成各路径的限流优先级：长行程逐天生成走批量优先级，用户发起的局部重新生成走交互优先级
+"""
+
+import pytest
+
+from app.services.ai_service import ai_service
+from app.services.rate_limiter import PRIORITY_BULK, PRIORITY_INTERACTIVE
+
+ITINERARY = {
+    "day1": {"date": "2025-10-01", "activities": [{"time": "09:00", "activity": "外滩", "location": "外滩", "duration": "2小时", "cost": 0, "type": "景点"}]},
+    "day2": {"date": "2025-10-02", "activities": [{"time": "09:00", "activity": "豫园", "location": "豫园", "duration": "2小时", "cost": 40, "type": "景点"}]},
+}
+
+
+@pytest.fixture
+def recorded_priorities(monkeypatch):
+    priorities = []
+
+    async def chat_json(prompt, expected_output_tokens=400, priority=PRIORITY_BULK):
+        priorities.append(priority)
+        if "替换" in prompt:
+            return {"activity": "新活动", "location": "新天地", "duration": "1小时", "cost": 0, "type": "景点"}
+        return {"day1": {"theme": "城市", "area": "市中心"}, "activities": [dict(ITINERARY["day1"]["activities"][0])]}
+
+    monkeypatch.setattr(ai_service, "_chat_json", chat_json)
+    return priorities
+
+
+@pytest.mark.asyncio
+async def test_parallel_days_use_bulk_priority(recorded_priorities):
+    days = [key async for key, _ in ai_service._plan_parallel("上海", "2025-10-01", "2025-10-04")]
+    assert sorted(days) == ["day1", "day2", "day3", "day4"]
+    # 骨架 + 每天一次，全部为批量优先级
+    assert recorded_priorities == [PRIORITY_BULK] * 5
+
+
+@pytest.mark.asyncio
+async def test_regenerate_uses_interactive_priority(recorded_priorities):
+    day = await ai_service.regenerate_day("上海", ITINERARY, 2, "2025-10-01")
+    activity = await ai_service.regenerate_activity("上海", ITINERARY, 1, 0, "2025-10-01")
+    assert day["success"] and activity["success"]
+    assert recorded_priorities == [PRIORITY_INTERACTIVE, PRIORITY_INTERACTIVE]
@@ -0,0 +1,54 @@
+"""
+批量费用提取接口：写入行程前的身份与归属校验
+"""
+
+import pytest
+
+from app.services.expense_batch import expense_batch_extractor
+
+EXTRACTED = {
+    "items": [
+        {"amount": 50.0, "category": "餐饮", "description": "午饭", "expense_date": "2025-10-01"},
+        {"amount": 30.0, "category": "交通", "description": "打车", "expense_date": "2025-10-01"},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def fixed_extraction(monkeypatch):
+    async def extract(text, lines, today):
+        return {"items": [dict(item) for item in EXTRACTED["items"]]}
+    monkeypatch.setattr(expense_batch_extractor, "extract", extract)
+
+
+def test_requires_login(client):
+    response = client.post("/api/budget/ai-extract/batch", json={"lines": ["午饭50元"]})
+    assert response.status_code in (401, 403)
+
+
+def test_rejects_other_users_trip(client, register_user, make_trip):
+    owner_id, _ = register_user()
+    _, other_headers = register_user()
+    trip = make_trip(owner_id)
+
+    response = client.post("/api/budget/ai-extract/batch", json={"lines": ["午饭50元"], "trip_id": trip.id}, headers=other_headers)
+    assert response.status_code == 403
+    expenses = client.get("/api/budget/list", params={"trip_id": trip.id}, headers=register_user()[1])
+    assert expenses.status_code == 404
+
+
+def test_missing_trip(client, register_user):
+    _, headers = register_user()
+    response = client.post("/api/budget/ai-extract/batch", json={"lines": ["午饭50元"], "trip_id": 999999}, headers=headers)
+    assert response.status_code == 404
+
+
+def test_saves_into_own_trip(client, register_user, make_trip):
+    user_id, headers = register_user()
+    trip = make_trip(user_id)
+
+    response = client.post("/api/budget/ai-extract/batch", json={"lines": ["午饭50元", "打车30元"], "trip_id": trip.id}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["saved"] == 2
+    listed = client.get("/api/budget/list", params={"trip_id": trip.id}, headers=headers).json()
+    assert sorted(item["amount"] for item in listed) == [30.0, 50.0]
@@ -0,0 +1,132 @@
+"""
+行程开销汇总表：ORM 事件维护的 trip_budget_totals 始终与费用明细的 SUM() 一致
+"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.database import AsyncReadSessionLocal
+from app.models import Expense, Trip, TripBudgetTotal, User
+from app.models.budget_total import rebuild_budget_totals
+from app.services.budget_totals import category_totals
+
+
+@pytest.fixture
+def trips(db_session, make_trip):
+    suffix = uuid.uuid4().hex[:8]
+    user = User(username=f"totals_{suffix}", email=f"totals_{suffix}@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    return make_trip(user.id), make_trip(user.id)
+
+
+def expense(trip, amount, category="food"):
+    return Expense(trip_id=trip.id, amount=amount, category=category, description="测试", expense_date=datetime(2025, 10, 1))
+
+
+def totals(session, trip_id):
+    rows = session.execute(
+        select(TripBudgetTotal.category, TripBudgetTotal.amount, TripBudgetTotal.expense_count)
+        .where(TripBudgetTotal.trip_id == trip_id)
+    ).all()
+    return {category: (float(amount), count) for category, amount, count in rows}
+
+
+def sums(session, trip_id):
+    rows = session.execute(
+        select(Expense.category, func.sum(Expense.amount), func.count(Expense.id))
+        .where(Expense.trip_id == trip_id)
+        .group_by(Expense.category)
+    ).all()
+    return {category: (float(amount), count) for category, amount, count in rows}
+
+
+def assert_consistent(session, *trip_list):
+    session.expire_all()
+    for trip in trip_list:
+        assert totals(session, trip.id) == sums(session, trip.id)
+
+
+def test_insert_update_delete_keep_totals_in_sync(db_session, trips):
+    first, second = trips
+    lunch, taxi, hotel = expense(first, 50), expense(first, 30.5, "transport"), expense(first, 400, "accommodation")
+    db_session.add_all([lunch, taxi, hotel, expense(second, 20)])
+    db_session.commit()
+    assert_consistent(db_session, first, second)
+    assert totals(db_session, first.id)["food"] == (50.0, 1)
+
+    lunch.amount = 65
+    taxi.category = "food"
+    db_session.commit()
+    assert_consistent(db_session, first, second)
+    assert "transport" not in totals(db_session, first.id)
+
+    hotel.trip_id = second.id
+    db_session.commit()
+    assert_consistent(db_session, first, second)
+
+    db_session.delete(lunch)
+    db_session.delete(taxi)
+    db_session.commit()
+    assert_consistent(db_session, first, second)
+    assert totals(db_session, first.id) == {}
+
+
+def test_deleting_trip_removes_its_totals(db_session, trips):
+    first, _ = trips
+    db_session.add_all([expense(first, 10), expense(first, 15, "shopping")])
+    db_session.commit()
+
+    db_session.delete(first)
+    db_session.commit()
+    assert totals(db_session, first.id) == {}
+
+
+def test_rebuild_after_bulk_insert(db_session, trips):
+    first, _ = trips
+    # Core 批量插入不触发 ORM 事件
+    db_session.execute(insert(Expense), [
+        {"trip_id": first.id, "amount": 12.5, "category": "food", "expense_date": datetime(2025, 10, 1)},
+        {"trip_id": first.id, "amount": 7.5, "category": "food", "expense_date": datetime(2025, 10, 2)},
+    ])
+    db_session.commit()
+    assert totals(db_session, first.id) == {}
+
+    rebuild_budget_totals(db_session.connection(), first.id)
+    db_session.commit()
+    assert_consistent(db_session, first)
+
+
+@pytest.mark.asyncio
+async def test_category_totals_match_aggregate(db_session, trips):
+    first, _ = trips
+    db_session.add_all([expense(first, 100, "accommodation"), expense(first, 25), expense(first, 35)])
+    db_session.commit()
+
+    async with AsyncReadSessionLocal() as db:
+        maintained = await category_totals(db, first.id, use_totals=True)
+        aggregated = await category_totals(db, first.id, use_totals=False)
+
+    assert maintained == aggregated
+    assert [(item["category"], item["amount"], item["count"]) for item in maintained] == [
+        ("accommodation", 100.0, 1), ("food", 60.0, 2),
+    ]
+    assert sum(item["share"] for item in maintained) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_summary_endpoint_reads_totals(client, register_user, make_trip):
+    user_id, headers = register_user()
+    trip = make_trip(user_id, budget=1000)
+    for amount, category in ((120, "food"), (80, "transport")):
+        response = client.post("/api/budget/add", json={
+            "trip_id": trip.id, "amount": amount, "category": category, "expense_date": "2025-10-01",
+        }, headers=headers)
+        assert response.status_code in (200, 201), response.text
+
+    summary = client.get("/api/budget/summary", params={"trip_id": trip.id}, headers=headers).json()
+    assert summary["total_expenses"] == 200
+    assert summary["remaining_budget"] == 800
+    assert summary["expense_count"] == 2
@@ -0,0 +1,148 @@
+"""
+行程活动表：行程JSON中的活动字段解析，以及 Trip 的 ORM 事件维护的 itinerary_activities 与行程JSON保持一致
+"""
+
+from datetime import time
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.models import Trip
+from app.models.activity import ItineraryActivity, rebuild_itinerary_activities
+from app.utils.activity_parser import activity_rows, parse_cost, parse_duration_minutes, parse_start_time
+
+
+def itinerary(*days):
+    """每个参数是一天的活动列表 [(time, name, location, cost, type), ...]"""
+    return {
+        f"day{index}": {
+            "date": f"2025-10-0{index}",
+            "activities": [
+                {"time": start, "activity": name, "location": location, "duration": "2小时", "cost": cost, "type": kind}
+                for start, name, location, cost, kind in activities
+            ],
+        }
+        for index, activities in enumerate(days, start=1)
+    }
+
+
+FIRST = itinerary(
+    [("09:00", "外滩漫步", "外滩", "免费", "景点"), ("12:00", "午餐", "南京路", "人均80元", "餐饮")],
+    [("10:00", "东方明珠", "陆家嘴", 220, "景点")],
+)
+SECOND = itinerary([("下午3点", "豫园", "豫园", 40, "景点")])
+
+
+def stored(session, trip_id):
+    session.expire_all()
+    rows = session.execute(
+        select(ItineraryActivity.day_index, ItineraryActivity.position, ItineraryActivity.name, ItineraryActivity.cost)
+        .where(ItineraryActivity.trip_id == trip_id)
+        .order_by(ItineraryActivity.day_index, ItineraryActivity.position)
+    ).all()
+    return [(day, position, name, float(cost) if cost is not None else None) for day, position, name, cost in rows]
+
+
+def expected(value):
+    return [(row["day_index"], row["position"], row["name"], row["cost"]) for row in activity_rows(value)]
+
+
+@pytest.mark.parametrize("value, minutes", [
+    ("2小时", 120), ("1.5小时", 90), ("一个半小时", 90), ("1小时30分钟", 90), ("90min", 90),
+    ("2-3小时", 150), ("半天", 240), ("半小时", 30), (2, 120), ("看心情", None), (None, None),
+])
+def test_parse_duration(value, minutes):
+    assert parse_duration_minutes(value) == minutes
+
+
+@pytest.mark.parametrize("value, parsed", [
+    ("09:00", time(9, 0)), ("14:00-16:00", time(14, 0)), ("下午3点半", time(15, 30)),
+    ("晚上七点", time(19, 0)), ("25:00", None), ("全天", None), (None, None),
+])
+def test_parse_start_time(value, parsed):
+    assert parse_start_time(value) == parsed
+
+
+@pytest.mark.parametrize("value, cost", [
+    (80, 80.0), ("约80元", 80.0), ("人均50", 50.0), ("免费", 0.0), ("免门票", 0.0),
+    (-1, None), (True, None), ("待定", None),
+])
+def test_parse_cost(value, cost):
+    assert parse_cost(value) == cost
+
+
+def test_activity_rows_orders_days_and_skips_malformed():
+    rows = activity_rows({
+        "day10": {"activities": [{"activity": "最后一天"}]},
+        "day2": {"activities": [{"activity": "第二天"}, "不是活动"]},
+        "summary": {"activities": [{"activity": "不是天"}]},
+        "day1": {"activities": None},
+    })
+    assert [(row["day_index"], row["position"], row["name"]) for row in rows] == [(2, 0, "第二天"), (10, 0, "最后一天")]
+    assert activity_rows(None) == [] and activity_rows([1, 2]) == []
+
+
+def test_trip_changes_keep_activities_in_sync(db_session, register_user, make_trip):
+    user_id, _ = register_user()
+    trip = make_trip(user_id, itinerary=FIRST)
+    assert stored(db_session, trip.id) == expected(FIRST) == [
+        (1, 0, "外滩漫步", 0.0), (1, 1, "午餐", 80.0), (2, 0, "东方明珠", 220.0),
+    ]
+
+    trip.itinerary = SECOND
+    db_session.commit()
+    assert stored(db_session, trip.id) == expected(SECOND)
+
+    # 不修改行程JSON时不重写活动行
+    before = db_session.scalars(select(ItineraryActivity.id).where(ItineraryActivity.trip_id == trip.id)).all()
+    trip.title = "改个标题"
+    db_session.commit()
+    assert db_session.scalars(select(ItineraryActivity.id).where(ItineraryActivity.trip_id == trip.id)).all() == before
+
+    trip.itinerary = None
+    db_session.commit()
+    assert stored(db_session, trip.id) == []
+
+    trip.itinerary = FIRST
+    db_session.commit()
+    db_session.delete(trip)
+    db_session.commit()
+    assert stored(db_session, trip.id) == []
+
+
+def test_rebuild_after_bulk_insert(db_session, register_user, make_trip):
+    user_id, _ = register_user()
+    template = make_trip(user_id)
+    # Core 批量插入不触发 ORM 事件
+    trip_id = db_session.execute(insert(Trip).returning(Trip.id), [{
+        "user_id": user_id, "title": "批量", "destination": "上海", "start_date": template.start_date,
+        "end_date": template.end_date, "status": "planning", "itinerary": FIRST,
+    }]).scalar_one()
+    db_session.commit()
+    assert stored(db_session, trip_id) == []
+
+    rebuild_itinerary_activities(db_session.connection(), trip_id)
+    db_session.commit()
+    assert stored(db_session, trip_id) == expected(FIRST)
+
+
+def test_activity_endpoints_follow_updates(client, register_user, make_trip):
+    user_id, headers = register_user()
+    trip = make_trip(user_id, itinerary=FIRST)
+    other_id, other_headers = register_user()
+    make_trip(other_id, itinerary=FIRST)
+
+    found = client.get("/api/itinerary/activities", params={"type": "景点", "min_cost": 200}, headers=headers).json()
+    assert [(item["trip_id"], item["name"], item["cost"]) for item in found] == [(trip.id, "东方明珠", 220.0)]
+    costs = client.get(f"/api/itinerary/{trip.id}/day-costs", headers=headers).json()
+    assert [(day["day_index"], day["activity_count"], day["planned_cost"]) for day in costs] == [(1, 2, 80.0), (2, 1, 220.0)]
+    assert client.get(f"/api/itinerary/{trip.id}/day-costs", headers=other_headers).status_code == 404
+
+    response = client.put(f"/api/itinerary/{trip.id}", json={"itinerary": SECOND}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert client.get("/api/itinerary/activities", params={"type": "景点", "min_cost": 200}, headers=headers).json() == []
+    found = client.get("/api/itinerary/activities", params={"location": "豫园"}, headers=headers).json()
+    assert [(item["name"], item["start_time"]) for item in found] == [("豫园", "15:00:00")]
+
+    assert client.delete(f"/api/itinerary/{trip.id}", headers=headers).status_code == 200
+    assert client.get("/api/itinerary/activities", headers=headers).json() == []
@@ -0,0 +1,67 @@
+"""
+行程生成缓存：返回的行程与缓存相互独立，内存命中不受持久层锁影响
+"""
+
+import threading
+
+import pytest
+
+from app.services.itinerary_cache import ItineraryCache, build_cache_key
+
+KEY = build_cache_key("上海", "2025-10-01", "2025-10-02", 3000, "美食", 2)
+ITINERARY = {
+    "day1": {"date": "2025-10-01", "activities": [{"time": "09:00", "activity": "外滩", "cost": 0}]},
+    "day2": {"date": "2025-10-02", "activities": [{"time": "10:00", "activity": "豫园", "cost": 40}]},
+}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ItineraryCache(path=str(tmp_path / "cache.db"), lru_size=8, ttl=3600)
+    cache.enabled = True
+    yield cache
+    cache.clear()
+
+
+def fresh():
+    return {key: {"date": day["date"], "activities": [dict(a) for a in day["activities"]]} for key, day in ITINERARY.items()}
+
+
+@pytest.mark.asyncio
+async def test_mutating_results_does_not_affect_cache(cache):
+    original = fresh()
+    await cache.set(KEY, original)
+    original["day1"]["activities"][0]["activity"] = "被调用方改掉"
+
+    first = await cache.get("2025-11-01", KEY)
+    assert first["day1"]["date"] == "2025-11-01"
+    first["day1"]["activities"][0]["cost"] = 999
+    first["day2"]["activities"].append({"activity": "追加"})
+
+    second = await cache.get("2025-10-01", KEY)
+    assert second == ITINERARY
+
+
+@pytest.mark.asyncio
+async def test_disk_hit_is_independent_of_memory_entry(cache):
+    await cache.set(KEY, fresh())
+    reopened = ItineraryCache(path=cache.path, lru_size=8, ttl=3600)
+    reopened.enabled = True
+
+    from_disk = await reopened.get("2025-10-01", KEY)
+    assert from_disk == ITINERARY
+    from_disk["day1"]["activities"][0]["activity"] = "被调用方改掉"
+    assert await reopened.get("2025-10-01", KEY) == ITINERARY
+
+
+@pytest.mark.asyncio
+async def test_memory_hit_not_blocked_by_disk_lock(cache):
+    await cache.set(KEY, fresh())
+    results = []
+    with cache._disk_lock:
+        # 模拟工作线程正在写盘
+        reader = threading.Thread(target=lambda: results.append(cache._memory_get(KEY)))
+        reader.start()
+        reader.join(timeout=2)
+        assert not reader.is_alive()
+    assert results == [ITINERARY]
@@ -0,0 +1,70 @@
+"""
+行程生成任务队列：重启后恢复未完成的任务
+"""
+
+import uuid
+
+import pytest
+
+from app.models import GenerationJob, Trip, User
+from app.services.ai_service import ai_service
+from app.services.job_queue import JobQueue
+
+REQUEST = {"destination": "杭州", "start_date": "2025-10-01", "end_date": "2025-10-02", "budget": 2000}
+
+
+@pytest.fixture
+def user(db_session):
+    suffix = uuid.uuid4().hex[:8]
+    user = User(username=f"job_{suffix}", email=f"job_{suffix}@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def add_job(db_session, user):
+    def add(status: str, attempts: int = 0) -> int:
+        job = GenerationJob(user_id=user.id, status=status, request=dict(REQUEST), attempts=attempts)
+        db_session.add(job)
+        db_session.commit()
+        return job.id
+    return add
+
+
+@pytest.mark.asyncio
+async def test_recover_requeues_interrupted_jobs(db_session, add_job):
+    queued = add_job("queued")
+    interrupted = add_job("running", attempts=1)
+    exhausted = add_job("running", attempts=2)
+    finished = add_job("done", attempts=1)
+
+    recovered = await JobQueue(workers=1, max_attempts=2)._recover()
+
+    assert [job_id for job_id in recovered if job_id in (queued, interrupted, exhausted, finished)] == [queued, interrupted]
+    db_session.expire_all()
+    assert db_session.get(GenerationJob, interrupted).status == "queued"
+    failed = db_session.get(GenerationJob, exhausted)
+    assert failed.status == "failed" and failed.error and failed.finished_at is not None
+    assert db_session.get(GenerationJob, finished).status == "done"
+
+
+@pytest.mark.asyncio
+async def test_start_runs_recovered_jobs(db_session, add_job, monkeypatch):
+    async def generate_itinerary(**kwargs):
+        return {"success": True, "data": {"day1": {"date": "2025-10-01", "activities": []}}, "message": "ok"}
+    monkeypatch.setattr(ai_service, "generate_itinerary", generate_itinerary)
+
+    interrupted = add_job("running", attempts=1)
+    queue = JobQueue(workers=1, max_attempts=2)
+    await queue.start()
+    try:
+        await queue._queue.join()
+    finally:
+        await queue.stop()
+
+    db_session.expire_all()
+    job = db_session.get(GenerationJob, interrupted)
+    assert job.status == "done"
+    assert job.attempts == 2
+    assert db_session.get(Trip, job.trip_id).destination == "杭州"
@@ -0,0 +1,88 @@
+"""
+容错JSON解析：截断时丢弃值不完整的成员，同一行缺逗号时放弃而不是合并
+"""
+
+import json
+
+import pytest
+
+from app.utils.json_repair import TolerantJSONParser, parse_model_json
+
+
+@pytest.mark.parametrize("text, data, dropped", [
+    ('{"date": "2025-10-01", "time": "10:', {"date": "2025-10-01"}, ["time"]),
+    ('{"budget": 5000, "travelers": 2', {"budget": 5000}, ["travelers"]),
+    ('{"a": true, "b": nul', {"a": True}, ["b"]),
+    ('{"a": 1, "category": 交', {"a": 1}, ["category"]),
+    ('{"suggestions": ["选择本地小吃", "提前预订门', {"suggestions": ["选择本地小吃"]}, []),
+    ('{"day1": {"time": "09:00", "activity": "外', {"day1": {"time": "09:00"}}, []),
+    ('{"day1": {"x": 1}, "da', {"day1": {"x": 1}}, []),
+])
+def test_truncated_values_are_dropped(text, data, dropped):
+    result = parse_model_json(text)
+    assert result.truncated
+    assert result.data == data
+    assert result.dropped_fields == dropped
+
+
+@pytest.mark.parametrize("text, data", [
+    ('{"a": "x"', {"a": "x"}),
+    ('{"ok": false', {"ok": False}),
+    ('{"items": [1, 2]', {"items": [1, 2]}),
+])
+def test_values_complete_at_truncation_are_kept(text, data):
+    result = parse_model_json(text)
+    assert result.truncated and result.data == data
+
+
+@pytest.mark.parametrize("text", [
+    '{"a": "x" "b": 2}',
+    '{"a": "x""b": 2}',
+    '{"day1": {"time": "09:00" "activity": "外滩"}}',
+    "{'a': 'x' 'b': 2}",
+])
+def test_missing_comma_on_same_line_gives_up(text):
+    result = parse_model_json(text)
+    assert result.data is None
+    assert "ambiguous_missing_comma" in result.repairs
+
+
+def test_missing_comma_across_lines_is_repaired():
+    result = parse_model_json('{"a": "x"\n"b": 2, "c": 3 "d": 4}')
+    assert result.data == {"a": "x", "b": 2, "c": 3, "d": 4}
+    assert "missing_comma" in result.repairs
+
+
+def test_unescaped_inner_quotes_still_repaired():
+    result = parse_model_json('{"description": "品尝"招牌"小笼包"}')
+    assert result.data == {"description": '品尝"招牌"小笼包'}
+
+
+def test_stream_keeps_fields_completed_before_giving_up():
+    parser = TolerantJSONParser()
+    text = json.dumps({"day1": {"activities": []}}, ensure_ascii=False)[:-1] + ', "day2": {"a": "x" "b": 1}}'
+    completed = [key for i in range(0, len(text), 4) for key, _ in parser.feed(text[i:i + 4])]
+    result = parser.finish()
+    assert completed == ["day1"]
+    assert result.data is None and not result.truncated
+    assert parser.take_completed() == []
+
+
+@pytest.mark.parametrize("text, data", [
+    (
+        '{"day1": {"date": "2025-10-01", "activities": [{"time": "09:00", "activity": "外滩"}]}, '
+        '"day2": {"date": "2025-10-02", "activities": [{"time": "10:',
+        {"day1": {"date": "2025-10-01", "activities": [{"time": "09:00", "activity": "外滩"}]},
+         "day2": {"date": "2025-10-02"}},
+    ),
+    (
+        '{"day1": {"activities": [{"time": "09:00", "activity": "外滩"}, {"time": "10:',
+        {"day1": {"activities": [{"time": "09:00", "activity": "外滩"}]}},
+    ),
+    ('{"day1": {"date": "2025-10-01"}, "day2": {', {"day1": {"date": "2025-10-01"}}),
+    ('{"s": ["x", ["y', {"s": ["x"]}),
+])
+def test_containers_emptied_by_truncation_are_dropped(text, data):
+    result = parse_model_json(text)
+    assert result.data == data
+    assert "{}" not in json.dumps(result.data) and "[]" not in json.dumps(result.data)
@@ -0,0 +1,114 @@
+"""
+数据库迁移：逐版本升级的结果与 ORM 模型一致，热点查询走索引
+"""
+
+import ast
+import json
+from datetime import time
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base
+from app.migrations import LATEST_VERSION, current_version, upgrade, versions
+from app.utils.query_plans import explain, hot_queries, plan_problems
+
+
+@pytest.fixture
+def fresh_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_initial_schema_is_frozen(fresh_engine):
+    with fresh_engine.begin() as conn:
+        assert upgrade(conn, 1) == [1]
+        inspector = inspect(conn)
+        # 迁移 1 只建基础表，之后迁移新增的列、索引和表都不存在
+        assert "travelers" not in {column["name"] for column in inspector.get_columns("trips")}
+        assert "ix_trips_user_id_created_at" not in {index["name"] for index in inspector.get_indexes("trips")}
+        assert not inspector.has_table("trip_budget_totals")
+        assert not inspector.has_table("itinerary_activities")
+
+
+def test_upgrade_matches_models(fresh_engine):
+    with fresh_engine.begin() as conn:
+        upgrade(conn, 1)
+        assert upgrade(conn) == list(range(2, LATEST_VERSION + 1))
+        assert current_version(conn) == LATEST_VERSION
+        assert upgrade(conn) == []
+
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            assert columns == {column.name for column in table.columns}, table.name
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            assert {index.name for index in table.indexes} <= indexes, table.name
+
+
+def test_upgrade_existing_create_all_database(fresh_engine):
+    """旧版本用 create_all 建好的库（没有 schema_version）也能升级"""
+    with fresh_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50), email VARCHAR(100), password_hash VARCHAR(255))"
+        ))
+        upgrade(conn)
+        assert current_version(conn) == LATEST_VERSION
+        assert "travelers" in {column["name"] for column in inspect(conn).get_columns("trips")}
+
+
+def test_migrations_do_not_import_models():
+    """迁移不依赖 ORM 模型，模型之后的修改不会改变已发布迁移"""
+    tree = ast.parse(open(versions.__file__, encoding="utf-8").read())
+    modules = [node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom)]
+    modules += [alias.name for node in ast.walk(tree) if isinstance(node, ast.Import) for alias in node.names]
+    assert not [name for name in modules if name and name.startswith("app.") and not name.startswith("app.migrations")]
+
+
+def test_backfill_existing_rows(fresh_engine):
+    """迁移 4、5 从升级前已有的费用和行程回填汇总表与活动表"""
+    itinerary = {"day1": {"activities": [
+        {"time": "下午3点", "activity": "豫园", "location": "豫园", "duration": "一个半小时", "cost": "约40元", "type": "景点"},
+    ]}}
+    with fresh_engine.begin() as conn:
+        upgrade(conn, 3)
+        conn.execute(text("INSERT INTO users (id, username, email, password_hash) VALUES (1, 'u', 'u@example.com', 'x')"))
+        conn.execute(text(
+            "INSERT INTO trips (id, user_id, title, destination, start_date, end_date, status, itinerary) "
+            "VALUES (1, 1, 't', '上海', '2025-10-01', '2025-10-02', 'planning', :itinerary)"
+        ), {"itinerary": json.dumps(itinerary, ensure_ascii=False)})
+        conn.execute(text(
+            "INSERT INTO expenses (trip_id, amount, category, expense_date) VALUES "
+            "(1, 12.5, 'food', '2025-10-01'), (1, 7.5, 'food', '2025-10-01'), (1, 30, 'transport', '2025-10-02')"
+        ))
+        upgrade(conn)
+
+        totals = conn.execute(text(
+            "SELECT category, amount, expense_count FROM trip_budget_totals WHERE trip_id = 1 ORDER BY category"
+        )).all()
+        assert [(category, float(amount), count) for category, amount, count in totals] == [
+            ("food", 20.0, 2), ("transport", 30.0, 1),
+        ]
+        activity = conn.execute(text(
+            "SELECT day_index, position, start_time, duration_minutes, cost, activity_type, name FROM itinerary_activities"
+        )).one()
+        assert activity[:2] == (1, 0)
+        assert activity[2].startswith(time(15, 0).isoformat())
+        assert (activity[3], float(activity[4]), activity[5], activity[6]) == (90, 40.0, "景点", "豫园")
+
+
+@pytest.mark.parametrize("name,statement,allow_temp_sort", hot_queries(), ids=[item[0] for item in hot_queries()])
+def test_hot_queries_use_indexes(database, name, statement, allow_temp_sort):
+    with database.connect() as conn:
+        details = explain(conn, statement)
+    assert plan_problems(details, allow_temp_sort) == [], details
+
+
+def test_plan_check_detects_missing_index(fresh_engine):
+    queries = {name: (statement, allow_temp_sort) for name, statement, allow_temp_sort in hot_queries()}
+    with fresh_engine.begin() as conn:
+        upgrade(conn)
+        conn.execute(text("DROP INDEX ix_expenses_trip_id_expense_date"))
+        statement, allow_temp_sort = queries["budget.list"]
+        assert plan_problems(explain(conn, statement), allow_temp_sort)
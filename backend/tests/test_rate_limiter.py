@@ -0,0 +1,105 @@
+"""
+上游准入控制：令牌桶计算与按优先级放行
+"""
+
+import time
+import asyncio
+
+import pytest
+
+from app.services.rate_limiter import PRIORITY_BULK, PRIORITY_DEFAULT, PRIORITY_INTERACTIVE, RateLimiter, TokenBucket
+
+
+def test_token_bucket_refill_and_debt():
+    bucket = TokenBucket(rate=10, capacity=20)
+    now = bucket.updated
+    assert bucket.wait_time(20, now) == 0
+    bucket.consume(20)
+    assert bucket.wait_time(5, now) == pytest.approx(0.5)
+    # 补充不超过容量
+    assert bucket.wait_time(1, now + 100) == 0
+    assert bucket.tokens == 20
+    # 实际用量超出预估时记为欠账，需要更久才能再次放行
+    bucket.adjust(30)
+    assert bucket.tokens == -10
+    assert bucket.wait_time(10, now + 100) == pytest.approx(2.0)
+
+
+def test_oversized_request_only_waits_for_a_full_bucket():
+    bucket = TokenBucket(rate=10, capacity=20)
+    assert bucket.wait_time(1000, bucket.updated) == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_are_released_before_bulk():
+    limiter = RateLimiter(rps=20, tpm=0)
+    for _ in range(20):
+        await limiter.acquire(0)
+
+    order = []
+
+    async def call(name: str, priority: int):
+        await limiter.acquire(0, priority)
+        order.append(name)
+
+    bulk = [asyncio.create_task(call(f"bulk{i}", PRIORITY_BULK)) for i in range(3)]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE))
+    default = asyncio.create_task(call("default", PRIORITY_DEFAULT))
+    await asyncio.gather(*bulk, interactive, default)
+
+    assert order == ["interactive", "default", "bulk0", "bulk1", "bulk2"]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_delays_calls_and_usage_is_refunded():
+    limiter = RateLimiter(rps=0, tpm=6000)  # 每秒补充 100 个 token
+    await limiter.acquire(6000)
+
+    started = time.monotonic()
+    await limiter.acquire(30)
+    assert time.monotonic() - started >= 0.25
+
+    # 实际用量少于预估时退还差额
+    before = limiter.tokens.tokens
+    limiter.record_usage(1000, {"prompt_tokens": 100, "completion_tokens": 100, "total_tokens": 200})
+    assert limiter.tokens.tokens == pytest.approx(before + 800)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_consume_quota():
+    limiter = RateLimiter(rps=10, tpm=0)
+    for _ in range(10):
+        await limiter.acquire(0)
+
+    cancelled = asyncio.create_task(limiter.acquire(0, PRIORITY_INTERACTIVE))
+    waiting = asyncio.create_task(limiter.acquire(0, PRIORITY_BULK))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    started = time.monotonic()
+    await waiting
+    # 取消的调用不占用额度：下一个调用在约一个令牌的时间内放行
+    assert time.monotonic() - started < 0.19
+    assert cancelled.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_after_grant_refunds_quota():
+    limiter = RateLimiter(rps=1, tpm=60)
+    limiter.requests.consume(1)
+    limiter.tokens.consume(60)
+
+    waiter = asyncio.create_task(limiter.acquire(30))
+    await asyncio.sleep(0)
+    # 由测试代替后台调度放行，放行后立即取消（调用方尚未恢复执行，如客户端断开）
+    limiter._dispatcher.cancel()
+    limiter.requests.tokens, limiter.tokens.tokens = 1, 60
+    await limiter._dispatch()
+    assert limiter.tokens.tokens == pytest.approx(30, abs=1)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert limiter.tokens.tokens == pytest.approx(60)
+    assert limiter.requests.tokens == pytest.approx(1)
@@ -0,0 +1,221 @@
+"""
+上游容错：熔断器状态变化、瞬时错误重试与对冲请求
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.resilience import CircuitBreaker, CircuitOpenError, hedged, retry_async
+
+
+async def fail():
+    raise ConnectionError("upstream down")
+
+
+async def succeed():
+    return "ok"
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+    assert breaker.state == "closed"
+
+    with pytest.raises(ConnectionError):
+        await breaker.call(fail)
+    assert breaker.state == "open"
+
+    calls = 0
+
+    async def counted():
+        nonlocal calls
+        calls += 1
+        return "ok"
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(counted)
+    assert calls == 0
+
+
+@pytest.mark.asyncio
+async def test_success_resets_failure_count_and_client_errors_do_not_count():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    with pytest.raises(ConnectionError):
+        await breaker.call(fail)
+    assert await breaker.call(succeed) == "ok"
+    with pytest.raises(ConnectionError):
+        await breaker.call(fail)
+    assert breaker.state == "closed"
+
+    async def bad_request():
+        raise ValueError("invalid prompt")
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            await breaker.call(bad_request)
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_half_open_lets_a_single_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(ConnectionError):
+        await breaker.call(fail)
+    await asyncio.sleep(0.06)
+
+    release = asyncio.Event()
+
+    async def slow_probe():
+        await release.wait()
+        return "recovered"
+
+    probe = asyncio.create_task(breaker.call(slow_probe))
+    await asyncio.sleep(0)
+    assert breaker.state == "half_open"
+    # 探测请求进行中，其余调用被拒绝
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+
+    release.set()
+    assert await probe == "recovered"
+    assert breaker.state == "closed"
+    assert await breaker.call(succeed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(ConnectionError):
+        await breaker.call(fail)
+    await asyncio.sleep(0.06)
+
+    with pytest.raises(ConnectionError):
+        await breaker.call(fail)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+
+
+@pytest.mark.asyncio
+async def test_retry_only_transient_errors():
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise ConnectionError("reset")
+        return "ok"
+
+    assert await retry_async(flaky, "test", attempts=3, base_delay=0) == "ok"
+    assert attempts == 3
+
+    attempts = 0
+
+    async def invalid():
+        nonlocal attempts
+        attempts += 1
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await retry_async(invalid, "test", attempts=3, base_delay=0)
+    assert attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_gives_up_and_does_not_retry_open_breaker():
+    attempts = 0
+
+    async def always_down():
+        nonlocal attempts
+        attempts += 1
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        await retry_async(always_down, "test", attempts=3, base_delay=0)
+    assert attempts == 3
+
+    attempts = 0
+
+    async def rejected():
+        nonlocal attempts
+        attempts += 1
+        raise CircuitOpenError("open")
+
+    with pytest.raises(CircuitOpenError):
+        await retry_async(rejected, "test", attempts=3, base_delay=0)
+    assert attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_returns_first_success():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(1)
+            return "slow"
+        return "fast"
+
+    assert await hedged(call, 0.02, "test") == "fast"
+    assert calls == 2
+
+    calls = 0
+
+    async def quick():
+        nonlocal calls
+        calls += 1
+        return "quick"
+
+    assert await hedged(quick, 0.5, "test") == "quick"
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("delay, expected_calls", [(0.01, 2), (1.0, 1)])
+async def test_cancelling_hedged_call_cancels_inner_calls(delay, expected_calls):
+    started, cancelled = [], []
+
+    async def call():
+        started.append(1)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    outer = asyncio.create_task(hedged(call, delay, "test"))
+    await asyncio.sleep(0.05)
+    outer.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await outer
+    await asyncio.sleep(0)
+    assert len(started) == len(cancelled) == expected_calls
+
+
+@pytest.mark.asyncio
+async def test_hedged_inner_cancellation_is_a_failure():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.05)
+            raise asyncio.CancelledError()
+        await asyncio.sleep(0.1)
+        return "hedge"
+
+    assert await hedged(call, 0.01, "test") == "hedge"
+
+    async def always_cancelled():
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        await hedged(always_cancelled, 0.01, "test")
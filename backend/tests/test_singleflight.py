@@ -0,0 +1,124 @@
+"""
+相同请求合并：SingleFlight 以及 LLM 网关的并发相同调用
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.llm_gateway import LLMGateway
+from app.services.singleflight import SingleFlight
+
+
+class FakeCompletions:
+    """记录调用次数、可控制返回时机的对话补全接口"""
+
+    def __init__(self, delay: float = 0.05, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    async def create(self, model, messages, temperature, timeout):
+        self.calls.append(messages)
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"reply {len(self.calls)}"))],
+            usage=None,
+            model=model,
+        )
+
+
+@pytest.fixture
+def gateway_with(monkeypatch):
+    def build(completions: FakeCompletions) -> LLMGateway:
+        gateway = LLMGateway()
+        gateway.configure()
+        client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        monkeypatch.setattr(gateway, "_get_client", lambda: client)
+        return gateway
+    return build
+
+
+MESSAGES = [{"role": "user", "content": "去杭州玩三天"}]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_upstream_call(gateway_with):
+    completions = FakeCompletions()
+    gateway = gateway_with(completions)
+
+    results = await asyncio.gather(*[gateway.chat(MESSAGES) for _ in range(5)])
+
+    assert len(completions.calls) == 1
+    assert {result.content for result in results} == {"reply 1"}
+
+
+@pytest.mark.asyncio
+async def test_different_requests_and_coalesce_off_are_not_merged(gateway_with):
+    completions = FakeCompletions()
+    gateway = gateway_with(completions)
+
+    await asyncio.gather(
+        gateway.chat(MESSAGES),
+        gateway.chat([{"role": "user", "content": "去成都"}]),
+        gateway.chat(MESSAGES, temperature=0.7),
+        gateway.chat(MESSAGES, coalesce=False),
+    )
+
+    assert len(completions.calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_finished_call_is_not_reused(gateway_with):
+    completions = FakeCompletions(delay=0)
+    gateway = gateway_with(completions)
+
+    first = await gateway.chat(MESSAGES)
+    second = await gateway.chat(MESSAGES)
+
+    assert (first.content, second.content) == ("reply 1", "reply 2")
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_waiter(gateway_with):
+    completions = FakeCompletions(error=ValueError("bad request"))
+    gateway = gateway_with(completions)
+
+    results = await asyncio.gather(*[gateway.chat(MESSAGES) for _ in range(3)], return_exceptions=True)
+
+    assert len(completions.calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert gateway._singleflight.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_waiter_keeps_the_shared_call():
+    flight = SingleFlight("test")
+    started = asyncio.Event()
+    release = asyncio.Event()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", upstream))
+    await started.wait()
+    second = asyncio.create_task(flight.do("key", upstream))
+    await asyncio.sleep(0)
+
+    # 最先发起的调用方断开，上游调用与其他等待者不受影响
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    release.set()
+
+    assert await second == "done"
+    assert calls == 1
+    assert flight.inflight == 0
@@ -0,0 +1,55 @@
+"""
+行程文本本地预解析：人数识别
+"""
+
+from datetime import date
+
+import pytest
+
+from app.utils.trip_preparser import preparse_trip
+
+TODAY = date(2025, 9, 15)
+
+
+@pytest.mark.parametrize("text", ["国庆想和老婆去成都玩五天", "我们俩去大理", "小两口去三亚度蜜月"])
+def test_couple_is_two(text):
+    result = preparse_trip(text, TODAY)
+    assert result.fields.get("travelers") == 2
+    assert "travelers" not in result.missing
+
+
+@pytest.mark.parametrize("text", ["我和老婆孩子去厦门玩四天", "和老公带爸妈去桂林", "夫妻俩和朋友去成都"])
+def test_couple_with_other_companions_defers_to_llm(text):
+    result = preparse_trip(text, TODAY)
+    assert "travelers" in result.missing
+    assert not result.complete
+
+
+def test_explicit_count_wins_over_couple():
+    result = preparse_trip("和老婆带爸妈去桂林，一共4个人", TODAY)
+    assert result.fields.get("travelers") == 4
+
+
+@pytest.mark.parametrize("text, travelers", [
+    ("我和老婆带两个孩子去三亚玩一周", 4),
+    ("夫妻俩带一个宝宝去青岛", 3),
+    ("周五去南京玩两天，两个大人一个小孩", 3),
+    ("后天去九寨沟，2个大人", 2),
+])
+def test_counted_children_include_implied_adults(text, travelers):
+    result = preparse_trip(text, TODAY)
+    assert result.fields.get("travelers") == travelers
+    assert "travelers" not in result.missing
+
+
+@pytest.mark.parametrize("text", [
+    "我和朋友带两个孩子去三亚",
+    "我和朋友带孩子去三亚玩一周",
+    "带两个孩子去三亚",
+    "夫妻俩带两个孩子和爸妈去三亚",
+    "两个大人带孩子去三亚",
+])
+def test_ambiguous_adults_defers_to_llm(text):
+    result = preparse_trip(text, TODAY)
+    assert "travelers" in result.missing
+    assert not result.complete